@@ -0,0 +1,184 @@
+"""Publicación de los archivos CSS/JS con huella de contenido y precomprimidos.
+
+La construcción copia cada archivo de static/css y static/js (y los paquetes
+de PAQUETES, que concatenan varios) a static/dist con un hash del contenido
+en el nombre, junto con sus variantes .gz y .br (brotli es opcional), y
+escribe static/dist/manifest.json con nombre lógico -> nombre publicado.
+
+Las plantillas piden los archivos por su nombre lógico con activo('css/...');
+/activos/ los sirve con caché inmutable de un año y la variante comprimida
+que acepte el navegador. Si un archivo de origen es más nuevo que el
+manifiesto, la aplicación vuelve a construir al arrancar.
+
+    python activos.py            # construir static/dist
+"""
+import gzip
+import hashlib
+import json
+import os
+import sys
+
+from flask import abort, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DIRECTORIO_STATIC = 'static'
+SUBDIRECTORIO_DIST = 'dist'
+NOMBRE_MANIFIESTO = 'manifest.json'
+
+# Carpetas de static/ cuyos archivos se publican, y extensiones publicadas
+CARPETAS_ACTIVOS = ('css', 'js')
+EXTENSIONES_ACTIVOS = ('.css', '.js')
+
+# Paquetes: nombre lógico -> archivos de origen concatenados en ese orden.
+# base.css reúne la hoja general y la cabecera del layout, que cargan todas las páginas.
+PAQUETES = {
+    'css/base.css': ('css/style.css', 'css/layout_cabecera.css'),
+}
+
+# Codificación -> extensión de la variante precomprimida, en orden de preferencia
+CODIFICACIONES = (('br', '.br'), ('gzip', '.gz'))
+
+CACHE_ACTIVOS_SEGUNDOS = 365 * 24 * 3600
+
+
+def _origenes(directorio_static):
+    """Nombre lógico -> lista de rutas relativas a static/ que lo forman"""
+    origenes = {}
+    for carpeta in CARPETAS_ACTIVOS:
+        raiz = os.path.join(directorio_static, carpeta)
+        for actual, _, archivos in os.walk(raiz):
+            for archivo in sorted(archivos):
+                if archivo.endswith(EXTENSIONES_ACTIVOS):
+                    relativo = os.path.relpath(os.path.join(actual, archivo), directorio_static)
+                    relativo = relativo.replace(os.sep, '/')
+                    origenes[relativo] = [relativo]
+    for nombre, partes in PAQUETES.items():
+        origenes[nombre] = list(partes)
+    return origenes
+
+
+def construir(directorio_static=DIRECTORIO_STATIC):
+    """Publicar los activos en static/dist y devolver el manifiesto"""
+    dist = os.path.join(directorio_static, SUBDIRECTORIO_DIST)
+    manifiesto = {}
+    publicados = set()
+
+    for nombre, partes in sorted(_origenes(directorio_static).items()):
+        contenido = b''
+        for parte in partes:
+            with open(os.path.join(directorio_static, parte), 'rb') as f:
+                contenido += f.read().rstrip(b'\n') + b'\n'
+
+        raiz, extension = os.path.splitext(nombre)
+        publicado = f'{raiz}.{hashlib.sha256(contenido).hexdigest()[:12]}{extension}'
+        manifiesto[nombre] = publicado
+
+        variantes = {publicado: contenido}
+        # mtime=0: el .gz es idéntico en cada construcción
+        variantes[publicado + '.gz'] = gzip.compress(contenido, compresslevel=9, mtime=0)
+        if brotli is not None:
+            variantes[publicado + '.br'] = brotli.compress(contenido, quality=11)
+
+        for archivo, datos in variantes.items():
+            publicados.add(archivo)
+            destino = os.path.join(dist, archivo)
+            if not os.path.exists(destino):
+                _escribir(destino, datos)
+
+    # Borrar las versiones anteriores que ya no están en el manifiesto
+    for actual, _, archivos in os.walk(dist):
+        for archivo in archivos:
+            relativo = os.path.relpath(os.path.join(actual, archivo), dist).replace(os.sep, '/')
+            if relativo != NOMBRE_MANIFIESTO and relativo not in publicados and not archivo.endswith('.tmp'):
+                os.remove(os.path.join(actual, archivo))
+
+    _escribir(os.path.join(dist, NOMBRE_MANIFIESTO), json.dumps(manifiesto, indent=2, sort_keys=True).encode('utf-8'))
+    return manifiesto
+
+
+def _escribir(destino, datos):
+    """Escritura atómica: varios workers pueden construir a la vez al arrancar"""
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporal = f'{destino}.{os.getpid()}.tmp'
+    with open(temporal, 'wb') as f:
+        f.write(datos)
+    os.replace(temporal, destino)
+
+
+def cargar_manifiesto(directorio_static=DIRECTORIO_STATIC):
+    """Manifiesto publicado, construyéndolo antes si falta o algún origen es más nuevo"""
+    ruta = os.path.join(directorio_static, SUBDIRECTORIO_DIST, NOMBRE_MANIFIESTO)
+    try:
+        construido = os.path.getmtime(ruta)
+    except OSError:
+        construido = None
+
+    if construido is not None:
+        origenes = {parte for partes in _origenes(directorio_static).values() for parte in partes}
+        if all(os.path.getmtime(os.path.join(directorio_static, parte)) <= construido for parte in origenes):
+            with open(ruta, encoding='utf-8') as f:
+                return json.load(f)
+
+    print("📦 Construyendo activos estáticos (static/dist)")
+    return construir(directorio_static)
+
+
+def registrar_activos(app):
+    """Agregar la ruta /activos/ y la función activo() de las plantillas"""
+    directorio_static = app.static_folder
+    dist = os.path.join(directorio_static, SUBDIRECTORIO_DIST)
+    try:
+        manifiesto = cargar_manifiesto(directorio_static)
+    except OSError as e:
+        # Sin permisos de escritura, por ejemplo: se sirven los archivos de origen
+        print(f"⚠️ No se pudieron construir los activos estáticos: {e}")
+        manifiesto = {}
+
+    def activo(nombre):
+        """URL con huella de un archivo de static/ (o la normal si no está publicado)"""
+        publicado = manifiesto.get(nombre)
+        if publicado is None:
+            return url_for('static', filename=nombre)
+        return url_for('activo_publicado', nombre=publicado)
+
+    def activo_publicado(nombre):
+        if nombre not in publicados:
+            abort(404)
+
+        archivo, codificacion = nombre, None
+        for candidata, extension in CODIFICACIONES:
+            if request.accept_encodings[candidata] and os.path.exists(os.path.join(dist, nombre + extension)):
+                archivo, codificacion = nombre + extension, candidata
+                break
+
+        respuesta = send_from_directory(
+            dist, archivo, mimetype=_tipo_mime(nombre), max_age=CACHE_ACTIVOS_SEGUNDOS,
+            etag=f'{nombre}-{codificacion or "identity"}', conditional=True
+        )
+        if codificacion:
+            respuesta.headers['Content-Encoding'] = codificacion
+        respuesta.vary.add('Accept-Encoding')
+        respuesta.cache_control.public = True
+        respuesta.cache_control.immutable = True
+        return respuesta
+
+    publicados = set(manifiesto.values())
+    app.add_url_rule('/activos/<path:nombre>', 'activo_publicado', activo_publicado)
+    app.add_template_global(activo, 'activo')
+
+
+def _tipo_mime(nombre):
+    # Werkzeug agrega '; charset=utf-8' a los tipos text/*
+    return 'text/css' if nombre.endswith('.css') else 'text/javascript'
+
+
+if __name__ == '__main__':
+    directorio = sys.argv[1] if len(sys.argv) > 1 else DIRECTORIO_STATIC
+    resultado = construir(directorio)
+    for nombre, publicado in sorted(resultado.items()):
+        print(f"   {nombre:<40} -> {publicado}")
+    print(f"✅ {len(resultado)} activos publicados en {os.path.join(directorio, SUBDIRECTORIO_DIST)}")
@@ -0,0 +1,105 @@
+"""Distribución de las tablas de inventario de cada usuario.
+
+Hay dos modos de almacenamiento:
+
+* ``por_usuario``: un par de tablas ``productos_{id}`` / ``movimientos_{id}``
+  (con sus índices, triggers, índice de búsqueda y resumen diario
+  ``movimientos_diarios_{id}``) por cada usuario.
+* ``compartido``: una sola tabla ``productos`` y una ``movimientos`` con una
+  columna ``user_id`` e índices compuestos que empiezan por ``user_id``.
+
+SistemaInventario escribe cada consulta una sola vez usando los nombres y
+fragmentos SQL que dan estas clases, de modo que sirve para ambos modos.
+"""
+
+POR_USUARIO = 'por_usuario'
+COMPARTIDO = 'compartido'
+MODOS_ALMACENAMIENTO = (POR_USUARIO, COMPARTIDO)
+
+COLUMNAS_BUSQUEDA = ('codigo', 'nombre', 'descripcion')
+
+
+class TablasPorUsuario:
+    """Tablas propias de un usuario: productos_{id}, movimientos_{id}, productos_fts_{id}"""
+
+    modo = POR_USUARIO
+
+    def __init__(self, user_id):
+        self.user_id = int(user_id)
+        self.productos = f'productos_{self.user_id}'
+        self.movimientos = f'movimientos_{self.user_id}'
+        self.busqueda = f'productos_fts_{self.user_id}'
+        self.diario = f'movimientos_diarios_{self.user_id}'
+        # Prefijos para las listas de columnas y valores de los INSERT
+        self.columna_usuario = ''
+        self.valor_usuario = ''
+        # Destino del ON CONFLICT de los upsert por código
+        self.clave_codigo = 'codigo'
+        self.columnas_busqueda = COLUMNAS_BUSQUEDA
+
+    def filtro(self, alias=None):
+        """Condición que limita una consulta a las filas del usuario"""
+        return '1 = 1'
+
+    def objeto(self, prefijo, sufijo):
+        """Nombre de un índice o trigger: idx_productos_{id}_nombre"""
+        return f'{prefijo}_{self.user_id}_{sufijo}'
+
+    def usuario_de(self, fila):
+        """Expresión con el user_id de la fila NEW/OLD dentro de un trigger"""
+        return str(self.user_id)
+
+    def columnas_indice(self, columnas):
+        return columnas
+
+    def consulta_busqueda(self, consulta):
+        return consulta
+
+    def pesos_busqueda(self, pesos):
+        return tuple(pesos)
+
+
+class TablasCompartidas:
+    """Tablas productos/movimientos compartidas, filtradas por user_id.
+
+    Con user_id=None sirve para crear el DDL común a todos los usuarios.
+    """
+
+    modo = COMPARTIDO
+
+    def __init__(self, user_id=None):
+        self.user_id = int(user_id) if user_id is not None else None
+        self.productos = 'productos'
+        self.movimientos = 'movimientos'
+        self.busqueda = 'productos_fts'
+        self.diario = 'movimientos_diarios'
+        self.columna_usuario = 'user_id, '
+        self.valor_usuario = f'{self.user_id}, '
+        self.clave_codigo = 'user_id, codigo'
+        # user_id también se indexa en FTS5 para filtrar dentro del propio índice
+        self.columnas_busqueda = ('user_id',) + COLUMNAS_BUSQUEDA
+
+    def filtro(self, alias=None):
+        prefijo = f'{alias}.' if alias else ''
+        return f'{prefijo}user_id = {self.user_id}'
+
+    def objeto(self, prefijo, sufijo):
+        return f'{prefijo}_{sufijo}'
+
+    def usuario_de(self, fila):
+        return f'{fila}.user_id'
+
+    def columnas_indice(self, columnas):
+        return f'user_id, {columnas}'
+
+    def consulta_busqueda(self, consulta):
+        return f'user_id : "{self.user_id}" AND ({consulta})'
+
+    def pesos_busqueda(self, pesos):
+        return (0.0,) + tuple(pesos)
+
+
+def tablas_para(modo, user_id):
+    if modo == COMPARTIDO:
+        return TablasCompartidas(user_id)
+    return TablasPorUsuario(user_id)
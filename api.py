@@ -0,0 +1,335 @@
+"""API JSON versionada (/api/v1) sobre SistemaInventario.
+
+Autenticación con la cabecera 'Authorization: Bearer <token>' (tokens creados
+en Mi Cuenta o con `python gestion.py crear-token`) o con la sesión del navegador.
+
+Los GET responden con ETag y Last-Modified tomados de la versión de datos del
+usuario (version_datos, que incrementa cada escritura): con If-None-Match o
+If-Modified-Since al día se responde 304 sin ejecutar la consulta.
+
+    GET   /api/v1/productos?campos=id,codigo,stock_actual&por_pagina=100&cursor=...
+    GET   /api/v1/productos/<id>
+    POST  /api/v1/productos                 (JSON con los campos del formulario)
+    PUT   /api/v1/productos/<id>            (PATCH para cambiar sólo algunos campos)
+    GET   /api/v1/movimientos?cursor=...
+    POST  /api/v1/movimientos               (una línea o {"movimientos": [...]})
+    GET   /api/v1/estadisticas
+    GET   /api/v1/reportes/stock
+    GET   /api/v1/reportes/stock_bajo       (productos en alerta: stock_actual <= stock_minimo)
+    GET   /api/v1/alertas/resumenes?despues_de=ID&limite=50
+    GET   /api/v1/reportes/movimientos?desde=AAAA-MM-DD&hasta=AAAA-MM-DD&agrupacion=dia|semana|mes&producto_id=N
+    GET   /api/v1/reportes/existencias?fecha=AAAA-MM-DD  (stock y valor al cierre del día, por defecto ayer)
+"""
+import datetime
+import functools
+
+from flask import Blueprint, current_app, jsonify, request, url_for
+from flask_login import current_user
+from werkzeug.local import LocalProxy
+
+from importacion import CAMPOS_PRODUCTO, validar_producto
+
+api_v1 = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+# SistemaInventario de la aplicación y el proceso actuales (ver app.RecursosInventario)
+sistema = LocalProxy(lambda: current_app.extensions['inventario'].sistema())
+
+# Campos que devuelve la API de cada recurso (nunca user_id) y que acepta ?campos=
+CAMPOS_API = {
+    'productos': ('id',) + CAMPOS_PRODUCTO + ('fecha_creacion', 'alerta_desde'),
+    'movimientos': ('id', 'producto_id', 'producto_codigo', 'producto_nombre', 'tipo', 'cantidad', 'motivo', 'fecha'),
+}
+
+MAX_POR_PAGINA = 500
+MAX_RESUMENES_ALERTAS = 200
+
+
+def es_peticion_api(peticion):
+    """También las rutas de /api/v1 que no existen (sin blueprint asignado)"""
+    return peticion.path.startswith(api_v1.url_prefix + '/')
+
+
+def token_de_peticion(peticion):
+    """Token de 'Authorization: Bearer <token>', o None"""
+    tipo, _, token = peticion.headers.get('Authorization', '').partition(' ')
+    if tipo.lower() != 'bearer' or not token.strip():
+        return None
+    return token.strip()
+
+
+def error_api(mensaje, codigo, cabeceras=None):
+    return jsonify({'error': mensaje}), codigo, cabeceras or {}
+
+
+class ErrorPeticion(Exception):
+    """Parámetro no válido: se responde 400 con el mensaje"""
+
+
+@api_v1.errorhandler(ErrorPeticion)
+def peticion_no_valida(error):
+    return error_api(str(error), 400)
+
+
+@api_v1.before_request
+def exigir_autenticacion():
+    # force_login no redirige las peticiones de la API: se responde 401 en JSON
+    if not current_user.is_authenticated:
+        return error_api('Token de API no válido o ausente', 401, {'WWW-Authenticate': 'Bearer realm="api"'})
+
+
+# ========== GET CONDICIONAL ==========
+
+def condicional(por_dia=False):
+    """ETag / Last-Modified por versión de datos del usuario y 304 sin consultar nada.
+
+    La versión se lee antes de la consulta: si una escritura llega en medio,
+    la respuesta es más nueva que su ETag y el cliente sólo la pide otra vez.
+    Con por_dia la respuesta depende también de la fecha (movimientos de hoy,
+    rango por defecto de los reportes): el día entra en el ETag y no se manda
+    Last-Modified.
+    """
+    def decorador(vista):
+        @functools.wraps(vista)
+        def envoltura(*args, **kwargs):
+            version, modificado = sistema.obtener_estado_datos(current_user.id)
+            etag = f'{current_user.id}-{version}'
+            if por_dia:
+                etag += f'-{datetime.datetime.now(datetime.timezone.utc).date().isoformat()}'
+                modificado = None
+            # Last-Modified tiene resolución de segundos: con una escritura en el
+            # segundo actual sólo se puede confiar en el ETag
+            ahora = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+            if modificado is not None and modificado >= ahora:
+                modificado = None
+
+            if request.if_none_match:
+                sin_cambios = request.if_none_match.contains(etag)
+            else:
+                sin_cambios = (modificado is not None and request.if_modified_since is not None
+                               and modificado <= request.if_modified_since)
+
+            if sin_cambios:
+                respuesta = current_app.response_class(status=304)
+            else:
+                respuesta = current_app.make_response(vista(*args, **kwargs))
+                if respuesta.status_code != 200:
+                    return respuesta
+                if modificado is not None:
+                    respuesta.last_modified = modificado
+            respuesta.set_etag(etag)
+            # Sólo para este usuario y siempre revalidando con el servidor
+            respuesta.cache_control.private = True
+            respuesta.cache_control.no_cache = True
+            respuesta.vary.update(('Authorization', 'Cookie'))
+            return respuesta
+        return envoltura
+    return decorador
+
+
+# ========== PARÁMETROS ==========
+
+def campos_pedidos(recurso):
+    """Campos de ?campos=a,b (todos si no se indica); ErrorPeticion si alguno no existe"""
+    disponibles = CAMPOS_API[recurso]
+    texto = request.args.get('campos', '').strip()
+    if not texto:
+        return disponibles
+    campos = [campo.strip() for campo in texto.split(',') if campo.strip()]
+    desconocidos = [campo for campo in campos if campo not in disponibles]
+    if desconocidos:
+        raise ErrorPeticion(f"Campos desconocidos: {', '.join(desconocidos)}. Disponibles: {', '.join(disponibles)}")
+    return campos
+
+
+def seleccionar(filas, campos):
+    return [{campo: fila.get(campo) for campo in campos} for fila in filas]
+
+
+def por_pagina_pedida():
+    por_pagina = request.args.get('por_pagina', current_app.config['TAMANO_PAGINA'], type=int)
+    return max(1, min(por_pagina, MAX_POR_PAGINA))
+
+
+def fecha_pedida(nombre):
+    valor = request.args.get(nombre, '').strip()
+    if not valor:
+        return None
+    try:
+        return datetime.date.fromisoformat(valor).isoformat()
+    except ValueError:
+        raise ErrorPeticion(f"'{nombre}' debe tener el formato AAAA-MM-DD")
+
+
+def json_pedido():
+    datos = request.get_json(silent=True)
+    if not isinstance(datos, dict):
+        raise ErrorPeticion('Se esperaba un objeto JSON (Content-Type: application/json)')
+    return datos
+
+
+def respuesta_pagina(pagina, recurso):
+    campos = campos_pedidos(recurso)
+    return jsonify({
+        'datos': seleccionar(pagina.items, campos),
+        'total': pagina.total,
+        'cursor_siguiente': pagina.next_num,
+        'cursor_anterior': pagina.prev_num,
+    })
+
+
+# ========== PRODUCTOS ==========
+
+@api_v1.route('/productos')
+@condicional()
+def productos():
+    campos_pedidos('productos')
+    pagina = sistema.obtener_productos_pagina(current_user.id, request.args.get('cursor'), por_pagina_pedida())
+    return respuesta_pagina(pagina, 'productos')
+
+
+@api_v1.route('/productos/<int:producto_id>')
+@condicional()
+def producto(producto_id):
+    campos = campos_pedidos('productos')
+    encontrado = sistema.obtener_producto_por_id(current_user.id, producto_id)
+    if not encontrado:
+        return error_api('Producto no encontrado', 404)
+    return jsonify(seleccionar([encontrado], campos)[0])
+
+
+@api_v1.route('/productos', methods=['POST'])
+def crear_producto():
+    datos, error = validar_producto(json_pedido())
+    if error:
+        return error_api(error, 400)
+
+    exito, mensaje = sistema.agregar_producto(current_user.id, **datos)
+    creado = sistema.obtener_producto_por_codigo(current_user.id, datos['codigo'])
+    if not exito:
+        return error_api(mensaje, 409 if creado else 500)
+
+    respuesta = jsonify(seleccionar([creado], CAMPOS_API['productos'])[0])
+    return respuesta, 201, {'Location': url_for('api_v1.producto', producto_id=creado['id'])}
+
+
+@api_v1.route('/productos/<int:producto_id>', methods=['PUT', 'PATCH'])
+def actualizar_producto(producto_id):
+    actual = sistema.obtener_producto_por_id(current_user.id, producto_id)
+    if not actual:
+        return error_api('Producto no encontrado', 404)
+
+    # PUT reemplaza el producto; PATCH conserva los campos que no se envían
+    datos = json_pedido()
+    if request.method == 'PATCH':
+        datos = {**actual, **datos}
+    datos, error = validar_producto(datos)
+    if error:
+        return error_api(error, 400)
+
+    exito, mensaje = sistema.actualizar_producto(current_user.id, producto_id, **datos)
+    if not exito:
+        return error_api(mensaje, 409)
+    actualizado = sistema.obtener_producto_por_id(current_user.id, producto_id)
+    return jsonify(seleccionar([actualizado], CAMPOS_API['productos'])[0])
+
+
+# ========== MOVIMIENTOS ==========
+
+@api_v1.route('/movimientos')
+@condicional()
+def movimientos():
+    campos_pedidos('movimientos')
+    pagina = sistema.obtener_movimientos_pagina(current_user.id, request.args.get('cursor'), por_pagina_pedida())
+    return respuesta_pagina(pagina, 'movimientos')
+
+
+@api_v1.route('/movimientos', methods=['POST'])
+def crear_movimientos():
+    """Una línea {"producto_id" o "codigo", "tipo", "cantidad", "motivo"} o un lote
+    {"motivo": "...", "movimientos": [líneas]}: se guardan todas las líneas o ninguna.
+    """
+    datos = json_pedido()
+    lineas = datos['movimientos'] if 'movimientos' in datos else [datos]
+
+    if not isinstance(lineas, list) or not lineas or not all(isinstance(linea, dict) for linea in lineas):
+        return error_api('Se esperaba una línea o una lista "movimientos" con al menos una línea', 400)
+    if len(lineas) > current_app.config['MAX_LINEAS_LOTE']:
+        return error_api(f"Máximo {current_app.config['MAX_LINEAS_LOTE']} líneas por lote", 413)
+
+    motivo = str(datos.get('motivo') or '').strip() if 'movimientos' in datos else ''
+    exito, resultados = sistema.agregar_movimientos_lote(current_user.id, lineas, motivo)
+    return jsonify({
+        'exito': exito,
+        'lineas': len(resultados),
+        'errores': sum(1 for resultado in resultados if not resultado['ok']),
+        'movimientos': resultados
+    }), 201 if exito else 409
+
+
+# ========== ESTADÍSTICAS Y REPORTES ==========
+
+@api_v1.route('/estadisticas')
+@condicional(por_dia=True)
+def estadisticas():
+    return jsonify(sistema.obtener_estadisticas(current_user.id))
+
+
+@api_v1.route('/reportes/stock')
+@condicional()
+def reporte_stock():
+    return jsonify({'datos': sistema.obtener_reporte_stock(current_user.id)})
+
+
+@api_v1.route('/reportes/stock_bajo')
+@condicional()
+def reporte_stock_bajo():
+    campos = campos_pedidos('productos')
+    return jsonify({'datos': seleccionar(sistema.obtener_productos_stock_bajo(current_user.id), campos)})
+
+
+@api_v1.route('/reportes/movimientos')
+@condicional(por_dia=True)
+def reporte_movimientos():
+    desde = fecha_pedida('desde')
+    hasta = fecha_pedida('hasta')
+    producto_id = request.args.get('producto_id', type=int)
+    try:
+        reporte = sistema.obtener_reporte_movimientos(
+            current_user.id, desde, hasta, request.args.get('agrupacion', 'dia'), producto_id
+        )
+    except ValueError as e:
+        raise ErrorPeticion(str(e))
+    return jsonify({'datos': reporte})
+
+
+@api_v1.route('/reportes/existencias')
+@condicional(por_dia=True)
+def reporte_existencias():
+    existencias = sistema.obtener_stock_en_fecha(current_user.id, fecha_pedida('fecha'))
+    if existencias is None:
+        return error_api('No se pudieron calcular las existencias', 500)
+    return jsonify({
+        'datos': existencias['productos'],
+        'fecha': existencias['fecha'],
+        'corte': existencias['corte'],
+        'total_stock': existencias['total_stock'],
+        'valor_total': existencias['valor_total'],
+    })
+
+
+# ========== ALERTAS ==========
+
+@api_v1.route('/alertas/resumenes')
+def resumenes_alertas():
+    """Resúmenes del evaluador de alertas (gestion.py resumir-alertas) posteriores a ?despues_de=ID.
+
+    No dependen de la versión de datos (los crea el evaluador, no una escritura
+    del usuario): se consultan sin GET condicional, guardando el último id visto.
+    """
+    despues_de = request.args.get('despues_de', 0, type=int)
+    limite = max(1, min(request.args.get('limite', 50, type=int), MAX_RESUMENES_ALERTAS))
+    resumenes = sistema.obtener_resumenes_alertas(current_user.id, despues_de, limite)
+    return jsonify({
+        'datos': resumenes,
+        'ultimo_id': resumenes[-1]['id'] if resumenes else despues_de,
+    })
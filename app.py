@@ -1,21 +1,129 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session
+from flask import (
+    Flask, current_app, render_template, request, jsonify, redirect, url_for, flash, session, abort,
+    send_from_directory
+)
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
-from database import SistemaInventario
+from werkzeug.local import LocalProxy
+from configuracion import cargar_configuracion, crear_sistema
+from contrasenas import HashingSaturado
+from database import AGRUPACIONES_REPORTE
+from importacion import CAMPOS_PRODUCTO, formato_de, validar_producto
+from exportacion import (
+    COLUMNAS_EXPORTACION_PRODUCTOS, COLUMNAS_EXPORTACION_MOVIMIENTOS, FORMATOS_EXPORTACION, comprimir_gzip
+)
+from fotos_perfil import VARIANTES_FOTO, es_hash_foto, nombre_archivo
+from activos import registrar_activos
+from metricas import registrar_metricas
+from api import api_v1, es_peticion_api, token_de_peticion
+from eventos import RECONEXION_MS, SuscripcionDescartada
+import atexit
 import sqlite3
 import datetime
 import os
+import threading
+import time
 
-app = Flask(__name__)
-app.secret_key = 'clave_secreta_inventario_2024_leo_sistema_multiusuario'
-app.config['TEMPLATES_AUTO_RELOAD'] = True
+# Las fotos de perfil se sirven por hash de contenido: caché de un año, inmutable
+CACHE_FOTOS_SEGUNDOS = 365 * 24 * 3600
+
+
+class RegistroRutas:
+    """Decoradores route/before_request/errorhandler/template_global diferidos.
+
+    Guardan las vistas definidas en este módulo y create_app las registra en
+    cada aplicación que crea, con los mismos nombres de endpoint (url_for('login')).
+    """
+
+    def __init__(self):
+        self._registros = []
+
+    def _diferir(self, metodo, *args, **kwargs):
+        def decorador(funcion):
+            self._registros.append((metodo, args, kwargs, funcion))
+            return funcion
+        return decorador
+
+    def route(self, regla, **opciones):
+        return self._diferir('route', regla, **opciones)
+
+    def before_request(self, funcion):
+        return self._diferir('before_request')(funcion)
+
+    def errorhandler(self, codigo):
+        return self._diferir('errorhandler', codigo)
+
+    def template_global(self):
+        return self._diferir('template_global')
+
+    def registrar(self, app):
+        for metodo, args, kwargs, funcion in self._registros:
+            decorador = getattr(app, metodo)
+            if metodo == 'before_request':
+                decorador(funcion)
+            else:
+                decorador(*args, **kwargs)(funcion)
+
+
+class RecursosInventario:
+    """SistemaInventario de una aplicación, creado en cada proceso la primera vez que se usa.
+
+    Así importar el módulo o crear la aplicación no abre la base de datos, y
+    cada worker de gunicorn (también con preload_app) tiene su propio pool de
+    conexiones y de hashing en vez de heredar los del proceso padre.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self._sistema = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def sistema(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # Lo heredado de otro proceso no se cierra aquí: sus conexiones no son de este
+                    self._sistema = crear_sistema(self.config)
+                    self._pid = os.getpid()
+                    atexit.register(self._sistema.cerrar)
+        return self._sistema
+
+
+def obtener_sistema(app=None):
+    app = app or current_app
+    return app.extensions['inventario'].sistema()
+
+
+rutas = RegistroRutas()
+
+# SistemaInventario de la aplicación y el proceso actuales
+sistema = LocalProxy(obtener_sistema)
 
 # Configuración de Flask-Login
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = 'login'
 login_manager.login_message = 'Por favor inicia sesión para acceder a esta página.'
 
-sistema = SistemaInventario()
+
+def create_app(config=None):
+    """Crear la aplicación con el perfil 'desarrollo' o 'produccion' (o un dict de ajustes).
+
+    Ver configuracion.py para los perfiles y wsgi.py / gunicorn.conf.py para producción.
+    """
+    app = Flask(__name__)
+    cargar_configuracion(app, config)
+
+    app.extensions['inventario'] = RecursosInventario(app.config)
+    login_manager.init_app(app)
+    rutas.registrar(app)
+    app.register_blueprint(api_v1)
+
+    # CSS/JS con huella de contenido y precomprimidos: activo('css/...') en las plantillas
+    registrar_activos(app)
+
+    # Latencia, estados y SQL por endpoint; /metrics en formato de Prometheus
+    registrar_metricas(app, lambda: obtener_sistema(app).metricas)
+    return app
 
 # Clase User para Flask-Login - AGREGADO CAMPO foto_perfil
 class User(UserMixin):
@@ -23,35 +131,59 @@ class User(UserMixin):
         self.id = user_data['id']
         self.username = user_data['username']
         self.nombre = user_data['nombre']
+        self.email = user_data.get('email')
         self.es_admin = user_data['es_admin']
         self.foto_perfil = user_data.get('foto_perfil')  # Nuevo campo
 
 @login_manager.user_loader
 def load_user(user_id):
-    user_data = sistema.obtener_usuario_por_id(user_id)
+    # Desde la cache de usuarios: sin consulta en la mayoría de las peticiones
+    user_data = sistema.obtener_usuario_sesion(user_id)
+    if user_data:
+        return User(user_data)
+    return None
+
+@login_manager.request_loader
+def load_user_from_request(request):
+    # Tokens de API (Authorization: Bearer), sólo en /api/v1; las páginas usan la sesión
+    token = token_de_peticion(request)
+    if not es_peticion_api(request) or not token:
+        return None
+    user_data = sistema.obtener_usuario_por_token(token)
     if user_data:
         return User(user_data)
     return None
 
 # ================= MIDDLEWARE SIMPLIFICADO =================
-@app.before_request
+@rutas.before_request
+def contexto_consultas_lentas():
+    # Usuario y endpoint de las sentencias lentas sobre tablas compartidas (sin sufijo de usuario)
+    if sistema.consultas_lentas is not None:
+        usuario = current_user.id if current_user.is_authenticated else None
+        sistema.consultas_lentas.fijar_contexto(usuario, request.endpoint)
+
+@rutas.before_request
 def asegurar_tablas_usuario():
-    if current_user.is_authenticated and request.endpoint not in ['login', 'register', 'static', 'logout']:
-        sistema.asegurar_tablas_usuario(current_user.id)
-        sistema.actualizar_estructura_tablas(current_user.id)
+    if current_user.is_authenticated and request.endpoint not in ['login', 'register', 'static', 'activo_publicado', 'logout']:
+        # Sin acceso a la base de datos cuando el esquema del usuario ya está al día
+        sistema.asegurar_esquema_usuario(current_user.id)
 
 # ================= REDIRECCIÓN FORZADA =================
-@app.before_request
+@rutas.before_request
 def force_login():
-    if request.endpoint != 'login' and request.endpoint != 'register' and request.endpoint != 'static' and not current_user.is_authenticated:
+    # La API responde 401 en JSON en lugar de redirigir (api.exigir_autenticacion);
+    # /metrics responde 403 y acepta además el token del scraper (metricas.registrar_metricas)
+    if es_peticion_api(request):
+        return
+    if request.endpoint not in ['login', 'register', 'static', 'activo_publicado', 'metricas'] and not current_user.is_authenticated:
         return redirect(url_for('login'))
 
-@app.route('/')
+@rutas.route('/')
 def root():
     return redirect(url_for('login'))
 
 # ================= AUTENTICACIÓN =================
-@app.route('/login', methods=['GET', 'POST'])
+@rutas.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
         logout_user()
@@ -62,7 +194,11 @@ def login():
         password = request.form.get('password')
         
         if username and password:
-            usuario = sistema.verificar_password(username, password)
+            try:
+                usuario = sistema.verificar_password(username, password)
+            except HashingSaturado:
+                flash('⏳ Hay muchos inicios de sesión en este momento, intenta nuevamente en unos segundos', 'error')
+                return render_template('login.html'), 503, {'Retry-After': '2'}
             if usuario:
                 user_obj = User(usuario)
                 login_user(user_obj)
@@ -75,7 +211,7 @@ def login():
     
     return render_template('login.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+@rutas.route('/register', methods=['GET', 'POST'])
 def register():
     if current_user.is_authenticated:
         logout_user()
@@ -109,7 +245,7 @@ def register():
     
     return render_template('register.html')
 
-@app.route('/logout')
+@rutas.route('/logout')
 @login_required
 def logout():
     logout_user()
@@ -118,7 +254,7 @@ def logout():
     return redirect(url_for('login'))
 
 # ================= NUEVA RUTA PARA SUBIR FOTO DE PERFIL =================
-@app.route('/actualizar_foto_perfil', methods=['POST'])
+@rutas.route('/actualizar_foto_perfil', methods=['POST'])
 @login_required
 def actualizar_foto_perfil():
     """Actualizar la foto de perfil del usuario"""
@@ -134,24 +270,13 @@ def actualizar_foto_perfil():
             flash('❌ No se seleccionó ningún archivo', 'error')
             return redirect(url_for('mi_cuenta'))
         
-        # Verificar extensión del archivo
-        allowed_extensions = {'png', 'jpg', 'jpeg', 'gif'}
-        if '.' in foto.filename:
-            extension = foto.filename.rsplit('.', 1)[1].lower()
-            if extension not in allowed_extensions:
-                flash('❌ Formato no permitido. Use PNG, JPG o GIF', 'error')
-                return redirect(url_for('mi_cuenta'))
-        
-        # Eliminar foto anterior si existe
-        sistema.eliminar_foto_antigua(current_user.id)
-        
-        # Guardar nueva foto
-        ruta_foto = sistema.guardar_foto_archivo(current_user.id, foto)
+        # El formato se comprueba por el contenido; la foto anterior la borra limpiar_fotos_huerfanas
+        hash_foto, error = sistema.guardar_foto_archivo(current_user.id, foto)
         
-        if ruta_foto:
+        if hash_foto:
             flash('✅ Foto de perfil actualizada correctamente', 'success')
         else:
-            flash('❌ Error al guardar la foto', 'error')
+            flash(f'❌ {error}', 'error')
         
         return redirect(url_for('mi_cuenta'))
         
@@ -160,15 +285,12 @@ def actualizar_foto_perfil():
         flash('❌ Error al actualizar la foto de perfil', 'error')
         return redirect(url_for('mi_cuenta'))
 
-@app.route('/eliminar_foto_perfil', methods=['POST'])
+@rutas.route('/eliminar_foto_perfil', methods=['POST'])
 @login_required
 def eliminar_foto_perfil():
     """Eliminar la foto de perfil del usuario"""
     try:
-        # Eliminar foto del sistema de archivos
-        sistema.eliminar_foto_antigua(current_user.id)
-        
-        # Limpiar campo en la base de datos
+        # Los archivos pueden ser de otros usuarios con la misma foto: los borra limpiar_fotos_huerfanas
         sistema.actualizar_foto_perfil(current_user.id, None)
         
         flash('✅ Foto de perfil eliminada correctamente', 'success')
@@ -179,26 +301,72 @@ def eliminar_foto_perfil():
         flash('❌ Error al eliminar la foto de perfil', 'error')
         return redirect(url_for('mi_cuenta'))
 
+@rutas.route('/fotos_perfil/<hash_foto>/<variante>.jpg')
+def foto_perfil(hash_foto, variante):
+    """Servir una variante de foto: el nombre cambia con el contenido, así que nunca caduca"""
+    if not es_hash_foto(hash_foto) or variante not in VARIANTES_FOTO:
+        abort(404)
+    nombre = nombre_archivo(hash_foto, variante)
+    ruta = os.path.join(sistema.directorio_fotos, nombre)
+    if not os.path.isfile(ruta):
+        abort(404)
+    
+    respuesta = send_from_directory(
+        os.path.abspath(sistema.directorio_fotos), nombre,
+        mimetype='image/jpeg', max_age=CACHE_FOTOS_SEGUNDOS, etag=nombre, conditional=True
+    )
+    respuesta.cache_control.public = True
+    respuesta.cache_control.immutable = True
+    return respuesta
+
+@rutas.template_global()
+def url_foto_perfil(foto, variante='avatar'):
+    """URL de la foto de perfil guardada en usuarios.foto_perfil (hash o ruta antigua en static/)"""
+    if es_hash_foto(foto):
+        return url_for('foto_perfil', hash_foto=foto, variante=variante)
+    return url_for('static', filename=foto)
+
 # ================= RUTA MI CUENTA MODIFICADA =================
-@app.route('/mi_cuenta')
+@rutas.route('/mi_cuenta')
 @login_required
 def mi_cuenta():
     """Página de gestión de cuenta del usuario - AHORA CON FOTO"""
     try:
-        # Obtener datos actualizados del usuario
-        usuario_data = sistema.obtener_usuario_por_id(current_user.id)
-        if usuario_data:
-            # Actualizar el objeto current_user con la foto de perfil
-            current_user.foto_perfil = usuario_data.get('foto_perfil')
-        
-        return render_template('mi_cuenta.html', usuario=current_user)
+        # current_user ya viene al día: actualizar_foto_perfil invalida la cache de usuarios
+        tokens = sistema.obtener_tokens_api(current_user.id)
+        return render_template('mi_cuenta.html', usuario=current_user, tokens=tokens)
     except Exception as e:
         print(f"Error en mi_cuenta: {e}")
         flash('❌ Error al cargar información de la cuenta', 'error')
         return redirect(url_for('dashboard'))
 
+@rutas.route('/mi_cuenta/tokens', methods=['POST'])
+@login_required
+def crear_token_api():
+    """Crear un token para la API (/api/v1); se muestra una sola vez"""
+    nombre = request.form.get('nombre', '').strip()
+    if not nombre:
+        flash('❌ Ponle un nombre al token (por ejemplo, el equipo que lo usará)', 'error')
+        return redirect(url_for('mi_cuenta'))
+    
+    token = sistema.crear_token_api(current_user.id, nombre)
+    if token:
+        flash(f'🔑 Token "{nombre}" creado. Cópialo ahora, no se volverá a mostrar: {token}', 'success')
+    else:
+        flash('❌ Error al crear el token', 'error')
+    return redirect(url_for('mi_cuenta'))
+
+@rutas.route('/mi_cuenta/tokens/<int:token_id>/revocar', methods=['POST'])
+@login_required
+def revocar_token_api(token_id):
+    if sistema.revocar_token_api(current_user.id, token_id):
+        flash('✅ Token revocado', 'success')
+    else:
+        flash('❌ Token no encontrado', 'error')
+    return redirect(url_for('mi_cuenta'))
+
 # ================= RUTAS PRINCIPALES =================
-@app.route('/dashboard')
+@rutas.route('/dashboard')
 @login_required
 def dashboard():
     try:
@@ -218,44 +386,61 @@ def dashboard():
         }
         return render_template('dashboard.html', stats=stats_default, productos_bajos=[])
 
-@app.route('/productos')
+@rutas.route('/dashboard/eventos')
+@login_required
+def eventos_dashboard():
+    """Flujo SSE del dashboard: estado completo al conectar y después sólo los cambios"""
+    central = sistema.eventos
+    suscripcion = central.suscribir(current_user.id)
+    if suscripcion is None:
+        return jsonify({'error': 'Demasiadas conexiones en vivo, se reintentará más tarde'}), 503, {'Retry-After': '30'}
+    
+    latido = current_app.config['EVENTOS_LATIDO_SEGUNDOS']
+    fin = time.monotonic() + current_app.config['EVENTOS_DURACION_SEGUNDOS']
+    
+    def flujo():
+        # Fuera del contexto de la petición: sólo usa la suscripción
+        try:
+            yield f'retry: {RECONEXION_MS}\n\n'
+            while time.monotonic() < fin:
+                mensaje = suscripcion.siguiente(min(latido, max(0, fin - time.monotonic())))
+                yield mensaje or ': latido\n\n'
+        except SuscripcionDescartada:
+            pass
+    
+    respuesta = current_app.response_class(flujo(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no',
+    })
+    # El servidor cierra la respuesta siempre, también si el cliente se va antes
+    # de que empiece el flujo (entonces el finally de un generador no llega a correr)
+    respuesta.call_on_close(lambda: central.cancelar(suscripcion))
+    return respuesta
+
+@rutas.route('/productos')
 @login_required
 def productos():
     try:
-        productos_lista = sistema.obtener_productos(current_user.id)
-        return render_template('productos.html', productos=productos_lista)
+        pagina = sistema.obtener_productos_pagina(
+            current_user.id, request.args.get('page'), current_app.config['TAMANO_PAGINA']
+        )
+        return render_template('productos.html', productos=pagina.items, pagination=pagina)
     except Exception as e:
         flash('Error al cargar los productos', 'error')
-        return render_template('productos.html', productos=[])
+        return render_template('productos.html', productos=[], pagination=None)
 
-@app.route('/agregar_producto', methods=['GET', 'POST'])
+@rutas.route('/agregar_producto', methods=['GET', 'POST'])
 @login_required
 def agregar_producto():
     if request.method == 'POST':
         try:
-            codigo = request.form['codigo'].strip()
-            nombre = request.form['nombre'].strip()
-            descripcion = request.form.get('descripcion', '').strip()
-            ubicacion = request.form.get('ubicacion', '').strip()
-            modelo = request.form.get('modelo', '').strip()
-            marca = request.form.get('marca', '').strip()
-            estado = request.form.get('estado', '').strip()
-            año_adquisicion = request.form.get('año_adquisicion', '').strip()
-            precio_compra = float(request.form['precio_compra'])
-            stock_actual = int(request.form['stock_actual'])
-            stock_minimo = int(request.form['stock_minimo'])
+            # Mismas reglas que la importación masiva (importacion.validar_producto)
+            producto, error = validar_producto(request.form)
             
-            año_int = int(año_adquisicion) if año_adquisicion and año_adquisicion.isdigit() else None
-            
-            if stock_actual < 0 or stock_minimo < 0:
-                flash('❌ El stock no puede ser negativo', 'error')
-            elif not codigo or not nombre:
-                flash('❌ Código y nombre son obligatorios', 'error')
+            if error:
+                flash(f'❌ {error}', 'error')
             else:
-                exito, mensaje = sistema.agregar_producto(
-                    current_user.id, codigo, nombre, descripcion, ubicacion, 
-                    modelo, marca, estado, año_int, precio_compra, stock_actual, stock_minimo
-                )
+                exito, mensaje = sistema.agregar_producto(current_user.id, **producto)
                 
                 if exito:
                     flash(f'✅ {mensaje}', 'success')
@@ -263,14 +448,12 @@ def agregar_producto():
                 else:
                     flash(f'❌ {mensaje}', 'error')
                 
-        except ValueError:
-            flash('❌ Error: Verifica que los precios y stock sean números válidos', 'error')
         except Exception as e:
             flash(f'❌ Error al agregar producto: {str(e)}', 'error')
     
     return render_template('agregar_producto.html')
 
-@app.route('/editar_producto/<int:producto_id>', methods=['GET', 'POST'])
+@rutas.route('/editar_producto/<int:producto_id>', methods=['GET', 'POST'])
 @login_required
 def editar_producto(producto_id):
     try:
@@ -281,28 +464,12 @@ def editar_producto(producto_id):
             return redirect(url_for('productos'))
         
         if request.method == 'POST':
-            codigo = request.form['codigo'].strip()
-            nombre = request.form['nombre'].strip()
-            descripcion = request.form.get('descripcion', '').strip()
-            ubicacion = request.form.get('ubicacion', '').strip()
-            modelo = request.form.get('modelo', '').strip()
-            marca = request.form.get('marca', '').strip()
-            estado = request.form.get('estado', '').strip()
-            año_adquisicion = request.form.get('año_adquisicion', '').strip()
-            precio_compra = float(request.form['precio_compra'])
-            stock_actual = int(request.form['stock_actual'])
-            stock_minimo = int(request.form['stock_minimo'])
-            
-            año_int = int(año_adquisicion) if año_adquisicion and año_adquisicion.isdigit() else None
+            datos, error = validar_producto(request.form)
             
-            if stock_actual < 0 or stock_minimo < 0:
-                flash('❌ El stock no puede ser negativo', 'error')
+            if error:
+                flash(f'❌ {error}', 'error')
             else:
-                exito, mensaje = sistema.actualizar_producto(
-                    current_user.id, producto_id, codigo, nombre, descripcion, 
-                    ubicacion, modelo, marca, estado, año_int, precio_compra, 
-                    stock_actual, stock_minimo
-                )
+                exito, mensaje = sistema.actualizar_producto(current_user.id, producto_id, **datos)
                 
                 if exito:
                     flash(f'✅ {mensaje}', 'success')
@@ -316,7 +483,41 @@ def editar_producto(producto_id):
         flash('❌ Error al cargar el producto', 'error')
         return redirect(url_for('productos'))
 
-@app.route('/eliminar_producto/<int:producto_id>')
+@rutas.route('/importar_productos', methods=['GET', 'POST'])
+@login_required
+def importar_productos():
+    informe = None
+    if request.method == 'POST':
+        archivo = request.files.get('archivo')
+        formato = formato_de(archivo.filename) if archivo else None
+        
+        if not archivo or archivo.filename == '':
+            flash('❌ No se seleccionó ningún archivo', 'error')
+        elif not formato:
+            flash('❌ Formato no permitido. Use CSV o XLSX', 'error')
+        else:
+            # Werkzeug ya volcó la subida a un archivo temporal: se lee como flujo
+            informe = sistema.importar_productos(current_user.id, archivo.stream, formato)
+            if informe['error']:
+                flash(f"❌ {informe['error']}", 'error')
+            else:
+                flash(f"✅ {informe['insertadas']} productos nuevos y {informe['actualizadas']} actualizados", 'success')
+                if informe['total_errores']:
+                    flash(f"⚠️ {informe['total_errores']} filas no se importaron; revisa el detalle", 'info')
+    
+    return render_template('importar_productos.html', informe=informe, campos=CAMPOS_PRODUCTO)
+
+@rutas.route('/importar_productos/plantilla.csv')
+@login_required
+def plantilla_importacion():
+    """CSV vacío con los encabezados que espera la importación"""
+    return current_app.response_class(
+        ','.join(CAMPOS_PRODUCTO) + '\r\n',
+        mimetype='text/csv',
+        headers={'Content-Disposition': 'attachment; filename=plantilla_productos.csv'}
+    )
+
+@rutas.route('/eliminar_producto/<int:producto_id>')
 @login_required
 def eliminar_producto(producto_id):
     try:
@@ -329,18 +530,21 @@ def eliminar_producto(producto_id):
     
     return redirect(url_for('productos'))
 
-@app.route('/movimientos')
+@rutas.route('/movimientos')
 @login_required
 def movimientos():
     try:
-        movimientos_lista = sistema.obtener_movimientos(current_user.id)
-        productos_lista = sistema.obtener_productos(current_user.id)
-        return render_template('movimientos.html', movimientos=movimientos_lista, productos=productos_lista)
+        pagina = sistema.obtener_movimientos_pagina(
+            current_user.id, request.args.get('page'), current_app.config['TAMANO_PAGINA']
+        )
+        # El selector sólo necesita id, código, nombre y stock de cada producto
+        productos_lista = sistema.obtener_opciones_productos(current_user.id)
+        return render_template('movimientos.html', movimientos=pagina.items, productos=productos_lista, pagination=pagina)
     except Exception as e:
         flash('Error al cargar movimientos', 'error')
-        return render_template('movimientos.html', movimientos=[], productos=[])
+        return render_template('movimientos.html', movimientos=[], productos=[], pagination=None)
 
-@app.route('/agregar_movimiento', methods=['POST'])
+@rutas.route('/agregar_movimiento', methods=['POST'])
 @login_required
 def agregar_movimiento():
     try:
@@ -363,7 +567,79 @@ def agregar_movimiento():
     
     return redirect(url_for('movimientos'))
 
-@app.route('/consultas')
+@rutas.route('/movimientos/lote', methods=['POST'])
+@login_required
+def agregar_movimientos_lote():
+    """Registrar un albarán o lista de picking en una sola petición.
+    
+    Espera JSON: {"motivo": "...", "movimientos": [{"producto_id" o "codigo", "tipo", "cantidad", "motivo"}]}.
+    Se guardan todas las líneas o ninguna; la respuesta trae el resultado de cada una.
+    """
+    datos = request.get_json(silent=True) or {}
+    lineas = datos.get('movimientos')
+    
+    if not isinstance(lineas, list) or not lineas or not all(isinstance(linea, dict) for linea in lineas):
+        return jsonify({'exito': False, 'error': 'Se esperaba una lista "movimientos" con al menos una línea'}), 400
+    if len(lineas) > current_app.config['MAX_LINEAS_LOTE']:
+        return jsonify({'exito': False, 'error': f"Máximo {current_app.config['MAX_LINEAS_LOTE']} líneas por lote"}), 413
+    
+    exito, resultados = sistema.agregar_movimientos_lote(current_user.id, lineas, str(datos.get('motivo') or '').strip())
+    return jsonify({
+        'exito': exito,
+        'lineas': len(resultados),
+        'errores': sum(1 for resultado in resultados if not resultado['ok']),
+        'movimientos': resultados
+    }), 200 if exito else 409
+
+# ================= EXPORTACIÓN =================
+def respuesta_exportacion(lotes, columnas, formato, nombre):
+    """Respuesta en streaming: cada lote leído con fetchmany se envía en cuanto se serializa"""
+    tipo_mime, serializar = FORMATOS_EXPORTACION[formato]
+    trozos = serializar(lotes, columnas)
+    cabeceras = {
+        'Content-Disposition': f'attachment; filename={nombre}_{datetime.date.today().isoformat()}.{formato}',
+        'Cache-Control': 'no-store',
+        # Que un proxy (nginx) no acumule la respuesta entera antes de reenviarla
+        'X-Accel-Buffering': 'no',
+        'Vary': 'Accept-Encoding',
+    }
+    # gzip sólo si se pide con ?gzip=1 y el cliente lo acepta
+    if request.args.get('gzip') == '1' and 'gzip' in request.accept_encodings:
+        trozos = comprimir_gzip(trozos)
+        cabeceras['Content-Encoding'] = 'gzip'
+    return current_app.response_class(trozos, content_type=tipo_mime, headers=cabeceras)
+
+def fecha_de_parametro(nombre):
+    valor = request.args.get(nombre, '').strip()
+    if not valor:
+        return None
+    return datetime.date.fromisoformat(valor).isoformat()
+
+@rutas.route('/exportar/productos.<formato>')
+@login_required
+def exportar_productos(formato):
+    if formato not in FORMATOS_EXPORTACION:
+        return jsonify({'error': 'Formato no permitido. Use csv o jsonl'}), 404
+    lotes = sistema.exportar_productos(current_user.id)
+    return respuesta_exportacion(lotes, COLUMNAS_EXPORTACION_PRODUCTOS, formato, 'productos')
+
+@rutas.route('/exportar/movimientos.<formato>')
+@login_required
+def exportar_movimientos(formato):
+    """Historial de movimientos; filtros opcionales ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD&producto_id=N"""
+    if formato not in FORMATOS_EXPORTACION:
+        return jsonify({'error': 'Formato no permitido. Use csv o jsonl'}), 404
+    try:
+        desde = fecha_de_parametro('desde')
+        hasta = fecha_de_parametro('hasta')
+        producto_id = request.args.get('producto_id', type=int)
+    except ValueError:
+        return jsonify({'error': 'Las fechas deben tener el formato AAAA-MM-DD'}), 400
+    
+    lotes = sistema.exportar_movimientos(current_user.id, desde, hasta, producto_id)
+    return respuesta_exportacion(lotes, COLUMNAS_EXPORTACION_MOVIMIENTOS, formato, 'movimientos')
+
+@rutas.route('/consultas')
 @login_required
 def consultas():
     try:
@@ -382,17 +658,32 @@ def consultas():
         flash('Error al realizar la búsqueda', 'error')
         return render_template('consultas.html', productos=[], ubicaciones=[], query='', ubicacion_seleccionada='')
 
-@app.route('/reportes')
+@rutas.route('/reportes')
 @login_required
 def reportes():
+    """Reportes; movimientos por periodo con ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD&agrupacion=dia|semana|mes"""
+    try:
+        desde = fecha_de_parametro('desde')
+        hasta = fecha_de_parametro('hasta')
+    except ValueError:
+        flash('Las fechas deben tener el formato AAAA-MM-DD', 'error')
+        desde = hasta = None
+    if desde and hasta and desde > hasta:
+        desde, hasta = hasta, desde
+    agrupacion = request.args.get('agrupacion', 'dia')
+    if agrupacion not in AGRUPACIONES_REPORTE:
+        agrupacion = 'dia'
+    filtros = {'desde': desde or '', 'hasta': hasta or '', 'agrupacion': agrupacion}
+    
     try:
         reporte_stock = sistema.obtener_reporte_stock(current_user.id)
-        reporte_movimientos = sistema.obtener_reporte_movimientos(current_user.id)
+        reporte_movimientos = sistema.obtener_reporte_movimientos(current_user.id, desde, hasta, agrupacion)
         fecha_actual = datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
         
         return render_template('reportes.html', 
                              reporte_stock=reporte_stock, 
                              reporte_movimientos=reporte_movimientos,
+                             filtros=filtros,
                              fecha_actual=fecha_actual)
     except Exception as e:
         flash('Error al generar reportes', 'error')
@@ -400,19 +691,59 @@ def reportes():
         return render_template('reportes.html', 
                              reporte_stock=[], 
                              reporte_movimientos=[],
+                             filtros=filtros,
                              fecha_actual=fecha_actual)
 
+@rutas.route('/reportes/existencias')
+@login_required
+def reporte_existencias():
+    """Stock y valor de cada producto al cierre de ?fecha=AAAA-MM-DD (por defecto ayer)"""
+    try:
+        fecha = fecha_de_parametro('fecha')
+    except ValueError:
+        flash('La fecha debe tener el formato AAAA-MM-DD', 'error')
+        fecha = None
+    
+    existencias = sistema.obtener_stock_en_fecha(current_user.id, fecha)
+    if existencias is None:
+        flash('Error al calcular las existencias', 'error')
+    fecha_actual = datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+    return render_template('existencias_fecha.html', existencias=existencias, fecha_actual=fecha_actual)
+
+# ================= ADMINISTRACIÓN =================
+@rutas.route('/admin/consultas_lentas')
+@login_required
+def consultas_lentas():
+    """Formas de sentencia más lentas del registro de consultas lentas (sólo ADMINISTRADORES)"""
+    administradores = current_app.config['ADMINISTRADORES']
+    if not administradores:
+        abort(404)
+    if current_user.id not in administradores:
+        abort(403)
+    registro = sistema.consultas_lentas
+    orden = 'maximo' if request.args.get('orden') == 'maximo' else 'total'
+    limite = request.args.get('n', current_app.config['CONSULTAS_LENTAS_TOP'], type=int)
+    formas = registro.resumen(limite, orden) if registro is not None else []
+    return render_template('consultas_lentas.html', registro=registro, formas=formas, orden=orden)
+
 # ================= MANEJO DE ERRORES =================
-@app.errorhandler(404)
+@rutas.errorhandler(404)
 def pagina_no_encontrada(error):
+    if es_peticion_api(request):
+        return jsonify({'error': 'Recurso no encontrado'}), 404
     return render_template('error.html', mensaje='Página no encontrada'), 404
 
-@app.errorhandler(500)
+@rutas.errorhandler(500)
 def error_servidor(error):
+    if es_peticion_api(request):
+        return jsonify({'error': 'Error interno del servidor'}), 500
     return render_template('error.html', mensaje='Error interno del servidor'), 500
 
 # ================= INICIALIZACIÓN =================
+# Servidor de desarrollo (un proceso). En producción: gunicorn -c gunicorn.conf.py wsgi:app
 if __name__ == '__main__':
+    app = create_app('desarrollo')
+    
     print("=" * 60)
     print("🚀 SISTEMA DE INVENTARIO MULTIUSUARIO INICIADO")
     print("📍 URL: http://localhost:5000/login")
@@ -428,6 +759,6 @@ if __name__ == '__main__':
     app.run(
         host='0.0.0.0',
         port=5000,
-        debug=True,  # Cambia a False en producción
+        debug=app.config['DEBUG'],
         threaded=True
     )
\ No newline at end of file
@@ -0,0 +1 @@
+"""Benchmarks del Sistema de Inventario (ejecutar con python -m benchmarks.<modulo>)"""
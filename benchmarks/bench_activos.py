@@ -0,0 +1,100 @@
+"""Bytes transferidos por página, en la primera visita y en las siguientes.
+
+Inicia sesión con el cliente de pruebas de Flask, pide cada página y los
+CSS/JS locales que enlaza (aceptando gzip y brotli) y suma los bytes del
+cuerpo de cada respuesta. En una visita repetida cuentan el HTML y los
+activos que el navegador no puede guardar: los que llegan sin max-age se
+vuelven a pedir (revalidación con If-None-Match / If-Modified-Since).
+
+Con --raiz se mide otro árbol del proyecto (p. ej. un `git worktree` de la
+versión anterior) para comparar antes y después.
+
+    python -m benchmarks.bench_activos [--raiz ../inventario-anterior]
+"""
+import argparse
+import contextlib
+import io
+import os
+import re
+import sys
+import tempfile
+
+PAGINAS = ['/login', '/dashboard', '/productos', '/agregar_producto', '/movimientos',
+           '/consultas', '/reportes', '/mi_cuenta', '/importar_productos']
+
+PATRON_ACTIVO = re.compile(r'<(?:link[^>]+rel="stylesheet"[^>]+href|script[^>]+src)="(/[^"]+)"')
+
+
+def cargar_app(raiz, directorio_trabajo):
+    """(aplicación, sistema) de app.py en raiz; su inventario.db se crea en directorio_trabajo"""
+    sys.path.insert(0, os.path.abspath(raiz))
+    os.chdir(directorio_trabajo)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as modulo
+        if not hasattr(modulo, 'create_app'):
+            # Versiones anteriores a create_app: aplicación creada al importar
+            return modulo.app, modulo.sistema
+        aplicacion = modulo.create_app({'PERFIL': 'produccion', 'SECRET_KEY': 'bench'})
+        return aplicacion, modulo.obtener_sistema(aplicacion)
+
+
+def cacheable(respuesta):
+    return bool(respuesta.cache_control.max_age) and not respuesta.cache_control.no_cache
+
+
+def medir_pagina(cliente, ruta):
+    html = cliente.get(ruta)
+    if html.status_code != 200:
+        return None
+    resultado = {'html': len(html.data), 'activos': 0, 'repetida': len(html.data), 'peticiones': 1}
+    for url in PATRON_ACTIVO.findall(html.get_data(as_text=True)):
+        respuesta = cliente.get(url, headers={'Accept-Encoding': 'br, gzip'})
+        resultado['activos'] += len(respuesta.data)
+        resultado['peticiones'] += 1
+        if not cacheable(respuesta):
+            # En la visita repetida se revalida: otra petición, aunque el 304 no tenga cuerpo
+            condicional = cliente.get(url, headers={
+                'Accept-Encoding': 'br, gzip',
+                'If-None-Match': respuesta.headers.get('ETag', ''),
+                'If-Modified-Since': respuesta.headers.get('Last-Modified', ''),
+            })
+            resultado['repetida'] += len(condicional.data)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--raiz', default='.', help='Directorio del proyecto a medir')
+    args = parser.parse_args()
+
+    raiz = os.path.abspath(args.raiz)
+    with tempfile.TemporaryDirectory() as tmp:
+        aplicacion, sistema = cargar_app(raiz, tmp)
+        with contextlib.redirect_stdout(io.StringIO()):
+            sistema.agregar_usuario('bench', 'bench123', 'Benchmark')
+        cliente = aplicacion.test_client()
+        medidas = {'/login': medir_pagina(cliente, '/login')}
+        cliente.post('/login', data={'username': 'bench', 'password': 'bench123'})
+
+        for ruta in PAGINAS[1:]:
+            medidas[ruta] = medir_pagina(cliente, ruta)
+        sistema.cerrar()
+
+    print("=" * 78)
+    print(f"📦 Bytes por página en {raiz}")
+    print("=" * 78)
+    print(f"{'página':<22}{'HTML':>10}{'CSS/JS':>10}{'1ª visita':>12}{'repetida':>12}{'peticiones':>12}")
+    total_primera = total_repetida = 0
+    for ruta, r in medidas.items():
+        if r is None:
+            print(f"{ruta:<22}{'(no se pudo renderizar)':>56}")
+            continue
+        primera = r['html'] + r['activos']
+        total_primera += primera
+        total_repetida += r['repetida']
+        print(f"{ruta:<22}{r['html']:>10,}{r['activos']:>10,}{primera:>12,}{r['repetida']:>12,}{r['peticiones']:>12}")
+    print(f"{'total':<22}{'':>20}{total_primera:>12,}{total_repetida:>12,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Productos con stock bajo: recorrido completo contra el índice parcial de alertas.
+
+Siembra un usuario con --productos productos, de los que --en-alerta están
+en su stock mínimo o por debajo (los triggers marcan alerta_desde durante la
+siembra), y mide:
+
+* la consulta anterior, que recorría toda la tabla comparando el stock,
+* la lectura del dashboard sobre idx_productos_alerta, sin cache de resultados,
+* el coste por escritura de los triggers de alertas (movimientos que cruzan el mínimo),
+* una pasada del evaluador de resúmenes (gestion.py resumir-alertas) sobre esos eventos.
+
+    python -m benchmarks.bench_alertas --productos 200000 --en-alerta 150
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from database import SistemaInventario, CONDICION_STOCK_BAJO
+
+
+def sembrar(sistema, productos, en_alerta, semilla=11):
+    rnd = random.Random(semilla)
+    with contextlib.redirect_stdout(io.StringIO()):
+        sistema.agregar_usuario('bench', 'bench123', 'Benchmark')
+    user_id = sistema.obtener_usuario_por_username('bench')['id']
+    tablas = sistema.tablas_usuario(user_id)
+
+    bajos = set(rnd.sample(range(productos), en_alerta))
+    with sistema.pool.conexion() as conn:
+        conn.executemany(
+            f'''INSERT INTO {tablas.productos} ({tablas.columna_usuario}codigo, nombre, stock_actual, stock_minimo)
+                VALUES ({tablas.valor_usuario}?, ?, ?, ?)''',
+            [(f'P{i:07d}', f'Producto {i}', rnd.randint(0, 10) if i in bajos else rnd.randint(11, 500), 10)
+             for i in range(productos)]
+        )
+        conn.commit()
+    return user_id, tablas
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--productos', type=int, default=100000)
+    parser.add_argument('--en-alerta', type=int, default=100, help='Productos sembrados en su stock mínimo o por debajo')
+    parser.add_argument('--cruces', type=int, default=1000, help='Movimientos que meten o sacan un producto de la alerta')
+    parser.add_argument('--almacenamiento', default='por_usuario', choices=('por_usuario', 'compartido'))
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sistema = SistemaInventario(os.path.join(tmp, 'bench.db'), almacenamiento=args.almacenamiento)
+        user_id, tablas = sembrar(sistema, args.productos, args.en_alerta)
+
+        def consulta_anterior():
+            with sistema.pool.conexion() as conn:
+                conn.execute(f'''
+                    SELECT * FROM {tablas.productos}
+                    WHERE {tablas.filtro()} AND {CONDICION_STOCK_BAJO.format(fila=tablas.productos)}
+                    ORDER BY stock_actual
+                ''').fetchall()
+
+        resultados = [
+            ('anterior (toda la tabla)', medir(consulta_anterior, args.repeticiones), args.productos),
+            ('índice parcial de alertas', medir(lambda: sistema._calcular_productos_stock_bajo(tablas),
+                                                args.repeticiones), args.en_alerta),
+        ]
+
+        # Cada par de movimientos saca un producto de la alerta y lo vuelve a meter
+        rnd = random.Random(5)
+        bajos = [producto['id'] for producto in sistema._calcular_productos_stock_bajo(tablas)]
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(args.cruces):
+                producto_id = rnd.choice(bajos)
+                sistema.agregar_movimiento(user_id, producto_id, 'entrada' if i % 2 == 0 else 'salida', 100, 'Bench')
+        ms_cruce = (time.perf_counter() - inicio) * 1000 / args.cruces
+
+        inicio = time.perf_counter()
+        resumenes = sistema.generar_resumenes_alertas()
+        ms_resumen = (time.perf_counter() - inicio) * 1000
+        sistema.cerrar()
+
+    print("=" * 70)
+    print(f"⚠️ Stock bajo: {args.productos:,} productos, {args.en_alerta} en alerta ({args.almacenamiento})")
+    print("=" * 70)
+    print(f"{'consulta':<36}{'ms':>10}{'filas leídas':>15}")
+    for nombre, ms, leidas in resultados:
+        print(f"{nombre:<36}{ms:>10.2f}{leidas:>15,}")
+    print(f"Movimiento que cruza el mínimo: {ms_cruce:.2f} ms; "
+          f"resumen de {args.cruces} eventos: {ms_resumen:.1f} ms ({len(resumenes or [])} resúmenes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""Compara el almacenamiento por usuario contra las tablas compartidas.
+
+Para cada modo y cada número de usuarios crea una base nueva, da de alta a
+los usuarios, siembra sus productos y movimientos y mide:
+
+* alta de un usuario (DDL por usuario contra una fila en schema_version),
+* tamaño del esquema (objetos en sqlite_master) y del archivo,
+* coste de abrir una conexión nueva y ejecutar su primera consulta (SQLite
+  analiza el esquema completo en ese momento, p. ej. en cada worker nuevo),
+* latencia de las consultas de una petición típica sobre usuarios al azar.
+
+    python -m benchmarks.bench_almacenamiento --usuarios 1000 10000
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from almacenamiento import MODOS_ALMACENAMIENTO
+from database import SistemaInventario
+from werkzeug.security import generate_password_hash
+
+UBICACIONES = ['Bodega 1', 'Bodega 2', 'Estante A', 'Estante B', 'Oficina', 'Taller']
+MARCAS = ['Acme', 'Bosch', 'Makita', 'Stanley', 'Truper', None]
+PALABRAS = ['Tornillo', 'Taladro', 'Cable', 'Válvula', 'Filtro', 'Sensor', 'Motor', 'Correa']
+
+# Consultas de una petición típica: (nombre, función(sistema, user_id, rnd))
+PETICION = [
+    ('estadisticas', lambda s, u, rnd: s.obtener_estadisticas(u)),
+    ('productos_pagina', lambda s, u, rnd: s.obtener_productos_pagina(u)),
+    ('movimientos_pagina', lambda s, u, rnd: s.obtener_movimientos_pagina(u)),
+    ('buscar', lambda s, u, rnd: s.buscar_productos(u, rnd.choice(PALABRAS)[:3], '')),
+    ('producto_por_id', lambda s, u, rnd: s.obtener_producto_por_id(u, rnd.randint(1, 10 ** 6))),
+    ('agregar_movimiento', lambda s, u, rnd: s.agregar_movimiento(
+        u, s.obtener_opciones_productos(u)[0]['id'], 'entrada', 1, 'Benchmark')),
+]
+
+
+def poblar(sistema, usuarios, productos, movimientos, semilla=11):
+    """Alta de usuarios y siembra de datos; devuelve (ids, ms medios por alta)"""
+    rnd = random.Random(semilla)
+    password = generate_password_hash('bench123')
+    with sistema.pool.conexion() as conn:
+        conn.executemany(
+            'INSERT INTO usuarios (username, password, nombre) VALUES (?, ?, ?)',
+            [(f'bench{i}', password, f'Usuario {i}') for i in range(usuarios)]
+        )
+        conn.commit()
+    ids = sistema.obtener_ids_usuarios()
+
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for user_id in ids:
+            sistema.asegurar_esquema_usuario(user_id)
+    ms_alta = (time.perf_counter() - inicio) * 1000 / max(1, len(ids))
+
+    with sistema.pool.conexion() as conn:
+        for user_id in ids:
+            tablas = sistema.tablas_usuario(user_id)
+            conn.executemany(
+                f'''INSERT INTO {tablas.productos}
+                    ({tablas.columna_usuario}codigo, nombre, descripcion, ubicacion, marca, precio_compra, stock_actual, stock_minimo)
+                    VALUES ({tablas.valor_usuario}?, ?, ?, ?, ?, ?, ?, ?)''',
+                [(f'P{i:05d}', f'{rnd.choice(PALABRAS)} {rnd.randint(1, 999)}', 'Uso general',
+                  rnd.choice(UBICACIONES), rnd.choice(MARCAS), round(rnd.uniform(1, 300), 2),
+                  rnd.randint(0, 200), rnd.randint(0, 20))
+                 for i in range(productos)]
+            )
+            primero = conn.execute(f'SELECT MIN(id) FROM {tablas.productos} WHERE {tablas.filtro()}').fetchone()[0]
+            conn.executemany(
+                f'''INSERT INTO {tablas.movimientos} ({tablas.columna_usuario}producto_id, tipo, cantidad, motivo, fecha)
+                    VALUES ({tablas.valor_usuario}?, ?, ?, ?, datetime('now', ?))''',
+                [(primero + rnd.randrange(productos), rnd.choice(['entrada', 'salida']), rnd.randint(1, 20),
+                  'Semilla', f'-{rnd.randint(0, 90 * 24)} hours')
+                 for _ in range(movimientos)]
+            )
+        conn.commit()
+    return ids, ms_alta
+
+
+def medir_conexion_fria(db_name, repeticiones=5):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        conn = sqlite3.connect(db_name)
+        conn.execute('SELECT COUNT(*) FROM usuarios').fetchone()
+        tiempos.append(time.perf_counter() - inicio)
+        conn.close()
+    return statistics.median(tiempos) * 1000
+
+
+def medir_peticiones(sistema, ids, peticiones, semilla=3):
+    rnd = random.Random(semilla)
+    tiempos = {nombre: [] for nombre, _ in PETICION}
+    for _ in range(peticiones):
+        user_id = rnd.choice(ids)
+        for nombre, consulta in PETICION:
+            inicio = time.perf_counter()
+            consulta(sistema, user_id, rnd)
+            tiempos[nombre].append(time.perf_counter() - inicio)
+    return {
+        nombre: (statistics.median(valores) * 1000, statistics.quantiles(valores, n=20)[-1] * 1000)
+        for nombre, valores in tiempos.items()
+    }
+
+
+def ejecutar(modo, usuarios, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, 'bench.db')
+        sistema = SistemaInventario(db_name, almacenamiento=modo)
+        try:
+            ids, ms_alta = poblar(sistema, usuarios, args.productos, args.movimientos)
+            with sistema.pool.conexion() as conn:
+                objetos = conn.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()[0]
+                conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            resultado = {
+                'alta_ms': ms_alta,
+                'objetos': objetos,
+                'archivo_mb': os.path.getsize(db_name) / 2 ** 20,
+                'conexion_fria_ms': medir_conexion_fria(db_name),
+                'peticion': medir_peticiones(sistema, ids, args.peticiones),
+            }
+        finally:
+            sistema.cerrar()
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--usuarios', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--productos', type=int, default=20, help='Productos por usuario')
+    parser.add_argument('--movimientos', type=int, default=50, help='Movimientos por usuario')
+    parser.add_argument('--peticiones', type=int, default=500)
+    args = parser.parse_args()
+
+    for usuarios in args.usuarios:
+        resultados = {modo: ejecutar(modo, usuarios, args) for modo in MODOS_ALMACENAMIENTO}
+
+        print("=" * 72)
+        print(f"🗄️  {usuarios} usuarios × {args.productos} productos × {args.movimientos} movimientos")
+        print("=" * 72)
+        print(f"{'métrica':<32}" + ''.join(f'{modo:>20}' for modo in MODOS_ALMACENAMIENTO))
+        for clave, etiqueta, formato in [('alta_ms', 'alta de usuario (ms)', '.2f'),
+                                         ('objetos', 'objetos en sqlite_master', 'd'),
+                                         ('archivo_mb', 'tamaño del archivo (MB)', '.1f'),
+                                         ('conexion_fria_ms', 'conexión nueva + 1ª consulta (ms)', '.2f')]:
+            print(f"{etiqueta:<32}" + ''.join(f'{resultados[modo][clave]:>20{formato}}' for modo in MODOS_ALMACENAMIENTO))
+        print(f"{'consulta (mediana / p95 ms)':<32}")
+        for nombre, _ in PETICION:
+            celdas = ''.join(f"{'%.3f / %.3f' % resultados[modo]['peticion'][nombre]:>20}" for modo in MODOS_ALMACENAMIENTO)
+            print(f"  {nombre:<30}{celdas}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Latencia de buscar_productos: índice FTS5 contra el recorrido con LIKE.
+
+    python -m benchmarks.bench_busqueda --productos 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from database import SistemaInventario
+
+PALABRAS = ['tornillo', 'tuerca', 'arandela', 'cable', 'camión', 'válvula', 'bomba', 'filtro',
+            'manguera', 'rodamiento', 'correa', 'interruptor', 'batería', 'sensor', 'motor']
+MARCAS = ['Acme', 'Bosch', 'Makita', 'Stanley', 'Truper']
+
+CONSULTAS = [
+    ('palabra completa', 'tornillo', ''),
+    ('prefijo', 'rod', ''),
+    ('sin acento', 'valvula', ''),
+    ('dos palabras', 'cable bosch', ''),
+    ('código', 'P0123', ''),
+    ('con ubicación', 'motor', 'Bodega 7'),
+]
+
+
+def poblar(sistema, productos, semilla=7):
+    rnd = random.Random(semilla)
+    sistema.agregar_usuario('bench', 'bench123', 'Benchmark')
+    user_id = sistema.obtener_usuario_por_username('bench')['id']
+    filas = []
+    for i in range(productos):
+        palabras = rnd.sample(PALABRAS, 2)
+        marca = rnd.choice(MARCAS)
+        filas.append((f'P{i:06d}', f'{palabras[0].capitalize()} {marca} {rnd.randint(1, 999)}',
+                      f'{palabras[1]} para uso industrial', f'Bodega {rnd.randint(1, 30)}',
+                      round(rnd.uniform(1, 300), 2), rnd.randint(0, 500)))
+    tablas = sistema.tablas_usuario(user_id)
+    with sistema.pool.conexion() as conn:
+        conn.executemany(
+            f'''INSERT INTO {tablas.productos}
+                ({tablas.columna_usuario}codigo, nombre, descripcion, ubicacion, precio_compra, stock_actual)
+                VALUES ({tablas.valor_usuario}?, ?, ?, ?, ?, ?)''', filas)
+        conn.commit()
+    return user_id
+
+
+def medir(sistema, user_id, query, ubicacion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultados = sistema.buscar_productos(user_id, query, ubicacion)
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos) * 1000, len(resultados)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--productos', type=int, default=100000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sistema = SistemaInventario(os.path.join(tmp, 'bench.db'))
+        if not sistema.fts_disponible:
+            print("❌ SQLite sin FTS5: no hay nada que comparar")
+            return
+        user_id = poblar(sistema, args.productos)
+
+        print("=" * 72)
+        print(f"🔍 buscar_productos con {args.productos} productos (mediana de {args.repeticiones})")
+        print("=" * 72)
+        print(f"{'consulta':<20}{'LIKE ms':>10}{'filas':>8}{'FTS5 ms':>10}{'filas':>8}{'mejora':>10}")
+        for nombre, query, ubicacion in CONSULTAS:
+            sistema.fts_disponible = False
+            ms_like, filas_like = medir(sistema, user_id, query, ubicacion, args.repeticiones)
+            sistema.fts_disponible = True
+            ms_fts, filas_fts = medir(sistema, user_id, query, ubicacion, args.repeticiones)
+            print(f"{nombre:<20}{ms_like:>10.2f}{filas_like:>8}{ms_fts:>10.2f}{filas_fts:>8}{ms_like / ms_fts:>9.1f}x")
+        sistema.cerrar()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Lecturas repetidas con y sin la cache de resultados versionada.
+
+Siembra un usuario con --productos productos y mide la mediana de
+obtener_reporte_stock, obtener_ubicaciones y obtener_productos_stock_bajo
+calculados cada vez (cache de capacidad 0) y servidos desde la cache. Después
+simula una mezcla de páginas con --escrituras escrituras por cada 100 lecturas
+y muestra la tasa de aciertos resultante.
+
+    python -m benchmarks.bench_cache_resultados --productos 20000 --escrituras 5
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from cache_resultados import CacheResultados
+from database import SistemaInventario
+
+LECTURAS = ('obtener_reporte_stock', 'obtener_ubicaciones', 'obtener_productos_stock_bajo')
+
+
+def sembrar(sistema, productos, semilla=3):
+    rnd = random.Random(semilla)
+    with contextlib.redirect_stdout(io.StringIO()):
+        sistema.agregar_usuario('bench', 'bench123', 'Benchmark')
+    user_id = sistema.obtener_usuario_por_username('bench')['id']
+    tablas = sistema.tablas_usuario(user_id)
+    with sistema.pool.conexion() as conn:
+        conn.executemany(
+            f'''INSERT INTO {tablas.productos}
+                ({tablas.columna_usuario}codigo, nombre, ubicacion, precio_compra, stock_actual)
+                VALUES ({tablas.valor_usuario}?, ?, ?, ?, ?)''',
+            [(f'P{i:06d}', f'Producto {i}', f'Bodega {rnd.randint(1, 40)}',
+              round(rnd.uniform(1, 500), 2), rnd.randint(0, 200)) for i in range(productos)]
+        )
+        conn.commit()
+    return user_id
+
+
+def mediana_ms(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--productos', type=int, default=20000)
+    parser.add_argument('--repeticiones', type=int, default=20)
+    parser.add_argument('--escrituras', type=int, default=5, help='Escrituras por cada 100 lecturas')
+    parser.add_argument('--peticiones', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, 'bench.db')
+        sistema = SistemaInventario(db_name, cache_resultados=CacheResultados(capacidad=0))
+        user_id = sembrar(sistema, args.productos)
+        sin_cache = {metodo: mediana_ms(lambda: getattr(sistema, metodo)(user_id), args.repeticiones)
+                     for metodo in LECTURAS}
+        sistema.cerrar()
+
+        cache = CacheResultados(archivo=os.path.join(tmp, 'cache.db'))
+        sistema = SistemaInventario(db_name, cache_resultados=cache)
+        con_cache = {metodo: mediana_ms(lambda: getattr(sistema, metodo)(user_id), args.repeticiones)
+                     for metodo in LECTURAS}
+
+        rnd = random.Random(5)
+        cache.estadisticas.update(aciertos=0, aciertos_compartidos=0, fallos=0)
+        for _ in range(args.peticiones):
+            if rnd.randrange(100) < args.escrituras:
+                sistema.agregar_movimiento(user_id, rnd.randint(1, args.productos), 'entrada', 1, 'Benchmark')
+            else:
+                getattr(sistema, rnd.choice(LECTURAS))(user_id)
+        tasa = cache.tasa_aciertos()
+        estadisticas = dict(cache.estadisticas)
+        sistema.cerrar()
+
+    print("=" * 78)
+    print(f"🗃️ Cache de resultados, {args.productos:,} productos (mediana de {args.repeticiones})")
+    print("=" * 78)
+    print(f"{'lectura':<32}{'sin cache ms':>15}{'con cache ms':>15}")
+    for metodo in LECTURAS:
+        print(f"{metodo:<32}{sin_cache[metodo]:>15.2f}{con_cache[metodo]:>15.3f}")
+    print(f"Mezcla con {args.escrituras} escrituras por 100 lecturas: tasa de aciertos {tasa:.0%} {estadisticas}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Mide las existencias en una fecha desde los cortes contra la reproducción completa de los movimientos.
+
+Para cada longitud de historial crea una base nueva con un usuario
+(benchmarks.datos, el mismo número de movimientos por día), guarda un corte
+al cierre de cada mes y mide:
+
+* generar el corte de ayer de ese usuario (gestion.py cortes-existencias),
+* obtener_stock_en_fecha a mitad del penúltimo mes: corte anterior más unos
+  15 días del resumen diario, sea cual sea la longitud del historial,
+* verificar_stock_en_fecha, que además reproduce todos los movimientos,
+
+y comprueba que las dos cuentas coinciden.
+
+    python -m benchmarks.bench_existencias --dias 365 1095 3650 --movimientos-dia 50
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.datos import generar_inventario
+from database import SistemaInventario
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos), resultado
+
+
+def ejecutar(dias, args):
+    hoy = datetime.datetime.now(datetime.timezone.utc).date()
+    with tempfile.TemporaryDirectory() as tmp:
+        sistema = SistemaInventario(os.path.join(tmp, 'bench.db'))
+        try:
+            user_id = generar_inventario(sistema, 1, args.productos, args.movimientos_dia * dias, dias=dias)[0]
+
+            # Un corte al cierre de cada mes del historial
+            inicio = time.perf_counter()
+            cortes = 0
+            dia = hoy.replace(day=1) - datetime.timedelta(days=1)
+            with contextlib.redirect_stdout(io.StringIO()):
+                while dia > hoy - datetime.timedelta(days=dias):
+                    sistema.generar_cortes_existencias(dia.isoformat(), [user_id], conservar_dias=0)
+                    cortes += 1
+                    dia = dia.replace(day=1) - datetime.timedelta(days=1)
+            cortes_s = time.perf_counter() - inicio
+
+            fecha = (hoy.replace(day=1) - datetime.timedelta(days=1)).replace(day=15).isoformat()
+            corte_ms, _ = medir(lambda: sistema.generar_cortes_existencias(None, [user_id]), args.repeticiones)
+            consulta_ms, existencias = medir(lambda: sistema.obtener_stock_en_fecha(user_id, fecha),
+                                             args.repeticiones)
+            verificacion_ms, verificacion = medir(lambda: sistema.verificar_stock_en_fecha(user_id, fecha),
+                                                  args.repeticiones)
+            assert existencias['corte'] is not None
+            assert not verificacion['diferencias'], verificacion['diferencias'][:5]
+        finally:
+            sistema.cerrar()
+    return {
+        'cortes': cortes,
+        'cortes_s': cortes_s,
+        'corte_ms': corte_ms,
+        'consulta_ms': consulta_ms,
+        'verificacion_ms': verificacion_ms,
+        'comparados': verificacion['comparados'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dias', type=int, nargs='+', default=[365, 1095, 3650], help='Días de historial')
+    parser.add_argument('--productos', type=int, default=500)
+    parser.add_argument('--movimientos-dia', type=int, default=50)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'días':>6}{'movimientos':>13}{'cortes':>8}{'cortes (s)':>12}{'corte (ms)':>12}"
+          f"{'consulta (ms)':>15}{'verificación (ms)':>19}{'productos':>11}")
+    for dias in args.dias:
+        r = ejecutar(dias, args)
+        print(f"{dias:>6}{args.movimientos_dia * dias:>13}{r['cortes']:>8}{r['cortes_s']:>12.1f}{r['corte_ms']:>12.2f}"
+              f"{r['consulta_ms']:>15.2f}{r['verificacion_ms']:>19.2f}{r['comparados']:>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Alta de productos: agregar_producto fila a fila contra importar_productos.
+
+    python -m benchmarks.bench_importacion --productos 100000
+"""
+import argparse
+import io
+import os
+import random
+import tempfile
+import time
+
+from database import SistemaInventario
+
+UBICACIONES = ['Bodega 1', 'Bodega 2', 'Estante A', 'Estante B', 'Taller']
+MARCAS = ['Acme', 'Bosch', 'Makita', 'Stanley', 'Truper']
+
+
+def generar_csv(productos, semilla=5):
+    rnd = random.Random(semilla)
+    lineas = ['codigo,nombre,descripcion,ubicacion,marca,precio_compra,stock_actual,stock_minimo']
+    for i in range(productos):
+        lineas.append(f'P{i:06d},Producto {rnd.randint(1, 10 ** 6)},Uso general,{rnd.choice(UBICACIONES)},'
+                      f'{rnd.choice(MARCAS)},{rnd.uniform(1, 300):.2f},{rnd.randint(0, 200)},{rnd.randint(0, 20)}')
+    return ('\n'.join(lineas) + '\n').encode('utf-8')
+
+
+def crear_sistema(tmp, nombre):
+    sistema = SistemaInventario(os.path.join(tmp, f'{nombre}.db'))
+    sistema.agregar_usuario('bench', 'bench123', 'Benchmark')
+    return sistema, sistema.obtener_usuario_por_username('bench')['id']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--productos', type=int, default=100000)
+    parser.add_argument('--muestra', type=int, default=2000,
+                        help='Filas a medir con agregar_producto (se extrapola al total)')
+    args = parser.parse_args()
+
+    contenido = generar_csv(args.productos)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sistema, user_id = crear_sistema(tmp, 'fila_a_fila')
+        filas = contenido.decode('utf-8').splitlines()[1:args.muestra + 1]
+        inicio = time.perf_counter()
+        for linea in filas:
+            codigo, nombre, descripcion, ubicacion, marca, precio, stock, minimo = linea.split(',')
+            sistema.agregar_producto(user_id, codigo, nombre, descripcion, ubicacion, '', marca, '', None,
+                                     float(precio), int(stock), int(minimo))
+        por_fila = (time.perf_counter() - inicio) / max(1, len(filas))
+        sistema.cerrar()
+
+        sistema, user_id = crear_sistema(tmp, 'importacion')
+        inicio = time.perf_counter()
+        informe = sistema.importar_productos(user_id, io.BytesIO(contenido), 'csv')
+        segundos = time.perf_counter() - inicio
+        sistema.cerrar()
+
+    print("=" * 72)
+    print(f"📥 Alta de {args.productos} productos")
+    print("=" * 72)
+    print(f"agregar_producto fila a fila: {por_fila * 1000:.2f} ms/fila → ~{por_fila * args.productos:.0f}s estimados")
+    print(f"importar_productos:           {segundos:.2f}s ({informe['insertadas']} nuevos, "
+          f"{informe['total_errores']} errores) → {args.productos / segundos:,.0f} filas/s")
+
+
+if __name__ == '__main__':
+    main()
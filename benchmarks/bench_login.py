@@ -0,0 +1,112 @@
+"""Ráfaga de inicios de sesión: hash en el hilo de la petición contra el pool de procesos.
+
+Lanza --rafaga inicios de sesión simultáneos (un hilo por petición, como el
+servidor de desarrollo con threaded=True) y, mientras tanto, un hilo que hace
+peticiones ligeras (estadísticas del dashboard) para ver cuánto las retrasa
+el hash de contraseñas. Muestra los percentiles de ambas latencias y cuántos
+inicios de sesión se rechazaron por saturación.
+
+    python -m benchmarks.bench_login --rafaga 32 --procesos 2 --max-pendientes 8
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from contrasenas import PoolHashing, HashingSaturado
+from database import SistemaInventario
+
+
+def percentil(valores, p):
+    if not valores:
+        return float('nan')
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))] * 1000
+
+
+def ejecutar(sistema, user_id, rafaga):
+    latencias_login = []
+    latencias_ligeras = []
+    rechazados = [0]
+    lock = threading.Lock()
+    terminado = threading.Event()
+
+    def iniciar_sesion(i):
+        inicio = time.perf_counter()
+        try:
+            sistema.verificar_password(f'bench{i}', 'bench123')
+        except HashingSaturado:
+            with lock:
+                rechazados[0] += 1
+            return
+        with lock:
+            latencias_login.append(time.perf_counter() - inicio)
+
+    def peticiones_ligeras():
+        while not terminado.is_set():
+            inicio = time.perf_counter()
+            sistema.obtener_estadisticas(user_id)
+            latencias_ligeras.append(time.perf_counter() - inicio)
+            time.sleep(0.005)
+
+    ligera = threading.Thread(target=peticiones_ligeras)
+    ligera.start()
+    inicio_total = time.perf_counter()
+    hilos = [threading.Thread(target=iniciar_sesion, args=(i,)) for i in range(rafaga)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    total = time.perf_counter() - inicio_total
+    terminado.set()
+    ligera.join()
+
+    return {
+        'total_s': total,
+        'rechazados': rechazados[0],
+        'login': [percentil(latencias_login, p) for p in (0.5, 0.95, 0.99)],
+        'ligera': [percentil(latencias_ligeras, p) for p in (0.5, 0.95, 1.0)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rafaga', type=int, default=32, help='Inicios de sesión simultáneos')
+    parser.add_argument('--procesos', type=int, default=2)
+    parser.add_argument('--max-pendientes', type=int, default=8)
+    args = parser.parse_args()
+
+    modos = {
+        'en el hilo': PoolHashing(procesos=0, max_pendientes=args.rafaga),
+        f'{args.procesos} procesos': PoolHashing(procesos=args.procesos, max_pendientes=args.max_pendientes),
+    }
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, 'bench.db')
+        sistema = SistemaInventario(db_name)
+        for i in range(args.rafaga):
+            sistema.agregar_usuario(f'bench{i}', 'bench123', f'Usuario {i}')
+        user_id = sistema.obtener_usuario_por_username('bench0')['id']
+        sistema.cerrar()
+
+        for nombre, hashing in modos.items():
+            sistema = SistemaInventario(db_name, hashing=hashing)
+            # Calentar el pool de procesos fuera de la medición
+            sistema.verificar_password('bench0', 'bench123')
+            resultados[nombre] = ejecutar(sistema, user_id, args.rafaga)
+            sistema.cerrar()
+
+    print("=" * 78)
+    print(f"🔐 Ráfaga de {args.rafaga} inicios de sesión, {os.cpu_count()} CPU")
+    print("=" * 78)
+    for nombre, r in resultados.items():
+        login = ' / '.join(f'{v:.0f}' for v in r['login'])
+        ligera = ' / '.join(f'{v:.1f}' for v in r['ligera'])
+        print(f"{nombre:<12} total {r['total_s']:>6.2f} s   rechazados {r['rechazados']:>3}   "
+              f"login p50/p95/p99 {login} ms   ligera p50/p95/máx {ligera} ms")
+
+
+if __name__ == '__main__':
+    main()
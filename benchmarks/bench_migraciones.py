@@ -0,0 +1,114 @@
+"""Mide `gestion.py migrar` sobre una base con muchos usuarios en tablas propias.
+
+Para cada número de usuarios crea una base nueva, da de alta a los usuarios
+con sus productos y movimientos, los deja en la versión 6 del esquema y mide:
+
+* una pasada sobre usuarios sanos (sólo se comprueban sus tablas, sin DDL),
+* una pasada sobre una fracción de usuarios con la tabla de productos copiada
+  por reparacion_migracion.py (CREATE TABLE ... AS SELECT: sin clave primaria,
+  UNIQUE ni triggers), que hay que reconstruir,
+* una pasada sin nada pendiente (lo que cuesta reanudar un comando terminado).
+
+    python -m benchmarks.bench_migraciones --usuarios 500 2000 --danados 0.05
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from benchmarks.bench_almacenamiento import poblar
+from database import SistemaInventario
+from migraciones import definicion_tabla
+
+
+def migrar_todo(sistema, lote):
+    """Segundos de una pasada completa de `gestion.py migrar` y usuarios actualizados"""
+    inicio = time.perf_counter()
+    actualizados = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        pendientes = sistema.usuarios_por_actualizar()
+        for i in range(0, len(pendientes), lote):
+            hechos, fallidos = sistema.migrar_esquemas(pendientes[i:i + lote])
+            assert not fallidos, fallidos
+            actualizados += len(hechos)
+        sistema.completar_migraciones()
+    return time.perf_counter() - inicio, actualizados
+
+
+def danar(sistema, ids):
+    """Dejar la tabla de productos de `ids` como la dejaba reparacion_migracion.py"""
+    with sistema.pool.conexion() as conn:
+        for user_id in ids:
+            conn.executescript(f'''
+                CREATE TABLE productos_{user_id}_temp AS SELECT * FROM productos_{user_id};
+                DROP TABLE productos_{user_id};
+                ALTER TABLE productos_{user_id}_temp RENAME TO productos_{user_id};
+            ''')
+        conn.execute(f"UPDATE schema_version SET version = 6 WHERE user_id IN ({', '.join(map(str, ids))})")
+        conn.commit()
+    sistema.olvidar_esquema_usuario()
+
+
+def ejecutar(usuarios, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, 'bench.db')
+        sistema = SistemaInventario(db_name)
+        try:
+            inicio = time.perf_counter()
+            ids, _ = poblar(sistema, usuarios, args.productos, args.movimientos)
+            alta_s = time.perf_counter() - inicio
+            with sistema.pool.conexion() as conn:
+                objetos = conn.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()[0]
+                conn.execute('UPDATE schema_version SET version = 6')
+                conn.commit()
+            sistema.olvidar_esquema_usuario()
+
+            sanos_s, sanos = migrar_todo(sistema, args.lote)
+
+            danados = ids[::max(1, round(1 / args.danados))]
+            danar(sistema, danados)
+            reconstruidos_s, reconstruidos = migrar_todo(sistema, args.lote)
+
+            reanudar_s, _ = migrar_todo(sistema, args.lote)
+
+            with sistema.pool.conexion() as conn:
+                cursor = conn.cursor()
+                columnas, unicas = definicion_tabla(cursor, f'productos_{danados[0]}')
+                assert columnas['id'][3] == 1 and ('codigo',) in unicas
+        finally:
+            sistema.cerrar()
+    return {
+        'alta_s': alta_s,
+        'objetos': objetos,
+        'sanos': sanos,
+        'sanos_ms': sanos_s * 1000 / max(1, sanos),
+        'sanos_s': sanos_s,
+        'reconstruidos': reconstruidos,
+        'reconstruidos_ms': reconstruidos_s * 1000 / max(1, reconstruidos),
+        'reconstruidos_s': reconstruidos_s,
+        'reanudar_ms': reanudar_s * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--usuarios', type=int, nargs='+', default=[500, 2000])
+    parser.add_argument('--productos', type=int, default=20, help='Productos por usuario')
+    parser.add_argument('--movimientos', type=int, default=50, help='Movimientos por usuario')
+    parser.add_argument('--danados', type=float, default=0.05, help='Fracción de usuarios con tablas dañadas')
+    parser.add_argument('--lote', type=int, default=200, help='Usuarios por transacción')
+    args = parser.parse_args()
+
+    print(f"{'usuarios':>9}{'objetos':>10}{'alta (s)':>10}{'sanos (ms/u)':>14}{'total (s)':>11}"
+          f"{'dañados':>9}{'reconstr. (ms/u)':>18}{'total (s)':>11}{'reanudar (ms)':>15}")
+    for usuarios in args.usuarios:
+        r = ejecutar(usuarios, args)
+        print(f"{usuarios:>9}{r['objetos']:>10}{r['alta_s']:>10.1f}{r['sanos_ms']:>14.3f}{r['sanos_s']:>11.2f}"
+              f"{r['reconstruidos']:>9}{r['reconstruidos_ms']:>18.1f}{r['reconstruidos_s']:>11.2f}"
+              f"{r['reanudar_ms']:>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Compara conexión por llamada contra el pool de conexiones.
+
+Simula el servidor de desarrollo con threaded=True: cada petición se atiende
+en un hilo nuevo que ejecuta la secuencia de consultas de /dashboard
+(load_user + estadísticas + productos con stock bajo).
+
+    python -m benchmarks.bench_pool --peticiones 2000 --concurrencia 16
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from database import SistemaInventario
+
+
+class ConexionPorLlamada:
+    """Comportamiento anterior: sqlite3.connect() y close() en cada método"""
+
+    def __init__(self, db_name):
+        self.db_name = db_name
+
+    @contextmanager
+    def conexion(self):
+        conn = sqlite3.connect(self.db_name)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def cerrar(self):
+        pass
+
+
+def poblar(sistema, productos):
+    sistema.agregar_usuario('bench', 'bench123', 'Benchmark')
+    usuario = sistema.obtener_usuario_por_username('bench')
+    with sistema.pool.conexion() as conn:
+        conn.executemany(
+            f'''INSERT INTO productos_{usuario['id']} (codigo, nombre, ubicacion, precio_compra, stock_actual, stock_minimo)
+                VALUES (?, ?, ?, ?, ?, ?)''',
+            [(f'P{i:06d}', f'Producto {i}', f'Estante {i % 40}', 1.5 + i % 100, i % 90, 10)
+             for i in range(productos)]
+        )
+        conn.commit()
+    return usuario['id']
+
+
+def peticion_dashboard(sistema, user_id):
+    sistema.obtener_usuario_por_id(user_id)
+    sistema.obtener_estadisticas(user_id)
+    sistema.obtener_productos_stock_bajo(user_id)
+
+
+def ejecutar(sistema, user_id, peticiones, concurrencia):
+    """Un hilo nuevo por petición, como ThreadingMixIn de werkzeug"""
+    latencias = []
+    lock = threading.Lock()
+    cupos = threading.Semaphore(concurrencia)
+
+    def atender():
+        inicio = time.perf_counter()
+        try:
+            peticion_dashboard(sistema, user_id)
+        finally:
+            duracion = time.perf_counter() - inicio
+            with lock:
+                latencias.append(duracion)
+            cupos.release()
+
+    hilos = []
+    inicio_total = time.perf_counter()
+    for _ in range(peticiones):
+        cupos.acquire()
+        hilo = threading.Thread(target=atender)
+        hilo.start()
+        hilos.append(hilo)
+    for hilo in hilos:
+        hilo.join()
+    total = time.perf_counter() - inicio_total
+
+    latencias.sort()
+    return {
+        'peticiones_por_segundo': peticiones / total,
+        'p50_ms': statistics.median(latencias) * 1000,
+        'p95_ms': latencias[int(len(latencias) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--peticiones', type=int, default=2000)
+    parser.add_argument('--concurrencia', type=int, default=16)
+    parser.add_argument('--productos', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, 'bench.db')
+        sistema = SistemaInventario(db_name)
+        user_id = poblar(sistema, args.productos)
+
+        resultados = {}
+        sistema.pool.cerrar()
+        sistema.pool = ConexionPorLlamada(db_name)
+        resultados['conexion por llamada'] = ejecutar(sistema, user_id, args.peticiones, args.concurrencia)
+
+        sistema = SistemaInventario(db_name)
+        resultados['pool'] = ejecutar(sistema, user_id, args.peticiones, args.concurrencia)
+        estadisticas_pool = dict(sistema.pool.estadisticas)
+        sistema.cerrar()
+
+    print("=" * 60)
+    print(f"📊 {args.peticiones} peticiones /dashboard, concurrencia {args.concurrencia}, {args.productos} productos")
+    print("=" * 60)
+    for nombre, r in resultados.items():
+        print(f"{nombre:<22} {r['peticiones_por_segundo']:>9.1f} req/s   "
+              f"p50 {r['p50_ms']:>7.2f} ms   p95 {r['p95_ms']:>7.2f} ms")
+    print(f"Pool: {estadisticas_pool}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Reporte de movimientos de un año: agrupación completa contra resumen diario.
+
+Siembra un usuario con --movimientos movimientos repartidos en un año (los
+triggers mantienen el resumen diario durante la siembra) y mide:
+
+* la consulta anterior, que agrupaba toda la tabla por DATE(fecha), tipo,
+* el reporte de un año por día, semana y mes leído del resumen diario, con
+  las filas que lee cada uno,
+* el coste de rellenar el resumen desde cero (gestion.py reconstruir-diario).
+
+    python -m benchmarks.bench_reportes --movimientos 2000000 --productos 500
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from database import SistemaInventario, AGRUPACIONES_REPORTE, PRODUCTO_TODOS
+
+
+def sembrar(sistema, productos, movimientos, dias, semilla=7):
+    rnd = random.Random(semilla)
+    with contextlib.redirect_stdout(io.StringIO()):
+        sistema.agregar_usuario('bench', 'bench123', 'Benchmark')
+    user_id = sistema.obtener_usuario_por_username('bench')['id']
+    tablas = sistema.tablas_usuario(user_id)
+
+    inicio = time.perf_counter()
+    with sistema.pool.conexion() as conn:
+        conn.executemany(
+            f'''INSERT INTO {tablas.productos} ({tablas.columna_usuario}codigo, nombre, stock_actual)
+                VALUES ({tablas.valor_usuario}?, ?, ?)''',
+            [(f'P{i:06d}', f'Producto {i}', 1000) for i in range(productos)]
+        )
+        lote = 100000
+        for desde in range(0, movimientos, lote):
+            conn.executemany(
+                f'''INSERT INTO {tablas.movimientos} ({tablas.columna_usuario}producto_id, tipo, cantidad, fecha)
+                    VALUES ({tablas.valor_usuario}?, ?, ?, datetime('now', ?))''',
+                [(rnd.randint(1, productos), rnd.choice(['entrada', 'salida']), rnd.randint(1, 20),
+                  f'-{rnd.randint(0, dias * 24 * 60)} minutes')
+                 for _ in range(min(lote, movimientos - desde))]
+            )
+        conn.commit()
+    return user_id, tablas, time.perf_counter() - inicio
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--movimientos', type=int, default=1000000)
+    parser.add_argument('--productos', type=int, default=500)
+    parser.add_argument('--dias', type=int, default=365, help='Días en los que se reparten los movimientos')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sistema = SistemaInventario(os.path.join(tmp, 'bench.db'))
+        user_id, tablas, segundos_siembra = sembrar(sistema, args.productos, args.movimientos, args.dias)
+
+        hasta = datetime.datetime.now(datetime.timezone.utc).date()
+        desde = (hasta - datetime.timedelta(days=args.dias)).isoformat()
+        hasta = hasta.isoformat()
+
+        def consulta_anterior():
+            with sistema.pool.conexion() as conn:
+                conn.execute(f'''
+                    SELECT DATE(fecha) as fecha, tipo, COUNT(*), SUM(cantidad)
+                    FROM {tablas.movimientos} WHERE {tablas.filtro()}
+                    GROUP BY DATE(fecha), tipo ORDER BY fecha DESC LIMIT 30
+                ''').fetchall()
+
+        with sistema.pool.conexion() as conn:
+            filas_leidas = conn.execute(f'''
+                SELECT COUNT(*) FROM {tablas.diario}
+                WHERE {tablas.filtro()} AND producto_id = ? AND dia BETWEEN ? AND ?
+            ''', (PRODUCTO_TODOS, desde, hasta)).fetchone()[0]
+            filas_diario = conn.execute(f'SELECT COUNT(*) FROM {tablas.diario}').fetchone()[0]
+
+        resultados = [('anterior (toda la tabla, 30 grupos)', medir(consulta_anterior, args.repeticiones),
+                       args.movimientos, 30)]
+        for agrupacion in AGRUPACIONES_REPORTE:
+            reporte = sistema.obtener_reporte_movimientos(user_id, desde, hasta, agrupacion)
+            ms = medir(lambda: sistema.obtener_reporte_movimientos(user_id, desde, hasta, agrupacion),
+                       args.repeticiones)
+            resultados.append((f'resumen diario, 1 año por {agrupacion}', ms, filas_leidas, len(reporte)))
+
+        inicio = time.perf_counter()
+        sistema.reconstruir_resumen_diario(user_id)
+        segundos_reconstruccion = time.perf_counter() - inicio
+        sistema.cerrar()
+
+    print("=" * 78)
+    print(f"📈 Reporte de movimientos: {args.movimientos:,} movimientos, {args.productos} productos, "
+          f"{args.dias} días")
+    print("=" * 78)
+    print(f"{'consulta':<40}{'ms':>10}{'filas leídas':>15}{'grupos':>10}")
+    for nombre, ms, leidas, grupos in resultados:
+        print(f"{nombre:<40}{ms:>10.1f}{leidas:>15,}{grupos:>10,}")
+    print(f"Siembra con triggers: {args.movimientos / segundos_siembra:,.0f} movimientos/s; "
+          f"resumen diario: {filas_diario:,} filas; reconstrucción: {segundos_reconstruccion:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
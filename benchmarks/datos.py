@@ -0,0 +1,141 @@
+"""Generador determinista de inventarios sintéticos para los benchmarks.
+
+Con la misma semilla y los mismos tamaños genera siempre los mismos usuarios,
+productos y movimientos. Las fechas se cuentan hacia atrás desde la medianoche
+UTC del día (o desde `referencia`), así que los reportes de "últimos N días"
+siempre encuentran datos; los productos se crean al principio de ese periodo.
+
+Las distribuciones imitan un inventario real: pocas ubicaciones y marcas
+concentran la mayoría de los productos (Zipf), el 15% no tiene marca, el stock
+sigue una lognormal y unos pocos productos acumulan la mayoría de los movimientos.
+
+    ids = generar_inventario(sistema, usuarios=3, productos=2000, movimientos=20000, semilla=42)
+"""
+import contextlib
+import datetime
+import io
+import random
+
+# Credenciales de los usuarios generados: bench1, bench2... con la misma contraseña
+PREFIJO_USUARIO = 'bench'
+CLAVE_USUARIO = 'bench123'
+
+UBICACIONES = (
+    ['Bodega Central', 'Bodega 2', 'Bodega 3', 'Taller', 'Oficina', 'Almacén Norte', 'Almacén Sur']
+    + [f'Estante {letra}-{numero}' for letra in 'ABCD' for numero in range(1, 6)]
+)
+MARCAS = ['Truper', 'Bosch', 'Makita', 'Stanley', 'DeWalt', 'Pretul', '3M', 'Urrea', 'Acme', 'Black+Decker',
+          'Irwin', 'Fluke']
+PROPORCION_SIN_MARCA = 0.15
+PALABRAS = ['Tornillo', 'Taladro', 'Cable', 'Válvula', 'Filtro', 'Sensor', 'Motor', 'Correa', 'Broca', 'Llave',
+            'Guante', 'Cinta', 'Rodamiento', 'Manguera', 'Interruptor', 'Batería']
+MEDIDAS = ['1/4"', '3/8"', '1/2"', '10 mm', '12 mm', '2 m', '5 m', '12 V', '24 V', 'M8', 'M10', 'XL']
+ESTADOS = (['Nuevo', 'Usado', 'Reparado', None], [70, 15, 5, 10])
+STOCK_MINIMO = ([0, 5, 10, 20, 50], [20, 30, 25, 15, 10])
+
+# Filas por executemany al sembrar movimientos
+TAMANO_LOTE = 50000
+
+
+def pesos_zipf(cantidad, exponente=1.1):
+    """Pesos acumulados de una Zipf sobre `cantidad` elementos (para random.choices)"""
+    acumulado, pesos = 0.0, []
+    for rango in range(1, cantidad + 1):
+        acumulado += 1 / rango ** exponente
+        pesos.append(acumulado)
+    return pesos
+
+
+def generar_productos(rnd, productos):
+    """Tuplas (codigo, nombre, descripcion, ubicacion, modelo, marca, estado, año, precio, stock, mínimo)"""
+    zipf_ubicaciones = pesos_zipf(len(UBICACIONES))
+    zipf_marcas = pesos_zipf(len(MARCAS))
+    filas = []
+    for i in range(productos):
+        palabra = rnd.choice(PALABRAS)
+        marca = None if rnd.random() < PROPORCION_SIN_MARCA else rnd.choices(MARCAS, cum_weights=zipf_marcas)[0]
+        filas.append((
+            f'{palabra[:3].upper()}-{i:06d}',
+            f'{palabra} {rnd.choice(MEDIDAS)} {rnd.randint(1, 999)}',
+            f'{palabra} para uso general, lote {rnd.randint(1, 50)}',
+            rnd.choices(UBICACIONES, cum_weights=zipf_ubicaciones)[0],
+            f'{palabra[:2].upper()}{rnd.randint(100, 9999)}',
+            marca,
+            rnd.choices(*ESTADOS)[0],
+            rnd.randint(2012, 2025),
+            round(rnd.lognormvariate(3, 1), 2),
+            int(rnd.lognormvariate(3.5, 1.0)),
+            rnd.choices(*STOCK_MINIMO)[0],
+        ))
+    return filas
+
+
+def generar_movimientos(rnd, productos, movimientos, dias, referencia):
+    """Tuplas (producto_id relativo 1..productos, tipo, cantidad, motivo, fecha)"""
+    # Unos pocos productos (al azar, no los primeros) concentran la mayoría de los movimientos
+    orden = list(range(1, productos + 1))
+    rnd.shuffle(orden)
+    zipf_productos = pesos_zipf(productos, exponente=0.8)
+    minutos = dias * 24 * 60
+    for _ in range(movimientos):
+        tipo = 'salida' if rnd.random() < 0.55 else 'entrada'
+        fecha = referencia - datetime.timedelta(minutes=rnd.randint(1, minutos))
+        yield (
+            rnd.choices(orden, cum_weights=zipf_productos)[0],
+            tipo,
+            max(1, int(rnd.expovariate(1 / 8))),
+            'Compra a proveedor' if tipo == 'entrada' else rnd.choice(['Venta', 'Consumo interno', 'Merma']),
+            fecha.strftime('%Y-%m-%d %H:%M:%S'),
+        )
+
+
+def generar_inventario(sistema, usuarios, productos, movimientos, dias=365, semilla=42, referencia=None):
+    """Dar de alta `usuarios` usuarios, cada uno con `productos` productos y `movimientos` movimientos.
+
+    Los datos se insertan directamente en las tablas de cada usuario (los
+    triggers mantienen resúmenes, alertas e índice de búsqueda como en una
+    escritura normal). Devuelve los ids de los usuarios en orden.
+    """
+    if referencia is None:
+        hoy = datetime.datetime.now(datetime.timezone.utc).date()
+        referencia = datetime.datetime.combine(hoy, datetime.time())
+    ids = []
+    for numero in range(1, usuarios + 1):
+        # Cada usuario tiene su propia semilla: añadir usuarios no cambia los anteriores
+        rnd = random.Random(f'{semilla}-{numero}')
+        username = f'{PREFIJO_USUARIO}{numero}'
+        with contextlib.redirect_stdout(io.StringIO()):
+            sistema.agregar_usuario(username, CLAVE_USUARIO, f'Benchmark {numero}')
+        user_id = sistema.obtener_usuario_por_username(username)['id']
+        tablas = sistema.tablas_usuario(user_id)
+
+        with sistema.pool.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT IFNULL(MAX(id), 0) FROM {tablas.productos}')
+            primer_id = cursor.fetchone()[0] + 1
+            creacion = (referencia - datetime.timedelta(days=dias)).strftime('%Y-%m-%d %H:%M:%S')
+            cursor.executemany(
+                f'''INSERT INTO {tablas.productos}
+                    ({tablas.columna_usuario}codigo, nombre, descripcion, ubicacion, modelo, marca, estado,
+                     año_adquisicion, precio_compra, stock_actual, stock_minimo, fecha_creacion)
+                    VALUES ({tablas.valor_usuario}?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                [fila + (creacion,) for fila in generar_productos(rnd, productos)]
+            )
+            lote = []
+            for producto, tipo, cantidad, motivo, fecha in generar_movimientos(rnd, productos, movimientos, dias,
+                                                                               referencia):
+                lote.append((primer_id + producto - 1, tipo, cantidad, motivo, fecha))
+                if len(lote) >= TAMANO_LOTE:
+                    cursor.executemany(_sql_movimientos(tablas), lote)
+                    lote = []
+            if lote:
+                cursor.executemany(_sql_movimientos(tablas), lote)
+            sistema._incrementar_version_datos(cursor, user_id)
+            conn.commit()
+        ids.append(user_id)
+    return ids
+
+
+def _sql_movimientos(tablas):
+    return f'''INSERT INTO {tablas.movimientos} ({tablas.columna_usuario}producto_id, tipo, cantidad, motivo, fecha)
+               VALUES ({tablas.valor_usuario}?, ?, ?, ?, ?)'''
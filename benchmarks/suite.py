@@ -0,0 +1,577 @@
+"""Suite de microbenchmarks: cada método de SistemaInventario y cada ruta de Flask.
+
+Siembra con benchmarks.datos un inventario determinista (--usuarios ×
+--productos × --movimientos) y mide la mediana y el p95 de cada caso sobre el
+primer usuario: los métodos llamando a SistemaInventario directamente y las
+rutas con el cliente de pruebas de Flask (con sesión o token de API). Por
+defecto la cache de resultados está apagada para medir las consultas; con
+--cache se mide como en producción.
+
+Los resultados se guardan en JSON (--salida) y se comparan con una línea base
+(--base): un caso cuya mediana empeora más de --umbral (y más de --minimo-ms)
+cuenta como regresión y el comando termina con código 1.
+
+    python -m benchmarks.suite --guardar-base                 # medir y guardar la línea base
+    python -m benchmarks.suite                                # medir y comparar con ella
+    python -m benchmarks.suite --usuarios 5 --productos 20000 --movimientos 200000 --solo metodo:buscar
+"""
+import argparse
+import contextlib
+import datetime
+import inspect
+import io
+import itertools
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import zlib
+
+from app import create_app
+from database import SistemaInventario
+from fotos_perfil import VARIANTES_FOTO
+from importacion import CAMPOS_PRODUCTO
+from benchmarks.datos import generar_inventario, PREFIJO_USUARIO, CLAVE_USUARIO
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+BASE_POR_DEFECTO = os.path.join(DIRECTORIO, 'linea_base.json')
+
+# Empeoramiento relativo de la mediana que cuenta como regresión, y diferencia
+# absoluta mínima (por debajo de ella el ruido del reloj domina)
+UMBRAL_REGRESION = 0.25
+MINIMO_MS = 0.05
+
+# Métodos públicos que la suite no mide: mantenimiento y ciclo de vida
+METODOS_OMITIDOS = {
+    'cerrar': 'cierra el sistema',
+    'crear_tablas': 'DDL de arranque',
+    'olvidar_esquema_usuario': 'sólo vacía memoria',
+    'reconstruir_resumen': 'mantenimiento (gestion.py)',
+    'reconstruir_resumen_diario': 'mantenimiento (gestion.py)',
+    'reconstruir_indice_busqueda': 'mantenimiento (gestion.py)',
+    'reconstruir_indices_busqueda': 'mantenimiento (gestion.py)',
+    'usuarios_por_migrar': 'mantenimiento (gestion.py)',
+    'usuarios_por_actualizar': 'mantenimiento (gestion.py)',
+    'migrar_esquemas': 'mantenimiento (gestion.py), ver bench_migraciones',
+    'completar_migraciones': 'mantenimiento (gestion.py)',
+    'estado_migraciones': 'mantenimiento (gestion.py)',
+    'migrar_usuarios_a_compartido': 'mantenimiento (gestion.py), ver bench_almacenamiento',
+    'eliminar_tablas_migradas': 'mantenimiento (gestion.py)',
+    'limpiar_fotos_huerfanas': 'mantenimiento (gestion.py)',
+    'obtener_ids_usuarios': 'mantenimiento (gestion.py)',
+    'generar_cortes_existencias': 'mantenimiento (gestion.py), ver bench_existencias',
+    'verificar_stock_en_fecha': 'mantenimiento (gestion.py), ver bench_existencias',
+}
+
+# Rutas que la suite no mide
+RUTAS_OMITIDAS = {
+    'eventos_dashboard': 'flujo SSE abierto durante minutos',
+}
+
+
+class Caso:
+    """Una medición: funcion(preparado) se cronometra; preparar() (sin cronometrar) le da sus datos"""
+
+    def __init__(self, nombre, funcion, preparar=None, estado_esperado=None):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.preparar = preparar
+        self.estado_esperado = estado_esperado
+
+    def ejecutar(self, repeticiones, despues=None):
+        tiempos = []
+        resultado = None
+        # Los mensajes de los métodos (✅ Usuario creado...) no se imprimen
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(repeticiones + 1):
+                preparado = self.preparar() if self.preparar else None
+                inicio = time.perf_counter()
+                resultado = self.funcion(preparado) if self.preparar else self.funcion()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+                if despues:
+                    despues()
+        # La primera ejecución calienta caches y conexiones: no cuenta
+        tiempos = sorted(tiempos[1:])
+        return {
+            'mediana_ms': round(statistics.median(tiempos), 4),
+            'p95_ms': round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))], 4),
+            'repeticiones': repeticiones,
+        }, resultado
+
+
+def consumir(resultado):
+    """Recorrer los generadores (exportaciones) para que hagan su trabajo"""
+    if inspect.isgenerator(resultado):
+        for _ in resultado:
+            pass
+    return resultado
+
+
+def imagen_png(lado=256):
+    """PNG en escala de grises sin dependencias (la foto de perfil de las pruebas)"""
+    filas = b''.join(b'\x00' + bytes((x * y) % 256 for x in range(lado)) for y in range(lado))
+
+    def bloque(tipo, datos):
+        return struct.pack('>I', len(datos)) + tipo + datos + struct.pack('>I', zlib.crc32(tipo + datos))
+
+    return (b'\x89PNG\r\n\x1a\n' + bloque(b'IHDR', struct.pack('>IIBBBBB', lado, lado, 8, 0, 0, 0, 0))
+            + bloque(b'IDAT', zlib.compress(filas)) + bloque(b'IEND', b''))
+
+
+def csv_importacion(productos):
+    """CSV con los productos dados (actualiza por código, así se puede repetir)"""
+    lineas = [','.join(CAMPOS_PRODUCTO)]
+    for producto in productos:
+        lineas.append(','.join('' if producto[campo] is None else str(producto[campo]).replace(',', ' ')
+                               for campo in CAMPOS_PRODUCTO))
+    return ('\n'.join(lineas) + '\n').encode('utf-8')
+
+
+# ========== CASOS ==========
+
+def casos_metodos(sistema, user_id, contexto):
+    medio = contexto['producto_medio']
+    codigos = itertools.count(1)
+    desde, hasta = contexto['desde'], contexto['hasta']
+    datos_producto = ('', 'Bodega Central', 'BN-100', 'Acme', 'Nuevo', 2024, 12.5, 40, 10)
+
+    def producto_nuevo():
+        codigo = f'BENCH-M-{next(codigos):06d}'
+        sistema.agregar_producto(user_id, codigo, 'Producto de benchmark', *datos_producto)
+        return sistema.obtener_producto_por_codigo(user_id, codigo)['id']
+
+    def token_nuevo():
+        sistema.crear_token_api(user_id, 'bench')
+        return sistema.obtener_tokens_api(user_id)[-1]['id']
+
+    usuarios_nuevos = itertools.count(1)
+    csv = csv_importacion(contexto['muestra_productos'])
+    return [
+        Caso('asegurar_esquema_usuario', lambda: sistema.asegurar_esquema_usuario(user_id)),
+        Caso('asegurar_tablas_usuario', lambda: sistema.asegurar_tablas_usuario(user_id)),
+        Caso('tablas_usuario', lambda: sistema.tablas_usuario(user_id)),
+        Caso('obtener_usuario_por_id', lambda: sistema.obtener_usuario_por_id(user_id)),
+        Caso('obtener_usuario_por_username', lambda: sistema.obtener_usuario_por_username(contexto['username'])),
+        Caso('obtener_usuario_sesion', lambda: sistema.obtener_usuario_sesion(user_id)),
+        Caso('verificar_password', lambda: sistema.verificar_password(contexto['username'], CLAVE_USUARIO)),
+        Caso('agregar_usuario', lambda nombre: sistema.agregar_usuario(nombre, 'bench123', 'Nuevo'),
+             preparar=lambda: f'nuevo{next(usuarios_nuevos)}'),
+        Caso('obtener_foto_perfil', lambda: sistema.obtener_foto_perfil(user_id)),
+        Caso('actualizar_foto_perfil', lambda: sistema.actualizar_foto_perfil(user_id, contexto['hash_foto'])),
+        Caso('guardar_foto_archivo', lambda archivo: sistema.guardar_foto_archivo(user_id, archivo),
+             preparar=lambda: io.BytesIO(contexto['png'])),
+        Caso('crear_token_api', lambda: sistema.crear_token_api(user_id, 'bench')),
+        Caso('obtener_tokens_api', lambda: sistema.obtener_tokens_api(user_id)),
+        Caso('obtener_usuario_por_token', lambda: sistema.obtener_usuario_por_token(contexto['token'])),
+        Caso('revocar_token_api', lambda token_id: sistema.revocar_token_api(user_id, token_id), preparar=token_nuevo),
+        Caso('obtener_version_datos', lambda: sistema.obtener_version_datos(user_id)),
+        Caso('obtener_estado_datos', lambda: sistema.obtener_estado_datos(user_id)),
+        Caso('obtener_versiones_datos', lambda: sistema.obtener_versiones_datos(contexto['usuarios'])),
+        Caso('obtener_estadisticas', lambda: sistema.obtener_estadisticas(user_id)),
+        Caso('obtener_productos_stock_bajo', lambda: sistema.obtener_productos_stock_bajo(user_id)),
+        Caso('obtener_estado_dashboard', lambda: sistema.obtener_estado_dashboard(user_id)),
+        Caso('obtener_productos', lambda: sistema.obtener_productos(user_id)),
+        Caso('obtener_productos_pagina', lambda: sistema.obtener_productos_pagina(user_id)),
+        Caso('obtener_productos_pagina[cursor]',
+             lambda: sistema.obtener_productos_pagina(user_id, contexto['cursor_productos'])),
+        Caso('obtener_opciones_productos', lambda: sistema.obtener_opciones_productos(user_id)),
+        Caso('obtener_producto_por_id', lambda: sistema.obtener_producto_por_id(user_id, medio)),
+        Caso('obtener_producto_por_codigo', lambda: sistema.obtener_producto_por_codigo(user_id, contexto['codigo'])),
+        Caso('agregar_producto', lambda codigo: sistema.agregar_producto(user_id, codigo, 'Nuevo', *datos_producto),
+             preparar=lambda: f'BENCH-A-{next(codigos):06d}'),
+        Caso('actualizar_producto',
+             lambda: sistema.actualizar_producto(user_id, medio, contexto['codigo'], 'Renombrado', *datos_producto)),
+        Caso('eliminar_producto', lambda producto_id: sistema.eliminar_producto(user_id, producto_id),
+             preparar=producto_nuevo),
+        Caso('importar_productos', lambda archivo: sistema.importar_productos(user_id, archivo),
+             preparar=lambda: io.BytesIO(csv)),
+        Caso('obtener_movimientos', lambda: sistema.obtener_movimientos(user_id)),
+        Caso('obtener_movimientos_pagina', lambda: sistema.obtener_movimientos_pagina(user_id)),
+        Caso('obtener_movimientos_pagina[cursor]',
+             lambda: sistema.obtener_movimientos_pagina(user_id, contexto['cursor_movimientos'])),
+        Caso('agregar_movimiento', lambda: sistema.agregar_movimiento(user_id, medio, 'entrada', 1, 'Benchmark')),
+        Caso('agregar_movimientos_lote', lambda: sistema.agregar_movimientos_lote(user_id, contexto['lote'], 'Lote')),
+        Caso('buscar_productos', lambda: sistema.buscar_productos(user_id, '', '')),
+        Caso('buscar_productos[texto]', lambda: sistema.buscar_productos(user_id, contexto['texto'], '')),
+        Caso('buscar_productos[texto+ubicacion]',
+             lambda: sistema.buscar_productos(user_id, contexto['texto'], contexto['ubicacion'])),
+        Caso('obtener_ubicaciones', lambda: sistema.obtener_ubicaciones(user_id)),
+        Caso('obtener_reporte_stock', lambda: sistema.obtener_reporte_stock(user_id)),
+        Caso('obtener_reporte_movimientos', lambda: sistema.obtener_reporte_movimientos(user_id)),
+        Caso('obtener_reporte_movimientos[año por semana]',
+             lambda: sistema.obtener_reporte_movimientos(user_id, desde, hasta, 'semana')),
+        Caso('obtener_reporte_movimientos[año por mes, producto]',
+             lambda: sistema.obtener_reporte_movimientos(user_id, desde, hasta, 'mes', medio)),
+        Caso('obtener_stock_en_fecha', lambda: sistema.obtener_stock_en_fecha(user_id, contexto['fecha_existencias'])),
+        Caso('obtener_stock_en_fecha[antes del primer corte]', lambda: sistema.obtener_stock_en_fecha(user_id, desde)),
+        Caso('exportar_productos', lambda: consumir(sistema.exportar_productos(user_id))),
+        Caso('exportar_movimientos', lambda: consumir(sistema.exportar_movimientos(user_id))),
+        Caso('exportar_movimientos[producto]', lambda: consumir(sistema.exportar_movimientos(user_id, None, None, medio))),
+        Caso('generar_resumenes_alertas', lambda: sistema.generar_resumenes_alertas()),
+        Caso('obtener_resumenes_alertas', lambda: sistema.obtener_resumenes_alertas(user_id)),
+    ]
+
+
+def casos_rutas(app, sistema, user_id, contexto):
+    """Casos por endpoint: {endpoint: [Caso]}. Cada caso devuelve la respuesta ya leída."""
+    cliente = contexto['cliente']
+    medio = contexto['producto_medio']
+    token = {'Authorization': f"Bearer {contexto['token']}"}
+    codigos = itertools.count(1)
+    usuarios_nuevos = itertools.count(1)
+    producto = dict(sistema.obtener_producto_por_id(user_id, medio))
+    formulario = {campo: '' if producto[campo] is None else producto[campo] for campo in CAMPOS_PRODUCTO}
+    csv = csv_importacion(contexto['muestra_productos'])
+
+    def pedir(metodo, url, cliente_peticion=None, **kwargs):
+        respuesta = (cliente_peticion or cliente).open(url, method=metodo, **kwargs)
+        respuesta.get_data()
+        respuesta.close()
+        return respuesta
+
+    def get(url, **kwargs):
+        return lambda: pedir('GET', url, **kwargs)
+
+    def producto_nuevo():
+        codigo = f'BENCH-R-{next(codigos):06d}'
+        sistema.agregar_producto(user_id, codigo, 'Producto de benchmark', '', 'Bodega Central', '', '', '', None,
+                                 10.0, 40, 10)
+        return sistema.obtener_producto_por_codigo(user_id, codigo)['id']
+
+    def token_nuevo():
+        sistema.crear_token_api(user_id, 'bench')
+        return sistema.obtener_tokens_api(user_id)[-1]['id']
+
+    def cliente_con_sesion():
+        otro = app.test_client()
+        otro.post('/login', data={'username': contexto['username'], 'password': CLAVE_USUARIO})
+        return otro
+
+    def formulario_nuevo():
+        return {**formulario, 'codigo': f'BENCH-F-{next(codigos):06d}'}
+
+    anonimo = app.test_client()
+    activos = contexto['activos']
+    return {
+        'root': [Caso('GET /', get('/'))],
+        # /login y /register cierran la sesión activa: van con un cliente sin sesión
+        'login': [
+            Caso('GET /login', get('/login', cliente_peticion=anonimo)),
+            Caso('POST /login', lambda: pedir('POST', '/login', cliente_peticion=app.test_client(), data={
+                'username': contexto['username'], 'password': CLAVE_USUARIO})),
+        ],
+        'register': [
+            Caso('GET /register', get('/register', cliente_peticion=anonimo)),
+            Caso('POST /register', lambda datos: pedir('POST', '/register', cliente_peticion=app.test_client(), data=datos),
+                 preparar=lambda: {'username': f'registro{next(usuarios_nuevos)}', 'password': 'bench123',
+                                   'confirm_password': 'bench123', 'nombre': 'Registro', 'email': ''}),
+        ],
+        'logout': [Caso('GET /logout', lambda otro: pedir('GET', '/logout', cliente_peticion=otro),
+                        preparar=cliente_con_sesion)],
+        'actualizar_foto_perfil': [Caso('POST /actualizar_foto_perfil', lambda foto: pedir(
+            'POST', '/actualizar_foto_perfil', data={'foto_perfil': (foto, 'foto.png')},
+            content_type='multipart/form-data'), preparar=lambda: io.BytesIO(contexto['png']))],
+        'eliminar_foto_perfil': [Caso('POST /eliminar_foto_perfil', lambda: pedir('POST', '/eliminar_foto_perfil'))],
+        'foto_perfil': [Caso('GET /fotos_perfil/<hash>/<variante>.jpg',
+                             get(f"/fotos_perfil/{contexto['hash_foto']}/{next(iter(VARIANTES_FOTO))}.jpg"))],
+        'mi_cuenta': [Caso('GET /mi_cuenta', get('/mi_cuenta'))],
+        'crear_token_api': [Caso('POST /mi_cuenta/tokens', lambda: pedir('POST', '/mi_cuenta/tokens',
+                                                                         data={'nombre': 'bench'}))],
+        'revocar_token_api': [Caso('POST /mi_cuenta/tokens/<id>/revocar', lambda token_id: pedir(
+            'POST', f'/mi_cuenta/tokens/{token_id}/revocar'), preparar=token_nuevo)],
+        'dashboard': [Caso('GET /dashboard', get('/dashboard'))],
+        'productos': [
+            Caso('GET /productos', get('/productos')),
+            Caso('GET /productos?page=cursor', get(f"/productos?page={contexto['cursor_productos']}")),
+        ],
+        'agregar_producto': [
+            Caso('GET /agregar_producto', get('/agregar_producto')),
+            Caso('POST /agregar_producto', lambda datos: pedir('POST', '/agregar_producto', data=datos),
+                 preparar=formulario_nuevo),
+        ],
+        'editar_producto': [
+            Caso('GET /editar_producto/<id>', get(f'/editar_producto/{medio}')),
+            Caso('POST /editar_producto/<id>', lambda: pedir('POST', f'/editar_producto/{medio}', data=formulario)),
+        ],
+        'importar_productos': [
+            Caso('GET /importar_productos', get('/importar_productos')),
+            Caso('POST /importar_productos', lambda archivo: pedir(
+                'POST', '/importar_productos', data={'archivo': (archivo, 'productos.csv')},
+                content_type='multipart/form-data'), preparar=lambda: io.BytesIO(csv)),
+        ],
+        'plantilla_importacion': [Caso('GET /importar_productos/plantilla.csv', get('/importar_productos/plantilla.csv'))],
+        'eliminar_producto': [Caso('GET /eliminar_producto/<id>', lambda producto_id: pedir(
+            'GET', f'/eliminar_producto/{producto_id}'), preparar=producto_nuevo)],
+        'movimientos': [Caso('GET /movimientos', get('/movimientos'))],
+        'agregar_movimiento': [Caso('POST /agregar_movimiento', lambda: pedir('POST', '/agregar_movimiento', data={
+            'producto_id': medio, 'tipo': 'entrada', 'cantidad': 1, 'motivo': 'Benchmark'}))],
+        'agregar_movimientos_lote': [Caso('POST /movimientos/lote', lambda: pedir(
+            'POST', '/movimientos/lote', json={'motivo': 'Lote', 'movimientos': contexto['lote']}))],
+        'exportar_productos': [Caso('GET /exportar/productos.csv', get('/exportar/productos.csv'))],
+        'exportar_movimientos': [Caso('GET /exportar/movimientos.csv', get('/exportar/movimientos.csv'))],
+        'consultas': [
+            Caso('GET /consultas', get('/consultas')),
+            Caso('GET /consultas?q=texto', get(f"/consultas?q={contexto['texto']}")),
+        ],
+        'reportes': [Caso('GET /reportes', get('/reportes'))],
+        'reporte_existencias': [Caso('GET /reportes/existencias?fecha=',
+                                     get(f"/reportes/existencias?fecha={contexto['fecha_existencias']}"))],
+        'static': [Caso('GET /static/js/scripts.js', get('/static/js/scripts.js'))],
+        'activo_publicado': [Caso('GET /activos/<nombre>', get(f'/activos/{activos[0]}'))] if activos else [],
+        'metricas': [Caso('GET /metrics', get('/metrics'))],
+        'consultas_lentas': [Caso('GET /admin/consultas_lentas', get('/admin/consultas_lentas'))],
+        'api_v1.productos': [Caso('GET /api/v1/productos', get('/api/v1/productos', headers=token))],
+        'api_v1.producto': [Caso('GET /api/v1/productos/<id>', get(f'/api/v1/productos/{medio}', headers=token))],
+        'api_v1.crear_producto': [Caso('POST /api/v1/productos', lambda datos: pedir(
+            'POST', '/api/v1/productos', headers=token, json=datos), preparar=formulario_nuevo)],
+        'api_v1.actualizar_producto': [Caso('PATCH /api/v1/productos/<id>', lambda: pedir(
+            'PATCH', f'/api/v1/productos/{medio}', headers=token, json={'nombre': 'Renombrado'}))],
+        'api_v1.movimientos': [Caso('GET /api/v1/movimientos', get('/api/v1/movimientos', headers=token))],
+        'api_v1.crear_movimientos': [Caso('POST /api/v1/movimientos', lambda: pedir(
+            'POST', '/api/v1/movimientos', headers=token, json={'motivo': 'Lote', 'movimientos': contexto['lote']}),
+            estado_esperado=201)],
+        'api_v1.estadisticas': [
+            Caso('GET /api/v1/estadisticas', get('/api/v1/estadisticas', headers=token)),
+            # El ETag se pide justo antes: los casos de escritura anteriores cambian la versión
+            Caso('GET /api/v1/estadisticas (304)', lambda etag: pedir(
+                'GET', '/api/v1/estadisticas', headers={**token, 'If-None-Match': etag}),
+                 preparar=lambda: pedir('GET', '/api/v1/estadisticas', headers=token).headers.get('ETag'),
+                 estado_esperado=304),
+        ],
+        'api_v1.reporte_stock': [Caso('GET /api/v1/reportes/stock', get('/api/v1/reportes/stock', headers=token))],
+        'api_v1.reporte_stock_bajo': [Caso('GET /api/v1/reportes/stock_bajo',
+                                           get('/api/v1/reportes/stock_bajo', headers=token))],
+        'api_v1.reporte_movimientos': [Caso('GET /api/v1/reportes/movimientos?agrupacion=semana', get(
+            f"/api/v1/reportes/movimientos?desde={contexto['desde']}&hasta={contexto['hasta']}&agrupacion=semana",
+            headers=token))],
+        'api_v1.reporte_existencias': [Caso('GET /api/v1/reportes/existencias?fecha=', get(
+            f"/api/v1/reportes/existencias?fecha={contexto['fecha_existencias']}", headers=token))],
+        'api_v1.resumenes_alertas': [Caso('GET /api/v1/alertas/resumenes',
+                                          get('/api/v1/alertas/resumenes', headers=token))],
+    }
+
+
+# ========== EJECUCIÓN ==========
+
+def preparar_contexto(sistema, user_ids):
+    user_id = user_ids[0]
+    productos = sistema.obtener_productos(user_id)
+    medio = productos[len(productos) // 2]
+    hasta = datetime.datetime.now(datetime.timezone.utc).date()
+    png = imagen_png()
+    hash_foto, _ = sistema.guardar_foto_archivo(user_id, io.BytesIO(png))
+    token = sistema.crear_token_api(user_id, 'suite')
+    pagina_productos = sistema.obtener_productos_pagina(user_id)
+    pagina_movimientos = sistema.obtener_movimientos_pagina(user_id)
+    # Un corte de existencias al cierre de cada mes del último año
+    dia = hasta.replace(day=1) - datetime.timedelta(days=1)
+    while dia > hasta - datetime.timedelta(days=365):
+        sistema.generar_cortes_existencias(dia.isoformat(), [user_id], conservar_dias=0)
+        dia = dia.replace(day=1) - datetime.timedelta(days=1)
+
+    manifiesto = os.path.join('static', 'dist', 'manifest.json')
+    activos = []
+    if os.path.exists(manifiesto):
+        with open(manifiesto, encoding='utf-8') as f:
+            activos = sorted(json.load(f).values())
+
+    return {
+        'usuarios': user_ids,
+        'username': f'{PREFIJO_USUARIO}1',
+        'producto_medio': medio['id'],
+        'codigo': medio['codigo'],
+        'texto': medio['nombre'].split()[0],
+        'ubicacion': medio['ubicacion'],
+        'muestra_productos': productos[:200],
+        'lote': [{'producto_id': producto['id'], 'tipo': 'entrada', 'cantidad': 1} for producto in productos[:20]],
+        'cursor_productos': pagina_productos.next_num,
+        'cursor_movimientos': pagina_movimientos.next_num,
+        'desde': (hasta - datetime.timedelta(days=365)).isoformat(),
+        'hasta': hasta.isoformat(),
+        # A mitad de un mes: la consulta suma unas dos semanas de movimientos a su corte
+        'fecha_existencias': (hasta.replace(day=1) - datetime.timedelta(days=45)).replace(day=15).isoformat(),
+        'png': png,
+        'hash_foto': hash_foto,
+        'token': token,
+        'activos': activos,
+    }
+
+
+def metodos_sin_caso(casos):
+    medidos = {caso.nombre.split('[')[0] for caso in casos}
+    publicos = [nombre for nombre, valor in inspect.getmembers(SistemaInventario, inspect.isfunction)
+                if not nombre.startswith('_')]
+    return [nombre for nombre in publicos if nombre not in medidos and nombre not in METODOS_OMITIDOS]
+
+
+def ejecutar(args):
+    resultados = {}
+    avisos = []
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta_db = os.path.join(tmp, 'bench.db')
+        sistema = SistemaInventario(ruta_db, almacenamiento=args.almacenamiento)
+        inicio = time.perf_counter()
+        user_ids = generar_inventario(sistema, args.usuarios, args.productos, args.movimientos,
+                                      dias=args.dias, semilla=args.semilla)
+        segundos_siembra = time.perf_counter() - inicio
+        sistema.cerrar()
+
+        app = create_app({
+            'PERFIL': 'produccion',
+            'DATABASE': ruta_db,
+            'SECRET_KEY': 'benchmarks',
+            'ALMACENAMIENTO': args.almacenamiento,
+            'RESULT_CACHE_TAMANO': 512 if args.cache else 0,
+            'RESULT_CACHE_ARCHIVO': None,
+            'HASH_PROCESOS': 0,
+            'METRICAS': not args.sin_metricas,
+        })
+        # Los errores 500 se avisan al final por su código, sin la traza de cada repetición
+        app.logger.disabled = True
+        with app.app_context():
+            sistema = app.extensions['inventario'].sistema()
+        sistema.directorio_fotos = os.path.join(tmp, 'fotos')
+        contexto = preparar_contexto(sistema, user_ids)
+        user_id = user_ids[0]
+
+        casos = casos_metodos(sistema, user_id, contexto)
+        for nombre in metodos_sin_caso(casos):
+            avisos.append(f"método sin caso: {nombre}")
+        for caso in casos:
+            clave = f'metodo:{caso.nombre}'
+            if args.solo and not clave.startswith(args.solo):
+                continue
+            resultados[clave], _ = caso.ejecutar(args.repeticiones)
+
+        cliente = app.test_client()
+        contexto['cliente'] = cliente
+        cliente.post('/login', data={'username': contexto['username'], 'password': CLAVE_USUARIO})
+
+        def limpiar_sesion():
+            # Los mensajes flash de las redirecciones se acumularían en la cookie
+            with cliente.session_transaction() as sesion:
+                sesion.pop('_flashes', None)
+
+        por_endpoint = casos_rutas(app, sistema, user_id, contexto)
+        for regla in app.url_map.iter_rules():
+            if regla.endpoint not in por_endpoint and regla.endpoint not in RUTAS_OMITIDAS:
+                avisos.append(f"ruta sin caso: {regla.endpoint} ({regla.rule})")
+        for casos_endpoint in por_endpoint.values():
+            for caso in casos_endpoint:
+                clave = f'ruta:{caso.nombre}'
+                if args.solo and not clave.startswith(args.solo):
+                    continue
+                medicion, respuesta = caso.ejecutar(args.repeticiones, despues=limpiar_sesion)
+                medicion['estado'] = respuesta.status_code
+                resultados[clave] = medicion
+                esperado = caso.estado_esperado
+                if (esperado and respuesta.status_code != esperado) or (not esperado and respuesta.status_code >= 400):
+                    avisos.append(f"{caso.nombre} respondió {respuesta.status_code}")
+        sistema.cerrar()
+
+    return {
+        'fecha': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'entorno': {
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'plataforma': platform.platform(),
+        },
+        'parametros': {
+            'usuarios': args.usuarios, 'productos': args.productos, 'movimientos': args.movimientos,
+            'dias': args.dias, 'semilla': args.semilla, 'almacenamiento': args.almacenamiento,
+            'cache': args.cache, 'metricas': not args.sin_metricas, 'repeticiones': args.repeticiones,
+        },
+        'siembra_segundos': round(segundos_siembra, 2),
+        'avisos': avisos,
+        'resultados': resultados,
+    }
+
+
+def comparar(actual, base, umbral, minimo_ms):
+    """Lista de (caso, ms base, ms actual, cambio relativo, es regresión) de los casos comunes"""
+    filas = []
+    for clave, medicion in actual['resultados'].items():
+        anterior = base['resultados'].get(clave)
+        if anterior is None:
+            continue
+        antes, ahora = anterior['mediana_ms'], medicion['mediana_ms']
+        cambio = (ahora - antes) / antes if antes else 0.0
+        filas.append((clave, antes, ahora, cambio, cambio > umbral and ahora - antes > minimo_ms))
+    return filas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--usuarios', type=int, default=3)
+    parser.add_argument('--productos', type=int, default=2000, help='Productos por usuario')
+    parser.add_argument('--movimientos', type=int, default=20000, help='Movimientos por usuario')
+    parser.add_argument('--dias', type=int, default=365, help='Días en los que se reparten los movimientos')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--almacenamiento', default='por_usuario', choices=('por_usuario', 'compartido'))
+    parser.add_argument('--cache', action='store_true', help='Medir con la cache de resultados encendida')
+    parser.add_argument('--sin-metricas', action='store_true',
+                        help='Sin la instrumentación de /metrics (para medir lo que cuesta)')
+    parser.add_argument('--repeticiones', type=int, default=20)
+    parser.add_argument('--solo', help='Sólo los casos cuyo nombre empieza así (p. ej. metodo:buscar o ruta:GET)')
+    parser.add_argument('--salida', default='resultados_benchmark.json', help='Archivo JSON con los resultados')
+    parser.add_argument('--base', default=BASE_POR_DEFECTO, help='Línea base con la que comparar')
+    parser.add_argument('--guardar-base', action='store_true', help='Guardar estos resultados como línea base')
+    parser.add_argument('--umbral', type=float, default=UMBRAL_REGRESION,
+                        help='Empeoramiento relativo de la mediana que cuenta como regresión (0.25 = 25%%)')
+    parser.add_argument('--minimo-ms', type=float, default=MINIMO_MS,
+                        help='Diferencia mínima en ms para contar una regresión')
+    args = parser.parse_args(argv)
+
+    actual = ejecutar(args)
+    with open(args.salida, 'w', encoding='utf-8') as f:
+        json.dump(actual, f, ensure_ascii=False, indent=2)
+
+    print("=" * 92)
+    print(f"⏱️  {len(actual['resultados'])} casos: {args.usuarios} usuarios × {args.productos:,} productos × "
+          f"{args.movimientos:,} movimientos ({args.almacenamiento}, cache {'sí' if args.cache else 'no'})")
+    print("=" * 92)
+    for aviso in actual['avisos']:
+        print(f"⚠️ {aviso}")
+
+    base = None
+    if not args.guardar_base and os.path.exists(args.base):
+        with open(args.base, encoding='utf-8') as f:
+            base = json.load(f)
+        if base['parametros'] != actual['parametros']:
+            print(f"⚠️ La línea base se midió con otros parámetros: {base['parametros']}")
+
+    filas = comparar(actual, base, args.umbral, args.minimo_ms) if base else []
+    cambios = {clave: (antes, cambio, regresion) for clave, antes, _, cambio, regresion in filas}
+    print(f"{'caso':<60}{'mediana ms':>12}{'p95 ms':>10}{'base ms':>10}{'cambio':>9}")
+    for clave, medicion in actual['resultados'].items():
+        linea = f"{clave[:59]:<60}{medicion['mediana_ms']:>12.3f}{medicion['p95_ms']:>10.3f}"
+        if clave in cambios:
+            antes, cambio, regresion = cambios[clave]
+            linea += f"{antes:>10.3f}{cambio:>+9.0%}" + ('  ❌' if regresion else '')
+        print(linea)
+
+    print(f"Resultados guardados en {args.salida} (siembra: {actual['siembra_segundos']} s)")
+    if args.guardar_base:
+        with open(args.base, 'w', encoding='utf-8') as f:
+            json.dump(actual, f, ensure_ascii=False, indent=2)
+        print(f"✅ Línea base guardada en {args.base}")
+        return 0
+    if base is None:
+        print(f"ℹ️ Sin línea base en {args.base}: guárdala con --guardar-base")
+        return 0
+
+    regresiones = [fila for fila in filas if fila[4]]
+    if regresiones:
+        print(f"❌ {len(regresiones)} regresiones de más del {args.umbral:.0%} respecto a la línea base")
+        return 1
+    print(f"✅ Sin regresiones de más del {args.umbral:.0%} en {len(filas)} casos comparados")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
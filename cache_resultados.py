@@ -0,0 +1,161 @@
+import json
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from pool_conexiones import PoolConexiones
+
+
+class CacheResultados:
+    """Cache de resultados de lecturas, válidos para una versión de datos del usuario.
+
+    Cada entrada es (método, user_id, argumentos) -> (versión, resultado). Un
+    resultado sólo se devuelve si se calculó con la versión de datos que el
+    usuario tiene ahora; cualquier escritura incrementa esa versión, así que no
+    hace falta invalidar nada. Los resultados se guardan serializados (pickle en
+    memoria, JSON en el nivel compartido): cada acierto devuelve una copia nueva
+    que quien llama puede modificar.
+
+    Con archivo, además del LRU del proceso hay un segundo nivel en una base
+    SQLite aparte que comparten todos los workers: lo que calcula uno lo
+    aprovechan los demás.
+    """
+
+    # Cada cuántos guardados en el nivel compartido se recorta a su capacidad
+    INTERVALO_RECORTE = 256
+
+    def __init__(self, capacidad=512, archivo=None, capacidad_compartida=10000, metricas=None):
+        self.capacidad = capacidad
+        self.archivo = archivo
+        self.capacidad_compartida = capacidad_compartida
+        self._entradas = OrderedDict()  # (metodo, user_id, args) -> (version, pickle)
+        self._lock = threading.Lock()
+        self._guardados_compartidos = 0
+        self.estadisticas = {'aciertos': 0, 'aciertos_compartidos': 0, 'fallos': 0,
+                             'expulsiones': 0, 'errores_compartidos': 0}
+        self._compartida = None
+        if archivo:
+            self._compartida = PoolConexiones(archivo, tamano_maximo=4, cache_size_kb=2048, mmap_size=0,
+                                              metricas=metricas)
+            self._crear_tabla()
+
+    def _crear_tabla(self):
+        with self._compartida.conexion() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS resultados (
+                    user_id INTEGER NOT NULL,
+                    metodo TEXT NOT NULL,
+                    args TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    valor TEXT NOT NULL,
+                    guardado REAL NOT NULL,
+                    PRIMARY KEY (user_id, metodo, args)
+                ) WITHOUT ROWID
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_resultados_guardado ON resultados (guardado)')
+            conn.commit()
+
+    def obtener(self, metodo, user_id, args, version):
+        """(True, resultado) si hay uno calculado con esta versión; (False, None) si no"""
+        clave = (metodo, user_id, json.dumps(args))
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[0] == version:
+                self._entradas.move_to_end(clave)
+                self.estadisticas['aciertos'] += 1
+                return True, pickle.loads(entrada[1])
+
+        valor = self._leer_compartida(clave, version)
+        if valor is None:
+            with self._lock:
+                self.estadisticas['fallos'] += 1
+            return False, None
+        resultado = json.loads(valor)
+        with self._lock:
+            self.estadisticas['aciertos_compartidos'] += 1
+            self._recordar(clave, version, pickle.dumps(resultado))
+        return True, resultado
+
+    def guardar(self, metodo, user_id, args, version, resultado):
+        clave = (metodo, user_id, json.dumps(args))
+        with self._lock:
+            self._recordar(clave, version, pickle.dumps(resultado))
+        if self._compartida is not None:
+            self._escribir_compartida(clave, version, json.dumps(resultado, separators=(',', ':')))
+
+    def _recordar(self, clave, version, valor):
+        if self.capacidad <= 0:
+            return
+        actual = self._entradas.get(clave)
+        # Nunca reemplazar un resultado por otro de una versión anterior
+        if actual is not None and actual[0] > version:
+            return
+        self._entradas[clave] = (version, valor)
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.capacidad:
+            self._entradas.popitem(last=False)
+            self.estadisticas['expulsiones'] += 1
+
+    # ========== NIVEL COMPARTIDO (SQLite) ==========
+
+    def _leer_compartida(self, clave, version):
+        if self._compartida is None:
+            return None
+        metodo, user_id, args = clave
+        try:
+            with self._compartida.conexion() as conn:
+                fila = conn.execute(
+                    'SELECT valor FROM resultados WHERE user_id = ? AND metodo = ? AND args = ? AND version = ?',
+                    (user_id, metodo, args, version)
+                ).fetchone()
+            return fila[0] if fila else None
+        except Exception as e:
+            # El nivel compartido es prescindible: ante un error se calcula el resultado
+            self._error_compartida(e)
+            return None
+
+    def _escribir_compartida(self, clave, version, valor):
+        metodo, user_id, args = clave
+        try:
+            with self._compartida.conexion() as conn:
+                conn.execute('''
+                    INSERT INTO resultados (user_id, metodo, args, version, valor, guardado)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (user_id, metodo, args) DO UPDATE SET
+                        version = excluded.version, valor = excluded.valor, guardado = excluded.guardado
+                    WHERE excluded.version >= resultados.version
+                ''', (user_id, metodo, args, version, valor, time.time()))
+                with self._lock:
+                    self._guardados_compartidos += 1
+                    recortar = self._guardados_compartidos % self.INTERVALO_RECORTE == 0
+                if recortar:
+                    # Sin más espacio se descartan los resultados guardados hace más tiempo
+                    conn.execute('''
+                        DELETE FROM resultados WHERE guardado <= (
+                            SELECT guardado FROM resultados ORDER BY guardado DESC LIMIT 1 OFFSET ?
+                        )
+                    ''', (self.capacidad_compartida,))
+                conn.commit()
+        except Exception as e:
+            self._error_compartida(e)
+
+    def _error_compartida(self, error):
+        with self._lock:
+            self.estadisticas['errores_compartidos'] += 1
+        print(f"⚠️ Cache de resultados compartida no disponible: {error}")
+
+    # ========== ESTADÍSTICAS Y CIERRE ==========
+
+    def tasa_aciertos(self):
+        """Fracción de lecturas servidas desde cualquiera de los dos niveles"""
+        aciertos = self.estadisticas['aciertos'] + self.estadisticas['aciertos_compartidos']
+        total = aciertos + self.estadisticas['fallos']
+        return aciertos / total if total else 0.0
+
+    def cerrar(self):
+        if self._compartida is not None:
+            self._compartida.cerrar()
+
+    def __len__(self):
+        return len(self._entradas)
@@ -0,0 +1,54 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheUsuarios:
+    """Cache LRU con caducidad de los datos de sesión de los usuarios, por id.
+
+    La usa el user_loader de Flask-Login para no consultar la tabla usuarios en
+    cada petición. Quien modifica un usuario debe llamar a invalidar(); el TTL
+    acota cuánto tarda otro proceso (otro worker) en ver el cambio.
+    """
+
+    def __init__(self, capacidad=1024, ttl=60):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self._entradas = OrderedDict()  # user_id -> (datos, instante de caducidad)
+        self._lock = threading.Lock()
+        self.estadisticas = {'aciertos': 0, 'fallos': 0, 'invalidaciones': 0, 'expulsiones': 0}
+
+    def obtener(self, user_id):
+        """Copia de los datos guardados, o None si no están o caducaron"""
+        with self._lock:
+            entrada = self._entradas.get(user_id)
+            if entrada is not None and entrada[1] > time.monotonic():
+                self._entradas.move_to_end(user_id)
+                self.estadisticas['aciertos'] += 1
+                return dict(entrada[0])
+            if entrada is not None:
+                del self._entradas[user_id]
+            self.estadisticas['fallos'] += 1
+            return None
+
+    def guardar(self, user_id, datos):
+        if self.capacidad <= 0:
+            return
+        with self._lock:
+            self._entradas[user_id] = (dict(datos), time.monotonic() + self.ttl)
+            self._entradas.move_to_end(user_id)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+                self.estadisticas['expulsiones'] += 1
+
+    def invalidar(self, user_id=None):
+        """Olvidar un usuario (o todos si no se indica ninguno)"""
+        with self._lock:
+            if user_id is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(user_id, None)
+            self.estadisticas['invalidaciones'] += 1
+
+    def __len__(self):
+        return len(self._entradas)
@@ -0,0 +1,185 @@
+"""Perfiles de configuración de la aplicación para create_app.
+
+El orden de precedencia es: CONFIG_BASE < perfil < variables de entorno
+INVENTARIO_* (p. ej. INVENTARIO_DATABASE, INVENTARIO_SQLITE_POOL_SIZE=16;
+los valores se interpretan como JSON cuando es posible) < config explícita
+pasada a create_app.
+"""
+import os
+
+from cache_resultados import CacheResultados
+from eventos import MAX_SUSCRIPTORES, INTERVALO_VIGILANCIA, LATIDO_SEGUNDOS, DURACION_CONEXION
+from contrasenas import PoolHashing, PROCESOS_HASH, MAX_PENDIENTES_HASH, TIMEOUT_HASH, METODO_HASH
+from metricas import Metricas
+from consultas_lentas import (
+    RegistroConsultasLentas, ARCHIVO_CONSULTAS_LENTAS, MAX_BYTES_CONSULTAS_LENTAS, COPIAS_CONSULTAS_LENTAS,
+    TOP_CONSULTAS_LENTAS
+)
+from database import (
+    SistemaInventario, TAMANO_PAGINA, TTL_ESQUEMA, MAX_LINEAS_LOTE, CAPACIDAD_CACHE_USUARIOS, TTL_CACHE_USUARIOS,
+    CAPACIDAD_CACHE_RESULTADOS
+)
+from pool_conexiones import CONFIG_POR_DEFECTO as CONFIG_POOL, opciones_pool_desde_config
+
+PREFIJO_ENTORNO = 'INVENTARIO'
+
+CONFIG_BASE = {
+    'SECRET_KEY': 'clave_secreta_inventario_2024_leo_sistema_multiusuario',
+
+    # Base de datos SQLite; las claves SQLITE_* configuran el pool de conexiones de cada proceso
+    'DATABASE': 'inventario.db',
+    **CONFIG_POOL,
+
+    # Tamaño de página de los listados de productos y movimientos
+    'TAMANO_PAGINA': TAMANO_PAGINA,
+
+    # Máximo de líneas por lote en /movimientos/lote
+    'MAX_LINEAS_LOTE': MAX_LINEAS_LOTE,
+
+    # Almacenamiento de los usuarios nuevos: 'por_usuario' (tablas propias) o 'compartido'
+    # (tablas únicas con user_id). Los usuarios existentes se pasan con
+    # `python gestion.py migrar-compartido`; SCHEMA_CACHE_SEGUNDOS es cada cuánto
+    # un proceso vuelve a comprobar el modo y el esquema de cada usuario.
+    'ALMACENAMIENTO': 'por_usuario',
+    'SCHEMA_CACHE_SEGUNDOS': TTL_ESQUEMA,
+
+    # Cache de usuarios del user_loader: USER_CACHE_SEGUNDOS es lo que tarda un
+    # worker en ver un cambio hecho por otro proceso (en el propio se invalida al momento)
+    'USER_CACHE_TAMANO': CAPACIDAD_CACHE_USUARIOS,
+    'USER_CACHE_SEGUNDOS': TTL_CACHE_USUARIOS,
+
+    # Cache de resultados de lecturas (reportes, ubicaciones, stock bajo), válidos mientras
+    # no cambie la versión de datos del usuario. Con RESULT_CACHE_ARCHIVO los workers
+    # comparten además los resultados en esa base SQLite (se puede borrar en cualquier momento)
+    'RESULT_CACHE_TAMANO': CAPACIDAD_CACHE_RESULTADOS,
+    'RESULT_CACHE_ARCHIVO': None,
+    'RESULT_CACHE_TAMANO_COMPARTIDO': 10000,
+
+    # Dashboard en vivo (/dashboard/eventos): conexiones por proceso (cada una ocupa un
+    # hilo; con más se responde 503 y el navegador reintenta), segundos entre latidos,
+    # duración máxima de una conexión y cada cuánto se buscan escrituras de otros workers
+    'EVENTOS_MAX_CONEXIONES': MAX_SUSCRIPTORES,
+    'EVENTOS_LATIDO_SEGUNDOS': LATIDO_SEGUNDOS,
+    'EVENTOS_DURACION_SEGUNDOS': DURACION_CONEXION,
+    'EVENTOS_INTERVALO_SEGUNDOS': INTERVALO_VIGILANCIA,
+
+    # Hash de contraseñas en un pool de procesos acotado: con más de HASH_MAX_PENDIENTES
+    # operaciones en curso los inicios de sesión se rechazan con 503 en vez de encolarse
+    'HASH_PROCESOS': PROCESOS_HASH,
+    'HASH_MAX_PENDIENTES': MAX_PENDIENTES_HASH,
+    'HASH_TIMEOUT_SEGUNDOS': TIMEOUT_HASH,
+    'HASH_METODO': METODO_HASH,
+
+    # Ids de los usuarios con acceso a las páginas de administración y a /metrics
+    # (INVENTARIO_ADMINISTRADORES='[1, 4]' o '1,4'). El campo es_admin de la base no
+    # cuenta: /register lo marca en todos los usuarios. Vacío, nadie tiene acceso
+    'ADMINISTRADORES': [],
+
+    # Métricas de Prometheus en /metrics (ADMINISTRADORES, o 'Authorization: Bearer
+    # <METRICAS_TOKEN>' para el scraper). Con METRICAS_DIRECTORIO los workers vuelcan
+    # allí sus contadores y /metrics devuelve la suma de todos
+    'METRICAS': True,
+    'METRICAS_TOKEN': None,
+    'METRICAS_DIRECTORIO': None,
+
+    # Registro de consultas lentas: con CONSULTAS_LENTAS_MS, cada sentencia que tarde más
+    # se anota (SQL normalizado, usuario, plan) en un archivo rotativo que comparten los
+    # workers; /admin/consultas_lentas muestra las CONSULTAS_LENTAS_TOP formas más lentas
+    'CONSULTAS_LENTAS_MS': None,
+    'CONSULTAS_LENTAS_ARCHIVO': ARCHIVO_CONSULTAS_LENTAS,
+    'CONSULTAS_LENTAS_MAX_BYTES': MAX_BYTES_CONSULTAS_LENTAS,
+    'CONSULTAS_LENTAS_COPIAS': COPIAS_CONSULTAS_LENTAS,
+    'CONSULTAS_LENTAS_TOP': TOP_CONSULTAS_LENTAS,
+}
+
+PERFILES = {
+    # Servidor de desarrollo: recarga de plantillas y depurador
+    'desarrollo': {
+        'DEBUG': True,
+        'TEMPLATES_AUTO_RELOAD': True,
+    },
+    # Varios workers (gunicorn/waitress): la clave secreta debe venir de INVENTARIO_SECRET_KEY
+    # y cada worker usa un solo proceso de hashing (ya hay un proceso por worker);
+    # los workers comparten la cache de resultados en cache_resultados.db y las métricas en metricas/
+    'produccion': {
+        'DEBUG': False,
+        'TEMPLATES_AUTO_RELOAD': False,
+        'SECRET_KEY': None,
+        'HASH_PROCESOS': 1,
+        'RESULT_CACHE_ARCHIVO': 'cache_resultados.db',
+        'METRICAS_DIRECTORIO': 'metricas',
+        'SESSION_COOKIE_SAMESITE': 'Lax',
+    },
+}
+
+PERFIL_POR_DEFECTO = 'desarrollo'
+
+
+def cargar_configuracion(app, config=None):
+    """Aplicar a app.config el perfil indicado (nombre o dict con 'PERFIL') y sus ajustes"""
+    if isinstance(config, str):
+        config = {'PERFIL': config}
+    config = dict(config or {})
+
+    perfil = config.get('PERFIL') or os.environ.get(f'{PREFIJO_ENTORNO}_PERFIL', PERFIL_POR_DEFECTO)
+    if perfil not in PERFILES:
+        raise ValueError(f"Perfil de configuración desconocido: {perfil}")
+
+    app.config.update(CONFIG_BASE)
+    app.config.update(PERFILES[perfil])
+    app.config.from_prefixed_env(PREFIJO_ENTORNO)
+    app.config.update(config)
+    app.config['PERFIL'] = perfil
+    app.config['ADMINISTRADORES'] = ids_administradores(app.config['ADMINISTRADORES'])
+
+    if not app.config.get('SECRET_KEY'):
+        raise RuntimeError(f"Define {PREFIJO_ENTORNO}_SECRET_KEY para el perfil '{perfil}'")
+
+
+def ids_administradores(valor):
+    """Conjunto de ids de usuario desde una lista o un texto separado por comas"""
+    if isinstance(valor, str):
+        valor = [parte for parte in valor.split(',') if parte.strip()]
+    elif isinstance(valor, int):
+        valor = [valor]
+    try:
+        return frozenset(int(user_id) for user_id in valor or ())
+    except (TypeError, ValueError):
+        raise ValueError(f"ADMINISTRADORES debe ser una lista de ids de usuario: {valor!r}")
+
+
+def crear_sistema(config):
+    """SistemaInventario con los ajustes de la configuración (uno por proceso)"""
+    metricas = Metricas(activas=config['METRICAS'], directorio=config['METRICAS_DIRECTORIO'])
+    consultas_lentas = None
+    if config['CONSULTAS_LENTAS_MS'] is not None:
+        consultas_lentas = RegistroConsultasLentas(
+            float(config['CONSULTAS_LENTAS_MS']),
+            archivo=config['CONSULTAS_LENTAS_ARCHIVO'],
+            max_bytes=int(config['CONSULTAS_LENTAS_MAX_BYTES']),
+            copias=int(config['CONSULTAS_LENTAS_COPIAS']),
+        )
+    return SistemaInventario(
+        config['DATABASE'],
+        almacenamiento=config['ALMACENAMIENTO'],
+        ttl_esquema=config['SCHEMA_CACHE_SEGUNDOS'],
+        capacidad_cache_usuarios=config['USER_CACHE_TAMANO'],
+        ttl_cache_usuarios=config['USER_CACHE_SEGUNDOS'],
+        cache_resultados=CacheResultados(
+            capacidad=config['RESULT_CACHE_TAMANO'],
+            archivo=config['RESULT_CACHE_ARCHIVO'],
+            capacidad_compartida=config['RESULT_CACHE_TAMANO_COMPARTIDO'],
+            metricas=metricas,
+        ),
+        max_suscriptores_eventos=config['EVENTOS_MAX_CONEXIONES'],
+        intervalo_eventos=config['EVENTOS_INTERVALO_SEGUNDOS'],
+        hashing=PoolHashing(
+            procesos=config['HASH_PROCESOS'],
+            max_pendientes=config['HASH_MAX_PENDIENTES'],
+            timeout=config['HASH_TIMEOUT_SEGUNDOS'],
+            metodo=config['HASH_METODO'],
+        ),
+        metricas=metricas,
+        consultas_lentas=consultas_lentas,
+        **opciones_pool_desde_config(config)
+    )
@@ -0,0 +1,207 @@
+"""Registro de consultas lentas con su plan de ejecución.
+
+Con CONSULTAS_LENTAS_MS configurado, las conexiones del pool de
+SistemaInventario cronometran cada sentencia (ejecución y lectura de sus
+filas) y las que superan el umbral se anotan, una línea JSON por sentencia,
+en un archivo rotativo que comparten todos los workers:
+
+    {"fecha": ..., "usuario": 3, "endpoint": "reportes", "sql": "SELECT ... FROM movimientos_{usuario} ...",
+     "ms": 182.4, "ejecuciones": 1, "plan": ["SCAN m", "USE TEMP B-TREE FOR GROUP BY"]}
+
+El SQL se normaliza (sufijo de las tablas de cada usuario, literales y
+listas IN colapsados) para que la misma consulta de distintos usuarios cuente
+como una sola forma. El plan es el EXPLAIN QUERY PLAN de la sentencia con sus
+mismos parámetros, capturado en la misma conexión al devolverla al pool.
+`ejecuciones` viene de set_trace_callback: SQLite avisa cada vez que empieza a
+ejecutar la sentencia o uno de sus triggers (executemany, una por fila).
+
+/admin/consultas_lentas agrupa el archivo por forma y muestra las más lentas.
+"""
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows: un solo proceso (waitress), no hace falta bloquear entre procesos
+
+ARCHIVO_CONSULTAS_LENTAS = 'consultas_lentas.log'
+MAX_BYTES_CONSULTAS_LENTAS = 5 * 1024 * 1024
+COPIAS_CONSULTAS_LENTAS = 5
+TOP_CONSULTAS_LENTAS = 20
+
+# Tablas propias de cada usuario en el modo por_usuario (almacenamiento.TablasPorUsuario)
+PATRON_TABLA_USUARIO = re.compile(r'\b(productos_fts|productos|movimientos_diarios|movimientos)_(\d+)\b')
+PATRON_CADENA = re.compile(r"'(?:[^']|'')*'")
+PATRON_NUMERO = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+PATRON_LISTA = re.compile(r'\?(?:\s*,\s*\?)+')
+PATRON_ESPACIOS = re.compile(r'\s+')
+# Sentencias con plan de ejecución (las demás: BEGIN, PRAGMA, DDL...)
+PATRON_CON_PLAN = re.compile(r'\s*(SELECT|INSERT|UPDATE|DELETE|REPLACE|WITH)\b', re.IGNORECASE)
+
+
+def normalizar_sql(sql):
+    """(forma de la sentencia, user_id de sus tablas o None)"""
+    usuario = None
+    coincidencia = PATRON_TABLA_USUARIO.search(sql)
+    if coincidencia:
+        usuario = int(coincidencia.group(2))
+    forma = PATRON_TABLA_USUARIO.sub(r'\1_{usuario}', sql)
+    forma = PATRON_CADENA.sub('?', forma)
+    forma = PATRON_NUMERO.sub('?', forma)
+    forma = PATRON_LISTA.sub('?, ...', forma)
+    return PATRON_ESPACIOS.sub(' ', forma).strip(), usuario
+
+
+class ArchivoRotativoCompartido(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler que pueden compartir varios procesos.
+
+    Cada escritura toma un bloqueo de archivo (flock) y, si otro proceso rotó
+    el archivo mientras tanto, lo vuelve a abrir antes de escribir.
+    """
+
+    def __init__(self, archivo, max_bytes, copias):
+        super().__init__(archivo, maxBytes=max_bytes, backupCount=copias, encoding='utf-8', delay=True)
+        self._archivo_bloqueo = f'{self.baseFilename}.lock'
+
+    @contextmanager
+    def _bloqueo(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self._archivo_bloqueo, 'a') as bloqueo:
+            fcntl.flock(bloqueo, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(bloqueo, fcntl.LOCK_UN)
+
+    def _reabrir_si_rotado(self):
+        if self.stream is None:
+            return
+        try:
+            rotado = os.stat(self.baseFilename).st_ino != os.fstat(self.stream.fileno()).st_ino
+        except FileNotFoundError:
+            rotado = True
+        if rotado:
+            self.stream.close()
+            self.stream = None  # emit lo vuelve a abrir (delay=True)
+
+    def emit(self, record):
+        with self._bloqueo():
+            self._reabrir_si_rotado()
+            super().emit(record)
+
+
+class RegistroConsultasLentas:
+    """Sentencias de más de umbral_ms al archivo rotativo, con su plan de ejecución"""
+
+    def __init__(self, umbral_ms, archivo=ARCHIVO_CONSULTAS_LENTAS, max_bytes=MAX_BYTES_CONSULTAS_LENTAS,
+                 copias=COPIAS_CONSULTAS_LENTAS):
+        self.umbral_ms = umbral_ms
+        self.umbral_segundos = umbral_ms / 1000
+        self.archivo = archivo
+        self.copias = copias
+        self._local = threading.local()
+
+        directorio = os.path.dirname(os.path.abspath(archivo))
+        os.makedirs(directorio, exist_ok=True)
+        # Un logger propio por archivo, sin propagar al de la aplicación
+        self._logger = logging.getLogger(f'{__name__}.{os.path.abspath(archivo)}')
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        if not self._logger.handlers:
+            manejador = ArchivoRotativoCompartido(archivo, max_bytes, copias)
+            manejador.setFormatter(logging.Formatter('%(message)s'))
+            self._logger.addHandler(manejador)
+
+    def fijar_contexto(self, usuario=None, endpoint=None):
+        """Usuario y endpoint de la petición del hilo actual (para las sentencias sin tablas propias)"""
+        self._local.usuario = usuario
+        self._local.endpoint = endpoint
+
+    def registrar(self, conn, sql, parametros, segundos, ejecuciones):
+        forma, usuario = normalizar_sql(sql)
+        entrada = {
+            'fecha': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='milliseconds'),
+            'pid': os.getpid(),
+            'usuario': usuario if usuario is not None else getattr(self._local, 'usuario', None),
+            'endpoint': getattr(self._local, 'endpoint', None),
+            'sql': forma,
+            'ms': round(segundos * 1000, 3),
+            'ejecuciones': ejecuciones,
+            'plan': self._plan(conn, sql, parametros),
+        }
+        self._logger.info(json.dumps(entrada, ensure_ascii=False))
+
+    def _plan(self, conn, sql, parametros):
+        """Líneas del EXPLAIN QUERY PLAN (sangradas según el árbol), o None si no tiene plan"""
+        if parametros is None or not PATRON_CON_PLAN.match(sql):
+            return None
+        try:
+            # Cursor básico: el plan no se mide ni se traza
+            filas = sqlite3.Cursor(conn).execute(f'EXPLAIN QUERY PLAN {sql}', parametros).fetchall()
+        except sqlite3.Error:
+            return None
+        profundidad = {0: -1}
+        lineas = []
+        for id_nodo, padre, _, detalle in filas:
+            profundidad[id_nodo] = profundidad.get(padre, -1) + 1
+            lineas.append('  ' * profundidad[id_nodo] + detalle)
+        return lineas
+
+    # ========== LECTURA ==========
+
+    def archivos(self):
+        """El archivo actual y sus copias rotadas, de la más antigua a la más nueva"""
+        candidatos = [f'{self.archivo}.{i}' for i in range(self.copias, 0, -1)] + [self.archivo]
+        return [archivo for archivo in candidatos if os.path.exists(archivo)]
+
+    def entradas(self):
+        for archivo in self.archivos():
+            try:
+                with open(archivo, encoding='utf-8') as f:
+                    for linea in f:
+                        try:
+                            yield json.loads(linea)
+                        except ValueError:
+                            continue  # línea a medio escribir o de otro formato
+            except OSError:
+                continue
+
+    def resumen(self, limite=TOP_CONSULTAS_LENTAS, orden='total'):
+        """Las `limite` formas más lentas por tiempo total ('total') o por la peor ejecución ('maximo')"""
+        formas = {}
+        for entrada in self.entradas():
+            forma = formas.get(entrada['sql'])
+            if forma is None:
+                forma = formas[entrada['sql']] = {
+                    'sql': entrada['sql'], 'veces': 0, 'total_ms': 0.0, 'maximo_ms': 0.0,
+                    'usuarios': set(), 'endpoints': set(), 'ultima': None, 'plan': None,
+                }
+            forma['veces'] += 1
+            forma['total_ms'] += entrada['ms']
+            if entrada['ms'] >= forma['maximo_ms']:
+                # El plan de la peor ejecución
+                forma['maximo_ms'] = entrada['ms']
+                forma['plan'] = entrada.get('plan')
+            if entrada.get('usuario') is not None:
+                forma['usuarios'].add(entrada['usuario'])
+            if entrada.get('endpoint'):
+                forma['endpoints'].add(entrada['endpoint'])
+            forma['ultima'] = max(forma['ultima'] or entrada['fecha'], entrada['fecha'])
+
+        clave = 'maximo_ms' if orden == 'maximo' else 'total_ms'
+        resultado = sorted(formas.values(), key=lambda forma: forma[clave], reverse=True)[:limite]
+        for forma in resultado:
+            forma['promedio_ms'] = forma['total_ms'] / forma['veces']
+            forma['usuarios'] = sorted(forma['usuarios'])
+            forma['endpoints'] = sorted(forma['endpoints'])
+        return resultado
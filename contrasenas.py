@@ -0,0 +1,151 @@
+"""Hash y verificación de contraseñas fuera de los hilos que atienden peticiones.
+
+pbkdf2/scrypt cuestan decenas o cientos de milisegundos de CPU por llamada;
+hechos en el hilo de la petición, una ráfaga de inicios de sesión bloquea al
+resto de peticiones. PoolHashing los ejecuta en un pool de procesos de tamaño
+fijo con un máximo de operaciones pendientes: pasado ese máximo rechaza al
+momento con HashingSaturado en vez de encolar sin límite.
+
+Los procesos se arrancan con forkserver (spawn donde no existe, p. ej. en
+Windows) y no con fork: un fork desde un worker con hilos copiaría en el hijo
+los locks que otros hilos tuvieran tomados en ese instante (conexiones del
+pool, logging...) y el proceso de hash podría quedarse bloqueado. Por eso
+los scripts que inician sesión o crean usuarios deben ejecutar su código bajo
+`if __name__ == '__main__':` (los procesos nuevos importan el módulo principal).
+"""
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Método de las contraseñas nuevas, en la forma completa con la que werkzeug lo
+# guarda delante del primer '$'. Los hashes guardados con otro método (p. ej.
+# menos iteraciones) se rehacen en el siguiente inicio de sesión correcto.
+METODO_HASH = 'pbkdf2:sha256:600000'
+
+# Procesos del pool, operaciones pendientes admitidas y espera máxima por resultado
+PROCESOS_HASH = min(2, os.cpu_count() or 1)
+MAX_PENDIENTES_HASH = 32
+TIMEOUT_HASH = 10
+
+
+class HashingSaturado(Exception):
+    """Demasiadas operaciones de hash pendientes; el llamador debe reintentar más tarde"""
+
+
+def necesita_rehash(hash_guardado, metodo=METODO_HASH):
+    return hash_guardado.split('$', 1)[0] != metodo
+
+
+def _verificar_y_revisar(hash_guardado, password, metodo):
+    """En el proceso trabajador: (contraseña correcta, hash nuevo o None si el guardado está al día)"""
+    if not check_password_hash(hash_guardado, password):
+        return False, None
+    if necesita_rehash(hash_guardado, metodo):
+        return True, generate_password_hash(password, metodo)
+    return True, None
+
+
+class PoolHashing:
+    """Pool acotado de procesos para generar y verificar hashes de contraseñas.
+
+    Con procesos=0 el hash se calcula en el hilo que llama (scripts y pruebas),
+    pero el límite de operaciones simultáneas se sigue aplicando.
+    """
+
+    def __init__(self, procesos=PROCESOS_HASH, max_pendientes=MAX_PENDIENTES_HASH,
+                 timeout=TIMEOUT_HASH, metodo=METODO_HASH):
+        self.procesos = procesos
+        self.max_pendientes = max_pendientes
+        self.timeout = timeout
+        self.metodo = metodo
+
+        self._cupos = threading.BoundedSemaphore(max_pendientes)
+        self._executor = None  # se crea en el primer uso, ya dentro del worker definitivo
+        self._lock = threading.Lock()
+        self.estadisticas = {'generados': 0, 'verificados': 0, 'rehechos': 0, 'rechazados': 0}
+
+    def _obtener_executor(self):
+        with self._lock:
+            if self._executor is None:
+                metodo = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.procesos, mp_context=multiprocessing.get_context(metodo)
+                )
+            return self._executor
+
+    def _ejecutar(self, funcion, *args):
+        if self.procesos <= 0:
+            self._reservar_cupo()
+            try:
+                return funcion(*args)
+            finally:
+                self._cupos.release()
+
+        try:
+            return self._ejecutar_en_pool(funcion, *args)
+        except concurrent.futures.process.BrokenProcessPool:
+            # Un trabajador murió (p. ej. por falta de memoria): se reintenta una vez en un pool nuevo
+            try:
+                return self._ejecutar_en_pool(funcion, *args)
+            except concurrent.futures.process.BrokenProcessPool:
+                raise HashingSaturado("El pool de hash se rompió dos veces seguidas")
+
+    def _reservar_cupo(self):
+        if not self._cupos.acquire(blocking=False):
+            with self._lock:
+                self.estadisticas['rechazados'] += 1
+            raise HashingSaturado(f"Más de {self.max_pendientes} operaciones de hash pendientes")
+
+    def _ejecutar_en_pool(self, funcion, *args):
+        self._reservar_cupo()
+        executor = self._obtener_executor()
+        try:
+            futuro = executor.submit(funcion, *args)
+        except concurrent.futures.process.BrokenProcessPool:
+            self._cupos.release()
+            self._descartar(executor)
+            raise
+        except Exception:
+            self._cupos.release()
+            raise
+        # El cupo se libera cuando el proceso termina, aunque el llamador deje de esperar
+        futuro.add_done_callback(lambda _: self._cupos.release())
+
+        try:
+            return futuro.result(timeout=self.timeout)
+        except concurrent.futures.TimeoutError:
+            raise HashingSaturado(f"El hash no terminó en {self.timeout} s")
+        except concurrent.futures.process.BrokenProcessPool:
+            self._descartar(executor)
+            raise
+
+    def _descartar(self, executor):
+        """Olvidar un pool roto; el siguiente uso crea uno nuevo"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def generar(self, password):
+        hash_nuevo = self._ejecutar(generate_password_hash, password, self.metodo)
+        with self._lock:
+            self.estadisticas['generados'] += 1
+        return hash_nuevo
+
+    def verificar(self, hash_guardado, password):
+        """(contraseña correcta, hash nuevo a guardar o None)"""
+        correcta, hash_nuevo = self._ejecutar(_verificar_y_revisar, hash_guardado, password, self.metodo)
+        with self._lock:
+            self.estadisticas['verificados'] += 1
+            if hash_nuevo:
+                self.estadisticas['rehechos'] += 1
+        return correcta, hash_nuevo
+
+    def cerrar(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
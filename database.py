@@ -1,313 +1,1736 @@
 import sqlite3
 import datetime
+import hashlib
+import json
 import os
-from werkzeug.security import generate_password_hash, check_password_hash
+import re
+import secrets
+import time
+from pool_conexiones import PoolConexiones
+from cache_usuarios import CacheUsuarios
+from cache_resultados import CacheResultados
+from eventos import CentralEventos, MAX_SUSCRIPTORES, INTERVALO_VIGILANCIA
+from contrasenas import PoolHashing, HashingSaturado
+from metricas import Metricas
+from fotos_perfil import DIRECTORIO_FOTOS, PATRON_ARCHIVO_FOTO, procesar_foto, guardar_variantes
+from paginacion import PaginaKeyset, codificar_cursor, decodificar_cursor
+from almacenamiento import (
+    POR_USUARIO, COMPARTIDO, MODOS_ALMACENAMIENTO, TablasPorUsuario, TablasCompartidas, tablas_para
+)
+from importacion import CAMPOS_PRODUCTO, leer_filas, validar_producto
+from migraciones import MIGRACIONES_USUARIO
+from exportacion import COLUMNAS_EXPORTACION_PRODUCTOS
+
+# Versión del esquema de las tablas por usuario: la de la última migración.
+# Cada cambio de _preparar_esquema_usuario lleva su migración en migraciones.py.
+VERSION_ESQUEMA_USUARIO = MIGRACIONES_USUARIO[-1][0]
+
+# Un producto está en alerta de stock bajo cuando no supera su propio stock
+# mínimo (el mismo criterio que la página de edición). {fila} es NEW, OLD o
+# el nombre o alias de la tabla de productos
+CONDICION_STOCK_BAJO = 'IFNULL({fila}.stock_actual <= {fila}.stock_minimo, 0)'
+
+# Eventos del historial de alertas que lee cada pasada del evaluador de
+# resúmenes, y días que se conservan el historial ya resumido y los resúmenes
+MAX_EVENTOS_RESUMEN_ALERTAS = 5000
+DIAS_HISTORIAL_ALERTAS = 90
+
+# Índices de las tablas de cada usuario: (tabla base, sufijo del índice, columnas).
+# Se crean como idx_<tabla>_<user_id>_<sufijo>, o como idx_<tabla>_<sufijo> sobre
+# (user_id, columnas) en el almacenamiento compartido; verificar_planes.py
+# comprueba que las consultas de SistemaInventario los usan.
+# Un cuarto elemento opcional hace el índice parcial: el de alertas sólo
+# contiene los productos en alerta, ordenados por stock.
+INDICES_USUARIO = [
+    ('movimientos', 'producto', 'producto_id'),
+    ('movimientos', 'fecha', 'fecha'),
+    ('productos', 'nombre', 'nombre'),
+    ('productos', 'ubicacion', 'ubicacion'),
+    ('productos', 'alerta', 'stock_actual, id', 'alerta_desde IS NOT NULL'),
+]
+
+# Índices de versiones anteriores del esquema que ya no se usan: (tabla base, sufijo)
+INDICES_RETIRADOS = [
+    ('productos', 'stock'),
+]
+
+# Índice de texto completo de productos: sin acentos ni mayúsculas y con
+# índices de prefijo para búsquedas mientras se escribe
+TOKENIZADOR_BUSQUEDA = 'unicode61 remove_diacritics 2'
+PREFIJOS_BUSQUEDA = '2 3'
+
+# Tamaño de página por defecto de los listados paginados
+TAMANO_PAGINA = 50
+
+# Peso de cada columna del índice (codigo, nombre, descripcion) en el ranking bm25
+PESOS_BUSQUEDA = (10.0, 5.0, 1.0)
+
+# Segundos que un proceso confía en su memoria del esquema de un usuario antes
+# de volver a leer schema_version (así nota las migraciones hechas por otro proceso)
+TTL_ESQUEMA = 300
+
+# Filas por executemany en la importación masiva y errores que guarda su informe
+TAMANO_LOTE_IMPORTACION = 2000
+MAX_ERRORES_IMPORTACION = 500
+
+# Filas por fetchmany en las exportaciones
+TAMANO_LOTE_EXPORTACION = 1000
+
+# Reporte de movimientos: agrupación -> expresión del inicio de cada periodo
+# sobre el día del resumen diario (las semanas empiezan en lunes), y días que
+# cubre el reporte cuando no se indica un rango
+AGRUPACIONES_REPORTE = {
+    'dia': 'dia',
+    'semana': "DATE(dia, 'weekday 0', '-6 days')",
+    'mes': "strftime('%Y-%m-01', dia)",
+}
+DIAS_REPORTE_MOVIMIENTOS = 30
+
+# producto_id de las filas del resumen diario que suman todos los productos
+PRODUCTO_TODOS = 0
+
+# Cambio de stock de una fila del resumen diario ({fila} es su alias)
+CAMBIO_STOCK_DIARIO = "CASE {fila}.tipo WHEN 'entrada' THEN {fila}.total_cantidad ELSE -{fila}.total_cantidad END"
+
+# Cortes de existencias: días que se conservan todos los cortes; de los más
+# antiguos sólo queda el último de cada mes
+DIAS_CORTES_DIARIOS = 90
+
+# Tipos de movimiento y máximo de líneas de un lote de movimientos
+TIPOS_MOVIMIENTO = ('entrada', 'salida')
+MAX_LINEAS_LOTE = 1000
+
+# Cache de los datos de sesión de los usuarios (user_loader de Flask-Login):
+# máximo de usuarios recordados y segundos que otro proceso puede tardar en ver un cambio
+CAPACIDAD_CACHE_USUARIOS = 1024
+TTL_CACHE_USUARIOS = 60
+
+# Resultados de lecturas recordados por proceso (obtener_reporte_stock, obtener_ubicaciones...)
+CAPACIDAD_CACHE_RESULTADOS = 512
+
+# Columnas de los productos con stock bajo que reciben los eventos en vivo del dashboard
+COLUMNAS_EVENTO_PRODUCTO = 'id, codigo, nombre, modelo, ubicacion, stock_actual, stock_minimo'
+
+# Columnas de usuarios que necesita la sesión (nunca el hash de la contraseña)
+COLUMNAS_SESION_USUARIO = 'id, username, nombre, email, es_admin, foto_perfil'
+
+# Tokens de la API: bytes aleatorios de cada token y segundos entre dos
+# actualizaciones de su último uso (no se escribe en cada petición)
+BYTES_TOKEN_API = 32
+INTERVALO_USO_TOKEN = 3600
+
+# Columnas de productos que se copian al migrar un usuario al almacenamiento compartido
+COLUMNAS_PRODUCTO = (
+    'codigo, nombre, descripcion, ubicacion, modelo, marca, estado, '
+    'año_adquisicion, precio_compra, stock_actual, stock_minimo, fecha_creacion, alerta_desde'
+)
 
 class SistemaInventario:
-    def __init__(self, db_name="inventario.db"):
+    def __init__(self, db_name="inventario.db", almacenamiento=POR_USUARIO, ttl_esquema=TTL_ESQUEMA,
+                 capacidad_cache_usuarios=CAPACIDAD_CACHE_USUARIOS, ttl_cache_usuarios=TTL_CACHE_USUARIOS,
+                 hashing=None, directorio_fotos=DIRECTORIO_FOTOS, cache_resultados=None,
+                 max_suscriptores_eventos=MAX_SUSCRIPTORES, intervalo_eventos=INTERVALO_VIGILANCIA, metricas=None,
+                 consultas_lentas=None, **opciones_pool):
+        if almacenamiento not in MODOS_ALMACENAMIENTO:
+            raise ValueError(f"Modo de almacenamiento desconocido: {almacenamiento}")
         self.db_name = db_name
+        # Modo de los usuarios nuevos; los existentes conservan el registrado en schema_version
+        self.almacenamiento = almacenamiento
+        self.ttl_esquema = ttl_esquema
+        # Sin métricas (scripts) las conexiones no se miden
+        self.metricas = metricas if metricas is not None else Metricas(activas=False)
+        # Registro opcional de sentencias lentas con su plan (consultas_lentas.py)
+        self.consultas_lentas = consultas_lentas
+        self.pool = PoolConexiones(db_name, metricas=self.metricas, consultas_lentas=consultas_lentas, **opciones_pool)
+        # user_id -> (tablas del usuario, instante hasta el que la comprobación es válida)
+        self._usuarios_al_dia = {}
+        self.cache_usuarios = CacheUsuarios(capacidad_cache_usuarios, ttl_cache_usuarios)
+        # Sin pool de procesos (scripts) las contraseñas se procesan en el hilo que llama
+        self.hashing = hashing or PoolHashing(procesos=0)
+        self.directorio_fotos = directorio_fotos
+        # Sin nivel compartido: cada proceso recuerda sólo lo que calcula él
+        self.cache_resultados = cache_resultados if cache_resultados is not None else CacheResultados(
+            CAPACIDAD_CACHE_RESULTADOS
+        )
+        # Eventos en vivo del dashboard: las escrituras avisan tras su commit
+        self.eventos = CentralEventos(
+            self.obtener_estado_dashboard, self.obtener_versiones_datos,
+            max_suscriptores=max_suscriptores_eventos, intervalo=intervalo_eventos
+        )
+        self.metricas.vigilar(self)
+        self.fts_disponible = self._detectar_fts5()
         self.crear_tablas()
     
+    def cerrar(self):
+        """Volcar las métricas y cerrar los eventos en vivo, el pool, el hashing y la cache de resultados"""
+        self.metricas.volcar()
+        self.eventos.cerrar()
+        self.pool.cerrar()
+        self.hashing.cerrar()
+        self.cache_resultados.cerrar()
+    
+    def _detectar_fts5(self):
+        with self.pool.conexion() as conn:
+            return bool(conn.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0])
+    
     def crear_tablas(self):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        # Tabla de usuarios (compartida) - AGREGADO CAMPO foto_perfil
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS usuarios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                nombre TEXT NOT NULL,
-                email TEXT,
-                es_admin BOOLEAN DEFAULT 1,
-                foto_perfil TEXT DEFAULT NULL,  -- NUEVO: campo para foto de perfil
-                fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        with self.pool.conexion() as conn:
+            cursor = conn.cursor()
+            
+            # Tabla de usuarios (compartida) - AGREGADO CAMPO foto_perfil
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS usuarios (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE NOT NULL,
+                    password TEXT NOT NULL,
+                    nombre TEXT NOT NULL,
+                    email TEXT,
+                    es_admin BOOLEAN DEFAULT 1,
+                    foto_perfil TEXT DEFAULT NULL,  -- NUEVO: campo para foto de perfil
+                    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Resumen del inventario de cada usuario, mantenido por triggers
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS resumen_inventario (
+                    user_id INTEGER PRIMARY KEY,
+                    total_productos INTEGER NOT NULL DEFAULT 0,
+                    total_movimientos INTEGER NOT NULL DEFAULT 0,
+                    productos_bajos INTEGER NOT NULL DEFAULT 0,
+                    valor_total REAL NOT NULL DEFAULT 0,
+                    movimientos_hoy INTEGER NOT NULL DEFAULT 0,
+                    dia_movimientos TEXT
+                )
+            ''')
+            
+            # Versión de los datos de inventario de cada usuario: cada escritura la incrementa
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS version_datos (
+                    user_id INTEGER PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    modificado TIMESTAMP
+                )
+            ''')
+            cursor.execute("PRAGMA table_info(version_datos)")
+            if 'modificado' not in [col[1] for col in cursor.fetchall()]:
+                cursor.execute("ALTER TABLE version_datos ADD COLUMN modificado TIMESTAMP")
+            
+            # Tokens de la API: sólo se guarda el SHA-256 de cada token
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS tokens_api (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    nombre TEXT NOT NULL,
+                    token_hash TEXT UNIQUE NOT NULL,
+                    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    ultimo_uso TIMESTAMP
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_tokens_api_usuario ON tokens_api (user_id)')
+            
+            # Entradas y salidas de la alerta de stock bajo, escritas por los triggers de productos
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS historial_alertas (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    producto_id INTEGER NOT NULL,
+                    codigo TEXT,
+                    nombre TEXT,
+                    tipo TEXT NOT NULL,
+                    stock_actual INTEGER,
+                    stock_minimo INTEGER,
+                    fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_historial_alertas_usuario ON historial_alertas (user_id, id)')
+            
+            # Resúmenes de alertas por usuario y hasta qué evento del historial llegó el evaluador
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS resumenes_alertas (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    creado TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    hasta_evento INTEGER NOT NULL,
+                    entran INTEGER NOT NULL,
+                    salen INTEGER NOT NULL,
+                    detalle TEXT NOT NULL
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_resumenes_alertas_usuario ON resumenes_alertas (user_id, id)')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS progreso_alertas (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    ultimo_evento INTEGER NOT NULL
+                )
+            ''')
+            
+            # Existencias y precio de cada producto al cierre de un día (generar_cortes_existencias)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cortes_existencias (
+                    user_id INTEGER NOT NULL,
+                    dia TEXT NOT NULL,
+                    productos INTEGER NOT NULL,
+                    total_stock INTEGER NOT NULL,
+                    valor_total REAL NOT NULL,
+                    generado TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (user_id, dia)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cortes_existencias_productos (
+                    user_id INTEGER NOT NULL,
+                    dia TEXT NOT NULL,
+                    producto_id INTEGER NOT NULL,
+                    codigo TEXT,
+                    nombre TEXT,
+                    ubicacion TEXT,
+                    stock INTEGER NOT NULL,
+                    precio_compra REAL,
+                    PRIMARY KEY (user_id, dia, producto_id)
+                ) WITHOUT ROWID
+            ''')
+            # Cambio neto de stock_actual hecho sin movimiento (editar o importar
+            # productos) por producto y día: los cortes y las existencias en una
+            # fecha lo suman al resumen diario de movimientos
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ajustes_existencias (
+                    user_id INTEGER NOT NULL,
+                    producto_id INTEGER NOT NULL,
+                    dia TEXT NOT NULL,
+                    cambio INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, producto_id, dia)
+                ) WITHOUT ROWID
+            ''')
+            
+            # Versión de esquema y modo de almacenamiento de cada usuario
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    user_id INTEGER PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    almacenamiento TEXT NOT NULL DEFAULT 'por_usuario',
+                    migrado_en TIMESTAMP
+                )
+            ''')
+            
+            cursor.execute("PRAGMA table_info(schema_version)")
+            columnas_existentes = [col[1] for col in cursor.fetchall()]
+            if 'almacenamiento' not in columnas_existentes:
+                cursor.execute("ALTER TABLE schema_version ADD COLUMN almacenamiento TEXT NOT NULL DEFAULT 'por_usuario'")
+            if 'migrado_en' not in columnas_existentes:
+                cursor.execute("ALTER TABLE schema_version ADD COLUMN migrado_en TIMESTAMP")
+            
+            # Registro de las migraciones de esquema (migraciones.py)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    nombre TEXT NOT NULL,
+                    registrada TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    completada TIMESTAMP
+                )
+            ''')
+            cursor.executemany(
+                'INSERT OR IGNORE INTO schema_migrations (version, nombre) VALUES (?, ?)',
+                [(version, nombre) for version, nombre, _ in MIGRACIONES_USUARIO]
             )
-        ''')
-        
-        conn.commit()
-        conn.close()
-
+            
+            # Tablas compartidas por los usuarios en modo 'compartido'
+            compartidas = TablasCompartidas()
+            self._crear_tablas_usuario(cursor, compartidas)
+            self._agregar_columnas_faltantes(cursor, compartidas)
+            self._crear_indices_usuario(cursor, compartidas)
+            self._crear_triggers_resumen(cursor, compartidas)
+            self._crear_triggers_alertas(cursor, compartidas)
+            self._crear_resumen_diario(cursor, compartidas)
+            if self.fts_disponible:
+                self._crear_indice_busqueda(cursor, compartidas)
+            
+            conn.commit()
+    
     # ========== NUEVOS MÉTODOS PARA FOTO DE PERFIL ==========
     
     def actualizar_foto_perfil(self, user_id, foto_path):
         """Actualizar la ruta de la foto de perfil del usuario"""
         try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                'UPDATE usuarios SET foto_perfil = ? WHERE id = ?',
-                (foto_path, user_id)
-            )
-            conn.commit()
-            conn.close()
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(
+                    'UPDATE usuarios SET foto_perfil = ? WHERE id = ?',
+                    (foto_path, user_id)
+                )
+                conn.commit()
+            self.cache_usuarios.invalidar(int(user_id))
             return True
         except Exception as e:
+            self.metricas.error_capturado(e)
             print(f"Error actualizando foto de perfil: {e}")
             return False
     
     def obtener_foto_perfil(self, user_id):
         """Obtener la ruta de la foto de perfil del usuario"""
         try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                'SELECT foto_perfil FROM usuarios WHERE id = ?',
-                (user_id,)
-            )
-            result = cursor.fetchone()
-            conn.close()
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(
+                    'SELECT foto_perfil FROM usuarios WHERE id = ?',
+                    (user_id,)
+                )
+                result = cursor.fetchone()
             return result[0] if result and result[0] else None
         except Exception as e:
+            self.metricas.error_capturado(e)
             print(f"Error obteniendo foto de perfil: {e}")
             return None
     
     def guardar_foto_archivo(self, user_id, file):
-        """Guardar archivo de foto en el sistema de archivos"""
+        """Procesar la foto subida, guardar sus variantes y registrar su hash.
+        
+        Devuelve (hash, None) o (None, mensaje de error). Las fotos que dejan de
+        usarse las borra limpiar_fotos_huerfanas.
+        """
+        try:
+            hash_foto, variantes = procesar_foto(file)
+        except ValueError as e:
+            return None, str(e)
+        
         try:
-            # Crear carpeta para fotos de perfil si no existe
-            foto_dir = os.path.join('static', 'profile_photos')
-            if not os.path.exists(foto_dir):
-                os.makedirs(foto_dir)
+            guardar_variantes(hash_foto, variantes, self.directorio_fotos)
+        except OSError as e:
+            print(f"Error al guardar foto: {e}")
+            return None, "Error al guardar la foto"
+        
+        if not self.actualizar_foto_perfil(user_id, hash_foto):
+            return None, "Error al guardar la foto"
+        return hash_foto, None
+    
+    def limpiar_fotos_huerfanas(self, gracia_segundos=3600):
+        """Borrar los archivos de fotos que ningún usuario referencia.
+        
+        Sólo se borran archivos con más de gracia_segundos, para no llevarse los
+        de una subida que todavía no ha registrado su hash. Devuelve los nombres
+        borrados, o None si hubo un error.
+        """
+        try:
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('SELECT DISTINCT foto_perfil FROM usuarios WHERE foto_perfil IS NOT NULL')
+                referenciadas = {row[0] for row in cursor.fetchall()}
             
-            # Generar nombre único para la foto
-            import uuid
-            extension = file.filename.split('.')[-1] if '.' in file.filename else 'jpg'
-            filename = f"{user_id}_{uuid.uuid4().hex[:8]}.{extension}"
-            filepath = os.path.join(foto_dir, filename)
+            if not os.path.isdir(self.directorio_fotos):
+                return []
             
-            # Guardar archivo
-            file.save(filepath)
+            limite = time.time() - gracia_segundos
+            borrados = []
+            for nombre in sorted(os.listdir(self.directorio_fotos)):
+                ruta = os.path.join(self.directorio_fotos, nombre)
+                coincidencia = PATRON_ARCHIVO_FOTO.match(nombre)
+                # Fotos antiguas: la columna guarda la ruta relativa a static/
+                clave = coincidencia.group(1) if coincidencia else f'profile_photos/{nombre}'
+                if clave in referenciadas or not os.path.isfile(ruta) or os.path.getmtime(ruta) > limite:
+                    continue
+                os.remove(ruta)
+                borrados.append(nombre)
+            return borrados
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error limpiando fotos huérfanas: {e}")
+            return None
+    
+    # ========== MÉTODOS EXISTENTES (se mantienen igual) ==========
+    
+    # ========== VERSIÓN DE ESQUEMA POR USUARIO ==========
+    
+    def asegurar_esquema_usuario(self, user_id):
+        """Preparar las tablas del usuario sólo si su versión de esquema no está al día.
+        
+        Tras la primera comprobación el usuario queda memorizado en el proceso y
+        las siguientes llamadas no tocan la base de datos hasta que pasen
+        ttl_esquema segundos. Un usuario al que `gestion.py migrar` todavía no
+        llegó recibe aquí sus migraciones pendientes.
+        """
+        try:
+            self.tablas_usuario(user_id)
+            return True
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error asegurando esquema del usuario {user_id}: {e}")
+            return False
+    
+    def tablas_usuario(self, user_id):
+        """Tablas donde viven los datos del usuario según su modo de almacenamiento.
+        
+        Si no se puede leer su modo o aplicar sus migraciones lanza la excepción
+        (sin suponer un modo: en el equivocado se leerían o escribirían otras tablas).
+        """
+        user_id = int(user_id)
+        memoria = self._usuarios_al_dia.get(user_id)
+        if memoria and time.monotonic() < memoria[1]:
+            return memoria[0]
+        
+        with self.pool.conexion() as conn:
+            cursor = conn.cursor()
             
-            # Guardar ruta relativa en la base de datos
-            ruta_relativa = f'profile_photos/{filename}'
-            self.actualizar_foto_perfil(user_id, ruta_relativa)
+            cursor.execute('SELECT version, almacenamiento FROM schema_version WHERE user_id = ?', (user_id,))
+            fila = cursor.fetchone()
             
-            return ruta_relativa
+            modo = fila['almacenamiento'] if fila else self._modo_inicial(cursor, user_id)
+            tablas = tablas_para(modo, user_id)
             
+            if not fila or fila['version'] < VERSION_ESQUEMA_USUARIO:
+                # Todas sus migraciones en una transacción, como en `gestion.py migrar`
+                cursor.execute('BEGIN IMMEDIATE')
+                try:
+                    self._aplicar_migraciones(cursor, tablas, fila['version'] if fila else 0)
+                    conn.commit()
+                    print(f"✅ Esquema del usuario {user_id} actualizado a la versión {VERSION_ESQUEMA_USUARIO}")
+                except sqlite3.IntegrityError as e:
+                    # Datos que la migración no admite: sigue con sus tablas como están
+                    # hasta que se corrijan (`gestion.py migrar` lo informa), sin reintentarlo en cada petición
+                    conn.rollback()
+                    print(f"⚠️ Migraciones pendientes del usuario {user_id}: {e}")
+        
+        self._usuarios_al_dia[user_id] = (tablas, time.monotonic() + self.ttl_esquema)
+        return tablas
+    
+    def _modo_inicial(self, cursor, user_id):
+        """Modo de un usuario sin registro: el de sus tablas propias si ya las tiene"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (f'productos_{user_id}',))
+        return POR_USUARIO if cursor.fetchone() else self.almacenamiento
+    
+    def olvidar_esquema_usuario(self, user_id=None):
+        """Descartar la memoria de usuarios al día (todos si no se indica ninguno)"""
+        if user_id is None:
+            self._usuarios_al_dia.clear()
+        else:
+            self._usuarios_al_dia.pop(int(user_id), None)
+    
+    def _preparar_esquema_usuario(self, cursor, tablas):
+        """Todo el DDL de las tablas de un usuario; debe ser idempotente.
+        
+        Las tablas compartidas se crean una sola vez en crear_tablas, así que
+        para esos usuarios sólo queda recalcular sus alertas y su fila del resumen.
+        """
+        if tablas.modo == POR_USUARIO:
+            self._crear_tablas_usuario(cursor, tablas)
+            self._agregar_columnas_faltantes(cursor, tablas)
+            self._crear_indices_usuario(cursor, tablas)
+            self._crear_triggers_resumen(cursor, tablas)
+            self._crear_triggers_alertas(cursor, tablas)
+            self._crear_resumen_diario(cursor, tablas)
+        self._reconstruir_alertas(cursor, tablas)
+        self._reconstruir_resumen(cursor, tablas)
+        self._reconstruir_resumen_diario(cursor, tablas)
+        if self.fts_disponible and tablas.modo == POR_USUARIO:
+            self._crear_indice_busqueda(cursor, tablas)
+    
+    def _registrar_version_esquema(self, cursor, tablas):
+        cursor.execute('''
+            INSERT INTO schema_version (user_id, version, almacenamiento) VALUES (?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                version = excluded.version,
+                almacenamiento = excluded.almacenamiento,
+                fecha_actualizacion = CURRENT_TIMESTAMP
+        ''', (tablas.user_id, VERSION_ESQUEMA_USUARIO, tablas.modo))
+    
+    def _crear_tablas_usuario(self, cursor, tablas):
+        for tabla, cuerpo in self._definiciones_tablas_usuario(tablas).items():
+            cursor.execute(f'CREATE TABLE IF NOT EXISTS {getattr(tablas, tabla)} {cuerpo}')
+    
+    def _definiciones_tablas_usuario(self, tablas):
+        """Columnas y restricciones de productos y movimientos (también las usa migraciones.reconstruir_tabla)"""
+        compartida = tablas.modo == COMPARTIDO
+        # En la tabla compartida el código sólo es único dentro de cada usuario
+        columna_usuario = 'user_id INTEGER NOT NULL,' if compartida else ''
+        codigo_unico = '' if compartida else 'UNIQUE '
+        restricciones = ', UNIQUE (user_id, codigo)' if compartida else ''
+        
+        return {
+            'productos': f'''(
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                {columna_usuario}
+                codigo TEXT {codigo_unico}NOT NULL,
+                nombre TEXT NOT NULL,
+                descripcion TEXT,
+                ubicacion TEXT,
+                modelo TEXT,
+                marca TEXT,
+                estado TEXT,
+                año_adquisicion INTEGER,
+                precio_compra REAL,
+                stock_actual INTEGER DEFAULT 0,
+                stock_minimo INTEGER DEFAULT 0,
+                fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                alerta_desde TIMESTAMP
+                {restricciones}
+            )''',
+            'movimientos': f'''(
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                {columna_usuario}
+                producto_id INTEGER,
+                tipo TEXT NOT NULL,
+                cantidad INTEGER NOT NULL,
+                motivo TEXT,
+                fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (producto_id) REFERENCES {tablas.productos} (id)
+            )''',
+        }
+    
+    def _crear_indices_usuario(self, cursor, tablas):
+        for tabla, sufijo, columnas, *condicion in INDICES_USUARIO:
+            nombre = tablas.objeto(f'idx_{tabla}', sufijo)
+            donde = f' WHERE {condicion[0]}' if condicion else ''
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {nombre} ON {getattr(tablas, tabla)} ({tablas.columnas_indice(columnas)}){donde}')
+        for tabla, sufijo in INDICES_RETIRADOS:
+            cursor.execute(f"DROP INDEX IF EXISTS {tablas.objeto(f'idx_{tabla}', sufijo)}")
+    
+    def _agregar_columnas_faltantes(self, cursor, tablas):
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (tablas.productos,))
+        if not cursor.fetchone():
+            return False
+        
+        cursor.execute(f"PRAGMA table_info({tablas.productos})")
+        columnas_existentes = [col[1] for col in cursor.fetchall()]
+        
+        columnas_nuevas = [
+            ('ubicacion', 'TEXT'),
+            ('modelo', 'TEXT'),
+            ('marca', 'TEXT'),
+            ('estado', 'TEXT'),
+            ('año_adquisicion', 'INTEGER'),
+            ('alerta_desde', 'TIMESTAMP')
+        ]
+        
+        for columna, tipo in columnas_nuevas:
+            if columna not in columnas_existentes:
+                cursor.execute(f"ALTER TABLE {tablas.productos} ADD COLUMN {columna} {tipo}")
+                print(f"✅ Columna {columna} agregada a {tablas.productos}")
+        return True
+    
+    # ========== RESUMEN INCREMENTAL DEL INVENTARIO ==========
+    
+    def _crear_trigger(self, cursor, nombre, cuerpo):
+        """Crear el trigger o reemplazarlo si su definición cambió.
+        
+        SQLite guarda el texto del CREATE TRIGGER tal cual en sqlite_master, así
+        que basta compararlo; CREATE TRIGGER IF NOT EXISTS dejaría la versión vieja.
+        """
+        definicion = f'CREATE TRIGGER {nombre} {cuerpo.strip()}'
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (nombre,))
+        fila = cursor.fetchone()
+        if fila and fila[0] == definicion:
+            return
+        if fila:
+            cursor.execute(f'DROP TRIGGER {nombre}')
+        cursor.execute(definicion)
+    
+    def _crear_triggers_resumen(self, cursor, tablas):
+        """Triggers que mantienen resumen_inventario en la misma transacción de cada escritura"""
+        bajo = CONDICION_STOCK_BAJO
+        valor = 'IFNULL({fila}.precio_compra * {fila}.stock_actual, 0)'
+        
+        # Los de productos cambiaron con la versión 6 del esquema (stock_minimo): se reemplazan
+        self._crear_trigger(cursor, tablas.objeto('trg_productos', 'resumen_ins'), f'''
+            AFTER INSERT ON {tablas.productos}
+            BEGIN
+                UPDATE resumen_inventario SET
+                    total_productos = total_productos + 1,
+                    productos_bajos = productos_bajos + {bajo.format(fila='NEW')},
+                    valor_total = valor_total + {valor.format(fila='NEW')}
+                WHERE user_id = {tablas.usuario_de('NEW')};
+            END
+        ''')
+        
+        self._crear_trigger(cursor, tablas.objeto('trg_productos', 'resumen_upd'), f'''
+            AFTER UPDATE OF precio_compra, stock_actual, stock_minimo ON {tablas.productos}
+            BEGIN
+                UPDATE resumen_inventario SET
+                    productos_bajos = productos_bajos + {bajo.format(fila='NEW')} - {bajo.format(fila='OLD')},
+                    valor_total = valor_total + {valor.format(fila='NEW')} - {valor.format(fila='OLD')}
+                WHERE user_id = {tablas.usuario_de('NEW')};
+            END
+        ''')
+        
+        self._crear_trigger(cursor, tablas.objeto('trg_productos', 'resumen_del'), f'''
+            AFTER DELETE ON {tablas.productos}
+            BEGIN
+                UPDATE resumen_inventario SET
+                    total_productos = total_productos - 1,
+                    productos_bajos = productos_bajos - {bajo.format(fila='OLD')},
+                    valor_total = valor_total - {valor.format(fila='OLD')}
+                WHERE user_id = {tablas.usuario_de('OLD')};
+            END
+        ''')
+        
+        # movimientos_hoy cuenta los movimientos de dia_movimientos (el día más reciente visto)
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {tablas.objeto('trg_movimientos', 'resumen_ins')}
+            AFTER INSERT ON {tablas.movimientos}
+            BEGIN
+                UPDATE resumen_inventario SET
+                    total_movimientos = total_movimientos + 1,
+                    movimientos_hoy = CASE
+                        WHEN DATE(NEW.fecha) = dia_movimientos THEN movimientos_hoy + 1
+                        WHEN DATE(NEW.fecha) > IFNULL(dia_movimientos, '') THEN 1
+                        ELSE movimientos_hoy
+                    END,
+                    dia_movimientos = CASE
+                        WHEN DATE(NEW.fecha) > IFNULL(dia_movimientos, '') THEN DATE(NEW.fecha)
+                        ELSE dia_movimientos
+                    END
+                WHERE user_id = {tablas.usuario_de('NEW')};
+            END
+        ''')
+        
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {tablas.objeto('trg_movimientos', 'resumen_del')}
+            AFTER DELETE ON {tablas.movimientos}
+            BEGIN
+                UPDATE resumen_inventario SET
+                    total_movimientos = total_movimientos - 1,
+                    movimientos_hoy = movimientos_hoy - IFNULL(DATE(OLD.fecha) = dia_movimientos, 0)
+                WHERE user_id = {tablas.usuario_de('OLD')};
+            END
+        ''')
+    
+    def _reconstruir_resumen(self, cursor, tablas):
+        """Recalcular el resumen del usuario desde cero con agregados completos"""
+        filtro = tablas.filtro()
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO resumen_inventario
+                (user_id, total_productos, total_movimientos, productos_bajos, valor_total, movimientos_hoy, dia_movimientos)
+            SELECT
+                {tablas.user_id},
+                (SELECT COUNT(*) FROM {tablas.productos} WHERE {filtro}),
+                (SELECT COUNT(*) FROM {tablas.movimientos} WHERE {filtro}),
+                (SELECT COUNT(*) FROM {tablas.productos} WHERE {filtro} AND alerta_desde IS NOT NULL),
+                (SELECT IFNULL(SUM(precio_compra * stock_actual), 0) FROM {tablas.productos} WHERE {filtro}),
+                (SELECT COUNT(*) FROM {tablas.movimientos} WHERE {filtro} AND DATE(fecha) = DATE('now')),
+                DATE('now')
+        ''')
+    
+    def _leer_resumen(self, cursor, user_id):
+        cursor.execute('''
+            SELECT total_productos, total_movimientos, productos_bajos, valor_total,
+                   CASE WHEN dia_movimientos = DATE('now') THEN movimientos_hoy ELSE 0 END AS movimientos_hoy
+            FROM resumen_inventario WHERE user_id = ?
+        ''', (user_id,))
+        fila = cursor.fetchone()
+        return dict(fila) if fila else None
+    
+    def reconstruir_resumen(self, user_id):
+        """Recalcular el resumen de un usuario; devuelve (antes, después) para verificar desvíos"""
+        try:
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                tablas = self.tablas_usuario(user_id)
+                antes = self._leer_resumen(cursor, user_id)
+                # productos_bajos se cuenta sobre alerta_desde: primero las alertas
+                if self._reconstruir_alertas(cursor, tablas):
+                    self._incrementar_version_datos(cursor, user_id)
+                self._reconstruir_resumen(cursor, tablas)
+                despues = self._leer_resumen(cursor, user_id)
+                
+                conn.commit()
+            return antes, despues
         except Exception as e:
-            print(f"Error al guardar foto: {e}")
+            self.metricas.error_capturado(e)
+            print(f"Error reconstruyendo resumen del usuario {user_id}: {e}")
+            return None, None
+    
+    def obtener_ids_usuarios(self):
+        try:
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('SELECT id FROM usuarios ORDER BY id')
+                ids = [row[0] for row in cursor.fetchall()]
+            return ids
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error obteniendo usuarios: {e}")
+            return []
+    
+    # ========== ALERTAS DE STOCK BAJO ==========
+    
+    def _crear_triggers_alertas(self, cursor, tablas):
+        """Triggers que mantienen alerta_desde de cada producto y anotan en historial_alertas sus entradas y salidas.
+        
+        Sólo se disparan cuando una escritura toca stock_actual o stock_minimo y
+        el producto cruza su mínimo; el UPDATE de alerta_desde no vuelve a dispararlos.
+        """
+        bajo = CONDICION_STOCK_BAJO
+        
+        def anotar(fila, tipo):
+            return f'''
+                INSERT INTO historial_alertas (user_id, producto_id, codigo, nombre, tipo, stock_actual, stock_minimo)
+                VALUES ({tablas.usuario_de(fila)}, {fila}.id, {fila}.codigo, {fila}.nombre, {tipo},
+                        {fila}.stock_actual, {fila}.stock_minimo);
+            '''
+        
+        # Sólo los productos copiados por la migración llegan con alerta_desde
+        self._crear_trigger(cursor, tablas.objeto('trg_productos', 'alerta_ins'), f'''
+            AFTER INSERT ON {tablas.productos}
+            WHEN NEW.alerta_desde IS NULL AND {bajo.format(fila='NEW')}
+            BEGIN
+                UPDATE {tablas.productos} SET alerta_desde = CURRENT_TIMESTAMP WHERE id = NEW.id;
+                {anotar('NEW', "'entra'")}
+            END
+        ''')
+        
+        # Se compara con alerta_desde (no con OLD): así también corrige un producto desfasado
+        self._crear_trigger(cursor, tablas.objeto('trg_productos', 'alerta_upd'), f'''
+            AFTER UPDATE OF stock_actual, stock_minimo ON {tablas.productos}
+            WHEN {bajo.format(fila='NEW')} <> (NEW.alerta_desde IS NOT NULL)
+            BEGIN
+                UPDATE {tablas.productos}
+                SET alerta_desde = CASE WHEN {bajo.format(fila='NEW')} THEN CURRENT_TIMESTAMP END
+                WHERE id = NEW.id;
+                {anotar('NEW', f"CASE WHEN {bajo.format(fila='NEW')} THEN 'entra' ELSE 'sale' END")}
+            END
+        ''')
+        
+        self._crear_trigger(cursor, tablas.objeto('trg_productos', 'alerta_del'), f'''
+            AFTER DELETE ON {tablas.productos}
+            WHEN OLD.alerta_desde IS NOT NULL
+            BEGIN
+                {anotar('OLD', "'sale'")}
+            END
+        ''')
+    
+    def _reconstruir_alertas(self, cursor, tablas):
+        """Recalcular alerta_desde; devuelve cuántos productos cambiaron.
+        
+        Los productos que siguen en alerta conservan su fecha.
+        """
+        filtro = tablas.filtro()
+        bajo = CONDICION_STOCK_BAJO.format(fila=tablas.productos)
+        cursor.execute(f'''
+            UPDATE {tablas.productos} SET alerta_desde = NULL
+            WHERE {filtro} AND alerta_desde IS NOT NULL AND NOT {bajo}
+        ''')
+        cambiados = cursor.rowcount
+        cursor.execute(f'''
+            UPDATE {tablas.productos} SET alerta_desde = CURRENT_TIMESTAMP
+            WHERE {filtro} AND alerta_desde IS NULL AND {bajo}
+        ''')
+        return cambiados + cursor.rowcount
+    
+    def generar_resumenes_alertas(self, max_eventos=MAX_EVENTOS_RESUMEN_ALERTAS, dias_historial=DIAS_HISTORIAL_ALERTAS):
+        """Agrupar en un resumen por usuario los eventos del historial de alertas aún no resumidos.
+        
+        Cada producto aparece una vez con su último evento; el que entra y vuelve
+        a salir (o al revés) dentro de la misma pasada no aparece. Devuelve la
+        lista de resúmenes creados, o None si la pasada falló y no se guardó nada.
+        """
+        try:
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                # Una sola pasada a la vez: dos evaluadores no resumen el mismo evento
+                cursor.execute('BEGIN IMMEDIATE')
+                try:
+                    cursor.execute('SELECT ultimo_evento FROM progreso_alertas WHERE id = 1')
+                    fila = cursor.fetchone()
+                    ultimo_evento = fila[0] if fila else 0
+                    
+                    cursor.execute(
+                        'SELECT * FROM historial_alertas WHERE id > ? ORDER BY id LIMIT ?', (ultimo_evento, max_eventos)
+                    )
+                    eventos = [dict(row) for row in cursor.fetchall()]
+                    
+                    # user_id -> {producto_id: (tipo del primer evento, último evento)}
+                    por_usuario = {}
+                    for evento in eventos:
+                        productos = por_usuario.setdefault(evento['user_id'], {})
+                        primero = productos.get(evento['producto_id'], (evento['tipo'],))[0]
+                        productos[evento['producto_id']] = (primero, evento)
+                    
+                    resumenes = []
+                    for user_id, productos in por_usuario.items():
+                        detalle = [{clave: evento[clave] for clave in
+                                    ('producto_id', 'codigo', 'nombre', 'tipo', 'stock_actual', 'stock_minimo', 'fecha')}
+                                   for primero, evento in productos.values() if evento['tipo'] == primero]
+                        if not detalle:
+                            continue
+                        entran = sum(1 for evento in detalle if evento['tipo'] == 'entra')
+                        cursor.execute('''
+                            INSERT INTO resumenes_alertas (user_id, hasta_evento, entran, salen, detalle)
+                            VALUES (?, ?, ?, ?, ?)
+                            RETURNING id, creado
+                        ''', (user_id, eventos[-1]['id'], entran, len(detalle) - entran,
+                              json.dumps(detalle, ensure_ascii=False)))
+                        creado = cursor.fetchone()
+                        resumenes.append({'id': creado['id'], 'user_id': user_id, 'creado': creado['creado'],
+                                          'entran': entran, 'salen': len(detalle) - entran, 'detalle': detalle})
+                    
+                    if eventos:
+                        ultimo_evento = eventos[-1]['id']
+                        cursor.execute('''
+                            INSERT INTO progreso_alertas (id, ultimo_evento) VALUES (1, ?)
+                            ON CONFLICT(id) DO UPDATE SET ultimo_evento = excluded.ultimo_evento
+                        ''', (ultimo_evento,))
+                    
+                    # Historial ya resumido y resúmenes más antiguos que dias_historial. Los
+                    # ids crecen con la fecha: el primero que se conserva acota el borrado
+                    limite = f'-{int(dias_historial)} days'
+                    cursor.execute('''
+                        DELETE FROM historial_alertas WHERE id <= ? AND id < IFNULL(
+                            (SELECT id FROM historial_alertas WHERE fecha >= datetime('now', ?) ORDER BY id LIMIT 1), ? + 1
+                        )
+                    ''', (ultimo_evento, limite, ultimo_evento))
+                    cursor.execute('''
+                        DELETE FROM resumenes_alertas WHERE id < IFNULL(
+                            (SELECT id FROM resumenes_alertas WHERE creado >= datetime('now', ?) ORDER BY id LIMIT 1),
+                            (SELECT MAX(id) + 1 FROM resumenes_alertas)
+                        )
+                    ''', (limite,))
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            return resumenes
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error generando resúmenes de alertas: {e}")
             return None
     
-    def eliminar_foto_antigua(self, user_id):
-        """Eliminar la foto anterior del usuario del sistema de archivos"""
+    def obtener_resumenes_alertas(self, user_id, despues_de=0, limite=50):
+        """Resúmenes de alertas del usuario con id mayor que despues_de, del más antiguo al más nuevo"""
         try:
-            foto_actual = self.obtener_foto_perfil(user_id)
-            if foto_actual:
-                foto_path = os.path.join('static', foto_actual)
-                if os.path.exists(foto_path):
-                    os.remove(foto_path)
-                    print(f"✅ Foto anterior eliminada: {foto_path}")
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT id, creado, entran, salen, detalle FROM resumenes_alertas
+                    WHERE user_id = ? AND id > ?
+                    ORDER BY id LIMIT ?
+                ''', (int(user_id), int(despues_de), int(limite)))
+                resumenes = [dict(row) for row in cursor.fetchall()]
+            for resumen in resumenes:
+                resumen['detalle'] = json.loads(resumen['detalle'])
+            return resumenes
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error al obtener resúmenes de alertas del usuario {user_id}: {e}")
+            return []
+    
+    # ========== RESUMEN DIARIO DE MOVIMIENTOS ==========
+    
+    def _crear_resumen_diario(self, cursor, tablas):
+        """Tabla (producto, día, tipo) -> movimientos y cantidad, mantenida por triggers.
+        
+        Cada movimiento suma en la fila de su producto y en la de PRODUCTO_TODOS,
+        así un reporte de un año lee como mucho 365 días x 2 tipos filas
+        contiguas de la clave primaria, tenga el usuario los movimientos que tenga.
+        """
+        compartida = tablas.modo == COMPARTIDO
+        columna_usuario = 'user_id INTEGER NOT NULL,' if compartida else ''
+        clave = f'{tablas.columna_usuario}producto_id, dia, tipo'
+        
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {tablas.diario} (
+                {columna_usuario}
+                producto_id INTEGER NOT NULL,
+                dia TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                total_movimientos INTEGER NOT NULL,
+                total_cantidad INTEGER NOT NULL,
+                PRIMARY KEY ({clave})
+            ) WITHOUT ROWID
+        ''')
+        
+        def sumar(fila, producto):
+            valor_usuario = f'{fila}.user_id, ' if compartida else ''
+            # WHERE antes de ON CONFLICT: sin él SQLite no distingue el upsert de un JOIN
+            return f'''
+                INSERT INTO {tablas.diario} ({clave}, total_movimientos, total_cantidad)
+                SELECT {valor_usuario}{producto}, DATE({fila}.fecha), {fila}.tipo, 1, {fila}.cantidad
+                WHERE {producto} IS NOT NULL
+                ON CONFLICT ({clave}) DO UPDATE SET
+                    total_movimientos = total_movimientos + 1,
+                    total_cantidad = total_cantidad + excluded.total_cantidad;
+            '''
+        
+        def restar(fila):
+            usuario = f'user_id = {fila}.user_id AND ' if compartida else ''
+            condicion = (f'{usuario}producto_id IN ({PRODUCTO_TODOS}, {fila}.producto_id) '
+                         f'AND dia = DATE({fila}.fecha) AND tipo = {fila}.tipo')
+            # Las filas que se quedan sin movimientos se borran para no leerlas en los reportes
+            return f'''
+                UPDATE {tablas.diario} SET
+                    total_movimientos = total_movimientos - 1,
+                    total_cantidad = total_cantidad - {fila}.cantidad
+                WHERE {condicion};
+                DELETE FROM {tablas.diario} WHERE {condicion} AND total_movimientos <= 0;
+            '''
+        
+        def agregar(fila):
+            return sumar(fila, PRODUCTO_TODOS) + sumar(fila, f'{fila}.producto_id')
+        
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {tablas.objeto('trg_movimientos', 'diario_ins')}
+            AFTER INSERT ON {tablas.movimientos}
+            BEGIN
+                {agregar('NEW')}
+            END
+        ''')
+        
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {tablas.objeto('trg_movimientos', 'diario_upd')}
+            AFTER UPDATE OF producto_id, tipo, cantidad, fecha ON {tablas.movimientos}
+            BEGIN
+                {restar('OLD')}
+                {agregar('NEW')}
+            END
+        ''')
+        
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {tablas.objeto('trg_movimientos', 'diario_del')}
+            AFTER DELETE ON {tablas.movimientos}
+            BEGIN
+                {restar('OLD')}
+            END
+        ''')
+    
+    def _reconstruir_resumen_diario(self, cursor, tablas):
+        """Recalcular el resumen diario del usuario agrupando todos sus movimientos"""
+        filtro = tablas.filtro()
+        cursor.execute(f'DELETE FROM {tablas.diario} WHERE {filtro}')
+        # Primero las filas de todos los productos y después las de cada producto
+        for producto, condicion, grupo in ((PRODUCTO_TODOS, '', ''),
+                                           ('producto_id', 'AND producto_id IS NOT NULL', 'producto_id, ')):
+            cursor.execute(f'''
+                INSERT INTO {tablas.diario}
+                    ({tablas.columna_usuario}producto_id, dia, tipo, total_movimientos, total_cantidad)
+                SELECT {tablas.valor_usuario}{producto}, DATE(fecha), tipo, COUNT(*), SUM(cantidad)
+                FROM {tablas.movimientos}
+                WHERE {filtro} {condicion}
+                GROUP BY {grupo}DATE(fecha), tipo
+            ''')
+    
+    def _leer_totales_diario(self, cursor, tablas):
+        cursor.execute(f'''
+            SELECT COUNT(*) AS filas,
+                   IFNULL(SUM(total_movimientos), 0) AS total_movimientos,
+                   IFNULL(SUM(total_cantidad), 0) AS total_cantidad
+            FROM {tablas.diario} WHERE {tablas.filtro()}
+        ''')
+        return dict(cursor.fetchone())
+    
+    def reconstruir_resumen_diario(self, user_id):
+        """Rellenar el resumen diario de un usuario; devuelve sus totales (antes, después)"""
+        try:
+            tablas = self.tablas_usuario(user_id)
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('BEGIN IMMEDIATE')
+                try:
+                    antes = self._leer_totales_diario(cursor, tablas)
+                    self._reconstruir_resumen_diario(cursor, tablas)
+                    despues = self._leer_totales_diario(cursor, tablas)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            return antes, despues
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error reconstruyendo resumen diario del usuario {user_id}: {e}")
+            return None, None
+    
+    # ========== VERSIÓN DE DATOS Y CACHE DE RESULTADOS ==========
+    
+    def _incrementar_version_datos(self, cursor, user_id):
+        """Llamar dentro de la transacción de cada escritura de productos o movimientos"""
+        cursor.execute('''
+            INSERT INTO version_datos (user_id, version, modificado) VALUES (?, 1, CURRENT_TIMESTAMP)
+            ON CONFLICT(user_id) DO UPDATE SET version = version + 1, modificado = CURRENT_TIMESTAMP
+        ''', (int(user_id),))
+    
+    def obtener_version_datos(self, user_id):
+        with self.pool.conexion() as conn:
+            fila = conn.execute('SELECT version FROM version_datos WHERE user_id = ?', (int(user_id),)).fetchone()
+        return fila[0] if fila else 0
+    
+    def obtener_estado_datos(self, user_id):
+        """(versión, instante UTC de la última escritura o None) de los datos del usuario"""
+        with self.pool.conexion() as conn:
+            fila = conn.execute(
+                'SELECT version, modificado FROM version_datos WHERE user_id = ?', (int(user_id),)
+            ).fetchone()
+        if not fila:
+            return 0, None
+        modificado = None
+        if fila['modificado']:
+            modificado = datetime.datetime.fromisoformat(fila['modificado']).replace(tzinfo=datetime.timezone.utc)
+        return fila['version'], modificado
+    
+    def obtener_versiones_datos(self, user_ids):
+        """{user_id: versión} de varios usuarios en una sola consulta"""
+        user_ids = [int(user_id) for user_id in user_ids]
+        if not user_ids:
+            return {}
+        with self.pool.conexion() as conn:
+            filas = conn.execute(
+                f'SELECT user_id, version FROM version_datos WHERE user_id IN ({", ".join("?" * len(user_ids))})',
+                user_ids
+            ).fetchall()
+        return {fila['user_id']: fila['version'] for fila in filas}
+    
+    def _memorizado(self, metodo, user_id, args, calcular):
+        """Resultado de calcular(tablas, *args), reutilizado mientras no cambie la versión de datos.
+        
+        La versión se lee antes de calcular: el resultado guardado nunca es más
+        antiguo que la versión con la que se guarda. Si calcular lanza una
+        excepción no se guarda nada.
+        """
+        user_id = int(user_id)
+        version = self.obtener_version_datos(user_id)
+        encontrado, resultado = self.cache_resultados.obtener(metodo, user_id, args, version)
+        if encontrado:
+            return resultado
+        resultado = calcular(self.tablas_usuario(user_id), *args)
+        self.cache_resultados.guardar(metodo, user_id, args, version, resultado)
+        return resultado
+    
+    # ========== ÍNDICE DE BÚSQUEDA (FTS5) ==========
+    
+    def _crear_indice_busqueda(self, cursor, tablas):
+        """Tabla FTS5 de contenido externo sobre la tabla de productos, sincronizada por triggers"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (tablas.busqueda,))
+        existia = cursor.fetchone() is not None
+        
+        columnas = ', '.join(tablas.columnas_busqueda)
+        nuevos = ', '.join(f'NEW.{columna}' for columna in tablas.columnas_busqueda)
+        viejos = ', '.join(f'OLD.{columna}' for columna in tablas.columnas_busqueda)
+        
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {tablas.busqueda} USING fts5(
+                {columnas},
+                content='{tablas.productos}', content_rowid='id',
+                tokenize='{TOKENIZADOR_BUSQUEDA}', prefix='{PREFIJOS_BUSQUEDA}'
+            )
+        ''')
+        
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {tablas.objeto('trg_productos', 'fts_ins')}
+            AFTER INSERT ON {tablas.productos}
+            BEGIN
+                INSERT INTO {tablas.busqueda} (rowid, {columnas})
+                VALUES (NEW.id, {nuevos});
+            END
+        ''')
+        
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {tablas.objeto('trg_productos', 'fts_del')}
+            AFTER DELETE ON {tablas.productos}
+            BEGIN
+                INSERT INTO {tablas.busqueda} ({tablas.busqueda}, rowid, {columnas})
+                VALUES ('delete', OLD.id, {viejos});
+            END
+        ''')
+        
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {tablas.objeto('trg_productos', 'fts_upd')}
+            AFTER UPDATE OF codigo, nombre, descripcion ON {tablas.productos}
+            BEGIN
+                INSERT INTO {tablas.busqueda} ({tablas.busqueda}, rowid, {columnas})
+                VALUES ('delete', OLD.id, {viejos});
+                INSERT INTO {tablas.busqueda} (rowid, {columnas})
+                VALUES (NEW.id, {nuevos});
+            END
+        ''')
+        
+        # Un índice recién creado para un usuario existente se llena con sus productos actuales
+        if not existia:
+            self._reconstruir_indice_busqueda(cursor, tablas)
+    
+    def _reconstruir_indice_busqueda(self, cursor, tablas):
+        # En el almacenamiento compartido 'rebuild' regenera el índice de todos los usuarios
+        cursor.execute(f"INSERT INTO {tablas.busqueda} ({tablas.busqueda}) VALUES ('rebuild')")
+    
+    def reconstruir_indice_busqueda(self, user_id):
+        """Regenerar el índice de búsqueda del usuario a partir de sus productos.
+        
+        En el almacenamiento compartido el índice es uno para todos los usuarios
+        y se regenera entero; para varios usuarios usar reconstruir_indices_busqueda.
+        """
+        return not self.reconstruir_indices_busqueda([user_id])
+    
+    def reconstruir_indices_busqueda(self, user_ids):
+        """Regenerar el índice de búsqueda de varios usuarios; devuelve los ids que fallaron.
+        
+        El índice compartido se regenera una sola vez, con el primer usuario en
+        modo compartido, y no una vez por cada uno. No se regeneran sólo las filas
+        de un usuario: borrarlas de un índice de contenido externo exige los
+        valores ya indexados, que son justo los que pueden estar mal.
+        """
+        if not self.fts_disponible:
+            return list(user_ids)
+        fallidos = []
+        compartido = None
+        for user_id in user_ids:
+            try:
+                tablas = self.tablas_usuario(user_id)
+                if tablas.modo == COMPARTIDO:
+                    if compartido is None:
+                        # Si falla, los demás usuarios compartidos fallan sin reintentarlo
+                        compartido = False
+                        self._regenerar_indice_busqueda(TablasCompartidas())
+                        compartido = True
+                    if not compartido:
+                        fallidos.append(user_id)
+                    continue
+                self._regenerar_indice_busqueda(tablas)
+            except Exception as e:
+                self.metricas.error_capturado(e)
+                print(f"Error reconstruyendo índice de búsqueda del usuario {user_id}: {e}")
+                fallidos.append(user_id)
+        return fallidos
+    
+    def _regenerar_indice_busqueda(self, tablas):
+        with self.pool.conexion() as conn:
+            cursor = conn.cursor()
+            
+            self._reconstruir_indice_busqueda(cursor, tablas)
+            
+            conn.commit()
+    
+    @staticmethod
+    def _consulta_fts(texto):
+        """Convertir el texto del usuario en una consulta FTS5 de prefijos: "tor"* AND "12"*"""
+        palabras = re.findall(r'\w+', texto)
+        return ' AND '.join(f'"{palabra}"*' for palabra in palabras)
+    
+    # ========== MIGRACIONES DE ESQUEMA ==========
+    
+    def _aplicar_migraciones(self, cursor, tablas, version):
+        """Aplicar las migraciones posteriores a `version` y registrar la versión actual"""
+        for numero, _, migrar in MIGRACIONES_USUARIO:
+            if numero > version:
+                migrar(self, cursor, tablas)
+        self._registrar_version_esquema(cursor, tablas)
+    
+    def usuarios_por_actualizar(self):
+        """Ids de los usuarios con migraciones de esquema pendientes"""
+        try:
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT u.id FROM usuarios u
+                    LEFT JOIN schema_version s ON s.user_id = u.id
+                    WHERE IFNULL(s.version, 0) < ?
+                    ORDER BY u.id
+                ''', (VERSION_ESQUEMA_USUARIO,))
+                ids = [row[0] for row in cursor.fetchall()]
+            return ids
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error obteniendo usuarios por actualizar: {e}")
+            return []
+    
+    def migrar_esquemas(self, user_ids):
+        """Aplicar las migraciones pendientes a un lote de usuarios en una sola transacción.
+        
+        Cada usuario va en su propio SAVEPOINT: si sus datos no encajan en el
+        esquema nuevo (p. ej. códigos repetidos al restaurar el UNIQUE) sólo se
+        deshacen sus cambios. Devuelve (actualizados, {user_id: error}); los
+        usuarios ya al día se omiten, así que el comando puede reanudarse.
+        Devuelve None si el lote falló y no se aplicó nada.
+        """
+        actualizados, fallidos = [], {}
+        try:
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('BEGIN IMMEDIATE')
+                try:
+                    for user_id in user_ids:
+                        user_id = int(user_id)
+                        cursor.execute('SAVEPOINT migracion_usuario')
+                        try:
+                            if self._migrar_esquema_usuario(cursor, user_id):
+                                actualizados.append(user_id)
+                        except sqlite3.Error as e:
+                            cursor.execute('ROLLBACK TO migracion_usuario')
+                            fallidos[user_id] = str(e)
+                        cursor.execute('RELEASE migracion_usuario')
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error migrando el esquema del lote {list(user_ids)}: {e}")
+            return None
+        
+        for user_id in actualizados:
+            self.olvidar_esquema_usuario(user_id)
+        return actualizados, fallidos
+    
+    def _migrar_esquema_usuario(self, cursor, user_id):
+        cursor.execute('SELECT version, almacenamiento FROM schema_version WHERE user_id = ?', (user_id,))
+        fila = cursor.fetchone()
+        if fila and fila['version'] >= VERSION_ESQUEMA_USUARIO:
+            return False
+        
+        modo = fila['almacenamiento'] if fila else self._modo_inicial(cursor, user_id)
+        self._aplicar_migraciones(cursor, tablas_para(modo, user_id), fila['version'] if fila else 0)
+        return True
+    
+    def completar_migraciones(self):
+        """Anotar en schema_migrations las migraciones que ya tienen a todos los usuarios al día"""
+        try:
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    UPDATE schema_migrations SET completada = CURRENT_TIMESTAMP
+                    WHERE completada IS NULL AND version <= ? AND NOT EXISTS (
+                        SELECT 1 FROM usuarios u
+                        LEFT JOIN schema_version s ON s.user_id = u.id
+                        WHERE IFNULL(s.version, 0) < schema_migrations.version
+                    )
+                ''', (VERSION_ESQUEMA_USUARIO,))
+                
+                conn.commit()
             return True
         except Exception as e:
-            print(f"Error eliminando foto anterior: {e}")
+            self.metricas.error_capturado(e)
+            print(f"Error completando migraciones: {e}")
             return False
-
-    # ========== MÉTODOS EXISTENTES (se mantienen igual) ==========
     
-    def actualizar_estructura_tablas(self, user_id):
-        """Actualizar la estructura de las tablas existentes con las nuevas columnas"""
+    def estado_migraciones(self):
+        """Migraciones registradas con los usuarios que aún no las tienen aplicadas"""
         try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT IFNULL(s.version, 0) AS version, COUNT(*) AS usuarios FROM usuarios u
+                    LEFT JOIN schema_version s ON s.user_id = u.id
+                    GROUP BY 1
+                ''')
+                por_version = cursor.fetchall()
+                
+                cursor.execute('SELECT version, nombre, registrada, completada FROM schema_migrations ORDER BY version')
+                migraciones = [dict(row) for row in cursor.fetchall()]
             
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (f'productos_{user_id}',))
-            if not cursor.fetchone():
-                conn.close()
-                return False
+            for migracion in migraciones:
+                migracion['pendientes'] = sum(fila['usuarios'] for fila in por_version
+                                              if fila['version'] < migracion['version'])
+            return migraciones
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error obteniendo el estado de las migraciones: {e}")
+            return None
+    
+    # ========== MIGRACIÓN AL ALMACENAMIENTO COMPARTIDO ==========
+    
+    def usuarios_por_migrar(self):
+        """Ids de los usuarios que todavía guardan sus datos en tablas propias"""
+        try:
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
                 
-            cursor.execute(f"PRAGMA table_info(productos_{user_id})")
-            columnas_existentes = [col[1] for col in cursor.fetchall()]
+                cursor.execute(f'''
+                    SELECT u.id FROM usuarios u
+                    LEFT JOIN schema_version s ON s.user_id = u.id
+                    WHERE IFNULL(s.almacenamiento, '{POR_USUARIO}') = '{POR_USUARIO}'
+                    ORDER BY u.id
+                ''')
+                ids = [row[0] for row in cursor.fetchall()]
+            return ids
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error obteniendo usuarios por migrar: {e}")
+            return []
+    
+    def migrar_usuarios_a_compartido(self, user_ids):
+        """Copiar un lote de usuarios a las tablas compartidas en una sola transacción.
+        
+        Devuelve la lista de usuarios migrados (los que ya lo estaban se omiten,
+        así que el comando puede reanudarse) o None si el lote falló y no se
+        aplicó nada. Las tablas antiguas quedan bloqueadas contra escrituras
+        hasta que eliminar_tablas_migradas las borre.
+        """
+        migrados = []
+        try:
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('BEGIN IMMEDIATE')
+                try:
+                    for user_id in user_ids:
+                        if self._migrar_usuario_a_compartido(cursor, int(user_id)):
+                            migrados.append(int(user_id))
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error migrando el lote {list(user_ids)}: {e}")
+            return None
+        
+        for user_id in migrados:
+            self.olvidar_esquema_usuario(user_id)
+        return migrados
+    
+    def _migrar_usuario_a_compartido(self, cursor, user_id):
+        cursor.execute('SELECT almacenamiento FROM schema_version WHERE user_id = ?', (user_id,))
+        fila = cursor.fetchone()
+        if fila and fila['almacenamiento'] == COMPARTIDO:
+            return False
+        
+        origen = TablasPorUsuario(user_id)
+        destino = TablasCompartidas(user_id)
+        
+        # Un usuario sin tablas propias sólo necesita cambiar de modo
+        if self._agregar_columnas_faltantes(cursor, origen):
+            cursor.execute(f'''
+                INSERT INTO {destino.productos} (user_id, {COLUMNAS_PRODUCTO})
+                SELECT {user_id}, {COLUMNAS_PRODUCTO} FROM {origen.productos} ORDER BY id
+            ''')
             
-            columnas_nuevas = [
-                ('modelo', 'TEXT'),
-                ('marca', 'TEXT'), 
-                ('estado', 'TEXT'),
-                ('año_adquisicion', 'INTEGER')
-            ]
+            # Los productos reciben ids nuevos: los movimientos se enlazan por código
+            cursor.execute(f'''
+                INSERT INTO {destino.movimientos} (user_id, producto_id, tipo, cantidad, motivo, fecha)
+                SELECT {user_id}, nuevo.id, m.tipo, m.cantidad, m.motivo, m.fecha
+                FROM {origen.movimientos} m
+                LEFT JOIN {origen.productos} viejo ON viejo.id = m.producto_id
+                LEFT JOIN {destino.productos} nuevo ON nuevo.user_id = {user_id} AND nuevo.codigo = viejo.codigo
+                ORDER BY m.id
+            ''')
             
-            for columna, tipo in columnas_nuevas:
-                if columna not in columnas_existentes:
-                    cursor.execute(f"ALTER TABLE productos_{user_id} ADD COLUMN {columna} {tipo}")
-                    print(f"✅ Columna {columna} agregada a productos_{user_id}")
+            # Los cortes de existencias siguen a sus productos por código; los de
+            # productos ya eliminados quedan con el id en negativo para no chocar
+            cursor.execute('UPDATE cortes_existencias_productos SET producto_id = -producto_id WHERE user_id = ?',
+                           (user_id,))
+            cursor.execute(f'''
+                UPDATE cortes_existencias_productos SET producto_id = IFNULL((
+                    SELECT nuevo.id FROM {destino.productos} nuevo
+                    WHERE nuevo.user_id = {user_id} AND nuevo.codigo = cortes_existencias_productos.codigo
+                ), producto_id)
+                WHERE user_id = ?
+            ''', (user_id,))
+            # Los ajustes, por el código del producto original (los eliminados ya no tienen)
+            nuevo_id = f'''(
+                SELECT nuevo.id FROM {origen.productos} viejo
+                JOIN {destino.productos} nuevo ON nuevo.user_id = {user_id} AND nuevo.codigo = viejo.codigo
+                WHERE viejo.id = -ajustes_existencias.producto_id
+            )'''
+            cursor.execute('UPDATE ajustes_existencias SET producto_id = -producto_id WHERE user_id = ?', (user_id,))
+            cursor.execute(f'DELETE FROM ajustes_existencias WHERE user_id = ? AND {nuevo_id} IS NULL', (user_id,))
+            cursor.execute(f'UPDATE ajustes_existencias SET producto_id = {nuevo_id} WHERE user_id = ?', (user_id,))
             
-            conn.commit()
-            conn.close()
-            return True
+            self._bloquear_tablas_migradas(cursor, origen)
+        
+        self._reconstruir_resumen(cursor, destino)
+        # Los productos migrados tienen ids nuevos
+        self._incrementar_version_datos(cursor, user_id)
+        cursor.execute('''
+            INSERT INTO schema_version (user_id, version, almacenamiento, migrado_en)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(user_id) DO UPDATE SET
+                almacenamiento = excluded.almacenamiento,
+                migrado_en = excluded.migrado_en,
+                fecha_actualizacion = CURRENT_TIMESTAMP
+        ''', (user_id, VERSION_ESQUEMA_USUARIO, COMPARTIDO))
+        return True
+    
+    def _bloquear_tablas_migradas(self, cursor, tablas):
+        """Rechazar escrituras de procesos que aún no notaron la migración (ver TTL_ESQUEMA)"""
+        for tabla in ('productos', 'movimientos'):
+            for operacion in ('INSERT', 'UPDATE', 'DELETE'):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {tablas.objeto(f'trg_{tabla}', f'migrado_{operacion.lower()}')}
+                    BEFORE {operacion} ON {getattr(tablas, tabla)}
+                    BEGIN
+                        SELECT RAISE(ABORT, 'datos del usuario {tablas.user_id} migrados al almacenamiento compartido');
+                    END
+                ''')
+    
+    def eliminar_tablas_migradas(self, gracia_segundos=3 * TTL_ESQUEMA):
+        """Borrar las tablas propias de los usuarios migrados hace más de gracia_segundos"""
+        try:
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT user_id FROM schema_version
+                    WHERE almacenamiento = ? AND migrado_en <= datetime('now', ?)
+                    ORDER BY user_id
+                ''', (COMPARTIDO, f'-{int(gracia_segundos)} seconds'))
+                candidatos = [row[0] for row in cursor.fetchall()]
+                
+                eliminados = []
+                for user_id in candidatos:
+                    tablas = TablasPorUsuario(user_id)
+                    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (tablas.productos,))
+                    if not cursor.fetchone():
+                        continue
+                    # Sus índices y triggers desaparecen con cada tabla
+                    cursor.execute(f'DROP TABLE IF EXISTS {tablas.busqueda}')
+                    cursor.execute(f'DROP TABLE IF EXISTS {tablas.diario}')
+                    cursor.execute(f'DROP TABLE IF EXISTS {tablas.movimientos}')
+                    cursor.execute(f'DROP TABLE IF EXISTS {tablas.productos}')
+                    eliminados.append(user_id)
+                
+                conn.commit()
+            return eliminados
         except Exception as e:
-            print(f"Error actualizando estructura de tablas: {e}")
-            return False
-
+            self.metricas.error_capturado(e)
+            print(f"Error eliminando tablas migradas: {e}")
+            return None
+    
     # ========== MÉTODOS PARA USUARIOS ==========
     
     def obtener_usuario_por_username(self, username):
         try:
-            conn = sqlite3.connect(self.db_name)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT * FROM usuarios WHERE username = ?', (username,))
-            usuario = cursor.fetchone()
-            conn.close()
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('SELECT * FROM usuarios WHERE username = ?', (username,))
+                usuario = cursor.fetchone()
             return dict(usuario) if usuario else None
         except Exception as e:
+            self.metricas.error_capturado(e)
             print(f"Error obteniendo usuario por username: {e}")
             return None
     
     def obtener_usuario_por_id(self, user_id):
         try:
-            conn = sqlite3.connect(self.db_name)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT * FROM usuarios WHERE id = ?', (user_id,))
-            usuario = cursor.fetchone()
-            conn.close()
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('SELECT * FROM usuarios WHERE id = ?', (user_id,))
+                usuario = cursor.fetchone()
             return dict(usuario) if usuario else None
         except Exception as e:
+            self.metricas.error_capturado(e)
             print(f"Error obteniendo usuario por ID: {e}")
             return None
     
+    def obtener_usuario_sesion(self, user_id):
+        """Datos de sesión del usuario (COLUMNAS_SESION_USUARIO), servidos desde la cache"""
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        
+        usuario = self.cache_usuarios.obtener(user_id)
+        if usuario is not None:
+            return usuario
+        
+        try:
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(f'SELECT {COLUMNAS_SESION_USUARIO} FROM usuarios WHERE id = ?', (user_id,))
+                fila = cursor.fetchone()
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error obteniendo usuario de la sesión: {e}")
+            return None
+        
+        if not fila:
+            return None
+        usuario = dict(fila)
+        self.cache_usuarios.guardar(user_id, usuario)
+        return usuario
+    
     def verificar_password(self, username, password):
+        """Usuario si la contraseña es correcta, None si no; lanza HashingSaturado si no hay cupo"""
         usuario = self.obtener_usuario_por_username(username)
-        if usuario and check_password_hash(usuario['password'], password):
-            return usuario
-        return None
+        if not usuario:
+            return None
+        
+        correcta, hash_nuevo = self.hashing.verificar(usuario['password'], password)
+        if not correcta:
+            return None
+        if hash_nuevo:
+            self._actualizar_hash_password(usuario['id'], usuario['password'], hash_nuevo)
+        return usuario
+    
+    def _actualizar_hash_password(self, user_id, hash_anterior, hash_nuevo):
+        """Guardar un hash rehecho con el método actual, salvo que la contraseña haya cambiado entretanto"""
+        try:
+            with self.pool.conexion() as conn:
+                conn.execute(
+                    'UPDATE usuarios SET password = ? WHERE id = ? AND password = ?',
+                    (hash_nuevo, user_id, hash_anterior)
+                )
+                conn.commit()
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error actualizando hash de contraseña del usuario {user_id}: {e}")
     
     def agregar_usuario(self, username, password, nombre, email=None, es_admin=True):
         try:
             if self.obtener_usuario_por_username(username):
                 return False, "El nombre de usuario ya existe"
             
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
+            # Antes de tomar una conexión: el hash tarda y no debe retenerla
+            password_hash = self.hashing.generar(password)
             
-            password_hash = generate_password_hash(password)
-            cursor.execute('''
-                INSERT INTO usuarios (username, password, nombre, email, es_admin)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (username, password_hash, nombre, email, 1 if es_admin else 0))
-            
-            user_id = cursor.lastrowid
-            
-            try:
-                cursor.execute(f'''
-                    CREATE TABLE IF NOT EXISTS productos_{user_id} (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        codigo TEXT UNIQUE NOT NULL,
-                        nombre TEXT NOT NULL,
-                        descripcion TEXT,
-                        ubicacion TEXT,
-                        modelo TEXT,
-                        marca TEXT,
-                        estado TEXT,
-                        año_adquisicion INTEGER,
-                        precio_compra REAL,
-                        stock_actual INTEGER DEFAULT 0,
-                        stock_minimo INTEGER DEFAULT 0,
-                        fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
                 
-                cursor.execute(f'''
-                    CREATE TABLE IF NOT EXISTS movimientos_{user_id} (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        producto_id INTEGER,
-                        tipo TEXT NOT NULL,
-                        cantidad INTEGER NOT NULL,
-                        motivo TEXT,
-                        fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (producto_id) REFERENCES productos_{user_id} (id)
-                    )
-                ''')
+                cursor.execute('''
+                    INSERT INTO usuarios (username, password, nombre, email, es_admin)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (username, password_hash, nombre, email, 1 if es_admin else 0))
+                
+                user_id = cursor.lastrowid
+                tablas = tablas_para(self.almacenamiento, user_id)
+                
+                try:
+                    self._preparar_esquema_usuario(cursor, tablas)
+                    self._registrar_version_esquema(cursor, tablas)
+                    
+                    print(f"✅ Usuario {username} (ID: {user_id}) creado con tablas exitosamente")
+                
+                except Exception as e:
+                    self.metricas.error_capturado(e)
+                    print(f"❌ Error creando tablas para usuario {user_id}: {e}")
+                    cursor.execute('DELETE FROM usuarios WHERE id = ?', (user_id,))
+                    conn.commit()
+                    self.cache_usuarios.invalidar(user_id)
+                    return False, "Error creando las tablas del usuario. Intenta nuevamente."
+                
+                conn.commit()
+            self._usuarios_al_dia[user_id] = (tablas, time.monotonic() + self.ttl_esquema)
+            return True, f"✅ Usuario {username} creado exitosamente"
+        
+        except sqlite3.IntegrityError:
+            return False, "El nombre de usuario ya existe"
+        except HashingSaturado:
+            return False, "El servidor está ocupado, intenta nuevamente en unos segundos"
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"❌ Error crítico agregando usuario: {e}")
+            return False, f"Error del sistema: {str(e)}"
+    
+    def asegurar_tablas_usuario(self, user_id):
+        try:
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                self._crear_tablas_usuario(cursor, self.tablas_usuario(user_id))
                 
-                print(f"✅ Usuario {username} (ID: {user_id}) creado con tablas exitosamente")
+                conn.commit()
+            return True
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error asegurando tablas para usuario {user_id}: {e}")
+            return False
+    
+    # ========== TOKENS DE LA API ==========
+    
+    @staticmethod
+    def _hash_token(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+    
+    def crear_token_api(self, user_id, nombre):
+        """Token nuevo para /api/v1; sólo se muestra ahora, en la base queda su hash"""
+        token = secrets.token_urlsafe(BYTES_TOKEN_API)
+        try:
+            with self.pool.conexion() as conn:
+                conn.execute(
+                    'INSERT INTO tokens_api (user_id, nombre, token_hash) VALUES (?, ?, ?)',
+                    (int(user_id), nombre, self._hash_token(token))
+                )
+                conn.commit()
+            return token
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error creando token de API para usuario {user_id}: {e}")
+            return None
+    
+    def obtener_tokens_api(self, user_id):
+        try:
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT id, nombre, fecha_creacion, ultimo_uso FROM tokens_api
+                    WHERE user_id = ? ORDER BY id
+                ''', (int(user_id),))
+                return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error obteniendo tokens de API del usuario {user_id}: {e}")
+            return []
+    
+    def revocar_token_api(self, user_id, token_id):
+        try:
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
                 
-            except Exception as e:
-                print(f"❌ Error creando tablas para usuario {user_id}: {e}")
-                cursor.execute('DELETE FROM usuarios WHERE id = ?', (user_id,))
+                cursor.execute('DELETE FROM tokens_api WHERE user_id = ? AND id = ?', (int(user_id), token_id))
+                revocado = cursor.rowcount > 0
                 conn.commit()
-                conn.close()
-                return False, "Error creando las tablas del usuario. Intenta nuevamente."
-            
-            conn.commit()
-            conn.close()
-            return True, f"✅ Usuario {username} creado exitosamente"
-            
-        except sqlite3.IntegrityError:
-            return False, "El nombre de usuario ya existe"
+            return revocado
         except Exception as e:
-            print(f"❌ Error crítico agregando usuario: {e}")
-            return False, f"Error del sistema: {str(e)}"
-
-    def asegurar_tablas_usuario(self, user_id):
+            self.metricas.error_capturado(e)
+            print(f"Error revocando token de API del usuario {user_id}: {e}")
+            return False
+    
+    def obtener_usuario_por_token(self, token):
+        """Datos de sesión (COLUMNAS_SESION_USUARIO) del dueño del token, o None"""
+        if not token:
+            return None
         try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            
-            cursor.execute(f'''
-                CREATE TABLE IF NOT EXISTS productos_{user_id} (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    codigo TEXT UNIQUE NOT NULL,
-                    nombre TEXT NOT NULL,
-                    descripcion TEXT,
-                    ubicacion TEXT,
-                    modelo TEXT,
-                    marca TEXT,
-                    estado TEXT,
-                    año_adquisicion INTEGER,
-                    precio_compra REAL,
-                    stock_actual INTEGER DEFAULT 0,
-                    stock_minimo INTEGER DEFAULT 0,
-                    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            cursor.execute(f'''
-                CREATE TABLE IF NOT EXISTS movimientos_{user_id} (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        producto_id INTEGER,
-                        tipo TEXT NOT NULL,
-                        cantidad INTEGER NOT NULL,
-                        motivo TEXT,
-                        fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (producto_id) REFERENCES productos_{user_id} (id)
-                )
-            ''')
-            
-            conn.commit()
-            conn.close()
-            return True
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT id, user_id, ultimo_uso IS NULL OR ultimo_uso < datetime('now', ?) AS uso_antiguo
+                    FROM tokens_api WHERE token_hash = ?
+                ''', (f'-{INTERVALO_USO_TOKEN} seconds', self._hash_token(token)))
+                fila = cursor.fetchone()
+                if not fila:
+                    return None
+                
+                # El último uso se guarda como mucho una vez por INTERVALO_USO_TOKEN
+                if fila['uso_antiguo']:
+                    cursor.execute('UPDATE tokens_api SET ultimo_uso = CURRENT_TIMESTAMP WHERE id = ?', (fila['id'],))
+                    conn.commit()
+            return self.obtener_usuario_sesion(fila['user_id'])
         except Exception as e:
-            print(f"Error asegurando tablas para usuario {user_id}: {e}")
-            return False
-
+            self.metricas.error_capturado(e)
+            print(f"Error verificando token de API: {e}")
+            return None
+    
     # ========== MÉTODOS PARA PRODUCTOS ==========
     
     def obtener_estadisticas(self, user_id):
         try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            
-            cursor.execute(f'SELECT COUNT(*) FROM productos_{user_id}')
-            total_productos = cursor.fetchone()[0]
-            
-            cursor.execute(f'SELECT COUNT(*) FROM movimientos_{user_id}')
-            total_movimientos = cursor.fetchone()[0]
+            # Los triggers del resumen forman parte del esquema del usuario
+            tablas = self.tablas_usuario(user_id)
             
-            cursor.execute(f'SELECT COUNT(*) FROM productos_{user_id} WHERE stock_actual < 30')
-            productos_bajos = cursor.fetchone()[0]
-            
-            cursor.execute(f'SELECT SUM(precio_compra * stock_actual) FROM productos_{user_id}')
-            valor_total = cursor.fetchone()[0] or 0
-            
-            cursor.execute(f'SELECT COUNT(*) FROM movimientos_{user_id} WHERE DATE(fecha) = DATE("now")')
-            movimientos_hoy = cursor.fetchone()[0]
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                resumen = self._leer_resumen(cursor, user_id)
+                if resumen is None:
+                    self._reconstruir_resumen(cursor, tablas)
+                    conn.commit()
+                    resumen = self._leer_resumen(cursor, user_id)
             
-            conn.close()
+            total_productos = resumen['total_productos']
+            total_movimientos = resumen['total_movimientos']
+            productos_bajos = resumen['productos_bajos']
+            valor_total = resumen['valor_total'] or 0
+            movimientos_hoy = resumen['movimientos_hoy']
             
             return {
                 'total_productos': total_productos,
@@ -319,6 +1742,7 @@ class SistemaInventario:
                 'movimientos_hoy': movimientos_hoy
             }
         except Exception as e:
+            self.metricas.error_capturado(e)
             print(f"Error al obtener estadísticas del usuario {user_id}: {e}")
             return {
                 'total_productos': 0,
@@ -332,264 +1756,953 @@ class SistemaInventario:
     
     def obtener_productos_stock_bajo(self, user_id):
         try:
-            conn = sqlite3.connect(self.db_name)
-            conn.row_factory = sqlite3.Row
+            return self._memorizado('obtener_productos_stock_bajo', user_id, (), self._calcular_productos_stock_bajo)
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error al obtener productos bajos en stock del usuario {user_id}: {e}")
+            return []
+    
+    def _calcular_productos_stock_bajo(self, tablas):
+        with self.pool.conexion() as conn:
             cursor = conn.cursor()
             
+            # El índice parcial de alertas sólo contiene los productos en alerta, ya ordenados
             cursor.execute(f'''
-                SELECT * FROM productos_{user_id} 
-                WHERE stock_actual < 30
-                ORDER BY stock_actual ASC
+                SELECT * FROM {tablas.productos}
+                WHERE {tablas.filtro()} AND alerta_desde IS NOT NULL
+                ORDER BY stock_actual, id
             ''')
-            productos = [dict(row) for row in cursor.fetchall()]
-            conn.close()
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def obtener_estado_dashboard(self, user_id):
+        """(versión de datos, estadísticas, productos con stock bajo) para los eventos en vivo"""
+        version = self.obtener_version_datos(user_id)
+        columnas = [columna.strip() for columna in COLUMNAS_EVENTO_PRODUCTO.split(',')]
+        bajos = [{columna: producto[columna] for columna in columnas}
+                 for producto in self.obtener_productos_stock_bajo(user_id)]
+        return version, self.obtener_estadisticas(user_id), bajos
+    
+    def obtener_productos(self, user_id):
+        try:
+            tablas = self.tablas_usuario(user_id)
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(f'SELECT * FROM {tablas.productos} WHERE {tablas.filtro()} ORDER BY nombre')
+                productos = [dict(row) for row in cursor.fetchall()]
             return productos
         except Exception as e:
-            print(f"Error al obtener productos bajos en stock del usuario {user_id}: {e}")
+            self.metricas.error_capturado(e)
+            print(f"Error al obtener productos del usuario {user_id}: {e}")
             return []
     
-    def obtener_productos(self, user_id):
+    def obtener_productos_pagina(self, user_id, cursor_pagina=None, por_pagina=TAMANO_PAGINA):
+        """Productos ordenados por (nombre, id), una página a la vez"""
         try:
-            conn = sqlite3.connect(self.db_name)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute(f'SELECT * FROM productos_{user_id} ORDER BY nombre')
-            productos = [dict(row) for row in cursor.fetchall()]
-            conn.close()
+            tablas = self.tablas_usuario(user_id)
+            return self._obtener_pagina(
+                user_id,
+                f'SELECT * FROM {tablas.productos} WHERE {tablas.filtro()}',
+                [('nombre', 'nombre'), ('id', 'id')],
+                descendente=False,
+                campo_total='total_productos',
+                cursor_pagina=cursor_pagina,
+                por_pagina=por_pagina
+            )
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error al obtener página de productos del usuario {user_id}: {e}")
+            return PaginaKeyset([], 1, por_pagina, 0)
+    
+    def obtener_opciones_productos(self, user_id):
+        """Sólo las columnas que necesitan los selectores de producto"""
+        try:
+            tablas = self.tablas_usuario(user_id)
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(f'SELECT id, codigo, nombre, stock_actual FROM {tablas.productos} WHERE {tablas.filtro()} ORDER BY nombre')
+                productos = [dict(row) for row in cursor.fetchall()]
             return productos
         except Exception as e:
-            print(f"Error al obtener productos del usuario {user_id}: {e}")
+            self.metricas.error_capturado(e)
+            print(f"Error al obtener opciones de productos del usuario {user_id}: {e}")
             return []
     
     def obtener_producto_por_id(self, user_id, producto_id):
         try:
-            conn = sqlite3.connect(self.db_name)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute(f'SELECT * FROM productos_{user_id} WHERE id = ?', (producto_id,))
-            producto = cursor.fetchone()
-            conn.close()
+            tablas = self.tablas_usuario(user_id)
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(f'SELECT * FROM {tablas.productos} WHERE {tablas.filtro()} AND id = ?', (producto_id,))
+                producto = cursor.fetchone()
             return dict(producto) if producto else None
         except Exception as e:
+            self.metricas.error_capturado(e)
             print(f"Error al obtener producto del usuario {user_id}: {e}")
             return None
     
+    def obtener_producto_por_codigo(self, user_id, codigo):
+        try:
+            tablas = self.tablas_usuario(user_id)
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(f'SELECT * FROM {tablas.productos} WHERE {tablas.filtro()} AND codigo = ?', (codigo,))
+                producto = cursor.fetchone()
+            return dict(producto) if producto else None
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error al obtener producto por código del usuario {user_id}: {e}")
+            return None
+    
     def agregar_producto(self, user_id, codigo, nombre, descripcion, ubicacion, modelo, marca, estado, año_adquisicion, precio_compra, stock_actual, stock_minimo):
         try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            
-            cursor.execute(f'SELECT COUNT(*) FROM productos_{user_id} WHERE codigo = ?', (codigo,))
-            existe = cursor.fetchone()[0] > 0
-            
-            if existe:
-                conn.close()
-                return False, f"El código '{codigo}' ya existe en tu inventario"
-            
-            cursor.execute(f'''
-                INSERT INTO productos_{user_id} (codigo, nombre, descripcion, ubicacion, modelo, marca, estado, año_adquisicion, precio_compra, stock_actual, stock_minimo)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (codigo, nombre, descripcion, ubicacion, modelo, marca, estado, año_adquisicion, precio_compra, stock_actual, stock_minimo))
-            
-            conn.commit()
-            conn.close()
+            tablas = self.tablas_usuario(user_id)
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(f'SELECT COUNT(*) FROM {tablas.productos} WHERE {tablas.filtro()} AND codigo = ?', (codigo,))
+                existe = cursor.fetchone()[0] > 0
+                
+                if existe:
+                    return False, f"El código '{codigo}' ya existe en tu inventario"
+                
+                cursor.execute(f'''
+                    INSERT INTO {tablas.productos} ({tablas.columna_usuario}codigo, nombre, descripcion, ubicacion, modelo, marca, estado, año_adquisicion, precio_compra, stock_actual, stock_minimo)
+                    VALUES ({tablas.valor_usuario}?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (codigo, nombre, descripcion, ubicacion, modelo, marca, estado, año_adquisicion, precio_compra, stock_actual, stock_minimo))
+                self._incrementar_version_datos(cursor, user_id)
+                
+                conn.commit()
+            self.eventos.avisar(user_id)
             return True, "Producto agregado correctamente"
-            
+        
         except sqlite3.IntegrityError:
             return False, f"El código '{codigo}' ya existe en tu inventario"
         except Exception as e:
+            self.metricas.error_capturado(e)
             print(f"Error agregando producto para usuario {user_id}: {e}")
             return False, f"Error del sistema: {str(e)}"
     
     def actualizar_producto(self, user_id, producto_id, codigo, nombre, descripcion, ubicacion, modelo, marca, estado, año_adquisicion, precio_compra, stock_actual, stock_minimo):
         try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            
-            cursor.execute(f'SELECT COUNT(*) FROM productos_{user_id} WHERE codigo = ? AND id != ?', (codigo, producto_id))
-            existe = cursor.fetchone()[0] > 0
-            
-            if existe:
-                conn.close()
-                return False, f"El código '{codigo}' ya existe para otro producto"
-            
-            cursor.execute(f'''
-                UPDATE productos_{user_id} 
-                SET codigo=?, nombre=?, descripcion=?, ubicacion=?, modelo=?, marca=?, estado=?, año_adquisicion=?, precio_compra=?, stock_actual=?, stock_minimo=?
-                WHERE id=?
-            ''', (codigo, nombre, descripcion, ubicacion, modelo, marca, estado, año_adquisicion, precio_compra, stock_actual, stock_minimo, producto_id))
-            
-            conn.commit()
-            conn.close()
+            tablas = self.tablas_usuario(user_id)
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(f'SELECT COUNT(*) FROM {tablas.productos} WHERE {tablas.filtro()} AND codigo = ? AND id != ?', (codigo, producto_id))
+                existe = cursor.fetchone()[0] > 0
+                
+                if existe:
+                    return False, f"El código '{codigo}' ya existe para otro producto"
+                
+                # El ajuste se anota antes del UPDATE, con el stock que éste reemplaza
+                self._registrar_ajustes_existencias(cursor, tablas, f'''
+                    SELECT id AS producto_id, ? - IFNULL(stock_actual, 0) AS cambio FROM {tablas.productos}
+                    WHERE {tablas.filtro()} AND id = ?
+                ''', (stock_actual, producto_id))
+                cursor.execute(f'''
+                    UPDATE {tablas.productos}
+                    SET codigo=?, nombre=?, descripcion=?, ubicacion=?, modelo=?, marca=?, estado=?, año_adquisicion=?, precio_compra=?, stock_actual=?, stock_minimo=?
+                    WHERE {tablas.filtro()} AND id=?
+                ''', (codigo, nombre, descripcion, ubicacion, modelo, marca, estado, año_adquisicion, precio_compra, stock_actual, stock_minimo, producto_id))
+                actualizados = cursor.rowcount
+                if actualizados:
+                    self._incrementar_version_datos(cursor, user_id)
+                
+                conn.commit()
             
-            if cursor.rowcount > 0:
+            if actualizados > 0:
+                self.eventos.avisar(user_id)
                 return True, "Producto actualizado correctamente"
             else:
                 return False, "Producto no encontrado"
-                
+        
         except Exception as e:
+            self.metricas.error_capturado(e)
             print(f"Error actualizando producto para usuario {user_id}: {e}")
             return False, f"Error al actualizar producto: {str(e)}"
     
     def eliminar_producto(self, user_id, producto_id):
         try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            
-            cursor.execute(f'DELETE FROM movimientos_{user_id} WHERE producto_id = ?', (producto_id,))
-            cursor.execute(f'DELETE FROM productos_{user_id} WHERE id = ?', (producto_id,))
-            
-            conn.commit()
-            conn.close()
-            return cursor.rowcount > 0
+            tablas = self.tablas_usuario(user_id)
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(f'DELETE FROM {tablas.movimientos} WHERE {tablas.filtro()} AND producto_id = ?', (producto_id,))
+                cursor.execute('DELETE FROM ajustes_existencias WHERE user_id = ? AND producto_id = ?', (tablas.user_id, producto_id))
+                cursor.execute(f'DELETE FROM {tablas.productos} WHERE {tablas.filtro()} AND id = ?', (producto_id,))
+                eliminado = cursor.rowcount > 0
+                self._incrementar_version_datos(cursor, user_id)
+                
+                conn.commit()
+            self.eventos.avisar(user_id)
+            return eliminado
         except Exception as e:
+            self.metricas.error_capturado(e)
             print(f"Error eliminando producto del usuario {user_id}: {e}")
             return False
-
+    
+    def importar_productos(self, user_id, archivo, formato='csv', tamano_lote=TAMANO_LOTE_IMPORTACION):
+        """Alta masiva de productos desde un archivo CSV o XLSX abierto en modo binario.
+        
+        Lee y valida el archivo en lotes y los vuelca con executemany a una tabla
+        temporal de la conexión, sin tomar el bloqueo de escritura ni retener el
+        archivo en memoria. Después, en una sola transacción (BEGIN IMMEDIATE),
+        pasa la última fila de cada código a la tabla de productos (los códigos
+        que ya existen se actualizan y el cambio de su stock queda en
+        ajustes_existencias). Devuelve un informe con los contadores y los
+        errores de cada fila rechazada; si el archivo no se puede leer no se
+        guarda nada e informe['error'] lo explica.
+        """
+        informe = {'procesadas': 0, 'insertadas': 0, 'actualizadas': 0, 'errores': [], 'total_errores': 0, 'error': None}
+        try:
+            tablas = self.tablas_usuario(user_id)
+            columnas = ', '.join(CAMPOS_PRODUCTO)
+            
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('DROP TABLE IF EXISTS temp.importacion_productos')
+                cursor.execute(f'CREATE TEMP TABLE importacion_productos (fila INTEGER PRIMARY KEY, {columnas})')
+                try:
+                    # La lectura y la validación (lo lento) no retienen el bloqueo de escritura
+                    validas = self._volcar_importacion(cursor, archivo, formato, tamano_lote, informe)
+                    conn.commit()
+                    
+                    cursor.execute('BEGIN IMMEDIATE')
+                    try:
+                        self._guardar_importacion(cursor, tablas, validas, informe)
+                        self._incrementar_version_datos(cursor, user_id)
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+                finally:
+                    cursor.execute('DROP TABLE IF EXISTS temp.importacion_productos')
+                    conn.commit()
+            self.eventos.avisar(user_id)
+            
+            print(f"✅ Importación del usuario {user_id}: {informe['insertadas']} nuevos, "
+                  f"{informe['actualizadas']} actualizados, {informe['total_errores']} filas con errores")
+        
+        except UnicodeDecodeError:
+            informe.update(insertadas=0, actualizadas=0, error="El archivo CSV debe estar guardado en UTF-8")
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error importando productos del usuario {user_id}: {e}")
+            informe.update(insertadas=0, actualizadas=0, error=str(e))
+        return informe
+    
+    def _volcar_importacion(self, cursor, archivo, formato, tamano_lote, informe):
+        """Validar las filas del archivo y volcar las válidas a la tabla temporal; devuelve cuántas son"""
+        sql = f"INSERT INTO temp.importacion_productos ({', '.join(CAMPOS_PRODUCTO)}) VALUES ({', '.join('?' for _ in CAMPOS_PRODUCTO)})"
+        validas = 0
+        lote = []
+        for numero, datos in leer_filas(archivo, formato):
+            informe['procesadas'] += 1
+            producto, error = validar_producto(datos)
+            if error:
+                informe['total_errores'] += 1
+                if len(informe['errores']) < MAX_ERRORES_IMPORTACION:
+                    informe['errores'].append({'fila': numero, 'codigo': datos.get('codigo'), 'error': error})
+                continue
+            
+            lote.append(tuple(producto[campo] for campo in CAMPOS_PRODUCTO))
+            if len(lote) >= tamano_lote:
+                cursor.executemany(sql, lote)
+                validas += len(lote)
+                lote = []
+        if lote:
+            cursor.executemany(sql, lote)
+            validas += len(lote)
+        return validas
+    
+    def _guardar_importacion(self, cursor, tablas, validas, informe):
+        """Pasar la tabla temporal a los productos del usuario; la última fila de cada código es la que queda"""
+        ultimas = 'SELECT MAX(fila) FROM temp.importacion_productos GROUP BY codigo'
+        
+        # Cada fila de un código que ya existía (en la tabla o antes en el archivo) cuenta como actualización
+        cursor.execute(f'''
+            SELECT COUNT(*) FROM temp.importacion_productos i
+            WHERE i.fila IN ({ultimas})
+              AND NOT EXISTS (SELECT 1 FROM {tablas.productos} p WHERE {tablas.filtro('p')} AND p.codigo = i.codigo)
+        ''')
+        informe['insertadas'] = cursor.fetchone()[0]
+        informe['actualizadas'] = validas - informe['insertadas']
+        
+        # Cambio de stock de los productos que ya existían (uno creado hoy no tiene pasado)
+        self._registrar_ajustes_existencias(cursor, tablas, f'''
+            SELECT p.id AS producto_id, i.stock_actual - IFNULL(p.stock_actual, 0) AS cambio
+            FROM temp.importacion_productos i
+            JOIN {tablas.productos} p ON {tablas.filtro('p')} AND p.codigo = i.codigo
+            WHERE i.fila IN ({ultimas})
+        ''', ())
+        
+        columnas = ', '.join(CAMPOS_PRODUCTO)
+        cambios = ', '.join(f'{campo} = excluded.{campo}' for campo in CAMPOS_PRODUCTO if campo != 'codigo')
+        cursor.execute(f'''
+            INSERT INTO {tablas.productos} ({tablas.columna_usuario}{columnas})
+            SELECT {tablas.valor_usuario}{columnas} FROM temp.importacion_productos
+            WHERE fila IN ({ultimas})
+            ORDER BY fila
+            ON CONFLICT({tablas.clave_codigo}) DO UPDATE SET {cambios}
+        ''')
+    
+    def _registrar_ajustes_existencias(self, cursor, tablas, sql_cambios, params):
+        """Sumar al día de hoy los cambios de stock sin movimiento; sql_cambios da las columnas producto_id y cambio"""
+        cursor.execute(f'''
+            INSERT INTO ajustes_existencias (user_id, producto_id, dia, cambio)
+            SELECT {tablas.user_id}, producto_id, DATE('now'), cambio
+            FROM ({sql_cambios})
+            WHERE cambio != 0
+            ON CONFLICT (user_id, producto_id, dia) DO UPDATE SET cambio = cambio + excluded.cambio
+        ''', params)
+    
     # ========== MÉTODOS PARA MOVIMIENTOS ==========
     
     def obtener_movimientos(self, user_id):
         try:
-            conn = sqlite3.connect(self.db_name)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute(f'''
-                SELECT m.*, p.codigo as producto_codigo, p.nombre as producto_nombre 
-                FROM movimientos_{user_id} m 
-                LEFT JOIN productos_{user_id} p ON m.producto_id = p.id 
-                ORDER BY m.fecha DESC
-            ''')
-            movimientos = [dict(row) for row in cursor.fetchall()]
-            conn.close()
+            tablas = self.tablas_usuario(user_id)
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(f'''
+                    SELECT m.*, p.codigo as producto_codigo, p.nombre as producto_nombre
+                    FROM {tablas.movimientos} m
+                    LEFT JOIN {tablas.productos} p ON m.producto_id = p.id
+                    WHERE {tablas.filtro('m')}
+                    ORDER BY m.fecha DESC
+                ''')
+                movimientos = [dict(row) for row in cursor.fetchall()]
             return movimientos
         except Exception as e:
+            self.metricas.error_capturado(e)
             print(f"Error al obtener movimientos del usuario {user_id}: {e}")
             return []
     
+    def obtener_movimientos_pagina(self, user_id, cursor_pagina=None, por_pagina=TAMANO_PAGINA):
+        """Movimientos del más reciente al más antiguo por (fecha, id), una página a la vez"""
+        try:
+            tablas = self.tablas_usuario(user_id)
+            return self._obtener_pagina(
+                user_id,
+                f'''
+                    SELECT m.*, p.codigo as producto_codigo, p.nombre as producto_nombre
+                    FROM {tablas.movimientos} m
+                    LEFT JOIN {tablas.productos} p ON m.producto_id = p.id
+                    WHERE {tablas.filtro('m')}
+                ''',
+                [('m.fecha', 'fecha'), ('m.id', 'id')],
+                descendente=True,
+                campo_total='total_movimientos',
+                cursor_pagina=cursor_pagina,
+                por_pagina=por_pagina
+            )
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error al obtener página de movimientos del usuario {user_id}: {e}")
+            return PaginaKeyset([], 1, por_pagina, 0)
+    
     def agregar_movimiento(self, user_id, producto_id, tipo, cantidad, motivo):
+        """Un movimiento suelto es un lote de una línea (misma comprobación de stock en SQL)"""
+        exito, _ = self.agregar_movimientos_lote(user_id, [
+            {'producto_id': producto_id, 'tipo': tipo, 'cantidad': cantidad, 'motivo': motivo}
+        ])
+        return exito
+    
+    def agregar_movimientos_lote(self, user_id, lineas, motivo=''):
+        """Registrar varias líneas de movimiento en una sola transacción: todas o ninguna.
+        
+        Cada línea es un dict con producto_id (o codigo), tipo, cantidad y, opcionalmente,
+        motivo (si falta se usa el del lote). La transacción toma el bloqueo de escritura
+        al empezar (BEGIN IMMEDIATE) y el stock se comprueba en el propio UPDATE, así que
+        dos salidas simultáneas no pueden dejarlo negativo. Devuelve (exito, resultados)
+        con un resultado por línea: ok indica si la línea es válida y aplicado si
+        quedó guardada. Si alguna falla no se guarda ninguna: todas quedan con
+        aplicado=False y sin stock_actual (el que calcularon se deshizo).
+        """
+        resultados = []
         try:
-            conn = sqlite3.connect(self.db_name)
+            tablas = self.tablas_usuario(user_id)
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('BEGIN IMMEDIATE')
+                try:
+                    # Se siguen revisando las líneas tras un fallo para informar de todas
+                    for numero, linea in enumerate(lineas, start=1):
+                        resultados.append(self._aplicar_linea_movimiento(cursor, tablas, numero, linea, motivo))
+                    
+                    exito = bool(resultados) and all(resultado['ok'] for resultado in resultados)
+                    if exito:
+                        self._incrementar_version_datos(cursor, user_id)
+                        conn.commit()
+                    else:
+                        conn.rollback()
+                except Exception:
+                    conn.rollback()
+                    raise
+            if exito:
+                self.eventos.avisar(user_id)
+            return exito, self._marcar_aplicados(resultados, exito)
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error agregando movimientos para usuario {user_id}: {e}")
+            return False, self._marcar_aplicados(resultados, False)
+    
+    @staticmethod
+    def _marcar_aplicados(resultados, aplicado):
+        for resultado in resultados:
+            resultado['aplicado'] = aplicado
+            if not aplicado:
+                resultado['stock_actual'] = None
+        return resultados
+    
+    def _aplicar_linea_movimiento(self, cursor, tablas, numero, linea, motivo_lote):
+        resultado = {'linea': numero, 'producto_id': None, 'tipo': linea.get('tipo'),
+                     'cantidad': linea.get('cantidad'), 'ok': False, 'aplicado': False, 'stock_actual': None,
+                     'error': None}
+        
+        # Como en el formulario, sólo enteros: int() truncaría 1.5 y aceptaría True
+        cantidad = linea.get('cantidad')
+        if isinstance(cantidad, float) and cantidad.is_integer():
+            cantidad = int(cantidad)
+        elif isinstance(cantidad, str):
+            try:
+                cantidad = int(cantidad)
+            except ValueError:
+                pass
+        
+        if resultado['tipo'] not in TIPOS_MOVIMIENTO:
+            resultado['error'] = "Tipo de movimiento no válido (entrada o salida)"
+            return resultado
+        if isinstance(cantidad, bool) or not isinstance(cantidad, int):
+            resultado['error'] = "La cantidad debe ser un número entero"
+            return resultado
+        if cantidad <= 0:
+            resultado['error'] = "La cantidad debe ser mayor a 0"
+            return resultado
+        
+        producto_id = self._producto_de_linea(cursor, tablas, linea)
+        resultado['producto_id'] = producto_id
+        if producto_id is None:
+            resultado['error'] = "Producto no encontrado"
+            return resultado
+        
+        # Sólo se actualiza si el stock resultante no queda negativo
+        cambio = cantidad if resultado['tipo'] == 'entrada' else -cantidad
+        cursor.execute(f'''
+            UPDATE {tablas.productos} SET stock_actual = stock_actual + ?
+            WHERE {tablas.filtro()} AND id = ? AND stock_actual + ? >= 0
+            RETURNING stock_actual
+        ''', (cambio, producto_id, cambio))
+        fila = cursor.fetchone()
+        
+        if fila is None:
+            cursor.execute(f'SELECT stock_actual FROM {tablas.productos} WHERE {tablas.filtro()} AND id = ?', (producto_id,))
+            actual = cursor.fetchone()
+            resultado['error'] = f"Stock insuficiente (disponible: {actual[0]})" if actual else "Producto no encontrado"
+            return resultado
+        
+        cursor.execute(f'''
+            INSERT INTO {tablas.movimientos} ({tablas.columna_usuario}producto_id, tipo, cantidad, motivo)
+            VALUES ({tablas.valor_usuario}?, ?, ?, ?)
+        ''', (producto_id, resultado['tipo'], cantidad, linea.get('motivo') or motivo_lote))
+        
+        resultado.update(ok=True, cantidad=cantidad, stock_actual=fila[0])
+        return resultado
+    
+    def _producto_de_linea(self, cursor, tablas, linea):
+        """Id del producto de una línea, indicado por producto_id o por codigo"""
+        if linea.get('producto_id') not in (None, ''):
+            try:
+                return int(linea['producto_id'])
+            except (TypeError, ValueError):
+                return None
+        
+        codigo = str(linea.get('codigo') or '').strip()
+        if not codigo:
+            return None
+        cursor.execute(f'SELECT id FROM {tablas.productos} WHERE {tablas.filtro()} AND codigo = ?', (codigo,))
+        fila = cursor.fetchone()
+        return fila[0] if fila else None
+    
+    # ========== PAGINACIÓN POR CLAVE ==========
+    
+    def _obtener_pagina(self, user_id, sql_base, claves, descendente, campo_total, cursor_pagina, por_pagina):
+        """Paginación keyset: filtra por la clave del último elemento visto en lugar de usar OFFSET.
+        
+        sql_base ya incluye el WHERE que limita las filas al usuario; claves es una
+        lista de (expresión SQL, campo del resultado) que define el orden; el total
+        sale del resumen del inventario en lugar de un COUNT(*) por página.
+        """
+        por_pagina = max(1, int(por_pagina))
+        expresiones = ', '.join(expresion for expresion, _ in claves)
+        marcas = ', '.join('?' for _ in claves)
+        
+        posicion = decodificar_cursor(cursor_pagina)
+        if posicion and len(posicion[1]) != len(claves):
+            posicion = None
+        direccion, valores, pagina = posicion or ('sig', None, 1)
+        
+        # Hacia atrás se recorre en orden inverso y luego se da la vuelta al resultado
+        hacia_atras = direccion == 'ant'
+        orden_desc = descendente != hacia_atras
+        sql = sql_base
+        params = []
+        if valores is not None:
+            sql += f' AND ({expresiones}) {"<" if orden_desc else ">"} ({marcas})'
+            params.extend(valores)
+        sentido = 'DESC' if orden_desc else 'ASC'
+        sql += ' ORDER BY ' + ', '.join(f'{expresion} {sentido}' for expresion, _ in claves) + ' LIMIT ?'
+        params.append(por_pagina + 1)
+        
+        with self.pool.conexion() as conn:
             cursor = conn.cursor()
             
-            cursor.execute(f'SELECT stock_actual FROM productos_{user_id} WHERE id = ?', (producto_id,))
-            producto = cursor.fetchone()
-            
-            if not producto:
-                conn.close()
-                return False
-            
-            if tipo == 'salida':
-                stock_actual = producto[0]
-                if stock_actual < cantidad:
-                    conn.close()
-                    return False
-            
-            cursor.execute(f'''
-                INSERT INTO movimientos_{user_id} (producto_id, tipo, cantidad, motivo)
-                VALUES (?, ?, ?, ?)
-            ''', (producto_id, tipo, cantidad, motivo))
-            
-            if tipo == 'entrada':
-                cursor.execute(f'UPDATE productos_{user_id} SET stock_actual = stock_actual + ? WHERE id = ?', (cantidad, producto_id))
-            else:
-                cursor.execute(f'UPDATE productos_{user_id} SET stock_actual = stock_actual - ? WHERE id = ?', (cantidad, producto_id))
-            
-            conn.commit()
-            conn.close()
-            return True
-        except Exception as e:
-            print(f"Error agregando movimiento para usuario {user_id}: {e}")
-            return False
-
+            cursor.execute(sql, params)
+            items = [dict(row) for row in cursor.fetchall()]
+            resumen = self._leer_resumen(cursor, user_id)
+        
+        if not items and valores is not None:
+            # Los elementos de esa página desaparecieron: volver a la primera
+            return self._obtener_pagina(user_id, sql_base, claves, descendente, campo_total, None, por_pagina)
+        
+        hay_mas = len(items) > por_pagina
+        items = items[:por_pagina]
+        if hacia_atras:
+            items.reverse()
+        
+        clave_de = lambda item: [item[campo] for _, campo in claves]
+        if hacia_atras:
+            tiene_anterior, tiene_siguiente = hay_mas, True
+        else:
+            tiene_anterior, tiene_siguiente = valores is not None, hay_mas
+        pagina = max(1, pagina if not hacia_atras or hay_mas else 1)
+        
+        return PaginaKeyset(
+            items,
+            pagina,
+            por_pagina,
+            resumen[campo_total] if resumen else len(items),
+            codificar_cursor('ant', clave_de(items[0]), pagina - 1) if tiene_anterior and items else None,
+            codificar_cursor('sig', clave_de(items[-1]), pagina + 1) if tiene_siguiente and items else None
+        )
+    
     # ========== MÉTODOS PARA BÚSQUEDA Y CONSULTAS ==========
     
     def buscar_productos(self, user_id, query='', ubicacion=''):
         try:
-            conn = sqlite3.connect(self.db_name)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            sql = f'''
-                SELECT * FROM productos_{user_id} 
-                WHERE (codigo LIKE ? OR nombre LIKE ? OR descripcion LIKE ?)
-            '''
-            params = [f'%{query}%', f'%{query}%', f'%{query}%']
+            consulta_fts = self._consulta_fts(query) if self.fts_disponible else ''
             
-            if ubicacion:
-                sql += ' AND ubicacion = ?'
-                params.append(ubicacion)
-            
-            sql += ' ORDER BY nombre'
-            
-            cursor.execute(sql, params)
-            productos = [dict(row) for row in cursor.fetchall()]
-            conn.close()
+            tablas = self.tablas_usuario(user_id)
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                if consulta_fts:
+                    # Coincidencias por prefijo ordenadas por relevancia
+                    sql = f'''
+                        SELECT p.* FROM {tablas.busqueda} f
+                        JOIN {tablas.productos} p ON p.id = f.rowid
+                        WHERE {tablas.busqueda} MATCH ? AND {tablas.filtro('p')}
+                    '''
+                    params = [tablas.consulta_busqueda(consulta_fts)]
+                    pesos = ', '.join(map(str, tablas.pesos_busqueda(PESOS_BUSQUEDA)))
+                    orden = f' ORDER BY bm25({tablas.busqueda}, {pesos})'
+                elif query.strip() and not self.fts_disponible:
+                    sql = f'''
+                        SELECT * FROM {tablas.productos} p
+                        WHERE {tablas.filtro('p')} AND (codigo LIKE ? OR nombre LIKE ? OR descripcion LIKE ?)
+                    '''
+                    params = [f'%{query}%', f'%{query}%', f'%{query}%']
+                    orden = ' ORDER BY nombre'
+                else:
+                    # Sin texto que buscar: todos los productos (de la ubicación, si se indicó)
+                    sql = f'SELECT * FROM {tablas.productos} p WHERE {tablas.filtro("p")}'
+                    params = []
+                    orden = ' ORDER BY nombre'
+                
+                if ubicacion:
+                    sql += ' AND p.ubicacion = ?'
+                    params.append(ubicacion)
+                
+                sql += orden
+                
+                cursor.execute(sql, params)
+                productos = [dict(row) for row in cursor.fetchall()]
             return productos
         except Exception as e:
+            self.metricas.error_capturado(e)
             print(f"Error buscando productos del usuario {user_id}: {e}")
             return []
     
     def obtener_ubicaciones(self, user_id):
         try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            
-            cursor.execute(f'SELECT DISTINCT ubicacion FROM productos_{user_id} WHERE ubicacion IS NOT NULL AND ubicacion != "" ORDER BY ubicacion')
-            ubicaciones = [row[0] for row in cursor.fetchall()]
-            conn.close()
-            return ubicaciones
+            return self._memorizado('obtener_ubicaciones', user_id, (), self._calcular_ubicaciones)
         except Exception as e:
+            self.metricas.error_capturado(e)
             print(f"Error obteniendo ubicaciones del usuario {user_id}: {e}")
             return []
-
+    
+    def _calcular_ubicaciones(self, tablas):
+        with self.pool.conexion() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(f'SELECT DISTINCT ubicacion FROM {tablas.productos} WHERE {tablas.filtro()} AND ubicacion IS NOT NULL AND ubicacion != "" ORDER BY ubicacion')
+            return [row[0] for row in cursor.fetchall()]
+    
     # ========== MÉTODOS PARA REPORTES ==========
     
     def obtener_reporte_stock(self, user_id):
         try:
-            conn = sqlite3.connect(self.db_name)
-            conn.row_factory = sqlite3.Row
+            return self._memorizado('obtener_reporte_stock', user_id, (), self._calcular_reporte_stock)
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error generando reporte stock del usuario {user_id}: {e}")
+            return []
+    
+    def _calcular_reporte_stock(self, tablas):
+        with self.pool.conexion() as conn:
             cursor = conn.cursor()
             
             cursor.execute(f'''
-                SELECT 
+                SELECT
                     COALESCE(ubicacion, 'Sin ubicación') as ubicacion,
                     COUNT(*) as total_productos,
                     SUM(stock_actual) as total_stock,
                     ROUND(SUM(precio_compra * stock_actual), 2) as valor_total
-                FROM productos_{user_id} 
+                FROM {tablas.productos}
+                WHERE {tablas.filtro()}
                 GROUP BY ubicacion
                 ORDER BY valor_total DESC
             ''')
-            reporte = [dict(row) for row in cursor.fetchall()]
-            conn.close()
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def obtener_reporte_movimientos(self, user_id, desde=None, hasta=None, agrupacion='dia', producto_id=None):
+        """Movimientos y cantidad por periodo y tipo, del más reciente al más antiguo.
+        
+        desde/hasta son fechas AAAA-MM-DD incluidas (por defecto los últimos
+        DIAS_REPORTE_MOVIMIENTOS días) y agrupacion una clave de AGRUPACIONES_REPORTE;
+        'fecha' es el primer día de cada periodo. Se lee del resumen diario, de
+        las filas de producto_id o de las de todos los productos.
+        """
+        if agrupacion not in AGRUPACIONES_REPORTE:
+            raise ValueError(f"Agrupación desconocida: {agrupacion}")
+        # Los movimientos se fechan con CURRENT_TIMESTAMP, en UTC
+        hasta = hasta or datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+        desde = desde or (datetime.date.fromisoformat(hasta) - datetime.timedelta(days=DIAS_REPORTE_MOVIMIENTOS - 1)).isoformat()
+        
+        try:
+            tablas = self.tablas_usuario(user_id)
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(f'''
+                    SELECT
+                        {AGRUPACIONES_REPORTE[agrupacion]} as fecha,
+                        tipo,
+                        SUM(total_movimientos) as total_movimientos,
+                        SUM(total_cantidad) as total_cantidad
+                    FROM {tablas.diario}
+                    WHERE {tablas.filtro()} AND producto_id = ? AND dia BETWEEN ? AND ?
+                    GROUP BY fecha, tipo
+                    ORDER BY fecha DESC, tipo
+                ''', (PRODUCTO_TODOS if producto_id is None else producto_id, desde, hasta))
+                reporte = [dict(row) for row in cursor.fetchall()]
             return reporte
         except Exception as e:
-            print(f"Error generando reporte stock del usuario {user_id}: {e}")
+            self.metricas.error_capturado(e)
+            print(f"Error generando reporte movimientos del usuario {user_id}: {e}")
             return []
     
-    def obtener_reporte_movimientos(self, user_id):
+    # ========== EXISTENCIAS EN UNA FECHA ==========
+    
+    def generar_cortes_existencias(self, dia=None, user_ids=None, conservar_dias=DIAS_CORTES_DIARIOS):
+        """Guardar el stock y el precio de cada producto al cierre de `dia` (por defecto ayer, en UTC).
+        
+        El cierre es el stock actual menos los cambios de los días posteriores
+        (resumen diario de movimientos y ajustes_existencias, que anota lo que
+        se cambia al editar o importar productos), así que el corte de ayer se
+        puede tomar en cualquier momento de hoy; volver a generarlo lo reemplaza.
+        Cada usuario va en su propia transacción y poda sus cortes de más de
+        conservar_dias días, salvo el último de cada mes. Devuelve ({user_id: productos}, {user_id: error}).
+        """
+        hoy = datetime.datetime.now(datetime.timezone.utc).date()
+        dia = datetime.date.fromisoformat(dia).isoformat() if dia else (hoy - datetime.timedelta(days=1)).isoformat()
+        generados, fallidos = {}, {}
+        for user_id in user_ids if user_ids is not None else self.obtener_ids_usuarios():
+            try:
+                tablas = self.tablas_usuario(user_id)
+                with self.pool.conexion() as conn:
+                    cursor = conn.cursor()
+                    
+                    cursor.execute('BEGIN IMMEDIATE')
+                    try:
+                        generados[tablas.user_id] = self._generar_corte_existencias(cursor, tablas, dia)
+                        self._podar_cortes_existencias(cursor, tablas.user_id, dia, conservar_dias)
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+            except Exception as e:
+                self.metricas.error_capturado(e)
+                print(f"Error generando el corte de existencias del usuario {user_id}: {e}")
+                fallidos[int(user_id)] = str(e)
+        return generados, fallidos
+    
+    def _generar_corte_existencias(self, cursor, tablas, dia):
+        cursor.execute('DELETE FROM cortes_existencias_productos WHERE user_id = ? AND dia = ?', (tablas.user_id, dia))
+        # Los productos creados después del cierre no entran en el corte
+        cursor.execute(f'''
+            INSERT INTO cortes_existencias_productos
+                (user_id, dia, producto_id, codigo, nombre, ubicacion, stock, precio_compra)
+            SELECT {tablas.user_id}, :dia, p.id, p.codigo, p.nombre, p.ubicacion,
+                   IFNULL(p.stock_actual, 0) - {self._sql_cambio_stock(tablas, 'p.id', ':dia', "'9999-12-31'")},
+                   p.precio_compra
+            FROM {tablas.productos} p
+            WHERE {tablas.filtro('p')} AND IFNULL(DATE(p.fecha_creacion) <= :dia, 1)
+        ''', {'dia': dia})
+        cursor.execute('''
+            INSERT OR REPLACE INTO cortes_existencias (user_id, dia, productos, total_stock, valor_total)
+            SELECT ?, ?, COUNT(*), IFNULL(SUM(stock), 0), IFNULL(SUM(precio_compra * stock), 0)
+            FROM cortes_existencias_productos WHERE user_id = ? AND dia = ?
+        ''', (tablas.user_id, dia, tablas.user_id, dia))
+        cursor.execute('SELECT productos FROM cortes_existencias WHERE user_id = ? AND dia = ?', (tablas.user_id, dia))
+        return cursor.fetchone()[0]
+    
+    def _sql_cambio_stock(self, tablas, producto, desde, hasta):
+        """Expresión SQL del cambio de stock de `producto` en los días (desde, hasta]: resumen diario más ajustes"""
+        return f'''(IFNULL((
+            SELECT SUM({CAMBIO_STOCK_DIARIO.format(fila='d')}) FROM {tablas.diario} d
+            WHERE {tablas.filtro('d')} AND d.producto_id = {producto} AND d.dia > {desde} AND d.dia <= {hasta}
+        ), 0) + IFNULL((
+            SELECT SUM(a.cambio) FROM ajustes_existencias a
+            WHERE a.user_id = {tablas.user_id} AND a.producto_id = {producto} AND a.dia > {desde} AND a.dia <= {hasta}
+        ), 0))'''
+    
+    def _podar_cortes_existencias(self, cursor, user_id, dia, conservar_dias):
+        """Borrar los cortes anteriores a dia - conservar_dias que no son el último de su mes"""
+        limite = (datetime.date.fromisoformat(dia) - datetime.timedelta(days=conservar_dias)).isoformat()
+        cursor.execute('SELECT dia FROM cortes_existencias WHERE user_id = ? AND dia < ? ORDER BY dia', (user_id, limite))
+        dias = [fila[0] for fila in cursor.fetchall()]
+        ultimos_del_mes = {dia[:7]: dia for dia in dias}
+        for viejo in dias:
+            if ultimos_del_mes[viejo[:7]] != viejo:
+                cursor.execute('DELETE FROM cortes_existencias_productos WHERE user_id = ? AND dia = ?', (user_id, viejo))
+                cursor.execute('DELETE FROM cortes_existencias WHERE user_id = ? AND dia = ?', (user_id, viejo))
+    
+    def obtener_stock_en_fecha(self, user_id, fecha=None):
+        """Existencias y valor de cada producto al cierre del día `fecha` (AAAA-MM-DD en UTC, por defecto ayer).
+        
+        Parte del último corte anterior o igual a la fecha y le suma los cambios
+        de los días siguientes (resumen diario y ajustes_existencias), así que el
+        coste depende de los días entre cortes y no del historial. Los productos
+        que no están en ese corte (creados después, o anteriores al primer
+        corte) parten del corte siguiente y restan los cambios hasta él o, si
+        tampoco están en ese corte, de su stock actual y restan todos los
+        cambios posteriores a la fecha. Cada producto se valora con el
+        precio del corte del que parte; los eliminados después del corte
+        aparecen con eliminado=True. Devuelve None si la consulta falla.
+        """
+        if fecha:
+            fecha = datetime.date.fromisoformat(fecha).isoformat()
+        else:
+            fecha = (datetime.datetime.now(datetime.timezone.utc).date() - datetime.timedelta(days=1)).isoformat()
+        
         try:
-            conn = sqlite3.connect(self.db_name)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            tablas = self.tablas_usuario(user_id)
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                # Cortes, productos y resumen diario leídos en la misma transacción
+                cursor.execute('BEGIN')
+                try:
+                    cursor.execute('SELECT MAX(dia) FROM cortes_existencias WHERE user_id = ? AND dia <= ?',
+                                   (tablas.user_id, fecha))
+                    anterior = cursor.fetchone()[0]
+                    cursor.execute('SELECT MIN(dia) FROM cortes_existencias WHERE user_id = ? AND dia > ?',
+                                   (tablas.user_id, fecha))
+                    siguiente = cursor.fetchone()[0]
+                    
+                    parametros = {'user_id': tablas.user_id, 'fecha': fecha, 'anterior': anterior, 'siguiente': siguiente}
+                    
+                    # Hacia delante desde el corte anterior
+                    cursor.execute(f'''
+                        SELECT c.producto_id, c.codigo, c.nombre, c.ubicacion, c.precio_compra,
+                               c.stock + {self._sql_cambio_stock(tablas, 'c.producto_id', ':anterior', ':fecha')} AS stock,
+                               p.id IS NULL AS eliminado
+                        FROM cortes_existencias_productos c
+                        LEFT JOIN {tablas.productos} p ON {tablas.filtro('p')} AND p.id = c.producto_id
+                        WHERE c.user_id = :user_id AND c.dia = :anterior
+                    ''', parametros)
+                    productos = [dict(row) for row in cursor.fetchall()]
+                    
+                    # Hacia atrás desde el corte siguiente (s.dia) o, si el producto no está
+                    # en él, desde el stock actual restando todos los cambios posteriores
+                    cursor.execute(f'''
+                        SELECT p.id AS producto_id, p.codigo, p.nombre, p.ubicacion,
+                               CASE WHEN s.producto_id IS NULL THEN p.precio_compra ELSE s.precio_compra END AS precio_compra,
+                               CASE WHEN s.producto_id IS NULL THEN IFNULL(p.stock_actual, 0) ELSE s.stock END
+                                   - {self._sql_cambio_stock(tablas, 'p.id', ':fecha', "IFNULL(s.dia, '9999-12-31')")} AS stock,
+                               0 AS eliminado
+                        FROM {tablas.productos} p
+                        LEFT JOIN cortes_existencias_productos s
+                            ON s.user_id = :user_id AND s.dia = :siguiente AND s.producto_id = p.id
+                        WHERE {tablas.filtro('p')} AND IFNULL(DATE(p.fecha_creacion) <= :fecha, 1)
+                          AND NOT EXISTS (
+                              SELECT 1 FROM cortes_existencias_productos a
+                              WHERE a.user_id = :user_id AND a.dia = :anterior AND a.producto_id = p.id
+                          )
+                    ''', parametros)
+                    productos += [dict(row) for row in cursor.fetchall()]
+                finally:
+                    conn.rollback()
             
-            cursor.execute(f'''
-                SELECT 
-                    DATE(fecha) as fecha,
-                    tipo,
-                    COUNT(*) as total_movimientos,
-                    SUM(cantidad) as total_cantidad
-                FROM movimientos_{user_id} 
-                GROUP BY DATE(fecha), tipo
-                ORDER BY fecha DESC
-                LIMIT 30
-            ''')
-            reporte = [dict(row) for row in cursor.fetchall()]
-            conn.close()
-            return reporte
+            for producto in productos:
+                producto['eliminado'] = bool(producto['eliminado'])
+                producto['valor'] = round((producto['precio_compra'] or 0) * producto['stock'], 2)
+            productos.sort(key=lambda producto: (producto['codigo'] or '', producto['producto_id']))
+            return {
+                'fecha': fecha,
+                'corte': anterior,
+                'corte_siguiente': siguiente,
+                'productos': productos,
+                'total_stock': sum(producto['stock'] for producto in productos),
+                'valor_total': round(sum(producto['valor'] for producto in productos), 2),
+            }
         except Exception as e:
-            print(f"Error generando reporte movimientos del usuario {user_id}: {e}")
-            return []
\ No newline at end of file
+            self.metricas.error_capturado(e)
+            print(f"Error calculando existencias en {fecha} del usuario {user_id}: {e}")
+            return None
+    
+    def verificar_stock_en_fecha(self, user_id, fecha=None):
+        """Comparar obtener_stock_en_fecha con una reproducción completa de los movimientos.
+        
+        La reproducción no usa cortes ni el resumen diario: al stock actual de
+        cada producto le resta sus movimientos (de la tabla de movimientos) y
+        sus ajustes sin movimiento (ajustes_existencias) posteriores al cierre
+        de la fecha. Una diferencia indica un corte o un resumen desviado, o
+        stock cambiado fuera de la aplicación después del corte. Los productos
+        eliminados se omiten (sus movimientos se borraron con ellos).
+        Devuelve {'existencias', 'comparados', 'omitidos', 'diferencias'} o None.
+        """
+        existencias = self.obtener_stock_en_fecha(user_id, fecha)
+        if existencias is None:
+            return None
+        
+        try:
+            tablas = self.tablas_usuario(user_id)
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(f'''
+                    SELECT p.id, p.codigo, IFNULL(p.stock_actual, 0) - IFNULL(m.posterior, 0) - IFNULL(a.posterior, 0) AS stock
+                    FROM {tablas.productos} p
+                    LEFT JOIN (
+                        SELECT producto_id, SUM(CASE tipo WHEN 'entrada' THEN cantidad ELSE -cantidad END) AS posterior
+                        FROM {tablas.movimientos}
+                        WHERE {tablas.filtro()} AND DATE(fecha) > :fecha
+                        GROUP BY producto_id
+                    ) m ON m.producto_id = p.id
+                    LEFT JOIN (
+                        SELECT producto_id, SUM(cambio) AS posterior
+                        FROM ajustes_existencias
+                        WHERE user_id = :user_id AND dia > :fecha
+                        GROUP BY producto_id
+                    ) a ON a.producto_id = p.id
+                    WHERE {tablas.filtro('p')} AND IFNULL(DATE(p.fecha_creacion) <= :fecha, 1)
+                ''', {'fecha': existencias['fecha'], 'user_id': tablas.user_id})
+                reproducidos = {fila['id']: dict(fila) for fila in cursor.fetchall()}
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error reproduciendo movimientos del usuario {user_id}: {e}")
+            return None
+        
+        diferencias = []
+        comparados = omitidos = 0
+        for producto in existencias['productos']:
+            reproducido = reproducidos.pop(producto['producto_id'], None)
+            if producto['eliminado'] or reproducido is None:
+                omitidos += 1
+                continue
+            comparados += 1
+            if producto['stock'] != reproducido['stock']:
+                diferencias.append({'producto_id': producto['producto_id'], 'codigo': producto['codigo'],
+                                    'stock_corte': producto['stock'], 'stock_reproducido': reproducido['stock']})
+        # Productos que la consulta por cortes no devolvió
+        for producto_id, reproducido in reproducidos.items():
+            diferencias.append({'producto_id': producto_id, 'codigo': reproducido['codigo'],
+                                'stock_corte': None, 'stock_reproducido': reproducido['stock']})
+        return {'existencias': existencias, 'comparados': comparados, 'omitidos': omitidos, 'diferencias': diferencias}
+    
+    # ========== EXPORTACIÓN ==========
+    
+    def exportar_productos(self, user_id, tamano_lote=TAMANO_LOTE_EXPORTACION):
+        """Generador de lotes de productos (tuplas en el orden de COLUMNAS_EXPORTACION_PRODUCTOS)"""
+        tablas = self._tablas_exportacion(user_id)
+        columnas = ', '.join(COLUMNAS_EXPORTACION_PRODUCTOS)
+        # Por código: el índice único (user_id, codigo) da el orden sin ordenar aparte
+        sql = f'SELECT {columnas} FROM {tablas.productos} WHERE {tablas.filtro()} ORDER BY codigo'
+        yield from self._recorrer_por_lotes(user_id, sql, [], tamano_lote)
+    
+    def exportar_movimientos(self, user_id, desde=None, hasta=None, producto_id=None, tamano_lote=TAMANO_LOTE_EXPORTACION):
+        """Generador de lotes de movimientos en orden cronológico, con el código y nombre del producto.
+        
+        desde y hasta son fechas 'AAAA-MM-DD' inclusivas; producto_id limita a un producto.
+        """
+        tablas = self._tablas_exportacion(user_id)
+        sql = f'''
+            SELECT m.id, m.fecha, m.tipo, m.cantidad, m.motivo, m.producto_id,
+                   p.codigo as producto_codigo, p.nombre as producto_nombre
+            FROM {tablas.movimientos} m
+            LEFT JOIN {tablas.productos} p ON m.producto_id = p.id
+            WHERE {tablas.filtro('m')}
+        '''
+        params = []
+        if desde:
+            sql += ' AND m.fecha >= ?'
+            params.append(desde)
+        if hasta:
+            sql += " AND m.fecha < DATE(?, '+1 day')"
+            params.append(hasta)
+        if producto_id is not None:
+            sql += ' AND m.producto_id = ?'
+            params.append(producto_id)
+        sql += ' ORDER BY m.fecha, m.id'
+        yield from self._recorrer_por_lotes(user_id, sql, params, tamano_lote)
+    
+    def _tablas_exportacion(self, user_id):
+        """Tablas del usuario; un error se registra y se propaga, como en _recorrer_por_lotes"""
+        try:
+            return self.tablas_usuario(user_id)
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error exportando datos del usuario {user_id}: {e}")
+            raise
+    
+    def _recorrer_por_lotes(self, user_id, sql, params, tamano_lote):
+        """Leer con fetchmany de un cursor abierto durante todo el recorrido.
+        
+        La conexión vuelve al pool cuando el generador se agota o se cierra
+        (Werkzeug lo cierra al terminar o cortarse la respuesta). Un error a
+        mitad del recorrido se registra y se propaga: con la respuesta ya
+        empezada el servidor corta la conexión sin terminar el cuerpo, así el
+        cliente no toma un archivo truncado por una exportación completa.
+        """
+        try:
+            with self.pool.conexion() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(sql, params)
+                while True:
+                    filas = cursor.fetchmany(tamano_lote)
+                    if not filas:
+                        break
+                    yield [tuple(fila) for fila in filas]
+        except Exception as e:
+            self.metricas.error_capturado(e)
+            print(f"Error exportando datos del usuario {user_id}: {e}")
+            raise
@@ -0,0 +1,242 @@
+"""Eventos en vivo del dashboard (Server-Sent Events) con un hub por proceso.
+
+Cada navegador con /dashboard abierto tiene una Suscripcion: una cola acotada
+de eventos ya serializados. Las escrituras de SistemaInventario sólo avisan a
+la CentralEventos; un único hilo vigilante por proceso lee la versión de datos
+(version_datos) de los usuarios con suscriptores, calcula el estado de los que
+cambiaron y reparte a sus suscriptores las diferencias: estadísticas que
+cambiaron y productos que entran, salen o cambian dentro del stock bajo. La
+misma comprobación periódica detecta las escrituras hechas en otros workers.
+
+Un suscriptor que no vacía su cola a tiempo se descarta: su conexión se
+cierra y el navegador, al reconectar, recibe el estado completo.
+"""
+import collections
+import json
+import threading
+
+# Eventos pendientes por suscriptor antes de descartarlo por lento
+CAPACIDAD_COLA_EVENTOS = 32
+
+# Suscriptores por proceso (cada conexión abierta ocupa un hilo del servidor)
+MAX_SUSCRIPTORES = 100
+
+# Segundos entre dos comprobaciones de version_datos con suscriptores conectados
+INTERVALO_VIGILANCIA = 2.0
+
+# Comentario SSE cada LATIDO_SEGUNDOS sin eventos (detecta conexiones cerradas y
+# mantiene vivos los proxies) y duración máxima de una conexión: al cerrarse,
+# el navegador reconecta tras RECONEXION_MS y recibe de nuevo el estado completo
+LATIDO_SEGUNDOS = 20
+DURACION_CONEXION = 900
+RECONEXION_MS = 3000
+
+
+def formato_sse(evento, datos):
+    return f"event: {evento}\ndata: {json.dumps(datos, separators=(',', ':'), ensure_ascii=False)}\n\n"
+
+
+class SuscripcionDescartada(Exception):
+    """El suscriptor se quedó atrás o la central se cerró: hay que cerrar su conexión"""
+
+
+class Suscripcion:
+    def __init__(self, user_id, capacidad):
+        self.user_id = user_id
+        self.capacidad = capacidad
+        self.descartada = False
+        self._eventos = collections.deque()
+        self._condicion = threading.Condition()
+
+    def entregar(self, mensaje):
+        """Encolar un evento serializado; False si el suscriptor queda descartado"""
+        with self._condicion:
+            if not self.descartada:
+                if len(self._eventos) >= self.capacidad:
+                    self.descartada = True
+                    self._eventos.clear()
+                else:
+                    self._eventos.append(mensaje)
+            self._condicion.notify()
+            return not self.descartada
+
+    def siguiente(self, espera):
+        """Próximo evento, o None si pasan `espera` segundos sin ninguno (toca latido)"""
+        with self._condicion:
+            if not self._eventos and not self.descartada:
+                self._condicion.wait(espera)
+            if self.descartada:
+                raise SuscripcionDescartada()
+            return self._eventos.popleft() if self._eventos else None
+
+    def cerrar(self):
+        with self._condicion:
+            self.descartada = True
+            self._condicion.notify()
+
+
+class CentralEventos:
+    """Suscriptores por usuario y el hilo que les reparte los cambios.
+
+    calcular_estado(user_id) -> (versión, estadísticas, productos con stock bajo)
+    leer_versiones(user_ids) -> {user_id: versión}
+    """
+
+    def __init__(self, calcular_estado, leer_versiones, capacidad_cola=CAPACIDAD_COLA_EVENTOS,
+                 max_suscriptores=MAX_SUSCRIPTORES, intervalo=INTERVALO_VIGILANCIA):
+        self._calcular_estado = calcular_estado
+        self._leer_versiones = leer_versiones
+        self.capacidad_cola = capacidad_cola
+        self.max_suscriptores = max_suscriptores
+        self.intervalo = intervalo
+        self._suscripciones = {}  # user_id -> set(Suscripcion)
+        self._estados = {}  # user_id -> (versión, estadísticas, {id: producto})
+        self._condicion = threading.Condition()
+        self._avisado = False
+        self._cerrada = False
+        self._hilo = None
+        self.estadisticas = {'suscriptores': 0, 'eventos': 0, 'entregas': 0, 'descartados': 0, 'rechazados': 0}
+
+    # ========== SUSCRIPCIONES ==========
+
+    def suscribir(self, user_id):
+        """Suscripcion nueva, o None si no hay cupo.
+
+        El cupo se reserva antes de calcular el estado, así que una conexión
+        rechazada no consulta la base. Su primer evento es 'estado' con el
+        estado completo: el recién calculado o, si es más nuevo, el último que
+        se repartió a los demás suscriptores del usuario.
+        """
+        user_id = int(user_id)
+        with self._condicion:
+            if self._cerrada or self.estadisticas['suscriptores'] >= self.max_suscriptores:
+                self.estadisticas['rechazados'] += 1
+                return None
+            self.estadisticas['suscriptores'] += 1
+
+        # El estado se calcula fuera del candado, con el cupo ya reservado
+        try:
+            estado = self._calcular_estado(user_id)
+        except Exception:
+            with self._condicion:
+                self.estadisticas['suscriptores'] -= 1
+            raise
+
+        with self._condicion:
+            if self._cerrada:
+                self.estadisticas['suscriptores'] -= 1
+                return None
+            suscripcion = Suscripcion(user_id, self.capacidad_cola)
+            self._suscripciones.setdefault(user_id, set()).add(suscripcion)
+            actual = self._estados.get(user_id)
+            if actual is None or estado[0] > actual[0]:
+                actual = self._estados[user_id] = self._estado_interno(estado)
+            version, estadisticas, bajos = actual
+            suscripcion.entregar(formato_sse('estado', {
+                'version': version,
+                'estadisticas': estadisticas,
+                'bajos': sorted(bajos.values(), key=lambda producto: producto['stock_actual']),
+            }))
+            self._iniciar_vigilante()
+            return suscripcion
+
+    def cancelar(self, suscripcion):
+        with self._condicion:
+            suscripciones = self._suscripciones.get(suscripcion.user_id)
+            if not suscripciones or suscripcion not in suscripciones:
+                return
+            suscripciones.discard(suscripcion)
+            self.estadisticas['suscriptores'] -= 1
+            if not suscripciones:
+                del self._suscripciones[suscripcion.user_id]
+                self._estados.pop(suscripcion.user_id, None)
+
+    def tiene_suscriptores(self, user_id):
+        return int(user_id) in self._suscripciones
+
+    def avisar(self, user_id):
+        """Llamar tras el commit de una escritura: despierta al vigilante si alguien mira"""
+        if not self.tiene_suscriptores(user_id):
+            return
+        with self._condicion:
+            self._avisado = True
+            self._condicion.notify()
+
+    # ========== VIGILANTE ==========
+
+    def _iniciar_vigilante(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._hilo = threading.Thread(target=self._vigilar, name='vigilante-eventos', daemon=True)
+            self._hilo.start()
+
+    def _vigilar(self):
+        while True:
+            with self._condicion:
+                # Sin suscriptores el hilo sólo espera: no consulta nada
+                while not self._cerrada and not self._suscripciones:
+                    self._condicion.wait()
+                if not self._avisado and not self._cerrada:
+                    self._condicion.wait(self.intervalo)
+                if self._cerrada:
+                    return
+                self._avisado = False
+                usuarios = list(self._suscripciones)
+            try:
+                self.revisar(usuarios)
+            except Exception as e:
+                print(f"⚠️ Error revisando cambios para los eventos del dashboard: {e}")
+
+    def revisar(self, usuarios):
+        """Publicar el estado de los usuarios cuya versión de datos cambió"""
+        versiones = self._leer_versiones(usuarios)
+        for user_id in usuarios:
+            actual = self._estados.get(user_id)
+            if actual is not None and versiones.get(user_id, 0) > actual[0]:
+                self.publicar(user_id, self._calcular_estado(user_id))
+
+    def publicar(self, user_id, estado):
+        """Repartir a los suscriptores de user_id lo que cambió respecto al último estado"""
+        version, estadisticas, bajos = self._estado_interno(estado)
+        with self._condicion:
+            anterior = self._estados.get(user_id)
+            if anterior is None or version <= anterior[0]:
+                return
+            self._estados[user_id] = (version, estadisticas, bajos)
+            suscripciones = list(self._suscripciones.get(user_id, ()))
+        _, estadisticas_antes, bajos_antes = anterior
+
+        cambios = {
+            'version': version,
+            'estadisticas': {clave: valor for clave, valor in estadisticas.items()
+                             if estadisticas_antes.get(clave) != valor},
+            'entran': [producto for id_producto, producto in bajos.items() if id_producto not in bajos_antes],
+            'salen': [id_producto for id_producto in bajos_antes if id_producto not in bajos],
+            'cambian': [producto for id_producto, producto in bajos.items()
+                        if id_producto in bajos_antes and bajos_antes[id_producto] != producto],
+        }
+        if not (cambios['estadisticas'] or cambios['entran'] or cambios['salen'] or cambios['cambian']):
+            return
+
+        # Se serializa una vez para todos los suscriptores del usuario
+        mensaje = formato_sse('cambios', cambios)
+        self.estadisticas['eventos'] += 1
+        for suscripcion in suscripciones:
+            if suscripcion.entregar(mensaje):
+                self.estadisticas['entregas'] += 1
+            else:
+                self.estadisticas['descartados'] += 1
+                self.cancelar(suscripcion)
+
+    @staticmethod
+    def _estado_interno(estado):
+        version, estadisticas, bajos = estado
+        return version, dict(estadisticas), {producto['id']: producto for producto in bajos}
+
+    def cerrar(self):
+        """Cerrar todas las conexiones abiertas y detener el vigilante"""
+        with self._condicion:
+            self._cerrada = True
+            suscripciones = [s for grupo in self._suscripciones.values() for s in grupo]
+            self._condicion.notify_all()
+        for suscripcion in suscripciones:
+            suscripcion.cerrar()
@@ -0,0 +1,57 @@
+"""Serialización en streaming de las exportaciones de productos y movimientos.
+
+Los generadores de SistemaInventario entregan lotes de filas (fetchmany);
+aquí cada lote se convierte en un trozo de bytes CSV o JSON-lines que Flask
+envía en cuanto se produce, opcionalmente comprimido con gzip.
+"""
+import csv
+import io
+import json
+import zlib
+
+# Columnas exportadas, en el orden de las consultas de SistemaInventario.exportar_*
+COLUMNAS_EXPORTACION_PRODUCTOS = (
+    'id', 'codigo', 'nombre', 'descripcion', 'ubicacion', 'modelo', 'marca', 'estado',
+    'año_adquisicion', 'precio_compra', 'stock_actual', 'stock_minimo', 'fecha_creacion'
+)
+COLUMNAS_EXPORTACION_MOVIMIENTOS = (
+    'id', 'fecha', 'tipo', 'cantidad', 'motivo', 'producto_id', 'producto_codigo', 'producto_nombre'
+)
+
+
+def trozos_csv(lotes, columnas):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator='\r\n')
+    escritor.writerow(columnas)
+    for lote in lotes:
+        escritor.writerows(lote)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    # Encabezado de una exportación sin filas
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def trozos_jsonl(lotes, columnas):
+    for lote in lotes:
+        yield ''.join(
+            json.dumps(dict(zip(columnas, fila)), ensure_ascii=False, default=str) + '\n' for fila in lote
+        ).encode('utf-8')
+
+
+# formato -> (tipo MIME, serializador)
+FORMATOS_EXPORTACION = {
+    'csv': ('text/csv; charset=utf-8', trozos_csv),
+    'jsonl': ('application/x-ndjson; charset=utf-8', trozos_jsonl),
+}
+
+
+def comprimir_gzip(trozos, nivel=6):
+    """Comprimir un flujo de bytes sobre la marcha (formato gzip, apto para Content-Encoding)"""
+    compresor = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+    for trozo in trozos:
+        comprimido = compresor.compress(trozo)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
@@ -0,0 +1,118 @@
+"""Procesamiento de las fotos de perfil subidas por los usuarios.
+
+Cada foto se decodifica una sola vez y se vuelve a codificar como JPEG en
+tamaños fijos (VARIANTES_FOTO), sin metadatos EXIF. Los archivos se nombran
+con un hash del contenido subido, así dos subidas idénticas comparten
+archivos y la base de datos sólo guarda ese hash. Necesita Pillow (está en
+requirements.txt): sin él se rechazan las subidas, nunca se guarda el archivo
+original tal cual.
+"""
+import hashlib
+import io
+import os
+import re
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+DIRECTORIO_FOTOS = os.path.join('static', 'profile_photos')
+
+# variante -> lado en píxeles (las fotos se recortan al centro en cuadrado)
+VARIANTES_FOTO = {
+    'avatar': 256,
+    'miniatura': 96,  # avatar de 45 px de la barra lateral, en pantallas 2x
+}
+
+MAX_BYTES_FOTO = 8 * 1024 * 1024
+CALIDAD_JPEG = 85
+
+# Firmas de los formatos aceptados: (prefijo, tipo MIME)
+FIRMAS_IMAGEN = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+PATRON_HASH_FOTO = re.compile(r'^[0-9a-f]{32}$')
+PATRON_ARCHIVO_FOTO = re.compile(r'^([0-9a-f]{32})_([a-z]+)$')
+
+
+def es_hash_foto(valor):
+    """True si foto_perfil guarda un hash (las fotos antiguas guardan una ruta en static/)"""
+    return bool(valor) and bool(PATRON_HASH_FOTO.match(valor))
+
+
+def nombre_archivo(hash_foto, variante):
+    return f'{hash_foto}_{variante}'
+
+
+def tipo_mime(contenido):
+    for firma, mime in FIRMAS_IMAGEN:
+        if contenido.startswith(firma):
+            return mime
+    return None
+
+
+def procesar_foto(archivo):
+    """Leer una foto subida y devolver (hash, {variante: bytes}).
+
+    Lanza ValueError si el archivo no es una imagen válida, es demasiado grande
+    o no está instalado Pillow.
+    """
+    if Image is None:
+        raise ValueError("Para subir fotos de perfil instala Pillow (pip install Pillow)")
+    contenido = archivo.read(MAX_BYTES_FOTO + 1)
+    if len(contenido) > MAX_BYTES_FOTO:
+        raise ValueError(f"La foto supera el máximo de {MAX_BYTES_FOTO // (1024 * 1024)} MB")
+    if tipo_mime(contenido) is None:
+        raise ValueError("Formato no permitido. Use PNG, JPG o GIF")
+
+    hash_foto = hashlib.sha256(contenido).hexdigest()[:32]
+    return hash_foto, _variantes(contenido)
+
+
+def _variantes(contenido):
+    try:
+        imagen = Image.open(io.BytesIO(contenido))
+        # Los JPEG grandes se decodifican directamente a una escala reducida
+        lado_maximo = max(VARIANTES_FOTO.values())
+        imagen.draft('RGB', (lado_maximo, lado_maximo))
+        imagen = ImageOps.exif_transpose(imagen)
+        if imagen.mode in ('RGBA', 'LA', 'P'):
+            # Las transparencias quedan sobre fondo blanco: JPEG no tiene canal alfa
+            imagen = imagen.convert('RGBA')
+            fondo = Image.new('RGB', imagen.size, (255, 255, 255))
+            fondo.paste(imagen, mask=imagen.getchannel('A'))
+            imagen = fondo
+        else:
+            imagen = imagen.convert('RGB')
+
+        variantes = {}
+        # De la más grande a la más pequeña, reduciendo cada una a partir de la anterior
+        for variante, lado in sorted(VARIANTES_FOTO.items(), key=lambda item: -item[1]):
+            imagen = ImageOps.fit(imagen, (lado, lado), Image.LANCZOS)
+            salida = io.BytesIO()
+            # Sin exif= ni icc_profile= Pillow no copia los metadatos del original
+            imagen.save(salida, 'JPEG', quality=CALIDAD_JPEG, optimize=True, progressive=True)
+            variantes[variante] = salida.getvalue()
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"No se pudo leer la imagen: {e}")
+    return variantes
+
+
+def guardar_variantes(hash_foto, variantes, directorio=DIRECTORIO_FOTOS):
+    """Escribir las variantes que aún no existan (escritura atómica con os.replace)"""
+    os.makedirs(directorio, exist_ok=True)
+    for variante, contenido in variantes.items():
+        destino = os.path.join(directorio, nombre_archivo(hash_foto, variante))
+        if os.path.exists(destino):
+            # Misma foto ya subida: se renueva la fecha para que la limpieza no la borre
+            os.utime(destino)
+            continue
+        temporal = f'{destino}.{os.getpid()}.tmp'
+        with open(temporal, 'wb') as f:
+            f.write(contenido)
+        os.replace(temporal, destino)
@@ -0,0 +1,423 @@
+"""Comandos de mantenimiento del Sistema de Inventario.
+
+    python gestion.py migrar [--usuario ID] [--lote 200] [--segundos-lote 1] [--pausa 0.05] [--estado]
+    python gestion.py reconstruir-resumen [--usuario ID] [--verificar]
+    python gestion.py reconstruir-busqueda [--usuario ID]
+    python gestion.py reconstruir-diario [--usuario ID] [--verificar]
+    python gestion.py migrar-compartido [--usuario ID] [--lote 100] [--pausa 0.1]
+    python gestion.py limpiar-migrados [--gracia 900]
+    python gestion.py limpiar-fotos [--gracia 3600]
+    python gestion.py importar-productos --usuario ID archivo.csv|archivo.xlsx
+    python gestion.py crear-token --usuario ID --nombre "Escáner bodega 1"
+    python gestion.py revocar-token --usuario ID --token ID_TOKEN
+    python gestion.py resumir-alertas [--cada SEGUNDOS]
+    python gestion.py cortes-existencias [--usuario ID] [--dia AAAA-MM-DD] [--conservar-dias 90]
+    python gestion.py verificar-existencias [--usuario ID] [--fecha AAAA-MM-DD]
+"""
+import argparse
+import datetime
+import sys
+import time
+
+from database import SistemaInventario, MAX_EVENTOS_RESUMEN_ALERTAS, DIAS_CORTES_DIARIOS
+from fotos_perfil import DIRECTORIO_FOTOS
+from importacion import formato_de
+
+
+def _usuarios_objetivo(sistema, args):
+    return [args.usuario] if args.usuario else sistema.obtener_ids_usuarios()
+
+
+def _fecha(valor):
+    """Tipo de argparse para fechas AAAA-MM-DD"""
+    try:
+        return datetime.date.fromisoformat(valor).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{valor}' no tiene el formato AAAA-MM-DD")
+
+
+def comando_migrar(sistema, args):
+    """Aplica las migraciones de esquema pendientes (migraciones.py), por lotes de usuarios.
+
+    Cada lote es una transacción; si el comando se interrumpe basta con volver
+    a ejecutarlo, porque cada usuario guarda su versión en schema_version.
+    Los usuarios cuyos datos no admiten una migración se informan al final y
+    no detienen al resto.
+
+    El tamaño del lote se ajusta para que cada transacción dure unos
+    --segundos-lote: revisar un usuario al día cuesta microsegundos, pero
+    reconstruir sus tablas tarda más cuanto más grande es el esquema, y
+    mientras dura el lote las escrituras de la aplicación esperan
+    (SQLITE_BUSY_TIMEOUT_MS).
+    """
+    if args.estado:
+        return _mostrar_estado_migraciones(sistema)
+
+    pendientes = [args.usuario] if args.usuario else sistema.usuarios_por_actualizar()
+    total = len(pendientes)
+    revisados = actualizados = 0
+    fallidos = {}
+    tamano_lote = args.lote
+    inicio_migracion = time.perf_counter()
+
+    while revisados < total:
+        lote = pendientes[revisados:revisados + tamano_lote]
+        inicio_lote = time.perf_counter()
+        resultado = sistema.migrar_esquemas(lote)
+        if resultado is None:
+            print(f"❌ Falló el lote que empieza en el usuario {lote[0]}; vuelve a ejecutar el comando para reanudar")
+            return 1
+        duracion = time.perf_counter() - inicio_lote
+        tamano_lote = max(1, min(args.lote, int(len(lote) * args.segundos_lote / max(duracion, 0.001))))
+
+        revisados += len(lote)
+        actualizados += len(resultado[0])
+        fallidos.update(resultado[1])
+        transcurrido = time.perf_counter() - inicio_migracion
+        print(f"   {revisados}/{total} usuarios revisados, {actualizados} actualizados ({transcurrido:.1f}s, "
+              f"quedan ~{transcurrido / revisados * (total - revisados):.0f}s)")
+        # Deja respirar a los escritores de la aplicación entre lotes
+        if args.pausa:
+            time.sleep(args.pausa)
+
+    sistema.completar_migraciones()
+    for user_id, error in fallidos.items():
+        print(f"❌ Usuario {user_id}: {error}")
+    print(f"✅ {actualizados} usuarios actualizados en {time.perf_counter() - inicio_migracion:.1f}s, "
+          f"{len(fallidos)} fallidos")
+    return 1 if fallidos else 0
+
+
+def _mostrar_estado_migraciones(sistema):
+    migraciones = sistema.estado_migraciones()
+    if migraciones is None:
+        print("❌ No se pudo leer el estado de las migraciones")
+        return 1
+    for migracion in migraciones:
+        estado = f"completada {migracion['completada']}" if migracion['completada'] else \
+            f"{migracion['pendientes']} usuarios pendientes"
+        print(f"   {migracion['version']:>4}  {migracion['nombre']:<24} {estado}")
+    return 0
+
+
+def comando_reconstruir_resumen(sistema, args):
+    """Recalcula resumen_inventario y muestra los usuarios cuyo resumen se había desviado"""
+    desviados = 0
+    usuarios = _usuarios_objetivo(sistema, args)
+
+    for user_id in usuarios:
+        sistema.asegurar_esquema_usuario(user_id)
+        antes, despues = sistema.reconstruir_resumen(user_id)
+        if despues is None:
+            print(f"❌ Usuario {user_id}: no se pudo reconstruir el resumen")
+            desviados += 1
+            continue
+
+        if antes is not None:
+            antes['valor_total'] = round(antes['valor_total'], 2)
+        despues['valor_total'] = round(despues['valor_total'], 2)
+
+        if antes != despues:
+            desviados += 1
+            print(f"⚠️ Usuario {user_id}: resumen desviado")
+            print(f"   antes:   {antes}")
+            print(f"   después: {despues}")
+
+    print(f"✅ {len(usuarios)} usuarios revisados, {desviados} con diferencias")
+    # En modo verificación las diferencias hacen fallar el comando
+    return 1 if args.verificar and desviados else 0
+
+
+def comando_reconstruir_busqueda(sistema, args):
+    """Crea (si falta) y rellena el índice FTS5 de productos de cada usuario"""
+    if not sistema.fts_disponible:
+        print("❌ Esta compilación de SQLite no incluye FTS5; la búsqueda seguirá usando LIKE")
+        return 1
+
+    usuarios = _usuarios_objetivo(sistema, args)
+    # El índice compartido se regenera una sola vez para todos sus usuarios
+    fallidos = sistema.reconstruir_indices_busqueda(usuarios)
+
+    print(f"✅ Índice de búsqueda reconstruido para {len(usuarios) - len(fallidos)} usuarios")
+    if fallidos:
+        print(f"❌ Fallaron: {fallidos}")
+        return 1
+    return 0
+
+
+def comando_reconstruir_diario(sistema, args):
+    """Rellena el resumen diario de movimientos desde la tabla de movimientos de cada usuario"""
+    desviados = 0
+    usuarios = _usuarios_objetivo(sistema, args)
+    inicio = time.perf_counter()
+
+    for user_id in usuarios:
+        sistema.asegurar_esquema_usuario(user_id)
+        antes, despues = sistema.reconstruir_resumen_diario(user_id)
+        if despues is None:
+            print(f"❌ Usuario {user_id}: no se pudo reconstruir el resumen diario")
+            desviados += 1
+            continue
+
+        if antes != despues:
+            desviados += 1
+            print(f"⚠️ Usuario {user_id}: resumen diario desviado")
+            print(f"   antes:   {antes}")
+            print(f"   después: {despues}")
+
+    print(f"✅ {len(usuarios)} usuarios revisados en {time.perf_counter() - inicio:.1f}s, {desviados} con diferencias")
+    return 1 if args.verificar and desviados else 0
+
+
+def comando_migrar_compartido(sistema, args):
+    """Mueve los usuarios con tablas propias a las tablas compartidas, por lotes.
+
+    Cada lote es una transacción; si el comando se interrumpe basta con volver
+    a ejecutarlo, porque los usuarios ya migrados no vuelven a procesarse.
+    """
+    pendientes = [args.usuario] if args.usuario else sistema.usuarios_por_migrar()
+    total = len(pendientes)
+    migrados = 0
+    inicio_migracion = time.perf_counter()
+
+    for inicio in range(0, total, args.lote):
+        lote = pendientes[inicio:inicio + args.lote]
+        resultado = sistema.migrar_usuarios_a_compartido(lote)
+        if resultado is None:
+            print(f"❌ Falló el lote que empieza en el usuario {lote[0]}; vuelve a ejecutar el comando para reanudar")
+            return 1
+        migrados += len(resultado)
+        print(f"   {inicio + len(lote)}/{total} usuarios revisados, {migrados} migrados "
+              f"({time.perf_counter() - inicio_migracion:.1f}s)")
+        # Deja respirar a los escritores de la aplicación entre lotes
+        if args.pausa:
+            time.sleep(args.pausa)
+
+    print(f"✅ {migrados} usuarios migrados al almacenamiento compartido")
+    print("   Las tablas antiguas quedan bloqueadas; bórralas con 'limpiar-migrados' cuando todos los procesos lo hayan notado")
+    return 0
+
+
+def comando_limpiar_migrados(sistema, args):
+    """Borra las tablas propias de los usuarios migrados hace más de --gracia segundos"""
+    eliminados = sistema.eliminar_tablas_migradas(args.gracia)
+    if eliminados is None:
+        print("❌ No se pudieron eliminar las tablas migradas")
+        return 1
+    print(f"✅ Tablas antiguas eliminadas para {len(eliminados)} usuarios")
+    return 0
+
+
+def comando_limpiar_fotos(sistema, args):
+    """Borra los archivos de fotos de perfil que ningún usuario tiene asignados"""
+    sistema.directorio_fotos = args.directorio
+    borrados = sistema.limpiar_fotos_huerfanas(args.gracia)
+    if borrados is None:
+        print("❌ No se pudieron limpiar las fotos")
+        return 1
+    for nombre in borrados:
+        print(f"   🗑️  {nombre}")
+    print(f"✅ {len(borrados)} archivos de fotos sin usar eliminados")
+    return 0
+
+
+def comando_importar_productos(sistema, args):
+    """Importa (o actualiza por código) los productos de un archivo CSV o XLSX"""
+    formato = formato_de(args.archivo)
+    if not formato:
+        print("❌ Formato no permitido. Use CSV o XLSX")
+        return 1
+
+    inicio = time.perf_counter()
+    with open(args.archivo, 'rb') as archivo:
+        informe = sistema.importar_productos(args.usuario, archivo, formato)
+    if informe['error']:
+        print(f"❌ {informe['error']}")
+        return 1
+
+    for error in informe['errores']:
+        print(f"   fila {error['fila']} ({error['codigo'] or 'sin código'}): {error['error']}")
+    print(f"✅ {informe['procesadas']} filas en {time.perf_counter() - inicio:.1f}s: "
+          f"{informe['insertadas']} nuevos, {informe['actualizadas']} actualizados, "
+          f"{informe['total_errores']} con errores")
+    return 1 if informe['total_errores'] else 0
+
+
+def comando_crear_token(sistema, args):
+    """Crea un token de la API (/api/v1) y lo muestra una única vez"""
+    if not sistema.obtener_usuario_por_id(args.usuario):
+        print(f"❌ No existe el usuario {args.usuario}")
+        return 1
+    token = sistema.crear_token_api(args.usuario, args.nombre)
+    if not token:
+        print("❌ No se pudo crear el token")
+        return 1
+    print(f"🔑 Token '{args.nombre}' del usuario {args.usuario} (no se volverá a mostrar):")
+    print(f"   {token}")
+    return 0
+
+
+def comando_revocar_token(sistema, args):
+    if not sistema.revocar_token_api(args.usuario, args.token):
+        print(f"❌ El usuario {args.usuario} no tiene el token {args.token}")
+        return 1
+    print(f"✅ Token {args.token} revocado")
+    return 0
+
+
+def comando_resumir_alertas(sistema, args):
+    """Agrupa en resúmenes por usuario las entradas y salidas de la alerta de stock bajo.
+
+    Sin --cada hace una pasada; con --cada se queda evaluando cada SEGUNDOS
+    segundos (para lanzarlo como servicio junto a la aplicación).
+    """
+    while True:
+        resumenes = sistema.generar_resumenes_alertas(args.max_eventos)
+        if resumenes is None:
+            print("❌ No se pudieron generar los resúmenes de alertas")
+            if not args.cada:
+                return 1
+        for resumen in resumenes or []:
+            print(f"   🔔 Usuario {resumen['user_id']}: {resumen['entran']} productos entran en alerta, "
+                  f"{resumen['salen']} salen")
+        if not args.cada:
+            print(f"✅ {len(resumenes)} resúmenes de alertas generados")
+            return 0
+        time.sleep(args.cada)
+
+
+def comando_cortes_existencias(sistema, args):
+    """Guarda el stock y el precio de cada producto al cierre de un día (por defecto ayer, en UTC).
+
+    Pensado para lanzarlo cada día poco después de medianoche UTC: la consulta
+    de existencias en una fecha parte del corte anterior más cercano, así que
+    su coste depende del intervalo entre cortes. Los cortes de más de
+    --conservar-dias días se podan dejando el último de cada mes.
+    """
+    inicio = time.perf_counter()
+    user_ids = [args.usuario] if args.usuario else None
+    generados, fallidos = sistema.generar_cortes_existencias(args.dia, user_ids, args.conservar_dias)
+    for user_id, error in fallidos.items():
+        print(f"❌ Usuario {user_id}: {error}")
+    print(f"✅ {len(generados)} cortes con {sum(generados.values())} productos en "
+          f"{time.perf_counter() - inicio:.1f}s, {len(fallidos)} fallidos")
+    return 1 if fallidos else 0
+
+
+def comando_verificar_existencias(sistema, args):
+    """Compara las existencias en una fecha calculadas desde los cortes con una reproducción completa de los movimientos"""
+    con_diferencias = 0
+    usuarios = _usuarios_objetivo(sistema, args)
+
+    for user_id in usuarios:
+        resultado = sistema.verificar_stock_en_fecha(user_id, args.fecha)
+        if resultado is None:
+            print(f"❌ Usuario {user_id}: no se pudieron verificar las existencias")
+            con_diferencias += 1
+            continue
+
+        if resultado['diferencias']:
+            con_diferencias += 1
+            existencias = resultado['existencias']
+            print(f"⚠️ Usuario {user_id}: {len(resultado['diferencias'])} productos con diferencias al "
+                  f"{existencias['fecha']} (corte {existencias['corte'] or 'ninguno'})")
+            for diferencia in resultado['diferencias'][:10]:
+                print(f"   {diferencia['codigo']}: cortes {diferencia['stock_corte']}, "
+                      f"reproducción {diferencia['stock_reproducido']}")
+
+    print(f"✅ {len(usuarios)} usuarios verificados, {con_diferencias} con diferencias")
+    return 1 if con_diferencias else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Comandos de mantenimiento del inventario")
+    parser.add_argument('--db', default='inventario.db', help='Ruta de la base de datos SQLite')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    p = subparsers.add_parser('migrar', aliases=['actualizar-esquemas'],
+                              help='Aplicar las migraciones de esquema pendientes')
+    p.add_argument('--usuario', type=int, help='Sólo este usuario (por defecto todos los pendientes)')
+    p.add_argument('--lote', type=int, default=200, help='Máximo de usuarios por transacción')
+    p.add_argument('--segundos-lote', type=float, default=1.0,
+                   help='Duración buscada de cada transacción (menor que SQLITE_BUSY_TIMEOUT_MS)')
+    p.add_argument('--pausa', type=float, default=0.05, help='Segundos de espera entre lotes')
+    p.add_argument('--estado', action='store_true', help='Sólo mostrar las migraciones y sus usuarios pendientes')
+    p.set_defaults(funcion=comando_migrar)
+
+    p = subparsers.add_parser('reconstruir-resumen', help='Recalcular los contadores del dashboard')
+    p.add_argument('--usuario', type=int, help='Sólo este usuario (por defecto todos)')
+    p.add_argument('--verificar', action='store_true',
+                   help='Salir con código 1 si algún resumen estaba desviado')
+    p.set_defaults(funcion=comando_reconstruir_resumen)
+
+    p = subparsers.add_parser('reconstruir-busqueda', help='Rellenar el índice de búsqueda de productos')
+    p.add_argument('--usuario', type=int, help='Sólo este usuario (por defecto todos)')
+    p.set_defaults(funcion=comando_reconstruir_busqueda)
+
+    p = subparsers.add_parser('reconstruir-diario', help='Rellenar el resumen diario de los reportes de movimientos')
+    p.add_argument('--usuario', type=int, help='Sólo este usuario (por defecto todos)')
+    p.add_argument('--verificar', action='store_true',
+                   help='Salir con código 1 si algún resumen diario estaba desviado')
+    p.set_defaults(funcion=comando_reconstruir_diario)
+
+    p = subparsers.add_parser('migrar-compartido', help='Mover los usuarios al almacenamiento compartido')
+    p.add_argument('--usuario', type=int, help='Sólo este usuario (por defecto todos los pendientes)')
+    p.add_argument('--lote', type=int, default=100, help='Usuarios por transacción')
+    p.add_argument('--pausa', type=float, default=0.1, help='Segundos de espera entre lotes')
+    p.set_defaults(funcion=comando_migrar_compartido)
+
+    p = subparsers.add_parser('limpiar-migrados', help='Borrar las tablas propias de los usuarios ya migrados')
+    p.add_argument('--gracia', type=int, default=900,
+                   help='Segundos desde la migración antes de borrar (mayor que SCHEMA_CACHE_SEGUNDOS)')
+    p.set_defaults(funcion=comando_limpiar_migrados)
+
+    p = subparsers.add_parser('limpiar-fotos', help='Borrar los archivos de fotos de perfil sin usar')
+    p.add_argument('--directorio', default=DIRECTORIO_FOTOS, help='Carpeta de las fotos de perfil')
+    p.add_argument('--gracia', type=int, default=3600,
+                   help='Antigüedad mínima en segundos de un archivo para borrarlo')
+    p.set_defaults(funcion=comando_limpiar_fotos)
+
+    p = subparsers.add_parser('importar-productos', help='Importar productos desde un archivo CSV o XLSX')
+    p.add_argument('--usuario', type=int, required=True, help='Usuario dueño de los productos')
+    p.add_argument('archivo', help='Ruta del archivo CSV o XLSX')
+    p.set_defaults(funcion=comando_importar_productos)
+
+    p = subparsers.add_parser('crear-token', help='Crear un token para la API /api/v1')
+    p.add_argument('--usuario', type=int, required=True, help='Usuario dueño del token')
+    p.add_argument('--nombre', required=True, help='Para qué o quién es el token')
+    p.set_defaults(funcion=comando_crear_token)
+
+    p = subparsers.add_parser('revocar-token', help='Revocar un token de la API')
+    p.add_argument('--usuario', type=int, required=True, help='Usuario dueño del token')
+    p.add_argument('--token', type=int, required=True, help='Id del token (se ve en Mi Cuenta)')
+    p.set_defaults(funcion=comando_revocar_token)
+
+    p = subparsers.add_parser('resumir-alertas', help='Resumir por usuario los cambios de la alerta de stock bajo')
+    p.add_argument('--cada', type=float, help='Repetir cada SEGUNDOS segundos en lugar de una sola pasada')
+    p.add_argument('--max-eventos', type=int, default=MAX_EVENTOS_RESUMEN_ALERTAS,
+                   help='Eventos del historial por pasada')
+    p.set_defaults(funcion=comando_resumir_alertas)
+
+    p = subparsers.add_parser('cortes-existencias', help='Guardar el stock de cada producto al cierre de un día')
+    p.add_argument('--usuario', type=int, help='Sólo este usuario (por defecto todos)')
+    p.add_argument('--dia', type=_fecha, help='Día del cierre, AAAA-MM-DD (por defecto ayer, en UTC)')
+    p.add_argument('--conservar-dias', type=int, default=DIAS_CORTES_DIARIOS,
+                   help='Días con todos sus cortes; de los anteriores queda el último de cada mes')
+    p.set_defaults(funcion=comando_cortes_existencias)
+
+    p = subparsers.add_parser('verificar-existencias',
+                              help='Comparar las existencias en una fecha con la reproducción de los movimientos')
+    p.add_argument('--usuario', type=int, help='Sólo este usuario (por defecto todos)')
+    p.add_argument('--fecha', type=_fecha, help='Día del cierre, AAAA-MM-DD (por defecto ayer, en UTC)')
+    p.set_defaults(funcion=comando_verificar_existencias)
+
+    args = parser.parse_args(argv)
+    sistema = SistemaInventario(args.db)
+    try:
+        return args.funcion(sistema, args)
+    finally:
+        sistema.cerrar()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
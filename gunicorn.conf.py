@@ -0,0 +1,48 @@
+"""Configuración de gunicorn: WEB_CONCURRENCY procesos × WEB_THREADS hilos.
+
+    INVENTARIO_SECRET_KEY=... gunicorn -c gunicorn.conf.py wsgi:app
+
+Cada worker importa wsgi.py y crea su propia aplicación, con su pool de
+conexiones SQLite y su proceso de hashing. El esquema de la base y los
+activos estáticos se preparan una sola vez en el proceso maestro
+(on_starting) antes de arrancar los workers.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('WEB_BIND', '0.0.0.0:8000')
+
+# Un proceso por CPU; los hilos atienden peticiones que esperan a SQLite o a la red
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_class = 'gthread'
+
+# Cada dashboard abierto mantiene una conexión de /dashboard/eventos que retiene
+# un hilo gthread (bloqueado, sin CPU) hasta EVENTOS_DURACION_SEGUNDOS, cuando el
+# navegador reconecta. El tope es threads // 2 por worker, así que el resto de
+# hilos sigue atendiendo páginas; las conexiones de más reciben un 503. Para más
+# pantallas en vivo, subir WEB_THREADS.
+os.environ.setdefault('INVENTARIO_EVENTOS_MAX_CONEXIONES', str(max(1, threads // 2)))
+
+# Sin preload: nada de la aplicación se hereda del maestro a través del fork
+preload_app = False
+
+timeout = 60
+graceful_timeout = 30
+
+# Reciclar los workers de vez en cuando acota la memoria de las caches por proceso
+max_requests = 5000
+max_requests_jitter = 500
+
+accesslog = '-'
+
+
+def on_starting(server):
+    """Crear las tablas compartidas y publicar static/dist antes de arrancar los workers"""
+    from app import create_app, obtener_sistema
+    from metricas import limpiar_directorio
+
+    app = create_app(os.environ.get('INVENTARIO_PERFIL', 'produccion'))
+    obtener_sistema(app).cerrar()
+    # Los contadores de /metrics empiezan de cero con cada arranque del servidor
+    limpiar_directorio(app.config['METRICAS_DIRECTORIO'])
@@ -0,0 +1,148 @@
+"""Lectura y validación de archivos de productos para la importación masiva.
+
+Los archivos se recorren fila a fila (nunca se cargan enteros en memoria) y
+cada fila se valida con las mismas reglas que el formulario de productos.
+El formato XLSX necesita openpyxl, que es opcional.
+"""
+import csv
+import io
+import itertools
+import os
+import re
+import unicodedata
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+# Campos de un producto en el orden de SistemaInventario.agregar_producto
+CAMPOS_PRODUCTO = (
+    'codigo', 'nombre', 'descripcion', 'ubicacion', 'modelo', 'marca', 'estado',
+    'año_adquisicion', 'precio_compra', 'stock_actual', 'stock_minimo'
+)
+
+# Encabezados alternativos aceptados, ya normalizados (minúsculas, sin acentos, con _)
+ALIAS_COLUMNAS = {
+    'ano_adquisicion': 'año_adquisicion',
+    'anio_adquisicion': 'año_adquisicion',
+    'ano': 'año_adquisicion',
+    'precio': 'precio_compra',
+    'stock': 'stock_actual',
+}
+
+COLUMNAS_OBLIGATORIAS = ('codigo', 'nombre')
+
+FORMATOS_IMPORTACION = ('csv', 'xlsx')
+
+
+def formato_de(nombre_archivo):
+    """'csv' o 'xlsx' según la extensión del archivo, o None si no se admite"""
+    extension = os.path.splitext(nombre_archivo or '')[1].lower().lstrip('.')
+    return extension if extension in FORMATOS_IMPORTACION else None
+
+
+def normalizar_encabezado(texto):
+    texto = unicodedata.normalize('NFKD', str(texto or '')).encode('ascii', 'ignore').decode('ascii')
+    texto = re.sub(r'[\s\-]+', '_', texto.strip().lower())
+    return ALIAS_COLUMNAS.get(texto, texto)
+
+
+def leer_filas(archivo, formato):
+    """Generador de (número de fila, {campo: valor}) para un archivo binario CSV o XLSX.
+
+    Lanza ValueError si el archivo está vacío o le faltan columnas obligatorias.
+    """
+    filas = _filas_xlsx(archivo) if formato == 'xlsx' else _filas_csv(archivo)
+
+    encabezado = next(filas, None)
+    if encabezado is None:
+        raise ValueError("El archivo está vacío")
+    columnas = [normalizar_encabezado(columna) for columna in encabezado]
+    faltantes = [columna for columna in COLUMNAS_OBLIGATORIAS if columna not in columnas]
+    if faltantes:
+        raise ValueError(f"Faltan columnas obligatorias: {', '.join(faltantes)}")
+
+    # La fila 1 es el encabezado; los números coinciden con los de la hoja de cálculo
+    for numero, valores in enumerate(filas, start=2):
+        if all(valor is None or str(valor).strip() == '' for valor in valores):
+            continue
+        yield numero, {columna: valor for columna, valor in zip(columnas, valores) if columna in CAMPOS_PRODUCTO}
+
+
+def _filas_csv(archivo):
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    primera = texto.readline()
+    if not primera:
+        return
+    # Excel en español guarda los CSV separados por punto y coma
+    separador = ';' if primera.count(';') > primera.count(',') else ','
+    yield from csv.reader(itertools.chain([primera], texto), delimiter=separador)
+
+
+def _filas_xlsx(archivo):
+    if openpyxl is None:
+        raise ValueError("Para importar archivos XLSX instala openpyxl (pip install openpyxl)")
+    libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        yield from libro.active.iter_rows(values_only=True)
+    finally:
+        libro.close()
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def _decimal(valor):
+    texto = _texto(valor)
+    # Coma decimal (1,5) de las hojas de cálculo en español
+    if ',' in texto and '.' not in texto:
+        texto = texto.replace(',', '.')
+    return float(texto)
+
+
+def _entero(valor):
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return int(_texto(valor))
+
+
+def validar_producto(datos):
+    """Reglas del formulario de productos: devuelve (producto, None) o (None, mensaje de error).
+
+    datos puede ser request.form o una fila de leer_filas; producto es un dict
+    con las claves de CAMPOS_PRODUCTO listo para agregar_producto(**producto).
+    """
+    try:
+        precio_compra = _decimal(datos.get('precio_compra'))
+        stock_actual = _entero(datos.get('stock_actual'))
+        stock_minimo = _entero(datos.get('stock_minimo'))
+    except (TypeError, ValueError):
+        return None, "Verifica que los precios y stock sean números válidos"
+
+    año_adquisicion = _texto(datos.get('año_adquisicion'))
+
+    producto = {
+        'codigo': _texto(datos.get('codigo')),
+        'nombre': _texto(datos.get('nombre')),
+        'descripcion': _texto(datos.get('descripcion')),
+        'ubicacion': _texto(datos.get('ubicacion')),
+        'modelo': _texto(datos.get('modelo')),
+        'marca': _texto(datos.get('marca')),
+        'estado': _texto(datos.get('estado')),
+        'año_adquisicion': int(año_adquisicion) if año_adquisicion.isdigit() else None,
+        'precio_compra': precio_compra,
+        'stock_actual': stock_actual,
+        'stock_minimo': stock_minimo,
+    }
+
+    if stock_actual < 0 or stock_minimo < 0:
+        return None, "El stock no puede ser negativo"
+    if not producto['codigo'] or not producto['nombre']:
+        return None, "Código y nombre son obligatorios"
+    return producto, None
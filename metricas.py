@@ -0,0 +1,392 @@
+"""Métricas del proceso en el formato de texto de Prometheus (/metrics).
+
+Por endpoint se registran las peticiones atendidas (por código de estado), su
+duración, las sentencias SQL que ejecutaron y el tiempo que pasaron en
+SQLite. Además: el total de sentencias y de tiempo en SQLite de cada base
+(medidos en el pool de conexiones, por donde pasa todo el acceso a SQLite),
+las conexiones abiertas, los errores que SistemaInventario captura y convierte
+en un valor por defecto, y las estadísticas de las caches, el hashing y los
+eventos en vivo.
+
+Cada hilo acumula en su propio fragmento (un dict que sólo escribe él), así
+que registrar una petición o una sentencia no toma ningún lock: al exponer se
+suman los fragmentos. Los de hilos terminados se pliegan en uno acumulado
+cuando se registra un hilo nuevo.
+
+Cada worker cuenta lo suyo. Con directorio (METRICAS_DIRECTORIO), cada uno
+vuelca allí sus contadores cada pocos segundos y /metrics devuelve la suma de
+todos los procesos, también de los que ya terminaron (los contadores nunca
+bajan); los valores instantáneos sólo se suman de los procesos vivos.
+"""
+import bisect
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+
+from flask import Response, abort, g, request
+from flask_login import current_user
+
+from api import token_de_peticion
+
+PREFIJO = 'inventario'
+
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_SENTENCIAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Segundos entre volcados de cada proceso al directorio compartido
+INTERVALO_VOLCADO = 5
+
+# nombre -> (tipo, ayuda, etiquetas, buckets)
+FAMILIAS = {
+    'http_peticiones_total': (
+        'counter', 'Peticiones HTTP atendidas', ('endpoint', 'metodo', 'estado'), None),
+    'http_duracion_segundos': (
+        'histogram', 'Duración de las peticiones (hasta el primer byte en las respuestas en streaming)',
+        ('endpoint', 'metodo'), BUCKETS_SEGUNDOS),
+    'http_sql_sentencias': (
+        'histogram', 'Sentencias SQL ejecutadas por petición', ('endpoint',), BUCKETS_SENTENCIAS),
+    'http_sql_segundos': (
+        'histogram', 'Tiempo en SQLite por petición', ('endpoint',), BUCKETS_SEGUNDOS),
+    'sql_sentencias_total': (
+        'counter', 'Llamadas a execute, executemany y executescript', ('base',), None),
+    'sql_segundos_total': (
+        'counter', 'Tiempo en SQLite: sentencias, lectura de filas y commits', ('base',), None),
+    'sqlite_conexiones_total': (
+        'counter', 'Conexiones SQLite de los pools por evento (creadas, reutilizadas, descartadas)',
+        ('base', 'evento'), None),
+    'sqlite_conexiones_libres': (
+        'gauge', 'Conexiones SQLite libres en los pools', ('base',), None),
+    'errores_capturados_total': (
+        'counter', 'Excepciones capturadas por SistemaInventario y devueltas como valor por defecto',
+        ('metodo', 'tipo'), None),
+    'cache_usuarios_total': (
+        'counter', 'Operaciones de la cache de usuarios por resultado', ('evento',), None),
+    'cache_usuarios_entradas': (
+        'gauge', 'Usuarios en la cache de sesión', (), None),
+    'cache_resultados_total': (
+        'counter', 'Operaciones de la cache de resultados por resultado', ('evento',), None),
+    'cache_resultados_entradas': (
+        'gauge', 'Resultados en la cache del proceso', (), None),
+    'hashing_total': (
+        'counter', 'Operaciones del pool de hashing de contraseñas', ('evento',), None),
+    'eventos_total': (
+        'counter', 'Eventos en vivo del dashboard', ('evento',), None),
+    'eventos_suscriptores': (
+        'gauge', 'Conexiones abiertas a /dashboard/eventos', (), None),
+}
+
+
+class Metricas:
+    """Contadores e histogramas del proceso, sin locks al registrar.
+
+    Con activas=False (scripts) el pool no mide las sentencias y no se cuentan
+    los errores capturados.
+    """
+
+    def __init__(self, activas=True, directorio=None, intervalo_volcado=INTERVALO_VOLCADO):
+        self.activas = activas
+        self.directorio = directorio
+        self.intervalo_volcado = intervalo_volcado
+        self._local = threading.local()
+        self._fragmentos = []  # (hilo, fragmento) de los hilos que registraron algo
+        self._retirado = {}  # suma de los fragmentos de hilos ya terminados
+        self._lock = threading.Lock()
+        self._lock_volcado = threading.Lock()
+        self._proximo_volcado = 0.0
+        self._pools = []
+        self._sistema = None
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    def registrar_pool(self, pool):
+        self._pools.append(pool)
+
+    def vigilar(self, sistema):
+        """Incluir al exponer las estadísticas de las caches, el hashing y los eventos de sistema"""
+        self._sistema = sistema
+
+    # ========== REGISTRO ==========
+
+    def _fragmento(self):
+        try:
+            return self._local.fragmento
+        except AttributeError:
+            return self._nuevo_fragmento()
+
+    def _nuevo_fragmento(self):
+        fragmento = {}
+        with self._lock:
+            vivos = []
+            for hilo, otro in self._fragmentos:
+                if hilo.is_alive():
+                    vivos.append((hilo, otro))
+                else:
+                    _sumar(self._retirado, otro)
+            vivos.append((threading.current_thread(), fragmento))
+            self._fragmentos = vivos
+        self._local.fragmento = fragmento
+        return fragmento
+
+    def contar(self, clave, valor=1):
+        """clave = (familia, *valores de sus etiquetas)"""
+        fragmento = self._fragmento()
+        fragmento[clave] = fragmento.get(clave, 0) + valor
+
+    def observar(self, clave, valor, buckets):
+        fragmento = self._fragmento()
+        serie = fragmento.get(clave)
+        if serie is None:
+            # Una cuenta por bucket más la de +Inf, y la suma de los valores
+            serie = fragmento[clave] = [0] * (len(buckets) + 1) + [0.0]
+        serie[bisect.bisect_left(buckets, valor)] += 1
+        serie[-1] += valor
+
+    def tiempo_sql(self, base, segundos, sentencias=1):
+        """Lo llama el pool al devolvérsele una conexión, con lo que acumuló mientras estuvo prestada"""
+        local = self._local
+        try:
+            local.sentencias += sentencias
+            local.segundos_sql += segundos
+        except AttributeError:
+            local.sentencias, local.segundos_sql = sentencias, segundos
+        fragmento = self._fragmento()
+        if sentencias:
+            clave = ('sql_sentencias_total', base)
+            fragmento[clave] = fragmento.get(clave, 0) + sentencias
+        clave = ('sql_segundos_total', base)
+        fragmento[clave] = fragmento.get(clave, 0) + segundos
+
+    def error_capturado(self, error):
+        """Contar una excepción que se va a tragar; la etiqueta metodo es la función que la captura"""
+        if self.activas:
+            self.contar(('errores_capturados_total', sys._getframe(1).f_code.co_name, type(error).__name__))
+
+    def inicio_peticion(self):
+        local = self._local
+        local.inicio = time.perf_counter()
+        local.sentencias = 0
+        local.segundos_sql = 0.0
+
+    def fin_peticion(self, endpoint, metodo, estado):
+        local = self._local
+        inicio = getattr(local, 'inicio', None)
+        if inicio is None:
+            return
+        local.inicio = None
+        # Las respuestas en streaming (exportaciones, eventos) siguen leyendo filas
+        # después: ese tiempo cuenta en sql_segundos_total pero no en su petición
+        self.contar(('http_peticiones_total', endpoint, metodo, str(estado)))
+        self.observar(('http_duracion_segundos', endpoint, metodo), time.perf_counter() - inicio, BUCKETS_SEGUNDOS)
+        self.observar(('http_sql_sentencias', endpoint), local.sentencias, BUCKETS_SENTENCIAS)
+        self.observar(('http_sql_segundos', endpoint), local.segundos_sql, BUCKETS_SEGUNDOS)
+        if self.directorio and time.monotonic() >= self._proximo_volcado:
+            self.volcar()
+
+    # ========== LECTURA ==========
+
+    def instantanea(self):
+        """Suma de los fragmentos de todos los hilos: {clave: valor}"""
+        with self._lock:
+            fragmentos = [fragmento for _, fragmento in self._fragmentos]
+            total = {}
+            _sumar(total, self._retirado)
+        for fragmento in fragmentos:
+            # dict.copy no cede el GIL: copia coherente aunque el hilo siga escribiendo
+            _sumar(total, fragmento.copy())
+        return total
+
+    def _estadisticas(self):
+        """(contadores, valores instantáneos) de los pools y de los componentes de sistema"""
+        contadores, medidas = {}, {}
+        for pool in self._pools:
+            base = os.path.basename(pool.db_name)
+            for evento, valor in pool.estadisticas.items():
+                contadores[('sqlite_conexiones_total', base, evento)] = valor
+            medidas[('sqlite_conexiones_libres', base)] = len(pool)
+
+        sistema = self._sistema
+        if sistema is not None:
+            for familia, componente in (('cache_usuarios', sistema.cache_usuarios),
+                                        ('cache_resultados', sistema.cache_resultados)):
+                for evento, valor in componente.estadisticas.items():
+                    contadores[(f'{familia}_total', evento)] = valor
+                medidas[(f'{familia}_entradas',)] = len(componente)
+            for evento, valor in sistema.hashing.estadisticas.items():
+                contadores[('hashing_total', evento)] = valor
+            for evento, valor in sistema.eventos.estadisticas.items():
+                if evento == 'suscriptores':
+                    medidas[('eventos_suscriptores',)] = valor
+                else:
+                    contadores[('eventos_total', evento)] = valor
+        return contadores, medidas
+
+    def recolectar(self):
+        """(contadores, valores instantáneos) de este proceso, o de todos los del directorio"""
+        contadores = self.instantanea()
+        externos, medidas = self._estadisticas()
+        _sumar(contadores, externos)
+        if not self.directorio:
+            return contadores, medidas
+
+        propio = f'{os.getpid()}.json'
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith('.json') or nombre == propio:
+                continue
+            try:
+                with open(os.path.join(self.directorio, nombre), encoding='utf-8') as f:
+                    datos = json.load(f)
+            except (OSError, ValueError):
+                continue
+            _sumar(contadores, _deserializar(datos['contadores']))
+            if _proceso_vivo(datos['pid']):
+                _sumar(medidas, _deserializar(datos['medidas']))
+        return contadores, medidas
+
+    def volcar(self):
+        """Escribir los contadores de este proceso en el directorio compartido"""
+        if not self.directorio or not self._lock_volcado.acquire(blocking=False):
+            return
+        try:
+            self._proximo_volcado = time.monotonic() + self.intervalo_volcado
+            contadores = self.instantanea()
+            externos, medidas = self._estadisticas()
+            _sumar(contadores, externos)
+            datos = {'pid': os.getpid(), 'contadores': _serializar(contadores), 'medidas': _serializar(medidas)}
+
+            ruta = os.path.join(self.directorio, f'{os.getpid()}.json')
+            temporal = f'{ruta}.tmp'
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(datos, f)
+            os.replace(temporal, ruta)
+        except OSError as e:
+            print(f"⚠️ No se pudieron volcar las métricas en {self.directorio}: {e}")
+        finally:
+            self._lock_volcado.release()
+
+    def texto(self):
+        return texto_prometheus(*self.recolectar())
+
+
+def limpiar_directorio(directorio):
+    """Borrar los volcados de una ejecución anterior (antes de arrancar los workers)"""
+    if not directorio or not os.path.isdir(directorio):
+        return
+    for nombre in os.listdir(directorio):
+        if nombre.endswith(('.json', '.json.tmp')):
+            os.remove(os.path.join(directorio, nombre))
+
+
+# ========== FORMATO ==========
+
+def _sumar(destino, origen):
+    for clave, valor in origen.items():
+        if isinstance(valor, list):
+            actual = destino.get(clave)
+            if actual is None:
+                destino[clave] = list(valor)
+            else:
+                for i, parcial in enumerate(valor):
+                    actual[i] += parcial
+        else:
+            destino[clave] = destino.get(clave, 0) + valor
+
+
+def _serializar(series):
+    return [[list(clave), valor] for clave, valor in series.items()]
+
+
+def _deserializar(series):
+    return {tuple(clave): valor for clave, valor in series}
+
+
+def _proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(valor) if isinstance(valor, float) else str(valor)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(pares):
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in pares) + '}'
+
+
+def texto_prometheus(contadores, medidas):
+    """Formato de exposición de texto de Prometheus (versión 0.0.4)"""
+    por_familia = {}
+    for series in (contadores, medidas):
+        for clave, valor in series.items():
+            por_familia.setdefault(clave[0], []).append((clave[1:], valor))
+
+    lineas = []
+    for familia, (tipo, ayuda, etiquetas, buckets) in FAMILIAS.items():
+        series = por_familia.get(familia)
+        if not series:
+            continue
+        nombre = f'{PREFIJO}_{familia}'
+        lineas.append(f'# HELP {nombre} {ayuda}')
+        lineas.append(f'# TYPE {nombre} {tipo}')
+        for valores, valor in sorted(series, key=lambda serie: serie[0]):
+            pares = list(zip(etiquetas, valores))
+            if tipo != 'histogram':
+                lineas.append(f'{nombre}{_etiquetas(pares)} {_numero(valor)}')
+                continue
+            acumulado = 0
+            for limite, cuenta in zip(buckets + (float('inf'),), valor):
+                acumulado += cuenta
+                lineas.append(f'{nombre}_bucket{_etiquetas(pares + [("le", _numero(limite))])} {acumulado}')
+            lineas.append(f'{nombre}_sum{_etiquetas(pares)} {_numero(valor[-1])}')
+            lineas.append(f'{nombre}_count{_etiquetas(pares)} {acumulado}')
+    return '\n'.join(lineas) + '\n'
+
+
+# ========== FLASK ==========
+
+def registrar_metricas(app, obtener_metricas):
+    """Medir cada petición y agregar /metrics (usuarios de ADMINISTRADORES o METRICAS_TOKEN)
+
+    obtener_metricas() devuelve las Metricas del proceso actual.
+    """
+    if not app.config['METRICAS']:
+        return
+
+    def iniciar_medicion():
+        g.metricas = obtener_metricas()
+        g.metricas.inicio_peticion()
+
+    # Antes que los demás before_request: también cuentan las redirecciones al login
+    app.before_request_funcs.setdefault(None, []).insert(0, iniciar_medicion)
+
+    @app.after_request
+    def terminar_medicion(respuesta):
+        metricas = g.pop('metricas', None)
+        if metricas is not None:
+            metricas.fin_peticion(request.endpoint or 'sin_ruta', request.method, respuesta.status_code)
+        return respuesta
+
+    def exponer_metricas():
+        token, enviado = app.config['METRICAS_TOKEN'], token_de_peticion(request)
+        con_token = bool(token and enviado) and hmac.compare_digest(enviado.encode(), token.encode())
+        if not con_token and not (current_user.is_authenticated
+                                  and current_user.id in app.config['ADMINISTRADORES']):
+            abort(403)
+        return Response(obtener_metricas().texto(), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metricas', exponer_metricas)
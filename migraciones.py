@@ -0,0 +1,161 @@
+"""Migraciones del esquema de las tablas de cada usuario.
+
+MIGRACIONES_USUARIO es la lista ordenada de cambios de esquema. Cada usuario
+guarda en schema_version.version el número de la última que tiene aplicada y
+la tabla schema_migrations registra cada migración: cuándo la vio por primera
+vez la aplicación y cuándo quedaron todos los usuarios al día.
+
+    python gestion.py migrar [--lote 200] [--segundos-lote 1] [--pausa 0.05]
+    python gestion.py migrar --estado
+
+El comando recorre los usuarios pendientes por lotes, un lote por transacción
+y cada usuario en su propio SAVEPOINT; si se interrumpe, al volver a lanzarlo
+sigue por los que faltan. Un usuario que entra antes de que el comando llegue
+a él recibe sus migraciones en esa petición (asegurar_esquema_usuario).
+
+Para cambiar el esquema: actualizar el DDL de SistemaInventario (lo que reciben
+los usuarios nuevos) y añadir al final una migración que lleve las tablas
+existentes a ese mismo estado. Cada migración comprueba el estado antes de
+tocar nada, porque la base (esquema_base) ya aplica el DDL actual.
+
+En el almacenamiento por usuario el esquema tiene decenas de objetos por
+usuario y el coste del DDL crece con él: cada CREATE o DROP recorre
+sqlite_master, y ALTER TABLE ... RENAME (de tabla o de columna) y ADD COLUMN
+vuelven a analizar el esquema entero. Con unos miles de usuarios un RENAME
+COLUMN tarda segundos por tabla, así que las migraciones cambian columnas
+con reconstruir_tabla (copia en TEMP, DROP y CREATE con el mismo nombre) y
+no ejecutan DDL en los usuarios que ya están al día.
+"""
+from almacenamiento import POR_USUARIO
+
+# Sufijo de la copia temporal de las filas en reconstruir_tabla
+SUFIJO_COPIA = '__copia'
+
+# (modo, tabla) -> definición de referencia (ver definicion_de_referencia)
+_REFERENCIAS = {}
+
+
+def columnas_de(cursor, tabla, esquema='main'):
+    cursor.execute(f'PRAGMA {esquema}.table_info({tabla})')
+    return [col[1] for col in cursor.fetchall()]
+
+
+def definicion_tabla(cursor, tabla, esquema='main'):
+    """({columna: (tipo, not null, default, posición en la clave primaria)}, columnas de cada UNIQUE)"""
+    cursor.execute(f'PRAGMA {esquema}.table_info({tabla})')
+    columnas = {col[1]: (col[2].upper(), col[3], col[4], col[5]) for col in cursor.fetchall()}
+    cursor.execute(f'PRAGMA {esquema}.index_list({tabla})')
+    restricciones = [indice[1] for indice in cursor.fetchall() if indice[3] == 'u']
+    unicas = set()
+    for indice in restricciones:
+        cursor.execute(f'PRAGMA {esquema}.index_info({indice})')
+        unicas.add(tuple(col[2] for col in cursor.fetchall()))
+    return columnas, unicas
+
+
+def definicion_de_referencia(cursor, clave, cuerpo):
+    """Definición que tendría una tabla creada hoy con `cuerpo` (se calcula una vez por proceso)"""
+    if clave not in _REFERENCIAS:
+        cursor.execute(f'CREATE TEMP TABLE referencia_migracion {cuerpo}')
+        try:
+            _REFERENCIAS[clave] = definicion_tabla(cursor, 'referencia_migracion', 'temp')
+        finally:
+            cursor.execute('DROP TABLE temp.referencia_migracion')
+    return _REFERENCIAS[clave]
+
+
+def difiere_de(actual, referencia):
+    """Si a la tabla le falta algo de la referencia (las columnas de más no cuentan)"""
+    columnas, unicas = actual
+    columnas_referencia, unicas_referencia = referencia
+    return (any(columnas.get(nombre) != definicion for nombre, definicion in columnas_referencia.items())
+            or not unicas_referencia <= unicas)
+
+
+def reconstruir_tabla(cursor, tabla, cuerpo, renombradas=None):
+    """Rehacer `tabla` con la definición `cuerpo` conservando filas, ids, índices y triggers.
+
+    Las filas pasan por una copia en TEMP, la tabla se borra y se vuelve a
+    crear con su mismo nombre. `renombradas` ({anterior: nueva}) cambia el
+    nombre de columnas al copiar; las columnas que la tabla tenga de más se
+    conservan al final. Si las filas no cumplen la nueva definición (p. ej.
+    códigos repetidos) lanza sqlite3.IntegrityError y el SAVEPOINT del
+    usuario deshace todo.
+    """
+    renombradas = renombradas or {}
+    copia = f'{tabla}{SUFIJO_COPIA}'
+    cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+        (tabla,)
+    )
+    dependientes = [fila[0] for fila in cursor.fetchall()]
+    cursor.execute(f'PRAGMA table_info({tabla})')
+    anteriores = [(col[1], col[2]) for col in cursor.fetchall()]
+    # AUTOINCREMENT no debe volver a dar los ids de filas ya borradas
+    cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (tabla,))
+    secuencia = cursor.fetchone()
+
+    cursor.execute(f'CREATE TEMP TABLE {copia} AS SELECT * FROM main.{tabla}')
+    cursor.execute(f'DROP TABLE main.{tabla}')
+    cursor.execute(f'CREATE TABLE main.{tabla} {cuerpo}')
+    nuevas = columnas_de(cursor, tabla)
+    destinos = []
+    for columna, tipo in anteriores:
+        destino = renombradas.get(columna, columna)
+        if destino not in nuevas:
+            cursor.execute(f'ALTER TABLE main.{tabla} ADD COLUMN "{destino}" {tipo}')
+        destinos.append(destino)
+    origen = ', '.join(f'"{columna}"' for columna, _ in anteriores)
+    destino = ', '.join(f'"{columna}"' for columna in destinos)
+    cursor.execute(f'INSERT INTO main.{tabla} ({destino}) SELECT {origen} FROM temp.{copia}')
+    cursor.execute(f'DROP TABLE temp.{copia}')
+    if secuencia:
+        cursor.execute('UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?', (secuencia[0], tabla))
+    for sql in dependientes:
+        cursor.execute(sql)
+
+
+def reparar_tablas(sistema, cursor, tablas):
+    """Reconstruir las tablas del usuario que no tengan la definición actual; devuelve si rehízo alguna.
+
+    Cubre lo que dejaron los scripts de reparación anteriores: categoria en
+    lugar de ubicacion y columnas sin añadir (reparacion_total.py), y tablas
+    copiadas con CREATE TABLE ... AS SELECT, sin clave primaria, UNIQUE(codigo),
+    NOT NULL ni valores por defecto (reparacion_migracion.py).
+    """
+    if tablas.modo != POR_USUARIO:
+        return False
+    reconstruidas = False
+    for tabla, cuerpo in sistema._definiciones_tablas_usuario(tablas).items():
+        nombre = getattr(tablas, tabla)
+        actual = definicion_tabla(cursor, nombre)
+        if not actual[0] or not difiere_de(actual, definicion_de_referencia(cursor, (tablas.modo, tabla), cuerpo)):
+            continue
+        renombradas = {'categoria': 'ubicacion'} if tabla == 'productos' and 'ubicacion' not in actual[0] else {}
+        reconstruir_tabla(cursor, nombre, cuerpo, renombradas)
+        reconstruidas = True
+        print(f"✅ Tabla {nombre} reconstruida con la definición actual")
+    return reconstruidas
+
+
+# ========== MIGRACIONES ==========
+
+def esquema_base(sistema, cursor, tablas):
+    """Versiones 1 a 6: tablas, columnas, índices, triggers, resúmenes e índice de búsqueda"""
+    reparar_tablas(sistema, cursor, tablas)
+    sistema._preparar_esquema_usuario(cursor, tablas)
+
+
+def restaurar_claves(sistema, cursor, tablas):
+    """Usuarios que ya llegaron a la versión 6 con tablas copiadas por reparacion_migracion.py"""
+    if reparar_tablas(sistema, cursor, tablas):
+        # La copia se llevó los índices y triggers de la tabla original
+        sistema._preparar_esquema_usuario(cursor, tablas)
+
+
+# (versión, nombre, función(sistema, cursor, tablas)), en orden. La versión 6
+# agrupa todo lo anterior al registro de migraciones.
+MIGRACIONES_USUARIO = [
+    (6, 'esquema_base', esquema_base),
+    (7, 'restaurar_claves', restaurar_claves),
+]
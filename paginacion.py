@@ -0,0 +1,59 @@
+import base64
+import binascii
+import json
+import math
+
+
+def codificar_cursor(direccion, clave, pagina):
+    """Cursor opaco para la URL: dirección ('sig' o 'ant'), valores de la clave y número de página"""
+    datos = json.dumps([direccion, list(clave), pagina], separators=(',', ':'), ensure_ascii=False)
+    return base64.urlsafe_b64encode(datos.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(token):
+    """Devolver (direccion, clave, pagina) o None si el cursor no es válido"""
+    if not token:
+        return None
+    try:
+        relleno = '=' * (-len(token) % 4)
+        direccion, clave, pagina = json.loads(base64.urlsafe_b64decode(token + relleno))
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    if direccion not in ('sig', 'ant') or not isinstance(clave, list) or not isinstance(pagina, int):
+        return None
+    return direccion, clave, pagina
+
+
+class PaginaKeyset:
+    """Página de resultados paginados por clave (keyset).
+
+    Expone los mismos atributos que usan las plantillas para la paginación
+    (has_prev, has_next, prev_num, next_num, page, pages); prev_num y
+    next_num son cursores opacos en lugar de números de página.
+    """
+
+    def __init__(self, items, pagina, por_pagina, total, cursor_anterior=None, cursor_siguiente=None):
+        self.items = items
+        self.page = pagina
+        self.per_page = por_pagina
+        self.total = total
+        self.prev_num = cursor_anterior
+        self.next_num = cursor_siguiente
+
+    @property
+    def has_prev(self):
+        return self.prev_num is not None
+
+    @property
+    def has_next(self):
+        return self.next_num is not None
+
+    @property
+    def pages(self):
+        return max(1, math.ceil(self.total / self.per_page)) if self.per_page else 1
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
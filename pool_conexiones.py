@@ -0,0 +1,362 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Valores por defecto del pool; se pueden sobrescribir desde app.config
+CONFIG_POR_DEFECTO = {
+    'SQLITE_POOL_SIZE': 8,
+    'SQLITE_CACHE_SIZE_KB': 16384,        # 16 MB de cache de páginas por conexión
+    'SQLITE_MMAP_SIZE': 128 * 1024 * 1024,  # 128 MB mapeados en memoria
+    'SQLITE_BUSY_TIMEOUT_MS': 5000,
+    'SQLITE_JOURNAL_MODE': 'WAL',
+    'SQLITE_SYNCHRONOUS': 'NORMAL',
+    'SQLITE_HEALTHCHECK_SEGUNDOS': 30,
+}
+
+
+def opciones_pool_desde_config(config):
+    """Traducir las claves SQLITE_* de la configuración de Flask a argumentos del pool"""
+    valores = dict(CONFIG_POR_DEFECTO)
+    valores.update({k: v for k, v in config.items() if k in CONFIG_POR_DEFECTO})
+    return {
+        'tamano_maximo': int(valores['SQLITE_POOL_SIZE']),
+        'cache_size_kb': int(valores['SQLITE_CACHE_SIZE_KB']),
+        'mmap_size': int(valores['SQLITE_MMAP_SIZE']),
+        'busy_timeout_ms': int(valores['SQLITE_BUSY_TIMEOUT_MS']),
+        'journal_mode': valores['SQLITE_JOURNAL_MODE'],
+        'synchronous': valores['SQLITE_SYNCHRONOUS'],
+        'intervalo_verificacion': float(valores['SQLITE_HEALTHCHECK_SEGUNDOS']),
+    }
+
+
+class CursorMedido(sqlite3.Cursor):
+    """Cursor que suma en su conexión el tiempo de cada sentencia y de la lectura de sus filas"""
+
+    def execute(self, *args):
+        inicio = time.perf_counter()
+        try:
+            return sqlite3.Cursor.execute(self, *args)
+        finally:
+            self.connection.medir(inicio, 1)
+
+    def executemany(self, *args):
+        inicio = time.perf_counter()
+        try:
+            return sqlite3.Cursor.executemany(self, *args)
+        finally:
+            self.connection.medir(inicio, 1)
+
+    def executescript(self, *args):
+        inicio = time.perf_counter()
+        try:
+            return sqlite3.Cursor.executescript(self, *args)
+        finally:
+            self.connection.medir(inicio, 1)
+
+    def fetchone(self):
+        inicio = time.perf_counter()
+        try:
+            return sqlite3.Cursor.fetchone(self)
+        finally:
+            self.connection.medir(inicio, 0)
+
+    def fetchmany(self, *args):
+        inicio = time.perf_counter()
+        try:
+            return sqlite3.Cursor.fetchmany(self, *args)
+        finally:
+            self.connection.medir(inicio, 0)
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        try:
+            return sqlite3.Cursor.fetchall(self)
+        finally:
+            self.connection.medir(inicio, 0)
+
+
+class ConexionMedida(sqlite3.Connection):
+    """Conexión cuyas sentencias pasan todas por CursorMedido (también conn.execute).
+
+    Acumula sentencias y segundos en la propia conexión, que sólo usa el hilo
+    que la tiene prestada; el pool los pasa a las métricas al devolverla.
+    """
+
+    sentencias = 0
+    segundos = 0.0
+
+    def medir(self, inicio, sentencias):
+        self.segundos += time.perf_counter() - inicio
+        self.sentencias += sentencias
+
+    def cursor(self, factory=CursorMedido):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+    def executescript(self, *args):
+        return self.cursor().executescript(*args)
+
+    def commit(self):
+        inicio = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            self.medir(inicio, 0)
+
+
+class CursorTrazado(CursorMedido):
+    """Cursor que además lleva la cuenta de su sentencia actual para el registro de consultas lentas"""
+
+    _traza = None
+
+    def execute(self, sql, parametros=()):
+        self._traza = self.connection.iniciar_traza(sql, parametros)
+        inicio = time.perf_counter()
+        try:
+            return CursorMedido.execute(self, sql, parametros)
+        finally:
+            self._traza[2] += time.perf_counter() - inicio
+
+    def executemany(self, sql, parametros):
+        self._traza = self.connection.iniciar_traza(sql, None)
+        inicio = time.perf_counter()
+        try:
+            return CursorMedido.executemany(self, sql, parametros)
+        finally:
+            self._traza[2] += time.perf_counter() - inicio
+
+    def executescript(self, script):
+        self._traza = self.connection.iniciar_traza(script, None)
+        inicio = time.perf_counter()
+        try:
+            return CursorMedido.executescript(self, script)
+        finally:
+            self._traza[2] += time.perf_counter() - inicio
+
+    def _leer(self, metodo, *args):
+        inicio = time.perf_counter()
+        try:
+            return metodo(self, *args)
+        finally:
+            if self._traza is not None:
+                self._traza[2] += time.perf_counter() - inicio
+
+    def fetchone(self):
+        return self._leer(CursorMedido.fetchone)
+
+    def fetchmany(self, *args):
+        return self._leer(CursorMedido.fetchmany, *args)
+
+    def fetchall(self):
+        return self._leer(CursorMedido.fetchall)
+
+
+class ConexionTrazada(ConexionMedida):
+    """Conexión que anota cada sentencia (SQL, parámetros, segundos, ejecuciones) mientras está prestada.
+
+    set_trace_callback avisa cada vez que SQLite empieza a ejecutar la
+    sentencia en curso o uno de sus triggers. Al devolverla, el pool revisa
+    las anotaciones y pasa las lentas al registro de consultas lentas.
+    """
+
+    consultas_lentas = None
+
+    def preparar_trazas(self, consultas_lentas):
+        self.consultas_lentas = consultas_lentas
+        self._trazas = []
+        self.set_trace_callback(self._trazar)
+
+    def _trazar(self, sql):
+        # El BEGIN implícito del módulo sqlite3 no es parte de la sentencia
+        if self._trazas and not sql.startswith('BEGIN'):
+            self._trazas[-1][3] += 1
+
+    def cursor(self, factory=CursorTrazado):
+        return super().cursor(factory)
+
+    def iniciar_traza(self, sql, parametros):
+        traza = [sql, parametros, 0.0, 0]
+        self._trazas.append(traza)
+        return traza
+
+    def revisar_trazas(self):
+        trazas, self._trazas = self._trazas, []
+        umbral = self.consultas_lentas.umbral_segundos
+        for sql, parametros, segundos, ejecuciones in trazas:
+            if segundos >= umbral:
+                self.consultas_lentas.registrar(self, sql, parametros, segundos, ejecuciones)
+
+
+class PoolConexiones:
+    """Pool de conexiones SQLite reutilizables con afinidad por hilo.
+
+    Cada hilo obtiene una única conexión mientras la tiene prestada (los
+    checkout anidados del mismo hilo reutilizan la misma conexión). Al
+    devolverla queda en una pila LIFO de conexiones libres, de modo que el
+    siguiente hilo que la pida la encuentra con la cache de páginas caliente.
+    Los PRAGMA se aplican una sola vez, al crear la conexión.
+
+    Con metricas (ver metricas.py) las conexiones miden cada sentencia, lectura
+    de filas y commit: es el único punto por el que la aplicación accede a SQLite.
+    Con consultas_lentas (ver consultas_lentas.py) además anotan cada sentencia y,
+    al devolverse, registran las que superaron el umbral con su plan.
+    """
+
+    def __init__(self, db_name, tamano_maximo=8, cache_size_kb=16384, mmap_size=128 * 1024 * 1024,
+                 busy_timeout_ms=5000, journal_mode='WAL', synchronous='NORMAL', intervalo_verificacion=30,
+                 metricas=None, consultas_lentas=None):
+        self.db_name = db_name
+        self.tamano_maximo = tamano_maximo
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.intervalo_verificacion = intervalo_verificacion
+
+        self._libres = []  # pila de (conexion, instante en que se devolvió)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._cerrado = False
+        self.estadisticas = {'creadas': 0, 'reutilizadas': 0, 'descartadas': 0}
+        self.metricas = metricas if metricas is not None and metricas.activas else None
+        self.consultas_lentas = consultas_lentas
+        self.base = os.path.basename(db_name)
+        if self.metricas is not None:
+            self.metricas.registrar_pool(self)
+
+    # ========== CICLO DE VIDA DE CONEXIONES ==========
+
+    def _crear_conexion(self):
+        conn = sqlite3.connect(
+            self.db_name,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            factory=self._clase_conexion()
+        )
+        conn.row_factory = sqlite3.Row
+        if self.consultas_lentas is not None:
+            conn.preparar_trazas(self.consultas_lentas)
+        self._aplicar_pragmas(conn)
+        with self._lock:
+            self.estadisticas['creadas'] += 1
+        return conn
+
+    def _clase_conexion(self):
+        if self.consultas_lentas is not None:
+            return ConexionTrazada
+        if self.metricas is not None:
+            return ConexionMedida
+        return sqlite3.Connection
+
+    def _aplicar_pragmas(self, conn):
+        if self.journal_mode and self.db_name != ':memory:':
+            conn.execute(f'PRAGMA journal_mode={self.journal_mode}')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        conn.execute(f'PRAGMA cache_size=-{int(self.cache_size_kb)}')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+
+    def _esta_sana(self, conn):
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _descartar(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self.estadisticas['descartadas'] += 1
+
+    # ========== CHECKOUT / CHECKIN ==========
+
+    def checkout(self):
+        """Prestar una conexión al hilo actual (reentrante)"""
+        local = self._local
+        if getattr(local, 'conn', None) is not None:
+            local.profundidad += 1
+            return local.conn
+
+        conn = None
+        while conn is None:
+            with self._lock:
+                candidata = self._libres.pop() if self._libres else None
+            if candidata is None:
+                conn = self._crear_conexion()
+                break
+
+            candidata, devuelta_en = candidata
+            inactiva = time.monotonic() - devuelta_en
+            if inactiva > self.intervalo_verificacion and not self._esta_sana(candidata):
+                self._descartar(candidata)
+                continue
+
+            conn = candidata
+            with self._lock:
+                self.estadisticas['reutilizadas'] += 1
+
+        local.conn = conn
+        local.profundidad = 1
+        return conn
+
+    def checkin(self, conn):
+        """Devolver la conexión prestada; sólo vuelve al pool en el último checkin del hilo"""
+        local = self._local
+        local.profundidad -= 1
+        if local.profundidad > 0:
+            return
+        local.conn = None
+        if self.consultas_lentas is not None:
+            conn.revisar_trazas()
+        if self.metricas is not None:
+            self._pasar_a_metricas(conn)
+
+        # Una transacción a medias (excepción antes del commit) no debe filtrarse al siguiente uso
+        if conn.in_transaction:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                self._descartar(conn)
+                return
+
+        with self._lock:
+            if not self._cerrado and len(self._libres) < self.tamano_maximo:
+                self._libres.append((conn, time.monotonic()))
+                return
+        self._descartar(conn)
+
+    def _pasar_a_metricas(self, conn):
+        if conn.sentencias or conn.segundos:
+            self.metricas.tiempo_sql(self.base, conn.segundos, conn.sentencias)
+            conn.sentencias, conn.segundos = 0, 0.0
+
+    @contextmanager
+    def conexion(self):
+        conn = self.checkout()
+        try:
+            yield conn
+        finally:
+            self.checkin(conn)
+
+    def cerrar(self):
+        """Cerrar todas las conexiones libres; las prestadas se cierran al devolverse"""
+        with self._lock:
+            self._cerrado = True
+            libres, self._libres = self._libres, []
+        for conn, _ in libres:
+            conn.close()
+
+    def __len__(self):
+        """Conexiones libres"""
+        return len(self._libres)
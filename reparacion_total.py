@@ -1,75 +0,0 @@
-import sqlite3
-import os
-
-def reparacion_total():
-    """REPARACIÓN TOTAL Y DEFINITIVA"""
-    print("🛠️ REPARACIÓN TOTAL DEL SISTEMA")
-    print("=" * 50)
-    
-    db_name = "inventario.db"
-    
-    if not os.path.exists(db_name):
-        print("❌ No existe la base de datos")
-        return
-    
-    conn = sqlite3.connect(db_name)
-    cursor = conn.cursor()
-    
-    # 1. Obtener TODOS los usuarios
-    cursor.execute('SELECT id, username FROM usuarios ORDER BY id')
-    usuarios = cursor.fetchall()
-    
-    print(f"👥 Encontrados {len(usuarios)} usuarios:")
-    
-    # 2. Crear tablas para CADA usuario
-    for user_id, username in usuarios:
-        print(f"   🔧 Usuario {user_id}: {username}")
-        
-        # Tabla productos
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS productos_{user_id} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                codigo TEXT UNIQUE NOT NULL,
-                nombre TEXT NOT NULL,
-                descripcion TEXT,
-                categoria TEXT,
-                precio_compra REAL,
-                stock_actual INTEGER DEFAULT 0,
-                stock_minimo INTEGER DEFAULT 0,
-                fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Tabla movimientos
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS movimientos_{user_id} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                producto_id INTEGER,
-                tipo TEXT NOT NULL,
-                cantidad INTEGER NOT NULL,
-                motivo TEXT,
-                fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (producto_id) REFERENCES productos_{user_id} (id)
-            )
-        ''')
-    
-    # 3. Verificar
-    print("\n✅ VERIFICACIÓN:")
-    for user_id, username in usuarios:
-        cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='productos_{user_id}'")
-        productos_existe = "✅" if cursor.fetchone() else "❌"
-        
-        cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='movimientos_{user_id}'")
-        movimientos_existe = "✅" if cursor.fetchone() else "❌"
-        
-        print(f"   Usuario {user_id}: Productos {productos_existe} | Movimientos {movimientos_existe}")
-    
-    conn.commit()
-    conn.close()
-    
-    print("\n🎉 ¡REPARACIÓN TOTAL COMPLETADA!")
-    print("💡 Ahora los usuarios 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39, 40, 41, 42, 43, 44, 45, 46, 47, 48, 49, 50, 51, 52, 53, 54, 55, 56, 57, 58, 59, 60, 61, 62, 63, 64, 65, 66, 67, 68, 69, 70, 71, 72, 73, 74, 75, 76, 77, 78, 79, 80, 81, 82, 83, 84, 85, 86, 87, 88, 89, 90, 91, 92, 93, 94, 95, 96, 97, 98, 99, 100... TODOS tienen sus tablas")
-    print("🚀 Puedes crear nuevos usuarios SIN errores")
-
-if __name__ == "__main__":
-    reparacion_total()
\ No newline at end of file
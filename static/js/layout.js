@@ -0,0 +1,40 @@
+// Actualizar hora del servidor
+function updateServerTime() {
+    const now = new Date();
+    const options = {
+        weekday: 'long',
+        year: 'numeric',
+        month: 'long',
+        day: 'numeric',
+        hour: '2-digit',
+        minute: '2-digit',
+        second: '2-digit',
+        hour12: false
+    };
+    const timeString = now.toLocaleDateString('es-ES', options);
+    document.getElementById('server-time').textContent = timeString;
+}
+
+// Cerrar notificaciones
+document.addEventListener('DOMContentLoaded', function() {
+    updateServerTime();
+    setInterval(updateServerTime, 1000);
+
+    // Cerrar notificaciones al hacer clic
+    document.querySelectorAll('.notification-close').forEach(button => {
+        button.addEventListener('click', function() {
+            this.closest('.notification').style.opacity = '0';
+            setTimeout(() => {
+                this.closest('.notification').remove();
+            }, 300);
+        });
+    });
+
+    // Cerrar notificaciones automáticamente después de 5 segundos
+    setTimeout(() => {
+        document.querySelectorAll('.notification').forEach(notification => {
+            notification.style.opacity = '0';
+            setTimeout(() => notification.remove(), 300);
+        });
+    }, 5000);
+});
@@ -0,0 +1,136 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Contador de caracteres para descripción
+    const descripcion = document.getElementById('descripcion');
+    const counter = document.getElementById('descripcion-counter');
+    const charStatus = document.getElementById('char-status');
+
+    function updateCharCounter() {
+        const length = descripcion.value.length;
+        counter.textContent = length;
+
+        if (length === 0) {
+            charStatus.textContent = '⚪ Vacío';
+            charStatus.className = 'char-status empty';
+        } else if (length < 50) {
+            charStatus.textContent = '🟡 Muy corto';
+            charStatus.className = 'char-status short';
+        } else if (length >= 50 && length <= 300) {
+            charStatus.textContent = '🟢 Suficiente';
+            charStatus.className = 'char-status good';
+        } else if (length > 300 && length < 450) {
+            charStatus.textContent = '🟠 Largo';
+            charStatus.className = 'char-status long';
+        } else if (length >= 450) {
+            charStatus.textContent = '🔴 Muy largo';
+            charStatus.className = 'char-status very-long';
+        }
+
+        if (length > 500) {
+            descripcion.value = descripcion.value.substring(0, 500);
+            counter.textContent = 500;
+            charStatus.textContent = '🔴 Límite alcanzado';
+        }
+    }
+
+    descripcion.addEventListener('input', updateCharCounter);
+    updateCharCounter(); // Inicializar
+
+    // Validación de formulario
+    const form = document.getElementById('addProductForm');
+    const submitBtn = document.getElementById('submitBtn');
+    const btnText = document.getElementById('btnText');
+    const btnLoading = document.getElementById('btnLoading');
+
+    form.addEventListener('submit', function(e) {
+        const codigo = document.getElementById('codigo').value;
+        const nombre = document.getElementById('nombre').value;
+        const precio = document.getElementById('precio_compra').value;
+        const stockActual = document.getElementById('stock_actual').value;
+        const stockMinimo = document.getElementById('stock_minimo').value;
+
+        // Validar formato de código
+        const codigoPattern = /^[A-Z]{3}-[0-9]{3}$/;
+        if (!codigoPattern.test(codigo)) {
+            e.preventDefault();
+            showError('El código debe tener el formato XXX-001 (ej: MOU-001)');
+            document.getElementById('codigo').focus();
+            return false;
+        }
+
+        // Validar precio positivo
+        if (parseFloat(precio) < 0) {
+            e.preventDefault();
+            showError('El precio debe ser un valor positivo');
+            document.getElementById('precio_compra').focus();
+            return false;
+        }
+
+        // Mostrar estado de carga
+        btnText.style.display = 'none';
+        btnLoading.style.display = 'inline';
+        submitBtn.disabled = true;
+        submitBtn.style.opacity = '0.7';
+        submitBtn.style.cursor = 'wait';
+
+        // Simular delay para mostrar la animación
+        setTimeout(() => {
+            submitBtn.disabled = false;
+            btnText.style.display = 'inline';
+            btnLoading.style.display = 'none';
+            submitBtn.style.opacity = '1';
+            submitBtn.style.cursor = 'pointer';
+        }, 2000);
+
+        return true;
+    });
+
+    // Auto-generar código basado en nombre
+    const nombreInput = document.getElementById('nombre');
+    const codigoInput = document.getElementById('codigo');
+
+    nombreInput.addEventListener('blur', function() {
+        if (!codigoInput.value && nombreInput.value.length >= 3) {
+            const initials = nombreInput.value.substring(0, 3).toUpperCase();
+            // Buscar el siguiente número disponible (esto sería mejor hacerlo en backend)
+            codigoInput.value = initials + '-001';
+        }
+    });
+});
+
+function showError(message) {
+    // Crear mensaje de error temporal
+    const errorDiv = document.createElement('div');
+    errorDiv.className = 'flash-message error';
+    errorDiv.innerHTML = `<i class="fas fa-exclamation-circle"></i> ${message}`;
+    errorDiv.style.animation = 'slideIn 0.5s ease-out';
+
+    // Insertar al principio de los mensajes flash
+    const flashMessages = document.querySelector('.flash-messages');
+    if (flashMessages) {
+        flashMessages.prepend(errorDiv);
+    } else {
+        const newFlashContainer = document.createElement('div');
+        newFlashContainer.className = 'flash-messages';
+        newFlashContainer.appendChild(errorDiv);
+        document.querySelector('.form-content-container').prepend(newFlashContainer);
+    }
+
+    // Eliminar después de 5 segundos
+    setTimeout(() => {
+        errorDiv.style.opacity = '0';
+        errorDiv.style.transform = 'translateX(-30px)';
+        setTimeout(() => errorDiv.remove(), 500);
+    }, 5000);
+}
+
+// Efecto de foco en inputs
+const inputs = document.querySelectorAll('.form-input, .form-select, .form-textarea');
+inputs.forEach(input => {
+    input.addEventListener('focus', function() {
+        this.parentElement.parentElement.classList.add('focused');
+    });
+
+    input.addEventListener('blur', function() {
+        this.parentElement.parentElement.classList.remove('focused');
+    });
+});
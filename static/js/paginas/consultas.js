@@ -0,0 +1,51 @@
+function exportToCSV() {
+    alert('Función de exportación a CSV en desarrollo.\nPara exportar, use la opción de imprimir y seleccione "Guardar como PDF".');
+}
+
+function printResults() {
+    const contenedor = document.querySelector('.page-container-consultas');
+    const printContent = document.querySelector('.results-section').innerHTML;
+    const originalContent = document.body.innerHTML;
+
+    document.body.innerHTML = `
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Consulta de Productos - Sistema de Inventario</title>
+        </head>
+        <body>
+            <div class="print-header">
+                <h1>Consulta de Productos</h1>
+                <p><strong>Sistema de Inventario</strong></p>
+                <p><strong>Fecha:</strong> ${new Date().toLocaleDateString()}</p>
+                <p><strong>Consulta:</strong> <span id="print-consulta"></span></p>
+                <p><strong>Ubicación:</strong> <span id="print-ubicacion"></span></p>
+            </div>
+            ${printContent}
+            <div class="no-print" style="margin-top: 30px; text-align: center; font-size: 0.9rem; color: #666;">
+                <p>Documento generado automáticamente por el Sistema de Inventario</p>
+            </div>
+        </body>
+        </html>
+    `;
+    // Los filtros vienen del usuario: como texto, no como HTML
+    document.getElementById('print-consulta').textContent = contenedor.dataset.consulta;
+    document.getElementById('print-ubicacion').textContent = contenedor.dataset.ubicacion;
+
+    window.print();
+    document.body.innerHTML = originalContent;
+    window.location.reload();
+}
+
+// Efecto hover en inputs
+document.querySelectorAll('.form-group-consultas input, .form-group-consultas select').forEach(el => {
+    el.addEventListener('focus', function() {
+        this.style.borderColor = '#3b82f6';
+        this.style.boxShadow = '0 0 15px rgba(59, 130, 246, 0.4)';
+    });
+
+    el.addEventListener('blur', function() {
+        this.style.borderColor = 'rgba(96, 165, 250, 0.5)';
+        this.style.boxShadow = 'none';
+    });
+});
@@ -0,0 +1,128 @@
+// Dashboard en vivo: /dashboard/eventos (Server-Sent Events) envía el estado
+// completo al conectar y después sólo lo que cambia (ver eventos.py)
+document.addEventListener('DOMContentLoaded', function() {
+    const contenedor = document.querySelector('.dashboard-container[data-eventos]');
+    if (!contenedor || !window.EventSource) {
+        return;
+    }
+    conectarEventos(contenedor);
+});
+
+// Si el servidor rechaza la conexión (sin cupo) se reintenta pasado este tiempo
+const ESPERA_RECONEXION_MS = 30000;
+
+function conectarEventos(contenedor) {
+    const fuente = new EventSource(contenedor.dataset.eventos);
+
+    fuente.addEventListener('estado', function(evento) {
+        const estado = JSON.parse(evento.data);
+        actualizarEstadisticas(estado.estadisticas);
+        reemplazarStockBajo(contenedor, estado.bajos);
+    });
+
+    fuente.addEventListener('cambios', function(evento) {
+        const cambios = JSON.parse(evento.data);
+        actualizarEstadisticas(cambios.estadisticas);
+        cambios.salen.forEach(id => quitarFila(id));
+        cambios.entran.concat(cambios.cambian).forEach(producto => ponerFila(contenedor, producto));
+        ordenarYContar();
+    });
+
+    fuente.addEventListener('error', function() {
+        // EventSource reconecta solo salvo que el servidor responda con un error
+        if (fuente.readyState === EventSource.CLOSED) {
+            setTimeout(() => conectarEventos(contenedor), ESPERA_RECONEXION_MS);
+        }
+    });
+}
+
+function actualizarEstadisticas(estadisticas) {
+    Object.entries(estadisticas).forEach(([clave, valor]) => {
+        const elemento = document.querySelector(`[data-stat="${clave}"]`);
+        if (elemento) {
+            elemento.textContent = elemento.hasAttribute('data-moneda') ? '$' + Number(valor).toFixed(2) : valor;
+        }
+    });
+}
+
+function reemplazarStockBajo(contenedor, productos) {
+    document.getElementById('filasStockBajo').replaceChildren();
+    productos.forEach(producto => ponerFila(contenedor, producto));
+    ordenarYContar();
+}
+
+function quitarFila(id) {
+    const fila = document.querySelector(`#filasStockBajo tr[data-id="${id}"]`);
+    if (fila) {
+        fila.remove();
+    }
+}
+
+function ponerFila(contenedor, producto) {
+    const nueva = crearFila(contenedor, producto);
+    const actual = document.querySelector(`#filasStockBajo tr[data-id="${producto.id}"]`);
+    if (actual) {
+        actual.replaceWith(nueva);
+    } else {
+        document.getElementById('filasStockBajo').appendChild(nueva);
+    }
+}
+
+function crearFila(contenedor, producto) {
+    const fila = document.createElement('tr');
+    fila.className = 'critical-row';
+    fila.dataset.id = producto.id;
+    fila.dataset.stock = producto.stock_actual;
+
+    const codigo = document.createElement('span');
+    codigo.className = 'product-code';
+    codigo.textContent = producto.codigo;
+
+    const info = document.createElement('div');
+    info.className = 'product-info';
+    const nombre = document.createElement('strong');
+    nombre.textContent = producto.nombre;
+    info.appendChild(nombre);
+    if (producto.modelo) {
+        const modelo = document.createElement('small');
+        modelo.textContent = producto.modelo;
+        info.appendChild(modelo);
+    }
+
+    const ubicacion = document.createElement('span');
+    ubicacion.className = 'location-badge';
+    ubicacion.innerHTML = '<i class="fas fa-map-pin"></i> ';
+    ubicacion.append(producto.ubicacion || 'Sin ubicación');
+
+    const stock = document.createElement('span');
+    stock.className = 'stock-badge low';
+    stock.innerHTML = '<i class="fas fa-exclamation"></i> ';
+    stock.append(String(producto.stock_actual));
+
+    const acciones = document.createElement('div');
+    acciones.className = 'action-buttons';
+    acciones.innerHTML =
+        '<a class="btn-action edit" title="Editar producto"><i class="fas fa-edit"></i></a>' +
+        '<a class="btn-action add" title="Añadir stock"><i class="fas fa-plus"></i></a>';
+    // url_for('editar_producto', producto_id=0) termina en /0
+    acciones.children[0].href = contenedor.dataset.urlEditar.replace(/0$/, producto.id);
+    acciones.children[1].href = `${contenedor.dataset.urlMovimientos}?producto_id=${producto.id}`;
+
+    [codigo, info, ubicacion, stock, String(producto.stock_minimo), acciones].forEach(contenido => {
+        const celda = document.createElement('td');
+        celda.append(contenido);
+        fila.appendChild(celda);
+    });
+    return fila;
+}
+
+function ordenarYContar() {
+    const cuerpo = document.getElementById('filasStockBajo');
+    const filas = Array.from(cuerpo.children);
+    filas.sort((a, b) => Number(a.dataset.stock) - Number(b.dataset.stock));
+    filas.forEach(fila => cuerpo.appendChild(fila));
+
+    document.getElementById('contadorStockBajo').textContent = `${filas.length} productos`;
+    document.getElementById('tablaStockBajo').hidden = filas.length === 0;
+    document.getElementById('stockOptimo').hidden = filas.length > 0;
+}
@@ -0,0 +1,220 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Actualizar fecha y hora actual
+    function updateDateTime() {
+        const now = new Date();
+        const options = {
+            year: 'numeric',
+            month: 'long',
+            day: 'numeric',
+            hour: '2-digit',
+            minute: '2-digit',
+            second: '2-digit'
+        };
+        document.getElementById('currentDateTime').textContent =
+            now.toLocaleDateString('es-ES', options);
+    }
+
+    updateDateTime();
+    setInterval(updateDateTime, 1000);
+
+    // Contador de caracteres para descripción
+    const descripcion = document.getElementById('descripcion');
+    const counter = document.getElementById('descripcion-counter');
+    const charStatus = document.getElementById('char-status');
+
+    function updateCharCounter() {
+        const length = descripcion.value.length;
+        counter.textContent = length;
+
+        if (length === 0) {
+            charStatus.textContent = '⚪ Vacío';
+            charStatus.className = 'char-status empty';
+        } else if (length < 50) {
+            charStatus.textContent = '🟡 Muy corto';
+            charStatus.className = 'char-status short';
+        } else if (length >= 50 && length <= 300) {
+            charStatus.textContent = '🟢 Suficiente';
+            charStatus.className = 'char-status good';
+        } else if (length > 300 && length < 450) {
+            charStatus.textContent = '🟠 Largo';
+            charStatus.className = 'char-status long';
+        } else if (length >= 450) {
+            charStatus.textContent = '🔴 Muy largo';
+            charStatus.className = 'char-status very-long';
+        }
+
+        if (length > 500) {
+            descripcion.value = descripcion.value.substring(0, 500);
+            counter.textContent = 500;
+            charStatus.textContent = '🔴 Límite alcanzado';
+        }
+    }
+
+    descripcion.addEventListener('input', updateCharCounter);
+    updateCharCounter(); // Inicializar
+
+    // Validación de formulario
+    const form = document.getElementById('editProductForm');
+    const submitBtn = document.getElementById('submitBtn');
+    const btnText = document.getElementById('btnText');
+    const btnLoading = document.getElementById('btnLoading');
+
+    form.addEventListener('submit', function(e) {
+        const codigo = document.getElementById('codigo').value;
+        const nombre = document.getElementById('nombre').value;
+        const precio = document.getElementById('precio_compra').value;
+        const stockActual = document.getElementById('stock_actual').value;
+        const stockMinimo = document.getElementById('stock_minimo').value;
+
+        // Validar formato de código
+        const codigoPattern = /^[A-Z]{3}-[0-9]{3}$/;
+        if (!codigoPattern.test(codigo)) {
+            e.preventDefault();
+            showError('El código debe tener el formato XXX-001 (ej: MOU-001)');
+            document.getElementById('codigo').focus();
+            return false;
+        }
+
+        // Validar precio positivo
+        if (parseFloat(precio) < 0) {
+            e.preventDefault();
+            showError('El precio debe ser un valor positivo');
+            document.getElementById('precio_compra').focus();
+            return false;
+        }
+
+        // Validar stock positivo
+        if (parseInt(stockMinimo) < 0 || parseInt(stockActual) < 0) {
+            e.preventDefault();
+            showError('Los valores de stock deben ser números positivos o cero');
+            document.getElementById('stock_actual').focus();
+            return false;
+        }
+
+        // Mostrar confirmación antes de actualizar
+        if (!confirm('¿Estás seguro de que deseas actualizar este producto?\nLos cambios se guardarán permanentemente.')) {
+            e.preventDefault();
+            return false;
+        }
+
+        // Mostrar estado de carga
+        btnText.style.display = 'none';
+        btnLoading.style.display = 'inline';
+        submitBtn.disabled = true;
+        submitBtn.style.opacity = '0.7';
+        submitBtn.style.cursor = 'wait';
+
+        // Simular delay para mostrar la animación
+        setTimeout(() => {
+            submitBtn.disabled = false;
+            btnText.style.display = 'inline';
+            btnLoading.style.display = 'none';
+            submitBtn.style.opacity = '1';
+            submitBtn.style.cursor = 'pointer';
+        }, 2000);
+
+        return true;
+    });
+
+    // Restablecer valores originales
+    const originalValues = {
+        codigo: document.getElementById('codigo').value,
+        nombre: document.getElementById('nombre').value,
+        ubicacion: document.getElementById('ubicacion').value,
+        modelo: document.getElementById('modelo').value,
+        marca: document.getElementById('marca').value,
+        estado: document.getElementById('estado').value,
+        año_adquisicion: document.getElementById('año_adquisicion').value,
+        descripcion: document.getElementById('descripcion').value,
+        precio_compra: document.getElementById('precio_compra').value,
+        stock_actual: document.getElementById('stock_actual').value,
+        stock_minimo: document.getElementById('stock_minimo').value
+    };
+
+    document.querySelector('.btn-reset').addEventListener('click', function() {
+        if (confirm('¿Restablecer todos los campos a sus valores originales?')) {
+            document.getElementById('codigo').value = originalValues.codigo;
+            document.getElementById('nombre').value = originalValues.nombre;
+            document.getElementById('ubicacion').value = originalValues.ubicacion;
+            document.getElementById('modelo').value = originalValues.modelo;
+            document.getElementById('marca').value = originalValues.marca;
+            document.getElementById('estado').value = originalValues.estado;
+            document.getElementById('año_adquisicion').value = originalValues.año_adquisicion;
+            document.getElementById('descripcion').value = originalValues.descripcion;
+            document.getElementById('precio_compra').value = originalValues.precio_compra;
+            document.getElementById('stock_actual').value = originalValues.stock_actual;
+            document.getElementById('stock_minimo').value = originalValues.stock_minimo;
+
+            updateCharCounter();
+            showSuccess('Valores restablecidos correctamente');
+        }
+    });
+});
+
+function showStockHistory() {
+    alert('Función de historial de stock en desarrollo. Pronto disponible.');
+}
+
+function showError(message) {
+    // Crear mensaje de error temporal
+    const errorDiv = document.createElement('div');
+    errorDiv.className = 'flash-message error';
+    errorDiv.innerHTML = `<i class="fas fa-exclamation-circle"></i> ${message}`;
+    errorDiv.style.animation = 'slideIn 0.5s ease-out';
+
+    // Insertar al principio de los mensajes flash
+    const flashMessages = document.querySelector('.flash-messages');
+    if (flashMessages) {
+        flashMessages.prepend(errorDiv);
+    } else {
+        const newFlashContainer = document.createElement('div');
+        newFlashContainer.className = 'flash-messages';
+        newFlashContainer.appendChild(errorDiv);
+        document.querySelector('.form-content-container').prepend(newFlashContainer);
+    }
+
+    // Eliminar después de 5 segundos
+    setTimeout(() => {
+        errorDiv.style.opacity = '0';
+        errorDiv.style.transform = 'translateX(-30px)';
+        setTimeout(() => errorDiv.remove(), 500);
+    }, 5000);
+}
+
+function showSuccess(message) {
+    // Crear mensaje de éxito temporal
+    const successDiv = document.createElement('div');
+    successDiv.className = 'flash-message success';
+    successDiv.innerHTML = `<i class="fas fa-check-circle"></i> ${message}`;
+    successDiv.style.animation = 'slideIn 0.5s ease-out';
+
+    // Insertar al principio de los mensajes flash
+    const flashMessages = document.querySelector('.flash-messages');
+    if (flashMessages) {
+        flashMessages.prepend(successDiv);
+    } else {
+        const newFlashContainer = document.createElement('div');
+        newFlashContainer.className = 'flash-messages';
+        newFlashContainer.appendChild(successDiv);
+        document.querySelector('.form-content-container').prepend(newFlashContainer);
+    }
+
+    // Eliminar después de 3 segundos
+    setTimeout(() => {
+        successDiv.style.opacity = '0';
+        successDiv.style.transform = 'translateX(-30px)';
+        setTimeout(() => successDiv.remove(), 500);
+    }, 3000);
+}
+
+// Efecto de foco en inputs
+const inputs = document.querySelectorAll('.form-input, .form-select, .form-textarea');
+inputs.forEach(input => {
+    input.addEventListener('focus', function() {
+        this.parentElement.parentElement.classList.add('focused');
+    });
+
+    input.addEventListener('blur', function() {
+        this.parentElement.parentElement.classList.remove('focused');
+    });
+});
@@ -0,0 +1,196 @@
+// Auto-enfocar el campo de usuario
+document.addEventListener('DOMContentLoaded', function() {
+    document.getElementById('username').focus();
+
+    // Efecto de aparición escalonada
+    const elements = document.querySelectorAll('.form-group, .form-options, .login-btn, .register-section');
+    elements.forEach((element, index) => {
+        element.style.opacity = '0';
+        element.style.transform = 'translateY(20px)';
+        element.style.transition = 'all 0.5s ease';
+
+        setTimeout(() => {
+            element.style.opacity = '1';
+            element.style.transform = 'translateY(0)';
+        }, 100 + (index * 100));
+    });
+});
+
+// Validación del formulario
+document.getElementById('loginForm').addEventListener('submit', function(e) {
+    const username = document.getElementById('username').value.trim();
+    const password = document.getElementById('password').value;
+    const loginButton = document.getElementById('loginButton');
+    const btnText = document.getElementById('btnText');
+    const btnLoading = document.getElementById('btnLoading');
+
+    // Validaciones
+    if (!username) {
+        e.preventDefault();
+        showError('Por favor ingresa tu usuario');
+        document.getElementById('username').focus();
+        return false;
+    }
+
+    if (!password) {
+        e.preventDefault();
+        showError('Por favor ingresa tu contraseña');
+        document.getElementById('password').focus();
+        return false;
+    }
+
+    // Mostrar estado de carga
+    btnText.style.display = 'none';
+    btnLoading.style.display = 'inline';
+    loginButton.disabled = true;
+    loginButton.style.opacity = '0.7';
+    loginButton.style.cursor = 'wait';
+
+    // Simular delay para mostrar la animación
+    setTimeout(() => {
+        loginButton.disabled = false;
+        btnText.style.display = 'inline';
+        btnLoading.style.display = 'none';
+        loginButton.style.opacity = '1';
+        loginButton.style.cursor = 'pointer';
+    }, 2000);
+
+    return true;
+});
+
+// Función para mostrar errores
+function showError(message) {
+    // Crear mensaje de error temporal
+    const errorDiv = document.createElement('div');
+    errorDiv.className = 'flash-message error';
+    errorDiv.innerHTML = `<i class="fas fa-exclamation-circle"></i> ${message}`;
+
+    // Insertar al principio del formulario
+    const flashMessages = document.querySelector('.flash-messages');
+    const form = document.querySelector('.login-form');
+
+    if (flashMessages) {
+        flashMessages.prepend(errorDiv);
+    } else {
+        const newFlashContainer = document.createElement('div');
+        newFlashContainer.className = 'flash-messages';
+        newFlashContainer.appendChild(errorDiv);
+        form.parentNode.insertBefore(newFlashContainer, form);
+    }
+
+    // Animación de entrada
+    setTimeout(() => {
+        errorDiv.style.opacity = '1';
+        errorDiv.style.transform = 'translateX(0)';
+    }, 10);
+
+    // Eliminar después de 5 segundos
+    setTimeout(() => {
+        errorDiv.style.opacity = '0';
+        errorDiv.style.transform = 'translateX(-30px)';
+        setTimeout(() => errorDiv.remove(), 500);
+    }, 5000);
+}
+
+// Función para mostrar ayuda CON TU EMAIL
+function showHelp() {
+    const helpMessage = document.createElement('div');
+    helpMessage.className = 'flash-message info';
+    helpMessage.innerHTML = `
+        <div style="display: flex; align-items: flex-start; gap: 15px; width: 100%;">
+            <i class="fas fa-life-ring" style="font-size: 26px; margin-top: 2px;"></i>
+            <div style="flex: 1;">
+                <strong style="display: block; margin-bottom: 8px; font-size: 1.15rem; color: #93c5fd;">
+                    ¿Problemas para iniciar sesión?
+                </strong>
+                <p style="margin: 0 0 12px 0; color: #c7d2fe; font-size: 0.95rem;">
+                    Contacta al administrador del sistema para asistencia técnica.
+                </p>
+                <div style="background: rgba(59, 130, 246, 0.25); padding: 12px 16px; border-radius: 10px; margin-top: 10px; border: 1px solid rgba(59, 130, 246, 0.4);">
+                    <div style="display: flex; align-items: center; gap: 10px;">
+                        <i class="fas fa-envelope" style="color: #93c5fd; font-size: 18px;"></i>
+                        <div>
+                            <div style="font-weight: 600; color: #93c5fd; margin-bottom: 2px;">Email de soporte:</div>
+                            <a href="mailto:pechojose22@gmail.com"
+                               style="color: #60a5fa; text-decoration: none; font-weight: 500; font-size: 1rem;"
+                               onclick="copyEmail(event)">
+                                pechojose22@gmail.com
+                            </a>
+                        </div>
+                    </div>
+                </div>
+            </div>
+        </div>
+    `;
+
+    const flashMessages = document.querySelector('.flash-messages');
+    const form = document.querySelector('.login-form');
+
+    if (flashMessages) {
+        flashMessages.prepend(helpMessage);
+    } else {
+        const newFlashContainer = document.createElement('div');
+        newFlashContainer.className = 'flash-messages';
+        newFlashContainer.appendChild(helpMessage);
+        form.parentNode.insertBefore(newFlashContainer, form);
+    }
+
+    // Animación de entrada
+    setTimeout(() => {
+        helpMessage.style.opacity = '1';
+        helpMessage.style.transform = 'translateX(0)';
+    }, 10);
+
+    // Hacer scroll suave al mensaje
+    helpMessage.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
+
+    // Eliminar después de 10 segundos
+    setTimeout(() => {
+        helpMessage.style.opacity = '0';
+        helpMessage.style.transform = 'translateX(-30px)';
+        setTimeout(() => helpMessage.remove(), 500);
+    }, 10000);
+}
+
+// Función para copiar email al portapapeles
+function copyEmail(e) {
+    e.preventDefault();
+
+    const email = 'pechojose22@gmail.com';
+    navigator.clipboard.writeText(email)
+        .then(() => {
+            // Mostrar notificación
+            const notification = document.createElement('div');
+            notification.className = 'flash-message success';
+            notification.innerHTML = '<i class="fas fa-check-circle"></i> Email copiado al portapapeles';
+            notification.style.position = 'fixed';
+            notification.style.top = '20px';
+            notification.style.right = '20px';
+            notification.style.zIndex = '10000';
+            notification.style.width = '300px';
+            document.body.appendChild(notification);
+
+            // Eliminar después de 3 segundos
+            setTimeout(() => {
+                notification.style.opacity = '0';
+                notification.style.transform = 'translateY(-20px)';
+                setTimeout(() => notification.remove(), 300);
+            }, 3000);
+        })
+        .catch(err => {
+            console.log('Error al copiar:', err);
+        });
+}
+
+// Efectos en inputs
+const inputs = document.querySelectorAll('.form-control');
+inputs.forEach(input => {
+    input.addEventListener('focus', function() {
+        this.parentElement.style.transform = 'translateY(-3px)';
+        this.parentElement.style.transition = 'transform 0.3s ease';
+    });
+
+    input.addEventListener('blur', function() {
+        this.parentElement.style.transform = 'translateY(0)';
+    });
+});
@@ -0,0 +1,139 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Inicializar tooltips
+    initTooltips();
+
+    // Configurar switches
+    initSwitches();
+});
+
+function previewPhoto(event) {
+    const file = event.target.files[0];
+    if (!file) return;
+
+    // Validar tamaño (5MB máximo)
+    if (file.size > 5 * 1024 * 1024) {
+        alert('La imagen es muy grande. Máximo 5MB.');
+        return;
+    }
+
+    // Validar tipo
+    const validTypes = ['image/jpeg', 'image/png', 'image/gif'];
+    if (!validTypes.includes(file.type)) {
+        alert('Formato no válido. Use JPG, PNG o GIF.');
+        return;
+    }
+
+    const reader = new FileReader();
+    reader.onload = function(e) {
+        // Actualizar vista previa
+        const profileImage = document.getElementById('profileImage');
+        const noPhoto = document.getElementById('noPhoto');
+        const photoContainer = document.querySelector('.photo-container');
+
+        if (profileImage) {
+            profileImage.src = e.target.result;
+        } else {
+            if (noPhoto) {
+                noPhoto.style.display = 'none';
+            }
+
+            const newImage = document.createElement('img');
+            newImage.src = e.target.result;
+            newImage.alt = "Foto de perfil";
+            newImage.className = "profile-image";
+            newImage.id = "profileImage";
+
+            const overlay = document.createElement('div');
+            overlay.className = "photo-overlay";
+            overlay.innerHTML = '<span class="photo-status">🔄 Vista previa</span>';
+
+            photoContainer.innerHTML = '';
+            photoContainer.appendChild(newImage);
+            photoContainer.appendChild(overlay);
+        }
+
+        // Mostrar botón de guardar
+        document.getElementById('btnSavePhoto').style.display = 'inline-block';
+    };
+
+    reader.readAsDataURL(file);
+}
+
+function confirmDeletePhoto() {
+    if (confirm('¿Estás seguro de que quieres eliminar tu foto de perfil?\nEsta acción no se puede deshacer.')) {
+        document.getElementById('deletePhotoForm').submit();
+    }
+}
+
+function changePassword() {
+    const newPassword = prompt('Ingresa tu nueva contraseña:');
+    if (newPassword && newPassword.length >= 6) {
+        if (confirm('¿Confirmar cambio de contraseña?')) {
+            alert('Función de cambio de contraseña en desarrollo. Pronto disponible.');
+        }
+    } else if (newPassword) {
+        alert('La contraseña debe tener al menos 6 caracteres.');
+    }
+}
+
+function exportData() {
+    alert('Función de exportación de datos en desarrollo. Pronto disponible.');
+}
+
+function initTooltips() {
+    // Inicializar tooltips si es necesario
+    const tooltips = document.querySelectorAll('[title]');
+    tooltips.forEach(el => {
+        el.addEventListener('mouseenter', function(e) {
+            const tooltip = document.createElement('div');
+            tooltip.className = 'custom-tooltip';
+            tooltip.textContent = e.target.title;
+            document.body.appendChild(tooltip);
+
+            const rect = e.target.getBoundingClientRect();
+            tooltip.style.position = 'fixed';
+            tooltip.style.left = rect.left + 'px';
+            tooltip.style.top = rect.top - tooltip.offsetHeight - 10 + 'px';
+            tooltip.style.zIndex = '10000';
+
+            e.target._tooltip = tooltip;
+        });
+
+        el.addEventListener('mouseleave', function(e) {
+            if (e.target._tooltip) {
+                e.target._tooltip.remove();
+                delete e.target._tooltip;
+            }
+        });
+    });
+}
+
+function initSwitches() {
+    const switches = document.querySelectorAll('.switch input');
+    switches.forEach(sw => {
+        sw.addEventListener('change', function() {
+            const setting = this.closest('.setting-item').querySelector('h3').textContent;
+            const status = this.checked ? 'activado' : 'desactivado';
+            showNotification(`${setting} ${status}`);
+        });
+    });
+}
+
+function showNotification(message) {
+    const notification = document.createElement('div');
+    notification.className = 'notification success';
+    notification.innerHTML = `<i class="fas fa-check-circle"></i> ${message}`;
+    notification.style.position = 'fixed';
+    notification.style.top = '20px';
+    notification.style.right = '20px';
+    notification.style.zIndex = '10000';
+    notification.style.animation = 'slideInRight 0.3s ease-out';
+
+    document.body.appendChild(notification);
+
+    setTimeout(() => {
+        notification.style.opacity = '0';
+        notification.style.transform = 'translateX(100%)';
+        setTimeout(() => notification.remove(), 300);
+    }, 3000);
+}
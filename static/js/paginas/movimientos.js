@@ -0,0 +1,262 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Inicializar selectores
+    initTypeSelector();
+    initProductSelect();
+    initFilters();
+
+    // Configurar eventos
+    setupEventListeners();
+});
+
+function initTypeSelector() {
+    const selectedType = document.getElementById('tipo').value || 'entrada';
+    selectType(selectedType);
+}
+
+function selectType(type) {
+    // Actualizar botones visualmente
+    document.querySelectorAll('.type-option').forEach(option => {
+        option.classList.remove('active');
+    });
+
+    const selectedOption = document.querySelector(`.type-option[data-value="${type}"]`);
+    if (selectedOption) {
+        selectedOption.classList.add('active');
+    }
+
+    // Actualizar campo oculto
+    document.getElementById('tipo').value = type;
+
+    // Actualizar interfaz según el tipo
+    updateInterfaceForType(type);
+}
+
+function updateInterfaceForType(type) {
+    const productSelect = document.getElementById('producto_id');
+    const stockInfo = document.getElementById('stockInfo');
+
+    if (productSelect.value) {
+        updateStockInfo();
+    }
+
+    if (type === 'salida') {
+        // Para salidas, verificar que no se exceda el stock
+        document.getElementById('cantidad').addEventListener('input', validateQuantity);
+    }
+}
+
+function initProductSelect() {
+    const productSelect = document.getElementById('producto_id');
+    productSelect.addEventListener('change', function() {
+        updateStockInfo();
+        validateQuantity();
+    });
+}
+
+function updateStockInfo() {
+    const productSelect = document.getElementById('producto_id');
+    const selectedOption = productSelect.options[productSelect.selectedIndex];
+    const stockInfo = document.getElementById('stockInfo');
+    const movementType = document.getElementById('tipo').value;
+
+    if (selectedOption.value) {
+        const stock = selectedOption.getAttribute('data-stock') || '0';
+        const productName = selectedOption.text.split(' - ')[1]?.split(' (Stock:')[0] || 'Producto';
+
+        stockInfo.innerHTML = `
+            <i class="fas fa-box"></i>
+            <span>
+                <strong>${productName}</strong> - Stock actual: <strong>${stock}</strong> unidades
+                ${movementType === 'salida' ? '<br><small class="warning">No puede exceder el stock disponible</small>' : ''}
+            </span>
+        `;
+        stockInfo.className = 'stock-info ' + (movementType === 'salida' ? 'warning' : 'info');
+    } else {
+        stockInfo.innerHTML = `
+            <i class="fas fa-info-circle"></i>
+            <span>Seleccione un producto para ver el stock actual</span>
+        `;
+        stockInfo.className = 'stock-info';
+    }
+}
+
+function validateQuantity() {
+    const productSelect = document.getElementById('producto_id');
+    const quantityInput = document.getElementById('cantidad');
+    const movementType = document.getElementById('tipo').value;
+
+    if (movementType === 'salida' && productSelect.value) {
+        const selectedOption = productSelect.options[productSelect.selectedIndex];
+        const currentStock = parseInt(selectedOption.getAttribute('data-stock')) || 0;
+        const quantity = parseInt(quantityInput.value) || 0;
+
+        if (quantity > currentStock) {
+            quantityInput.style.borderColor = '#ef4444';
+            quantityInput.style.boxShadow = '0 0 0 3px rgba(239, 68, 68, 0.1)';
+
+            // Mostrar advertencia
+            showQuantityWarning(`Stock insuficiente. Disponible: ${currentStock} unidades`);
+            return false;
+        } else {
+            quantityInput.style.borderColor = '';
+            quantityInput.style.boxShadow = '';
+            hideQuantityWarning();
+            return true;
+        }
+    }
+
+    quantityInput.style.borderColor = '';
+    quantityInput.style.boxShadow = '';
+    hideQuantityWarning();
+    return true;
+}
+
+function showQuantityWarning(message) {
+    let warning = document.getElementById('quantity-warning');
+    if (!warning) {
+        warning = document.createElement('div');
+        warning.id = 'quantity-warning';
+        warning.className = 'quantity-warning';
+        quantityInput.parentNode.appendChild(warning);
+    }
+    warning.innerHTML = `<i class="fas fa-exclamation-triangle"></i> ${message}`;
+    warning.style.display = 'block';
+}
+
+function hideQuantityWarning() {
+    const warning = document.getElementById('quantity-warning');
+    if (warning) {
+        warning.style.display = 'none';
+    }
+}
+
+function simulateMovement() {
+    const productSelect = document.getElementById('producto_id');
+    const quantity = document.getElementById('cantidad').value;
+    const movementType = document.getElementById('tipo').value;
+
+    if (!productSelect.value) {
+        alert('Seleccione un producto primero');
+        return;
+    }
+
+    if (!quantity || quantity <= 0) {
+        alert('Ingrese una cantidad válida');
+        return;
+    }
+
+    const selectedOption = productSelect.options[productSelect.selectedIndex];
+    const currentStock = parseInt(selectedOption.getAttribute('data-stock')) || 0;
+    const productName = selectedOption.text.split(' - ')[1]?.split(' (Stock:')[0] || 'Producto';
+
+    let newStock;
+    if (movementType === 'entrada') {
+        newStock = currentStock + parseInt(quantity);
+    } else {
+        if (parseInt(quantity) > currentStock) {
+            alert('La cantidad excede el stock disponible');
+            return;
+        }
+        newStock = currentStock - parseInt(quantity);
+    }
+
+    const simulation = `
+        Simulación de movimiento:
+
+        Producto: ${productName}
+        Stock actual: ${currentStock} unidades
+        Tipo: ${movementType === 'entrada' ? 'Entrada (+)' : 'Salida (-)'}
+        Cantidad: ${quantity} unidades
+        Nuevo stock: ${newStock} unidades
+
+        ${movementType === 'salida' && newStock < 20 ? '⚠️ Atención: El nuevo stock sería menor a 20 unidades' : ''}
+    `;
+
+    alert(simulation);
+}
+
+function toggleFilters() {
+    const filtersPanel = document.getElementById('filtersPanel');
+    if (filtersPanel.style.display === 'none') {
+        filtersPanel.style.display = 'block';
+        setTimeout(() => {
+            filtersPanel.style.opacity = '1';
+            filtersPanel.style.transform = 'translateY(0)';
+        }, 10);
+    } else {
+        filtersPanel.style.opacity = '0';
+        filtersPanel.style.transform = 'translateY(-10px)';
+        setTimeout(() => {
+            filtersPanel.style.display = 'none';
+        }, 300);
+    }
+}
+
+function clearFilters() {
+    document.querySelectorAll('.filters-form input, .filters-form select').forEach(element => {
+        if (element.type !== 'submit' && element.type !== 'button') {
+            element.value = '';
+        }
+    });
+
+    // También puedes recargar la página sin filtros
+    window.location.href = window.location.pathname;
+}
+
+function initFilters() {
+    // Establecer fechas por defecto (últimos 7 días)
+    const today = new Date().toISOString().split('T')[0];
+    const weekAgo = new Date();
+    weekAgo.setDate(weekAgo.getDate() - 7);
+    const weekAgoStr = weekAgo.toISOString().split('T')[0];
+
+    const fechaInicio = document.querySelector('input[name="fecha_inicio"]');
+    const fechaFin = document.querySelector('input[name="fecha_fin"]');
+
+    if (fechaInicio && !fechaInicio.value) {
+        fechaInicio.value = weekAgoStr;
+    }
+    if (fechaFin && !fechaFin.value) {
+        fechaFin.value = today;
+    }
+}
+
+function exportHistory() {
+    alert('Función de exportación en desarrollo. Pronto disponible.');
+}
+
+function printHistory() {
+    window.print();
+}
+
+function scrollToForm() {
+    document.querySelector('.quick-register-card').scrollIntoView({
+        behavior: 'smooth',
+        block: 'start'
+    });
+}
+
+function setupEventListeners() {
+    // Validar formulario al enviar
+    document.getElementById('quickForm').addEventListener('submit', function(e) {
+        if (!validateQuantity()) {
+            e.preventDefault();
+            alert('No se puede registrar la salida. La cantidad excede el stock disponible.');
+            return false;
+        }
+
+        // Mostrar loading
+        const submitBtn = this.querySelector('button[type="submit"]');
+        const originalText = submitBtn.innerHTML;
+        submitBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Registrando...';
+        submitBtn.disabled = true;
+
+        // Restaurar después de 2 segundos (por si hay error)
+        setTimeout(() => {
+            submitBtn.innerHTML = originalText;
+            submitBtn.disabled = false;
+        }, 2000);
+
+        return true;
+    });
+}
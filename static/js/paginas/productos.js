@@ -0,0 +1,110 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Actualizar contadores de stock
+    updateStockCounters();
+
+    // Configurar búsqueda en tiempo real
+    const searchInput = document.getElementById('searchInput');
+    searchInput.addEventListener('input', filterTable);
+
+    // Configurar filtros
+    document.getElementById('stockFilter').addEventListener('change', filterTable);
+    document.getElementById('sortFilter').addEventListener('change', sortTable);
+});
+
+function updateStockCounters() {
+    let criticalCount = 0;
+    let lowCount = 0;
+
+    document.querySelectorAll('.product-row').forEach(row => {
+        const stock = parseInt(row.getAttribute('data-stock'));
+        if (stock <= 5) {
+            criticalCount++;
+        } else if (stock <= 20) {
+            lowCount++;
+        }
+    });
+
+    document.getElementById('criticalCount').textContent = criticalCount;
+    document.getElementById('lowCount').textContent = lowCount;
+    document.getElementById('displayCriticalCount').textContent = criticalCount;
+    document.getElementById('displayLowCount').textContent = lowCount;
+}
+
+function filterTable() {
+    const searchTerm = document.getElementById('searchInput').value.toLowerCase();
+    const stockFilter = document.getElementById('stockFilter').value;
+    const rows = document.querySelectorAll('.product-row');
+
+    rows.forEach(row => {
+        const text = row.textContent.toLowerCase();
+        const stock = parseInt(row.getAttribute('data-stock'));
+
+        let shouldShow = true;
+
+        // Aplicar filtro de búsqueda
+        if (searchTerm && !text.includes(searchTerm)) {
+            shouldShow = false;
+        }
+
+        // Aplicar filtro de stock
+        if (stockFilter === 'low' && stock > 20) {
+            shouldShow = false;
+        } else if (stockFilter === 'critical' && stock > 5) {
+            shouldShow = false;
+        }
+
+        row.style.display = shouldShow ? '' : 'none';
+    });
+
+    updateStockCounters();
+}
+
+function sortTable() {
+    const sortBy = document.getElementById('sortFilter').value;
+    const tbody = document.querySelector('#productsTable tbody');
+    const rows = Array.from(tbody.querySelectorAll('.product-row'));
+
+    rows.sort((a, b) => {
+        let aValue, bValue;
+
+        switch(sortBy) {
+            case 'name':
+                aValue = a.querySelector('.product-name-cell strong').textContent;
+                bValue = b.querySelector('.product-name-cell strong').textContent;
+                return aValue.localeCompare(bValue);
+            case 'code':
+                aValue = a.querySelector('.product-code').textContent;
+                bValue = b.querySelector('.product-code').textContent;
+                return aValue.localeCompare(bValue);
+            case 'stock_asc':
+                aValue = parseInt(a.getAttribute('data-stock'));
+                bValue = parseInt(b.getAttribute('data-stock'));
+                return aValue - bValue;
+            case 'stock_desc':
+                aValue = parseInt(a.getAttribute('data-stock'));
+                bValue = parseInt(b.getAttribute('data-stock'));
+                return bValue - aValue;
+            default:
+                return 0;
+        }
+    });
+
+    // Reordenar filas
+    rows.forEach(row => tbody.appendChild(row));
+}
+
+function confirmDelete(event, productName) {
+    if (!confirm(`¿Estás seguro de eliminar el producto "${productName}"?\nEsta acción no se puede deshacer.`)) {
+        event.preventDefault();
+        return false;
+    }
+    return true;
+}
+
+function exportTable() {
+    alert('Función de exportación en desarrollo. Pronto disponible.');
+}
+
+function printTable() {
+    window.print();
+}
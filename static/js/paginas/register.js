@@ -0,0 +1,186 @@
+// Auto-enfocar el primer campo
+document.addEventListener('DOMContentLoaded', function() {
+    document.getElementById('nombre').focus();
+
+    // Efecto de aparición escalonada
+    const elements = document.querySelectorAll('.form-group');
+    elements.forEach((element, index) => {
+        element.style.opacity = '0';
+        element.style.transform = 'translateY(20px)';
+        element.style.transition = 'all 0.5s ease';
+
+        setTimeout(() => {
+            element.style.opacity = '1';
+            element.style.transform = 'translateY(0)';
+        }, 100 + (index * 100));
+    });
+});
+
+// Validación de fortaleza de contraseña
+function checkPasswordStrength() {
+    const password = document.getElementById('password').value;
+    const strengthBar = document.getElementById('strengthBar');
+    const strengthText = document.getElementById('strengthText');
+
+    if (!password) {
+        strengthBar.style.width = '0%';
+        strengthBar.style.background = 'transparent';
+        strengthText.textContent = 'Ingresa una contraseña';
+        strengthText.style.color = '#94a3b8';
+        return;
+    }
+
+    let score = 0;
+    if (password.length >= 8) score += 25;
+    if (/[A-Z]/.test(password)) score += 25;
+    if (/[0-9]/.test(password)) score += 25;
+    if (/[^A-Za-z0-9]/.test(password)) score += 25;
+
+    strengthBar.style.width = score + '%';
+
+    if (score < 50) {
+        strengthBar.style.background = '#ef4444';
+        strengthText.textContent = 'Débil';
+        strengthText.style.color = '#fca5a5';
+    } else if (score < 75) {
+        strengthBar.style.background = '#f59e0b';
+        strengthText.textContent = 'Moderada';
+        strengthText.style.color = '#fcd34d';
+    } else {
+        strengthBar.style.background = '#10b981';
+        strengthText.textContent = 'Fuerte';
+        strengthText.style.color = '#86efac';
+    }
+}
+
+// Validación de coincidencia de contraseñas
+function checkPasswordMatch() {
+    const password = document.getElementById('password').value;
+    const confirmPassword = document.getElementById('confirm_password').value;
+    const matchText = document.getElementById('matchText');
+
+    if (!confirmPassword) {
+        matchText.textContent = '';
+        return;
+    }
+
+    if (password === confirmPassword) {
+        matchText.textContent = '✓ Las contraseñas coinciden';
+        matchText.style.color = '#86efac';
+    } else {
+        matchText.textContent = '✗ Las contraseñas no coinciden';
+        matchText.style.color = '#fca5a5';
+    }
+}
+
+// Validación del formulario de registro
+document.getElementById('registerForm').addEventListener('submit', function(e) {
+    const nombre = document.getElementById('nombre').value.trim();
+    const username = document.getElementById('username').value.trim();
+    const password = document.getElementById('password').value;
+    const confirmPassword = document.getElementById('confirm_password').value;
+    const registerButton = document.getElementById('registerButton');
+    const btnText = document.getElementById('btnText');
+    const btnLoading = document.getElementById('btnLoading');
+
+    // Validaciones
+    if (!nombre) {
+        e.preventDefault();
+        showError('Por favor ingresa tu nombre completo');
+        document.getElementById('nombre').focus();
+        return false;
+    }
+
+    if (!username) {
+        e.preventDefault();
+        showError('Por favor ingresa un nombre de usuario');
+        document.getElementById('username').focus();
+        return false;
+    }
+
+    if (!password) {
+        e.preventDefault();
+        showError('Por favor crea una contraseña');
+        document.getElementById('password').focus();
+        return false;
+    }
+
+    if (password.length < 6) {
+        e.preventDefault();
+        showError('La contraseña debe tener al menos 6 caracteres');
+        document.getElementById('password').focus();
+        return false;
+    }
+
+    if (password !== confirmPassword) {
+        e.preventDefault();
+        showError('Las contraseñas no coinciden');
+        document.getElementById('confirm_password').focus();
+        return false;
+    }
+
+    // Mostrar estado de carga
+    btnText.style.display = 'none';
+    btnLoading.style.display = 'inline';
+    registerButton.disabled = true;
+    registerButton.style.opacity = '0.7';
+    registerButton.style.cursor = 'wait';
+
+    // Simular delay para mostrar la animación
+    setTimeout(() => {
+        registerButton.disabled = false;
+        btnText.style.display = 'inline';
+        btnLoading.style.display = 'none';
+        registerButton.style.opacity = '1';
+        registerButton.style.cursor = 'pointer';
+    }, 2000);
+
+    return true;
+});
+
+// Función para mostrar errores
+function showError(message) {
+    // Crear mensaje de error temporal
+    const errorDiv = document.createElement('div');
+    errorDiv.className = 'flash-message error';
+    errorDiv.innerHTML = `<i class="fas fa-exclamation-circle"></i> ${message}`;
+
+    // Insertar al principio del formulario
+    const flashMessages = document.querySelector('.flash-messages');
+    const form = document.querySelector('.register-form');
+
+    if (flashMessages) {
+        flashMessages.prepend(errorDiv);
+    } else {
+        const newFlashContainer = document.createElement('div');
+        newFlashContainer.className = 'flash-messages';
+        newFlashContainer.appendChild(errorDiv);
+        form.parentNode.insertBefore(newFlashContainer, form);
+    }
+
+    // Animación de entrada
+    setTimeout(() => {
+        errorDiv.style.opacity = '1';
+        errorDiv.style.transform = 'translateX(0)';
+    }, 10);
+
+    // Eliminar después de 5 segundos
+    setTimeout(() => {
+        errorDiv.style.opacity = '0';
+        errorDiv.style.transform = 'translateX(-30px)';
+        setTimeout(() => errorDiv.remove(), 500);
+    }, 5000);
+}
+
+// Efectos en inputs
+const inputs = document.querySelectorAll('.form-control');
+inputs.forEach(input => {
+    input.addEventListener('focus', function() {
+        this.parentElement.style.transform = 'translateY(-3px)';
+        this.parentElement.style.transition = 'transform 0.3s ease';
+    });
+
+    input.addEventListener('blur', function() {
+        this.parentElement.style.transform = 'translateY(0)';
+    });
+});
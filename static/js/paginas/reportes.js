@@ -0,0 +1,27 @@
+function printReport() {
+    const contenedor = document.querySelector('.page-container');
+    const printContent = document.querySelector('.reports-container').innerHTML;
+    const originalContent = document.body.innerHTML;
+
+    document.body.innerHTML = `
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Reporte de Inventario</title>
+            <link rel="stylesheet" href="${contenedor.dataset.hoja}">
+        </head>
+        <body>
+            <div class="system-header">
+                <h1>Sistema de Inventario</h1>
+                <p>Reporte Generado: ${contenedor.dataset.fecha}</p>
+            </div>
+            ${printContent}
+            <div class="clear"></div>
+        </body>
+        </html>
+    `;
+
+    window.print();
+    document.body.innerHTML = originalContent;
+    window.location.reload();
+}
@@ -0,0 +1,25 @@
+"""Fixtures comunes: un SistemaInventario en una base temporal por prueba, en los dos modos de almacenamiento."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from almacenamiento import MODOS_ALMACENAMIENTO  # noqa: E402
+from database import SistemaInventario  # noqa: E402
+
+
+@pytest.fixture(params=MODOS_ALMACENAMIENTO)
+def sistema(request, tmp_path):
+    sistema = SistemaInventario(str(tmp_path / 'inventario.db'), almacenamiento=request.param,
+                                directorio_fotos=str(tmp_path / 'fotos'))
+    yield sistema
+    sistema.cerrar()
+
+
+@pytest.fixture
+def user_id(sistema):
+    sistema.agregar_usuario('prueba', 'secreto123', 'Usuario de prueba')
+    return sistema.obtener_usuario_por_username('prueba')['id']
+
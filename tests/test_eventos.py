@@ -0,0 +1,86 @@
+"""Eventos en vivo del dashboard (user-019): el cupo se reserva antes de calcular el estado."""
+import pytest
+
+from eventos import CentralEventos, SuscripcionDescartada
+
+
+def estado(version, **estadisticas):
+    return version, estadisticas, []
+
+
+class Calculos:
+    """calcular_estado de prueba que cuenta sus llamadas"""
+
+    def __init__(self, version=1):
+        self.version = version
+        self.llamadas = 0
+
+    def __call__(self, user_id):
+        self.llamadas += 1
+        return estado(self.version, total=self.version)
+
+
+@pytest.fixture
+def calculos():
+    return Calculos()
+
+
+@pytest.fixture
+def central(calculos):
+    central = CentralEventos(calculos, lambda user_ids: {}, max_suscriptores=1, intervalo=60)
+    yield central
+    central.cerrar()
+
+
+def test_primer_evento_es_el_estado_completo(central):
+    suscripcion = central.suscribir(7)
+
+    assert suscripcion.siguiente(0).startswith('event: estado\n')
+
+
+def test_sin_cupo_no_se_calcula_el_estado(central, calculos):
+    primera = central.suscribir(7)
+
+    assert central.suscribir(8) is None
+    assert calculos.llamadas == 1
+    assert central.estadisticas['rechazados'] == 1
+
+    central.cancelar(primera)
+    assert central.suscribir(8) is not None
+
+
+def test_error_calculando_libera_el_cupo(central, calculos):
+    def fallar(user_id):
+        raise RuntimeError('base no disponible')
+    central._calcular_estado = fallar
+
+    with pytest.raises(RuntimeError):
+        central.suscribir(7)
+    assert central.estadisticas['suscriptores'] == 0
+
+    central._calcular_estado = calculos
+    assert central.suscribir(7) is not None
+
+
+def test_central_cerrada_rechaza(central):
+    central.cerrar()
+
+    assert central.suscribir(7) is None
+    assert central.estadisticas['suscriptores'] == 0
+
+
+def test_cambios_llegan_a_los_suscriptores(calculos):
+    central = CentralEventos(calculos, lambda user_ids: {}, max_suscriptores=2, intervalo=60)
+    try:
+        suscripcion = central.suscribir(7)
+        suscripcion.siguiente(0)
+
+        central.publicar(7, estado(2, total=5))
+
+        assert suscripcion.siguiente(0) == 'event: cambios\ndata: {"version":2,"estadisticas":{"total":5},' \
+                                           '"entran":[],"salen":[],"cambian":[]}\n\n'
+    finally:
+        central.cerrar()
+
+    with pytest.raises(SuscripcionDescartada):
+        suscripcion.siguiente(0)
@@ -0,0 +1,175 @@
+"""Existencias en una fecha (user-025): cortes, resumen diario y ajustes_existencias."""
+import datetime
+import io
+
+import pytest
+
+
+def hace_dias(dias):
+    """Fecha 'AAAA-MM-DD' en UTC, como DATE('now') de SQLite"""
+    hoy = datetime.datetime.now(datetime.timezone.utc).date()
+    return (hoy - datetime.timedelta(days=dias)).isoformat()
+
+
+def crear_producto(sistema, user_id, codigo, stock, dias_antiguedad=60):
+    """Producto creado hace dias_antiguedad días con `stock` unidades"""
+    sistema.agregar_producto(user_id, codigo, f'Producto {codigo}', '', '', '', '', '', None, 2.0, stock, 0)
+    tablas = sistema.tablas_usuario(user_id)
+    with sistema.pool.conexion() as conn:
+        conn.execute(f"UPDATE {tablas.productos} SET fecha_creacion = datetime('now', ?) WHERE {tablas.filtro()} AND codigo = ?",
+                     (f'-{dias_antiguedad} days', codigo))
+        conn.commit()
+        return conn.execute(f'SELECT id FROM {tablas.productos} WHERE {tablas.filtro()} AND codigo = ?',
+                            (codigo,)).fetchone()[0]
+
+
+def mover(sistema, user_id, producto_id, tipo, cantidad, dias):
+    """Movimiento de hace `dias` días, con su efecto en el stock actual como lo haría la aplicación"""
+    tablas = sistema.tablas_usuario(user_id)
+    cambio = cantidad if tipo == 'entrada' else -cantidad
+    with sistema.pool.conexion() as conn:
+        conn.execute(f'''
+            INSERT INTO {tablas.movimientos} ({tablas.columna_usuario}producto_id, tipo, cantidad, motivo, fecha)
+            VALUES ({tablas.valor_usuario}?, ?, ?, 'Prueba', datetime('now', ?))
+        ''', (producto_id, tipo, cantidad, f'-{dias} days'))
+        conn.execute(f'UPDATE {tablas.productos} SET stock_actual = stock_actual + ? WHERE {tablas.filtro()} AND id = ?',
+                     (cambio, producto_id))
+        conn.commit()
+
+
+def stock_en(sistema, user_id, dias):
+    existencias = sistema.obtener_stock_en_fecha(user_id, hace_dias(dias))
+    return {producto['codigo']: producto['stock'] for producto in existencias['productos']}
+
+
+def editar_stock(sistema, user_id, producto_id, stock):
+    producto = sistema.obtener_producto_por_id(user_id, producto_id)
+    exito, _ = sistema.actualizar_producto(
+        user_id, producto_id, producto['codigo'], producto['nombre'], '', '', '', '', '', None, 2.0, stock, 0
+    )
+    assert exito
+
+
+def sin_diferencias(sistema, user_id, dias):
+    resultado = sistema.verificar_stock_en_fecha(user_id, hace_dias(dias))
+    return resultado['diferencias'] == [] and resultado['comparados'] > 0
+
+
+@pytest.fixture
+def producto_id(sistema, user_id):
+    # 40 unidades hoy: 50 al principio, salidas hace 20 y hace 5 días
+    producto_id = crear_producto(sistema, user_id, 'A', 50)
+    mover(sistema, user_id, producto_id, 'salida', 5, 20)
+    mover(sistema, user_id, producto_id, 'salida', 5, 5)
+    return producto_id
+
+
+def test_sin_cortes_reproduce_los_movimientos(sistema, user_id, producto_id):
+    assert stock_en(sistema, user_id, 30) == {'A': 50}
+    assert stock_en(sistema, user_id, 10) == {'A': 45}
+    assert stock_en(sistema, user_id, 1) == {'A': 40}
+
+
+def test_desde_el_corte_anterior(sistema, user_id, producto_id):
+    sistema.generar_cortes_existencias(hace_dias(10), [user_id])
+
+    existencias = sistema.obtener_stock_en_fecha(user_id, hace_dias(1))
+
+    assert existencias['corte'] == hace_dias(10)
+    assert {p['codigo']: p['stock'] for p in existencias['productos']} == {'A': 40}
+    assert sin_diferencias(sistema, user_id, 1)
+
+
+def test_producto_creado_despues_no_aparece(sistema, user_id, producto_id):
+    crear_producto(sistema, user_id, 'B', 7, dias_antiguedad=3)
+
+    assert stock_en(sistema, user_id, 10) == {'A': 45}
+    assert stock_en(sistema, user_id, 1) == {'A': 40, 'B': 7}
+
+
+def test_edicion_de_stock_no_cambia_el_pasado(sistema, user_id, producto_id):
+    sistema.generar_cortes_existencias(hace_dias(10), [user_id])
+
+    editar_stock(sistema, user_id, producto_id, 80)
+    # El corte de hoy ya incluye la edición; los días anteriores no
+    sistema.generar_cortes_existencias(hace_dias(0), [user_id])
+
+    assert stock_en(sistema, user_id, 1) == {'A': 40}
+    assert stock_en(sistema, user_id, 0) == {'A': 80}
+    assert sin_diferencias(sistema, user_id, 1)
+    assert sin_diferencias(sistema, user_id, 10)
+
+
+def test_ediciones_del_mismo_dia_se_acumulan(sistema, user_id, producto_id):
+    editar_stock(sistema, user_id, producto_id, 80)
+    editar_stock(sistema, user_id, producto_id, 30)
+
+    with sistema.pool.conexion() as conn:
+        ajustes = conn.execute('SELECT dia, cambio FROM ajustes_existencias').fetchall()
+    assert [tuple(ajuste) for ajuste in ajustes] == [(hace_dias(0), -10)]
+    assert stock_en(sistema, user_id, 1) == {'A': 40}
+
+
+def test_edicion_rechazada_no_anota_ajuste(sistema, user_id, producto_id):
+    crear_producto(sistema, user_id, 'B', 7)
+
+    # Código duplicado: no se guarda nada
+    exito, _ = sistema.actualizar_producto(user_id, producto_id, 'B', 'Otro', '', '', '', '', '', None, 2.0, 99, 0)
+
+    assert not exito
+    with sistema.pool.conexion() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM ajustes_existencias').fetchone()[0] == 0
+
+
+def test_lote_deshecho_no_cambia_las_existencias(sistema, user_id, producto_id):
+    sistema.generar_cortes_existencias(hace_dias(1), [user_id])
+
+    exito, _ = sistema.agregar_movimientos_lote(user_id, [
+        {'producto_id': producto_id, 'tipo': 'entrada', 'cantidad': 10},
+        {'producto_id': producto_id, 'tipo': 'salida', 'cantidad': 500},
+    ])
+    sistema.generar_cortes_existencias(hace_dias(0), [user_id])
+
+    assert not exito
+    assert stock_en(sistema, user_id, 0) == {'A': 40}
+    assert sin_diferencias(sistema, user_id, 0)
+
+
+def test_hacia_atras_desde_el_corte_siguiente(sistema, user_id, producto_id):
+    # Sin corte anterior a la fecha: se parte del corte siguiente y se restan los cambios hasta él
+    sistema.generar_cortes_existencias(hace_dias(3), [user_id])
+    mover(sistema, user_id, producto_id, 'entrada', 8, 1)
+
+    existencias = sistema.obtener_stock_en_fecha(user_id, hace_dias(30))
+
+    assert existencias['corte'] is None
+    assert {p['codigo']: p['stock'] for p in existencias['productos']} == {'A': 50}
+
+
+def test_hacia_atras_sin_el_producto_en_el_corte_siguiente(sistema, user_id, producto_id):
+    # Un producto que falta en el corte siguiente parte de su stock actual:
+    # se restan todos los cambios posteriores a la fecha, no sólo los previos al corte
+    sistema.generar_cortes_existencias(hace_dias(3), [user_id])
+    mover(sistema, user_id, producto_id, 'entrada', 8, 1)
+    editar_stock(sistema, user_id, producto_id, 60)
+    with sistema.pool.conexion() as conn:
+        conn.execute('DELETE FROM cortes_existencias_productos WHERE producto_id = ?', (producto_id,))
+        conn.commit()
+
+    assert stock_en(sistema, user_id, 30) == {'A': 50}
+    assert stock_en(sistema, user_id, 2) == {'A': 40}
+    assert sin_diferencias(sistema, user_id, 30)
+
+
+def test_importacion_anota_ajustes(sistema, user_id, producto_id):
+    sistema.generar_cortes_existencias(hace_dias(1), [user_id])
+
+    informe = sistema.importar_productos(user_id, io.BytesIO(
+        'codigo,nombre,precio_compra,stock_actual,stock_minimo\nA,Producto A,2,100,0\n'.encode('utf-8')
+    ))
+    sistema.generar_cortes_existencias(hace_dias(0), [user_id])
+
+    assert informe['actualizadas'] == 1
+    assert stock_en(sistema, user_id, 1) == {'A': 40}
+    assert stock_en(sistema, user_id, 0) == {'A': 100}
+    assert sin_diferencias(sistema, user_id, 1)
@@ -0,0 +1,93 @@
+"""Exportación en streaming (user-010): lotes con fetchmany y errores que no pasan por una exportación completa."""
+import csv
+import gzip
+import io
+import json
+import sqlite3
+
+import pytest
+
+from exportacion import (
+    COLUMNAS_EXPORTACION_MOVIMIENTOS, COLUMNAS_EXPORTACION_PRODUCTOS, comprimir_gzip, trozos_csv, trozos_jsonl,
+)
+
+
+@pytest.fixture
+def con_productos(sistema, user_id):
+    for numero in range(5):
+        sistema.agregar_producto(user_id, f'P{numero}', f'Producto {numero}', '', '', '', '', '', None, 1.0, numero, 0)
+    return user_id
+
+
+def test_productos_en_lotes_ordenados_por_codigo(sistema, con_productos):
+    lotes = list(sistema.exportar_productos(con_productos, tamano_lote=2))
+
+    assert [len(lote) for lote in lotes] == [2, 2, 1]
+    codigo = COLUMNAS_EXPORTACION_PRODUCTOS.index('codigo')
+    assert [fila[codigo] for lote in lotes for fila in lote] == [f'P{numero}' for numero in range(5)]
+
+
+def test_un_trozo_por_lote(sistema, con_productos):
+    trozos = list(trozos_csv(sistema.exportar_productos(con_productos, tamano_lote=2), COLUMNAS_EXPORTACION_PRODUCTOS))
+
+    assert len(trozos) == 3
+    filas = list(csv.reader(io.StringIO(b''.join(trozos).decode('utf-8'))))
+    assert filas[0] == list(COLUMNAS_EXPORTACION_PRODUCTOS)
+    assert len(filas) == 6
+
+
+def test_csv_vacio_lleva_encabezado(sistema, user_id):
+    contenido = b''.join(trozos_csv(sistema.exportar_productos(user_id), COLUMNAS_EXPORTACION_PRODUCTOS))
+
+    assert contenido.decode('utf-8') == ','.join(COLUMNAS_EXPORTACION_PRODUCTOS) + '\r\n'
+
+
+def test_movimientos_jsonl_filtrados(sistema, con_productos):
+    productos = sistema.obtener_productos(con_productos)
+    sistema.agregar_movimiento(con_productos, productos[0]['id'], 'entrada', 3, 'Compra')
+    sistema.agregar_movimiento(con_productos, productos[1]['id'], 'entrada', 4, 'Compra')
+
+    lotes = sistema.exportar_movimientos(con_productos, producto_id=productos[1]['id'])
+    lineas = b''.join(trozos_jsonl(lotes, COLUMNAS_EXPORTACION_MOVIMIENTOS)).decode('utf-8').splitlines()
+
+    assert [json.loads(linea)['cantidad'] for linea in lineas] == [4]
+    assert json.loads(lineas[0])['producto_codigo'] == productos[1]['codigo']
+
+
+def test_gzip_descomprime_al_mismo_contenido(sistema, con_productos):
+    plano = b''.join(trozos_csv(sistema.exportar_productos(con_productos, tamano_lote=2), COLUMNAS_EXPORTACION_PRODUCTOS))
+    comprimido = b''.join(comprimir_gzip(
+        trozos_csv(sistema.exportar_productos(con_productos, tamano_lote=2), COLUMNAS_EXPORTACION_PRODUCTOS)
+    ))
+
+    assert gzip.decompress(comprimido) == plano
+
+
+def test_cerrar_a_medias_devuelve_la_conexion(sistema, con_productos):
+    lotes = sistema.exportar_productos(con_productos, tamano_lote=2)
+    next(lotes)
+    assert sistema.pool._libres == []
+
+    # Werkzeug cierra el generador cuando el cliente corta la descarga
+    lotes.close()
+
+    assert len(sistema.pool._libres) == 1
+
+
+def test_error_a_mitad_se_propaga(sistema, con_productos, capsys):
+    tablas = sistema.tablas_usuario(con_productos)
+    # json() sólo falla al llegar a la última fila, con algún lote ya entregado
+    sql = f"""
+        SELECT codigo, json(CASE codigo WHEN 'P4' THEN '{{roto' ELSE '1' END)
+        FROM {tablas.productos} WHERE {tablas.filtro()} ORDER BY codigo
+    """
+    lotes = sistema._recorrer_por_lotes(con_productos, sql, [], 2)
+    entregados = []
+
+    with pytest.raises(sqlite3.OperationalError):
+        for lote in lotes:
+            entregados.append(lote)
+
+    assert entregados
+    assert f'Error exportando datos del usuario {con_productos}' in capsys.readouterr().out
+    assert len(sistema.pool._libres) == 1
@@ -0,0 +1,91 @@
+"""Importación masiva de productos (user-008): mismas reglas que el formulario y upsert por código."""
+import io
+
+import pytest
+
+from importacion import validar_producto
+
+ENCABEZADO = 'codigo,nombre,precio_compra,stock_actual,stock_minimo\n'
+
+
+def csv(*filas):
+    return io.BytesIO((ENCABEZADO + ''.join(f'{fila}\n' for fila in filas)).encode('utf-8'))
+
+
+def productos_por_codigo(sistema, user_id):
+    return {producto['codigo']: producto for producto in sistema.obtener_productos(user_id)}
+
+
+@pytest.mark.parametrize('fila', [
+    'A1,Tornillo,1.5,abc,0',     # stock no numérico
+    'A1,Tornillo,1.5,2.5,0',     # stock con decimales
+    'A1,Tornillo,1.5,-1,0',      # stock negativo
+    'A1,,1.5,3,0',               # sin nombre
+    ',Tornillo,1.5,3,0',         # sin código
+    'A1,Tornillo,caro,3,0',      # precio no numérico
+])
+def test_filas_rechazadas_con_el_mensaje_del_formulario(sistema, user_id, fila):
+    codigo, nombre, precio, stock, minimo = fila.split(',')
+    _, error_formulario = validar_producto({
+        'codigo': codigo, 'nombre': nombre, 'precio_compra': precio, 'stock_actual': stock, 'stock_minimo': minimo,
+    })
+    assert error_formulario
+
+    informe = sistema.importar_productos(user_id, csv(fila))
+
+    assert informe['error'] is None
+    assert informe['insertadas'] == 0
+    assert informe['errores'] == [{'fila': 2, 'codigo': codigo, 'error': error_formulario}]
+    assert sistema.obtener_productos(user_id) == []
+
+
+def test_coma_decimal_aceptada_como_en_el_formulario(sistema, user_id):
+    informe = sistema.importar_productos(user_id, csv('A1,Tornillo,"1,5",3,0'))
+
+    assert informe['insertadas'] == 1
+    assert productos_por_codigo(sistema, user_id)['A1']['precio_compra'] == 1.5
+
+
+def test_upsert_por_codigo_y_ultima_fila_gana(sistema, user_id):
+    sistema.agregar_producto(user_id, 'A1', 'Tornillo', '', '', '', '', '', None, 1.0, 10, 0)
+
+    # Lotes de 2 filas: los duplicados quedan en lotes distintos
+    informe = sistema.importar_productos(user_id, csv(
+        'A1,Tornillo largo,1,15,0',
+        'B1,Tuerca,1,3,0',
+        'B1,Tuerca M8,1,4,0',
+        'A1,Tornillo corto,1,12,0',
+        'C1,,1,1,0',
+    ), tamano_lote=2)
+
+    assert informe['procesadas'] == 5
+    assert informe['insertadas'] == 1
+    assert informe['actualizadas'] == 3
+    assert informe['total_errores'] == 1
+    productos = productos_por_codigo(sistema, user_id)
+    assert {codigo: (producto['nombre'], producto['stock_actual']) for codigo, producto in productos.items()} == {
+        'A1': ('Tornillo corto', 12),
+        'B1': ('Tuerca M8', 4),
+    }
+
+
+def test_cambio_de_stock_de_productos_existentes_queda_en_ajustes(sistema, user_id):
+    sistema.agregar_producto(user_id, 'A1', 'Tornillo', '', '', '', '', '', None, 1.0, 10, 0)
+
+    sistema.importar_productos(user_id, csv('A1,Tornillo,1,15,0', 'A1,Tornillo,1,12,0', 'B1,Tuerca,1,3,0'))
+
+    producto_id = productos_por_codigo(sistema, user_id)['A1']['id']
+    with sistema.pool.conexion() as conn:
+        ajustes = conn.execute('SELECT producto_id, cambio FROM ajustes_existencias').fetchall()
+    # El producto nuevo no tiene pasado que ajustar
+    assert [tuple(ajuste) for ajuste in ajustes] == [(producto_id, 2)]
+
+
+def test_archivo_ilegible_no_guarda_nada(sistema, user_id):
+    archivo = io.BytesIO(ENCABEZADO.encode('utf-8') + 'A1,Tornillo,1,3,0\n'.encode('latin-1') + b'\xe9\xff,x,1,1,0\n')
+
+    informe = sistema.importar_productos(user_id, archivo)
+
+    assert informe['error'] == "El archivo CSV debe estar guardado en UTF-8"
+    assert informe['insertadas'] == 0
+    assert sistema.obtener_productos(user_id) == []
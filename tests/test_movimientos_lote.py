@@ -0,0 +1,61 @@
+"""Movimientos en lote (user-009): todo o nada, con un resultado por línea."""
+import pytest
+
+
+@pytest.fixture
+def producto_id(sistema, user_id):
+    sistema.agregar_producto(user_id, 'A1', 'Tornillo', '', '', '', '', '', None, 1.0, 10, 0)
+    return sistema.obtener_productos(user_id)[0]['id']
+
+
+def stock(sistema, user_id, producto_id):
+    return sistema.obtener_producto_por_id(user_id, producto_id)['stock_actual']
+
+
+def test_lote_valido_se_aplica_entero(sistema, user_id, producto_id):
+    exito, resultados = sistema.agregar_movimientos_lote(user_id, [
+        {'producto_id': producto_id, 'tipo': 'entrada', 'cantidad': 5},
+        {'codigo': 'A1', 'tipo': 'salida', 'cantidad': '3'},
+    ], 'Recuento')
+
+    assert exito
+    assert [(r['ok'], r['aplicado'], r['stock_actual']) for r in resultados] == [(True, True, 15), (True, True, 12)]
+    assert stock(sistema, user_id, producto_id) == 12
+    assert len(sistema.obtener_movimientos(user_id)) == 2
+
+
+def test_una_linea_invalida_deshace_todo_el_lote(sistema, user_id, producto_id):
+    exito, resultados = sistema.agregar_movimientos_lote(user_id, [
+        {'producto_id': producto_id, 'tipo': 'entrada', 'cantidad': 5},
+        {'producto_id': producto_id, 'tipo': 'salida', 'cantidad': 50},
+    ])
+
+    assert not exito
+    # La primera línea era válida, pero su cambio se deshizo con el resto
+    assert resultados[0]['ok'] and not resultados[0]['aplicado']
+    assert resultados[0]['stock_actual'] is None
+    assert not resultados[1]['ok'] and not resultados[1]['aplicado']
+    assert resultados[1]['error'] == "Stock insuficiente (disponible: 15)"
+    assert stock(sistema, user_id, producto_id) == 10
+    assert sistema.obtener_movimientos(user_id) == []
+
+
+@pytest.mark.parametrize('cantidad', [1.5, True, False, 'x', '2.5', None, [3]])
+def test_cantidades_no_enteras_rechazadas(sistema, user_id, producto_id, cantidad):
+    exito, resultados = sistema.agregar_movimientos_lote(user_id, [
+        {'producto_id': producto_id, 'tipo': 'entrada', 'cantidad': cantidad},
+    ])
+
+    assert not exito
+    assert resultados[0]['error'] == "La cantidad debe ser un número entero"
+    assert stock(sistema, user_id, producto_id) == 10
+
+
+@pytest.mark.parametrize('cantidad', [4, 4.0, '4', ' 4 '])
+def test_cantidades_enteras_aceptadas(sistema, user_id, producto_id, cantidad):
+    exito, resultados = sistema.agregar_movimientos_lote(user_id, [
+        {'producto_id': producto_id, 'tipo': 'entrada', 'cantidad': cantidad},
+    ])
+
+    assert exito
+    assert resultados[0]['stock_actual'] == 14
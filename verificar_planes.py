@@ -0,0 +1,243 @@
+"""Guardia de regresión de planes de consulta.
+
+Ejecuta cada consulta caliente de SistemaInventario contra una base de datos
+sembrada, captura las sentencias SQL con un trace callback y revisa su
+EXPLAIN QUERY PLAN. Falla (código de salida 1) si alguna sentencia recorre
+una tabla completa o necesita ordenar sin índice y ese paso no está
+declarado en PASOS_PERMITIDOS.
+
+Se comprueban los dos modos de almacenamiento (tablas por usuario y tablas
+compartidas con user_id) salvo que se indique uno con --almacenamiento.
+
+    python verificar_planes.py [--productos 2000] [--movimientos 10000]
+                               [--almacenamiento por_usuario|compartido] [-v]
+"""
+import argparse
+import inspect
+import os
+import random
+import re
+import sys
+import tempfile
+
+from almacenamiento import MODOS_ALMACENAMIENTO
+from database import SistemaInventario
+from paginacion import codificar_cursor
+
+# Pasos de plan aceptados por método (ya normalizados, sin el sufijo del usuario).
+# Son recorridos de listados completos o agregados sobre toda la tabla, que
+# por definición leen todas las filas; el resto debe resolverse con SEARCH.
+PASOS_PERMITIDOS = {
+    'obtener_productos': {
+        'SCAN productos USING INDEX idx_productos_nombre',
+    },
+    'obtener_movimientos': {
+        'SCAN m USING INDEX idx_movimientos_fecha',
+    },
+    # La primera página recorre el índice en orden y se detiene en el LIMIT
+    'obtener_productos_pagina': {
+        'SCAN productos USING INDEX idx_productos_nombre',
+    },
+    'obtener_movimientos_pagina': {
+        'SCAN m USING INDEX idx_movimientos_fecha',
+    },
+    # El índice parcial de alertas sólo contiene los productos en alerta
+    'obtener_productos_stock_bajo': {
+        'SCAN productos USING INDEX idx_productos_alerta',
+    },
+    'obtener_opciones_productos': {
+        'SCAN productos USING INDEX idx_productos_nombre',
+    },
+    'obtener_reporte_stock': {
+        'SCAN productos USING INDEX idx_productos_ubicacion',
+        'USE TEMP B-TREE FOR ORDER BY',
+    },
+    # Lee el rango de días del resumen diario y agrupa esas filas por semana o mes
+    'obtener_reporte_movimientos': {
+        'USE TEMP B-TREE FOR GROUP BY',
+        'USE TEMP B-TREE FOR ORDER BY',
+    },
+    # Un corte y las existencias en una fecha tienen una fila por producto; el
+    # resumen diario y los cortes se leen por clave primaria para cada uno
+    'generar_cortes_existencias': {
+        'SCAN p',
+    },
+    'obtener_stock_en_fecha': {
+        'SCAN p',
+    },
+    # Exportaciones completas: recorren la tabla en el orden del índice, sin ordenar aparte
+    'exportar_productos': {
+        'SCAN productos USING INDEX sqlite_autoindex_productos_1',
+    },
+    # Con producto_id sólo se ordenan los movimientos de ese producto
+    'exportar_movimientos': {
+        'SCAN m USING INDEX idx_movimientos_fecha',
+        'USE TEMP B-TREE FOR ORDER BY',
+    },
+    # La purga busca el primer evento o resumen que se conserva: recorre por id
+    # desde el principio y se detiene en él (lo anterior ya se borró en otra pasada)
+    'generar_resumenes_alertas': {
+        'SCAN historial_alertas',
+        'SCAN resumenes_alertas',
+    },
+    # Sin texto lista por nombre; con texto ordena las coincidencias por bm25
+    'buscar_productos': {
+        'SCAN p USING INDEX idx_productos_nombre',
+        'USE TEMP B-TREE FOR ORDER BY',
+    },
+}
+
+_SUFIJO_USUARIO = re.compile(r'(productos_fts|productos|movimientos_diarios|movimientos)_\d+')
+
+
+def normalizar(texto):
+    """Quitar el id de usuario de los nombres de tablas e índices"""
+    return _SUFIJO_USUARIO.sub(r'\1', texto)
+
+
+def es_paso_costoso(detalle):
+    # Las tablas virtuales (FTS5) resuelven el filtro dentro de su propio índice
+    if 'VIRTUAL TABLE INDEX' in detalle:
+        return False
+    return detalle.startswith('SCAN') or detalle.startswith('USE TEMP B-TREE')
+
+
+def sembrar(sistema, productos, movimientos, semilla=42):
+    rnd = random.Random(semilla)
+    sistema.agregar_usuario('planes', 'planes123', 'Verificación de planes')
+    user_id = sistema.obtener_usuario_por_username('planes')['id']
+    tablas = sistema.tablas_usuario(user_id)
+
+    with sistema.pool.conexion() as conn:
+        conn.executemany(
+            f'''INSERT INTO {tablas.productos}
+                ({tablas.columna_usuario}codigo, nombre, descripcion, ubicacion, marca, precio_compra, stock_actual, stock_minimo)
+                VALUES ({tablas.valor_usuario}?, ?, ?, ?, ?, ?, ?, ?)''',
+            [(f'P{i:06d}', f'Producto {rnd.randint(0, 10 ** 6)}', f'Descripción {i}',
+              f'Bodega {rnd.randint(1, 25)}', rnd.choice(['Acme', 'Bosch', 'Makita', None]),
+              round(rnd.uniform(1, 500), 2), rnd.randint(0, 200), rnd.randint(0, 20))
+             for i in range(productos)]
+        )
+        conn.executemany(
+            f'''INSERT INTO {tablas.movimientos} ({tablas.columna_usuario}producto_id, tipo, cantidad, motivo, fecha)
+                VALUES ({tablas.valor_usuario}?, ?, ?, ?, datetime('now', ?))''',
+            [(rnd.randint(1, productos), rnd.choice(['entrada', 'salida']), rnd.randint(1, 20),
+              'Semilla', f'-{rnd.randint(0, 365 * 24)} hours')
+             for _ in range(movimientos)]
+        )
+        conn.commit()
+    sistema.reconstruir_resumen(user_id)
+    return user_id
+
+
+def consultas_calientes(user_id, productos):
+    """(método, argumentos) de cada consulta que atiende una página o escritura"""
+    medio = productos // 2
+    datos_producto = ('NUEVO-1', 'Producto nuevo', '', 'Bodega 1', '', '', '', None, 10.0, 5, 1)
+    return [
+        ('obtener_usuario_por_id', (user_id,)),
+        ('obtener_usuario_por_username', ('planes',)),
+        ('obtener_estadisticas', (user_id,)),
+        ('obtener_productos_stock_bajo', (user_id,)),
+        ('obtener_productos', (user_id,)),
+        ('obtener_producto_por_id', (user_id, medio)),
+        ('obtener_movimientos', (user_id,)),
+        ('obtener_productos_pagina', (user_id,)),
+        ('obtener_productos_pagina', (user_id, codificar_cursor('sig', ['Producto 5', medio], 2))),
+        ('obtener_movimientos_pagina', (user_id,)),
+        ('obtener_movimientos_pagina', (user_id, codificar_cursor('ant', ['2000-01-01 00:00:00', 10], 3))),
+        ('obtener_opciones_productos', (user_id,)),
+        ('buscar_productos', (user_id, 'Producto 12', 'Bodega 3')),
+        ('buscar_productos', (user_id, 'descripción', '')),
+        ('buscar_productos', (user_id, '', '')),
+        ('obtener_ubicaciones', (user_id,)),
+        ('obtener_reporte_stock', (user_id,)),
+        ('obtener_reporte_movimientos', (user_id,)),
+        ('obtener_reporte_movimientos', (user_id, '2024-01-01', '2024-12-31', 'semana')),
+        ('obtener_reporte_movimientos', (user_id, '2024-01-01', '2024-12-31', 'mes', medio)),
+        ('generar_cortes_existencias', ('2024-06-30', [user_id])),
+        ('obtener_stock_en_fecha', (user_id, '2024-07-15')),
+        ('obtener_stock_en_fecha', (user_id, '2024-06-01')),
+        ('exportar_productos', (user_id,)),
+        ('exportar_movimientos', (user_id,)),
+        ('exportar_movimientos', (user_id, '2024-01-01', '2024-03-31')),
+        ('exportar_movimientos', (user_id, None, None, medio)),
+        ('agregar_producto', (user_id,) + datos_producto),
+        ('actualizar_producto', (user_id, medio) + datos_producto[:1] + ('Renombrado',) + datos_producto[2:]),
+        ('agregar_movimiento', (user_id, medio, 'entrada', 5, 'Verificación')),
+        ('eliminar_producto', (user_id, medio + 1)),
+        ('generar_resumenes_alertas', ()),
+        ('obtener_resumenes_alertas', (user_id,)),
+    ]
+
+
+def capturar_sentencias(sistema, metodo, args):
+    sentencias = []
+    with sistema.pool.conexion() as conn:
+        conn.set_trace_callback(sentencias.append)
+        try:
+            resultado = getattr(sistema, metodo)(*args)
+            # Los métodos generadores (exportaciones) sólo consultan al recorrerlos
+            if inspect.isgenerator(resultado):
+                for _ in resultado:
+                    pass
+        finally:
+            conn.set_trace_callback(None)
+    # Las líneas "-- TRIGGER" y el control de transacciones no tienen plan propio
+    return [s for s in sentencias
+            if s.split(None, 1)[0].upper() in ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'WITH')]
+
+
+def plan_de(sistema, sql):
+    with sistema.pool.conexion() as conn:
+        parametros = [None] * sql.count('?')
+        return [fila['detail'] for fila in conn.execute(f'EXPLAIN QUERY PLAN {sql}', parametros)]
+
+
+def verificar(sistema, user_id, productos, detallado=False):
+    problemas = []
+    for metodo, args in consultas_calientes(user_id, productos):
+        permitidos = PASOS_PERMITIDOS.get(metodo, set())
+        for sql in capturar_sentencias(sistema, metodo, args):
+            for detalle in plan_de(sistema, sql):
+                paso = normalizar(detalle)
+                if detallado:
+                    print(f"   {metodo:<30} {paso}")
+                if es_paso_costoso(paso) and paso not in permitidos:
+                    problemas.append((metodo, paso, ' '.join(normalizar(sql).split())))
+    return problemas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verificar los planes de las consultas calientes")
+    parser.add_argument('--productos', type=int, default=2000)
+    parser.add_argument('--movimientos', type=int, default=10000)
+    parser.add_argument('--almacenamiento', choices=MODOS_ALMACENAMIENTO,
+                        help='Comprobar sólo este modo (por defecto ambos)')
+    parser.add_argument('-v', '--detallado', action='store_true', help='Mostrar todos los pasos de cada plan')
+    args = parser.parse_args(argv)
+
+    problemas = []
+    for modo in [args.almacenamiento] if args.almacenamiento else MODOS_ALMACENAMIENTO:
+        with tempfile.TemporaryDirectory() as tmp:
+            sistema = SistemaInventario(os.path.join(tmp, 'planes.db'), almacenamiento=modo)
+            try:
+                user_id = sembrar(sistema, args.productos, args.movimientos)
+                problemas += [(modo,) + problema
+                              for problema in verificar(sistema, user_id, args.productos, args.detallado)]
+            finally:
+                sistema.cerrar()
+
+    if problemas:
+        print(f"❌ {len(problemas)} pasos de plan sin índice:")
+        for modo, metodo, paso, sql in problemas:
+            print(f"   • [{modo}] {metodo}: {paso}")
+            print(f"     {sql}")
+        return 1
+
+    print("✅ Todas las consultas calientes usan índices")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
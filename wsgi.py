@@ -0,0 +1,12 @@
+"""Punto de entrada WSGI para producción.
+
+    INVENTARIO_SECRET_KEY=... gunicorn -c gunicorn.conf.py wsgi:app
+    INVENTARIO_SECRET_KEY=... waitress-serve --threads 8 --listen 0.0.0.0:8000 wsgi:app
+
+El perfil es 'produccion' salvo que INVENTARIO_PERFIL indique otro.
+"""
+import os
+
+from app import create_app
+
+app = create_app(os.environ.get('INVENTARIO_PERFIL', 'produccion'))